@@ -0,0 +1,329 @@
+"""
+Cross-piece benchmark suite on synthetic data: wall time and peak memory per piece and for the
+whole pipeline, at several data scales, checked against a stored baseline.
+
+For every scale the inputs are generated with ``synthetic_data.generate`` (cached under
+``--data-dir``). Each piece then runs alone in a fresh Python process (``LocalRunner`` with one
+stage, tables handed over as files), so its peak RSS is its own; wall / CPU time and peak RSS come
+from the piece's ``metrics.json``. The ``pipeline`` row is one ``LocalRunner`` run of the whole DAG
+per site, in memory, as in development. The ``kernel:*`` rows time the shared battery kernels in
+process on the first site's load; ``KERNEL_SCALES`` adds them at 1-minute resolution by default,
+without running the pieces at that scale.
+
+A result regresses when it exceeds the baseline by more than ``--threshold`` (relative) and by more
+than the absolute floors (``--min-wall-s``, ``--min-rss-mb``), which keep sub-second pieces from
+failing on noise. Any regression makes the suite exit with status 1.
+
+From the repository root:
+
+    python benchmarks/run_benchmarks.py                          # default scales, compare with baseline.json
+    python benchmarks/run_benchmarks.py --scale 5y --scale 20y   # named scales (see SCALES)
+    python benchmarks/run_benchmarks.py --scale big:10:5:2       # custom NAME:YEARS:MINUTES:SITES
+    python benchmarks/run_benchmarks.py --update-baseline        # record the current machine as baseline
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+BENCH_DIR = Path(__file__).resolve().parent
+PIECES_DIR = BENCH_DIR.parent / "pieces"
+sys.path.insert(0, str(PIECES_DIR))
+
+from pipeline_common.battery import discharge_above_rate, peak_hour_mask, simulate_peak_shaving  # noqa: E402
+from pipeline_common.instrumentation import METRICS_FILE, _peak_rss_mb  # noqa: E402
+from pipeline_common.local_runner import SAMPLE_INPUTS, LocalRunner, Stage, default_stages, output_value  # noqa: E402
+from synthetic_data import SyntheticSpec, generate  # noqa: E402
+
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+
+# name -> (years, resolution minutes, sites)
+SCALES = {
+    "1y": (1, 15, 1),
+    "5y": (5, 15, 1),
+    "20y": (20, 15, 1),
+    "1y-5min": (1, 5, 1),
+    "1y-1min": (1, 1, 1),
+    "1y-3sites": (1, 15, 3),
+}
+DEFAULT_SCALES = ("1y", "5y")
+KERNEL_SCALES = ("1y-1min",)  # default scales where only the kernels run
+RESULT_COLUMNS = ["scale", "stage", "piece", "rows", "wall_s", "cpu_s", "peak_rss_mb", "status"]
+
+
+def parse_scale(text: str) -> tuple[str, SyntheticSpec]:
+    """``1y`` (a name in SCALES) or ``NAME:YEARS:MINUTES:SITES``."""
+    if text in SCALES:
+        name, (years, minutes, sites) = text, SCALES[text]
+    else:
+        try:
+            name, years, minutes, sites = text.split(":")
+            years, minutes, sites = int(years), int(minutes), int(sites)
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                f"Unknown scale '{text}'. Use one of {sorted(SCALES)} or NAME:YEARS:MINUTES:SITES"
+            ) from None
+    spec = SyntheticSpec(years=years, resolution_min=minutes, sites=sites)
+    spec.validate()
+    return name, spec
+
+
+def site_inputs(site: dict[str, Any]) -> dict[str, str]:
+    """``default_stages`` inputs for one generated site (configs stay the repository samples)."""
+    files = site["files"]
+    return {
+        "load_csv": files["load"],
+        "production_csv": files["production"],
+        "prices_csv": files["prices"],
+        "weather_csv": files["weather"],
+        "kpi_production_csv": files["production"],
+    }
+
+
+def benchmark_stages(inputs: dict[str, str]) -> list[Stage]:
+    """``default_stages`` plus the pieces outside the default DAG (Backtest, SizingOptimization)."""
+    src = {k: str(v) for k, v in {**SAMPLE_INPUTS, **inputs}.items()}
+    v = output_value
+    return default_stages(inputs) + [
+        Stage("backtest", "BacktestPiece", lambda o: {
+            "data_path": v(o["preprocess"], "train_file_path"), "model_path": v(o["train"], "model_file_path"),
+            "max_workers": 1,
+        }, after=("preprocess", "train")),
+        Stage("sizing", "SizingOptimizationPiece", lambda o: {
+            "forecast_csv": v(o["predict"], "prediction_file_path"), "virtual_solar_csv": v(o["solar"], "output_path"),
+            "battery_config_yml": src["battery_config_yml"], "scenario_yml": src["battery_scenario_yml"],
+            "investment_config_yml": src["investment_config_yml"],
+        }, after=("predict", "solar")),
+    ]
+
+
+def _child_env() -> dict[str, str]:
+    env = dict(os.environ)
+    env["PIPELINE_RESULT_CACHE"] = "off"
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (str(PIECES_DIR), env.get("PYTHONPATH", "")) if p)
+    return env
+
+
+def _run_child(job: dict[str, Any]) -> dict[str, Any]:
+    """Run ``job`` with ``--child`` in a fresh interpreter; returns the JSON it writes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        job_path = Path(tmp) / "job.json"
+        result_path = Path(tmp) / "result.json"
+        job_path.write_text(json.dumps({**job, "result": str(result_path)}))
+        proc = subprocess.run([sys.executable, str(Path(__file__).resolve()), "--child", str(job_path)],
+                              env=_child_env(), capture_output=True, text=True)
+        if proc.returncode != 0 or not result_path.is_file():
+            tail = "\n".join((proc.stdout + proc.stderr).strip().splitlines()[-15:])
+            raise RuntimeError(f"Benchmark job {job['kind']} failed (exit {proc.returncode}):\n{tail}")
+        return json.loads(result_path.read_text())
+
+
+def _child(job_path: str) -> None:
+    """Child side: run one stage (inputs already resolved) or the whole pipeline of one site."""
+    job = json.loads(Path(job_path).read_text())
+    if job["kind"] == "stage":
+        runner = LocalRunner(job["results_dir"], max_workers=1, in_memory=False)
+        output = runner.run([Stage(job["stage"], job["piece"], job["inputs"])])[job["stage"]]
+        result = {"output": output if isinstance(output, dict) else output.model_dump()}
+    else:
+        start = time.perf_counter()
+        runner = LocalRunner(job["results_dir"], max_workers=job.get("workers", 2))
+        runner.run(default_stages(job["inputs"]))
+        result = {"wall_s": time.perf_counter() - start, "cpu_s": time.process_time(), "peak_rss_mb": _peak_rss_mb()}
+    Path(job["result"]).write_text(json.dumps(result, default=str))
+
+
+def bench_pieces(scale: str, manifest: dict[str, Any], work_dir: Path) -> list[dict[str, Any]]:
+    """Every piece of the first site, one process each, in dependency order."""
+    site = manifest["sites"][0]
+    rows = site["rows"]
+    outputs: dict[str, Any] = {}
+    results = []
+    for stage in benchmark_stages(site_inputs(site)):
+        results_dir = work_dir / scale / "pieces"
+        kwargs = stage.inputs(outputs) if callable(stage.inputs) else dict(stage.inputs)
+        child = _run_child({"kind": "stage", "stage": stage.name, "piece": stage.piece, "inputs": kwargs,
+                            "results_dir": str(results_dir)})
+        outputs[stage.name] = child["output"]
+        metrics = json.loads((results_dir / stage.name / METRICS_FILE).read_text())
+        results.append({
+            "scale": scale, "stage": stage.name, "piece": stage.piece, "rows": rows,
+            "wall_s": metrics["wall_s"], "cpu_s": metrics["cpu_s"], "peak_rss_mb": metrics["peak_rss_mb"],
+            "status": metrics["status"],
+        })
+        print(f"[METRIC] {scale:<10s} {stage.name:<11s} {metrics['wall_s']:8.2f} s  {metrics['peak_rss_mb']:8.0f} MB")
+    return results
+
+
+def bench_pipeline(scale: str, manifest: dict[str, Any], work_dir: Path) -> dict[str, Any]:
+    """The default DAG in memory for every site, one process per site: summed wall / CPU, max peak RSS."""
+    wall = cpu = rss = 0.0
+    for site in manifest["sites"]:
+        child = _run_child({"kind": "pipeline", "inputs": site_inputs(site),
+                            "results_dir": str(work_dir / scale / "pipeline" / site["name"])})
+        wall += child["wall_s"]
+        cpu += child["cpu_s"]
+        rss = max(rss, child["peak_rss_mb"])
+    result = {
+        "scale": scale, "stage": "pipeline", "piece": f"{len(manifest['sites'])} site(s)",
+        "rows": sum(s["rows"] for s in manifest["sites"]),
+        "wall_s": round(wall, 3), "cpu_s": round(cpu, 3), "peak_rss_mb": round(rss, 1), "status": "ok",
+    }
+    print(f"[METRIC] {scale:<10s} {'pipeline':<11s} {wall:8.2f} s  {rss:8.0f} MB")
+    return result
+
+
+def bench_kernels(scale: str, manifest: dict[str, Any]) -> list[dict[str, Any]]:
+    """Battery kernels on the first site's load: wall time and peak traced allocation (not RSS)."""
+    load = pd.read_csv(manifest["sites"][0]["files"]["load"], parse_dates=["datetime"])
+    load_kw = load["load_kw"].to_numpy(dtype=float)
+    dt_h = load["datetime"].diff().median().total_seconds() / 3600
+    in_peak = peak_hour_mask(load["datetime"], {"start": "08:00", "end": "20:00"})
+    capacity, power = 500.0, 250.0
+    kernels = {
+        "discharge_above_rate": lambda: discharge_above_rate(load_kw, capacity, power, interval_h=dt_h),
+        "simulate_peak_shaving": lambda: simulate_peak_shaving(load_kw - 300.0, capacity, power, in_peak, dt_h),
+    }
+    results = []
+    for name, kernel in kernels.items():
+        start, cpu = time.perf_counter(), time.process_time()
+        kernel()
+        wall, cpu = time.perf_counter() - start, time.process_time() - cpu
+        tracemalloc.start()  # second run: tracing slows the Python loops down too much to time them
+        kernel()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+        results.append({
+            "scale": scale, "stage": f"kernel:{name}", "piece": "pipeline_common.battery", "rows": len(load_kw),
+            "wall_s": round(wall, 4), "cpu_s": round(cpu, 4), "peak_rss_mb": round(peak_mb, 1), "status": "ok",
+        })
+        print(f"[METRIC] {scale:<10s} {name:<22s} {wall:8.3f} s  {peak_mb:8.0f} MB")
+    return results
+
+
+def machine_info() -> dict[str, Any]:
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "pandas": pd.__version__,
+    }
+
+
+def compare(results: pd.DataFrame, baseline: dict[str, Any], threshold: float,
+            min_wall_s: float, min_rss_mb: float) -> pd.DataFrame:
+    """One row per result and metric with the baseline value, the change and whether it regressed."""
+    known = baseline.get("results", {})
+    rows = []
+    for r in results.itertuples(index=False):
+        base = known.get(f"{r.scale}/{r.stage}")
+        if not base:
+            continue
+        for metric, floor in (("wall_s", min_wall_s), ("peak_rss_mb", min_rss_mb)):
+            now, before = float(getattr(r, metric)), float(base[metric])
+            change = (now - before) / before if before > 0 else 0.0
+            rows.append({
+                "scale": r.scale, "stage": r.stage, "metric": metric, "baseline": before, "current": now,
+                "change": round(change, 3), "regressed": change > threshold and now - before > floor,
+            })
+    return pd.DataFrame(rows, columns=["scale", "stage", "metric", "baseline", "current", "change", "regressed"])
+
+
+def write_baseline(results: pd.DataFrame, path: Path) -> None:
+    """Merge ``results`` into the baseline at ``path`` (scales not run keep their stored values)."""
+    baseline = json.loads(path.read_text()) if path.is_file() else {}
+    stored = baseline.get("results", {})
+    for r in results.itertuples(index=False):
+        stored[f"{r.scale}/{r.stage}"] = {"wall_s": round(r.wall_s, 3), "peak_rss_mb": r.peak_rss_mb, "rows": r.rows}
+    baseline = {
+        "created_utc": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        "results": dict(sorted(stored.items())),
+    }
+    path.write_text(json.dumps(baseline, indent=1) + "\n")
+    print(f"[SUCCESS] Baseline written to {path} ({len(results)} results)")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the pieces and the pipeline on synthetic data.")
+    parser.add_argument("--scale", action="append", type=parse_scale,
+                        help=f"scale to run, repeatable: one of {sorted(SCALES)} or NAME:YEARS:MINUTES:SITES "
+                             f"(default: {', '.join(DEFAULT_SCALES)}, plus kernels at {', '.join(KERNEL_SCALES)})")
+    parser.add_argument("--data-dir", default=str(Path(tempfile.gettempdir()) / "industry_sg_vre_synthetic"),
+                        help="where the synthetic inputs are generated (reused across runs)")
+    parser.add_argument("--out", default="benchmark_results", help="piece outputs, benchmark_results.csv / .json")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE))
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative increase counted as a regression")
+    parser.add_argument("--min-wall-s", type=float, default=0.25, help="ignore wall time increases below this")
+    parser.add_argument("--min-rss-mb", type=float, default=32.0, help="ignore peak RSS increases below this")
+    parser.add_argument("--skip-pieces", action="store_true", help="only the whole pipeline")
+    parser.add_argument("--skip-pipeline", action="store_true", help="only the pieces")
+    parser.add_argument("--skip-kernels", action="store_true", help="no battery kernel timings")
+    parser.add_argument("--update-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.child)
+        return 0
+
+    scales = args.scale or [parse_scale(s) for s in DEFAULT_SCALES]
+    kernel_only = [] if args.scale or args.skip_kernels else [parse_scale(s) for s in KERNEL_SCALES]
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    results = []
+    for (name, spec), full in [(s, True) for s in scales] + [(s, False) for s in kernel_only]:
+        t0 = time.perf_counter()
+        manifest = generate(spec, Path(args.data_dir) / spec.name)
+        print(f"[INFO] Scale {name}: {spec.name}, {manifest['sites'][0]['rows']:,} rows per site "
+              f"(data ready in {time.perf_counter() - t0:.1f} s)")
+        if full and not args.skip_pieces:
+            results += bench_pieces(name, manifest, out)
+        if full and not args.skip_pipeline:
+            results.append(bench_pipeline(name, manifest, out))
+        if not args.skip_kernels:
+            results += bench_kernels(name, manifest)
+
+    frame = pd.DataFrame(results, columns=RESULT_COLUMNS)
+    frame.to_csv(out / "benchmark_results.csv", index=False)
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        write_baseline(frame, baseline_path)
+        return 0
+
+    if not baseline_path.is_file():
+        print(f"[WARNING] No baseline at {baseline_path}; run with --update-baseline to create one")
+        return 0
+    baseline = json.loads(baseline_path.read_text())
+    report = compare(frame, baseline, args.threshold, args.min_wall_s, args.min_rss_mb)
+    (out / "benchmark_results.json").write_text(json.dumps({
+        "machine": machine_info(), "baseline_machine": baseline.get("machine"), "threshold": args.threshold,
+        "results": frame.to_dict(orient="records"), "comparison": report.to_dict(orient="records"),
+    }, indent=1, default=str))
+    if baseline.get("machine", {}).get("platform") != machine_info()["platform"]:
+        print("[WARNING] Baseline was recorded on another machine; timings may not be comparable")
+    regressions = report[report["regressed"]]
+    for r in regressions.itertuples(index=False):
+        print(f"[WARNING] Regression {r.scale}/{r.stage} {r.metric}: {r.baseline:.2f} -> {r.current:.2f} ({r.change:+.0%})")
+    if not regressions.empty:
+        print(f"[INFO] {len(regressions)} regression(s) above {args.threshold:.0%}; results in {out}")
+        return 1
+    print(f"[SUCCESS] {len(report)} comparisons within {args.threshold:.0%} of the baseline; results in {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
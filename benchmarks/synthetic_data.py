@@ -0,0 +1,300 @@
+"""
+Deterministic synthetic input data at scale: load, production, prices and SolarGIS weather.
+
+One directory per site with the files FetchEnergyDataPiece, SolarSimPiece and KPIPiece read
+(load.csv, production.csv, prices.csv, SolarGIS.csv) and a ``manifest.json``. The same seed,
+span, resolution and site count always give byte-identical files. The data is written one
+calendar year at a time, so 20 years at 1 min resolution never sit in memory at once.
+
+Shapes (per site, scaled by a site factor):
+    load_kw           two-shift weekday profile, lower weekends, seasonal swing, daily level random walk, noise
+    production_ton    follows the load (about 44 kWh per ton) with its own noise
+    price_eur_kwh     hourly constant: morning / evening peaks, seasonal level, daily random walk
+    weather           clear-sky irradiance from the sun position at the site times a daily cloudiness,
+                      split into DNI / DIF; diurnal and seasonal temperature, gamma distributed wind
+
+    python benchmarks/synthetic_data.py --out /tmp/synthetic --years 5 --resolution 15 --sites 3
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+RESOLUTIONS_MIN = (1, 5, 15)
+MAX_YEARS = 20
+START = "2005-01-01"
+SOLARGIS_COLUMNS = ["Date", "Time", "GHI", "DNI", "DIF", "GTI", "SE", "SA", "PVOUT", "TEMP", "WS", "WG", "WD", "RH", "AP"]
+_KWH_PER_TON = 44.0
+
+
+@dataclass(frozen=True)
+class SyntheticSpec:
+    years: int = 1
+    resolution_min: int = 15
+    sites: int = 1
+    seed: int = 0
+    start: str = START
+
+    def validate(self) -> SyntheticSpec:
+        if not 1 <= self.years <= MAX_YEARS:
+            raise ValueError(f"years must be between 1 and {MAX_YEARS}, got {self.years}")
+        if self.resolution_min not in RESOLUTIONS_MIN:
+            raise ValueError(f"resolution_min must be one of {RESOLUTIONS_MIN}, got {self.resolution_min}")
+        if self.sites < 1:
+            raise ValueError(f"sites must be >= 1, got {self.sites}")
+        return self
+
+    @property
+    def name(self) -> str:
+        return f"{self.years}y_{self.resolution_min}min_{self.sites}site_seed{self.seed}"
+
+
+@dataclass(frozen=True)
+class Site:
+    name: str
+    latitude: float
+    longitude: float
+    elevation_m: float
+    load_scale: float
+
+
+def make_sites(spec: SyntheticSpec) -> list[Site]:
+    rng = np.random.default_rng([spec.seed, 0])
+    return [
+        Site(
+            name=f"site_{i + 1:02d}",
+            latitude=round(48.17 + rng.uniform(-1.5, 1.5), 4),
+            longitude=round(17.07 + rng.uniform(-2.0, 4.0), 4),
+            elevation_m=round(rng.uniform(120, 600), 1),
+            load_scale=round(rng.uniform(0.6, 1.6), 3),
+        )
+        for i in range(spec.sites)
+    ]
+
+
+def _daily_walk(rng: np.random.Generator, days: int, sigma: float, phi: float = 0.9) -> np.ndarray:
+    """AR(1) day-level factor (one value per day of the whole span)."""
+    shocks = rng.normal(0.0, sigma, days)
+    out = np.empty(days)
+    level = 0.0
+    for d in range(days):
+        level = phi * level + shocks[d]
+        out[d] = level
+    return out
+
+
+def _shift_profile(hour: np.ndarray, weekday: np.ndarray) -> np.ndarray:
+    """0..1 activity: two shifts 06–22 on weekdays, one reduced shift on Saturday, standby on Sunday."""
+    day_shift = ((hour >= 6) & (hour < 22)).astype(float)
+    ramp = np.clip(np.minimum(hour - 5.0, 23.0 - hour), 0.0, 1.0)
+    weekday_factor = np.select([weekday < 5, weekday == 5], [1.0, 0.45], 0.1)
+    return np.maximum(day_shift, ramp) * weekday_factor
+
+
+def _sun(times: pd.DatetimeIndex, site: Site) -> tuple[np.ndarray, np.ndarray]:
+    """Solar elevation and azimuth (deg) at local standard time UTC+1, without the equation of time."""
+    doy = times.dayofyear.to_numpy()
+    hours = times.hour.to_numpy() + times.minute.to_numpy() / 60.0
+    decl = np.radians(23.44) * np.sin(2 * np.pi * (284 + doy) / 365.0)
+    solar_time = hours + (site.longitude - 15.0) / 15.0
+    hour_angle = np.radians(15.0 * (solar_time - 12.0))
+    lat = np.radians(site.latitude)
+    sin_el = np.sin(lat) * np.sin(decl) + np.cos(lat) * np.cos(decl) * np.cos(hour_angle)
+    elevation = np.degrees(np.arcsin(np.clip(sin_el, -1, 1)))
+    azimuth = np.degrees(np.arctan2(np.sin(hour_angle), np.cos(hour_angle) * np.sin(lat) - np.tan(decl) * np.cos(lat))) + 180.0
+    return elevation, azimuth
+
+
+def _year_frames(spec: SyntheticSpec, site: Site, year_start: pd.Timestamp, year_end: pd.Timestamp,
+                 rng: np.random.Generator, daily: dict[str, np.ndarray], first_day: pd.Timestamp) -> dict[str, pa.Table]:
+    step = pd.Timedelta(minutes=spec.resolution_min)
+    times = pd.date_range(year_start, year_end - step, freq=step)
+    n = len(times)
+    day_idx = ((times.normalize() - first_day) // pd.Timedelta(days=1)).to_numpy()
+    hour = times.hour.to_numpy() + times.minute.to_numpy() / 60.0
+    season = np.cos(2 * np.pi * (times.dayofyear.to_numpy() - 15) / 365.25)  # +1 mid January, -1 mid July
+
+    # ---- load / production ----
+    activity = _shift_profile(hour, times.dayofweek.to_numpy())
+    load = site.load_scale * (
+        420.0 + 520.0 * activity + 60.0 * season + daily["load"][day_idx]
+    ) + rng.normal(0.0, 12.0, n) * site.load_scale
+    load = np.maximum(load, 50.0)
+    step_h = spec.resolution_min / 60.0
+    production = np.maximum(
+        (load - 380.0 * site.load_scale) * step_h / _KWH_PER_TON * (1.0 + rng.normal(0.0, 0.03, n)), 0.0
+    )
+
+    # ---- prices (constant within the hour) ----
+    hour_of = np.floor(hour)
+    peaks = np.exp(-0.5 * ((hour_of - 8.0) / 1.5) ** 2) + 1.2 * np.exp(-0.5 * ((hour_of - 19.0) / 2.0) ** 2)
+    solar_dip = 0.4 * np.exp(-0.5 * ((hour_of - 13.0) / 2.0) ** 2) * (1 - season) / 2
+    price = 0.085 + 0.055 * peaks - 0.03 * solar_dip + 0.02 * season + daily["price"][day_idx]
+    hour_key = times.floor("h").asi8
+    first_of_hour = np.r_[True, hour_key[1:] != hour_key[:-1]]
+    hour_noise = rng.normal(0.0, 0.006, int(first_of_hour.sum()))
+    price = price + hour_noise[np.cumsum(first_of_hour) - 1]
+
+    # ---- weather (SolarGIS: interval centre, UTC+1) ----
+    centre = times + pd.Timedelta(minutes=spec.resolution_min // 2)
+    elevation, azimuth = _sun(centre, site)
+    sin_el = np.sin(np.radians(np.maximum(elevation, 0.0)))
+    clear = np.where(elevation > 0, 1098.0 * sin_el * np.exp(-0.057 / np.maximum(sin_el, 1e-3)), 0.0)
+    clearness = np.clip(daily["cloud"][day_idx] + rng.normal(0.0, 0.05, n), 0.05, 1.0)
+    ghi = clear * clearness
+    dif = ghi * np.clip(1.0 - 0.85 * clearness, 0.1, 1.0)
+    dni = np.where(sin_el > 0.02, np.minimum((ghi - dif) / np.maximum(sin_el, 0.02), 1000.0), 0.0)
+    temp = 10.0 - 11.0 * season + 5.0 * np.sin(2 * np.pi * (hour - 9.0) / 24.0) * clearness + daily["temp"][day_idx]
+    wind = rng.gamma(2.0, 1.4, n)
+
+    datetime_col = pa.array(times.to_numpy().astype("datetime64[s]"))
+    return {
+        "load": pa.table({"datetime": datetime_col, "load_kw": np.round(load, 1)}),
+        "production": pa.table({"datetime": datetime_col, "production_ton": np.round(production, 3)}),
+        "prices": pa.table({"datetime": datetime_col, "price_eur_kwh": np.round(price, 5)}),
+        "weather": pa.table({
+            "Date": pa.array(_strftime(centre, "%d.%m.%Y", by_day=True)),
+            "Time": pa.array(_strftime(centre, "%H:%M", by_day=False)),
+            "GHI": np.round(ghi).astype(np.int32),
+            "DNI": np.round(dni).astype(np.int32),
+            "DIF": np.round(dif).astype(np.int32),
+            "GTI": np.round(ghi * 1.08).astype(np.int32),
+            "SE": np.round(elevation, 2),
+            "SA": np.round(azimuth, 2),
+            "PVOUT": np.round(ghi * 0.8e-3, 3),
+            "TEMP": np.round(temp, 1),
+            "WS": np.round(wind, 1),
+            "WG": np.round(wind * 1.9, 1),
+            "WD": rng.integers(0, 360, n),
+            "RH": np.round(np.clip(75.0 - 1.5 * (temp - 10.0) + rng.normal(0.0, 5.0, n), 15.0, 100.0), 1),
+            "AP": np.round(1013.0 - site.elevation_m / 8.3 + rng.normal(0.0, 2.0, n), 1),
+        }),
+    }
+
+
+def _strftime(times: pd.DatetimeIndex, fmt: str, by_day: bool) -> np.ndarray:
+    """``times.strftime(fmt)`` formatting only the distinct days (``by_day``) or times of day (strftime is slow per row)."""
+    if by_day:
+        codes, uniques = pd.factorize(times.normalize())
+        labels = pd.DatetimeIndex(uniques).strftime(fmt)
+    else:
+        codes, uniques = pd.factorize(times - times.normalize())
+        labels = (pd.Timestamp("2000-01-01") + pd.TimedeltaIndex(uniques)).strftime(fmt)
+    return np.asarray(labels, dtype=object)[codes]
+
+
+def _solargis_header(spec: SyntheticSpec, site: Site, first: pd.Timestamp, last: pd.Timestamp) -> str:
+    lines = [
+        f"#{spec.resolution_min} MINUTE VALUES OF SOLAR RADIATION AND METEOROLOGICAL PARAMETERS (SYNTHETIC)",
+        "#",
+        f"#File type: Solargis_TS{spec.resolution_min}",
+        f"#Site name: {site.name} (synthetic, seed {spec.seed})",
+        f"#Latitude: {site.latitude}",
+        f"#Longitude: {site.longitude}",
+        f"#Elevation: {site.elevation_m} m a.s.l.",
+        "#",
+        f"#Summarization type: harmonized to {spec.resolution_min} min",
+        f"#Summarization period: {first:%d/%m/%Y} - {last:%d/%m/%Y}",
+        "#",
+        "#Columns:",
+        "#Date - Date of measurement, format DD.MM.YYYY",
+        f"#Time - Time of measurement, time reference UTC+1, time step {spec.resolution_min} min, time format HH:MM, center of interval",
+        "#GHI - Global horizontal irradiance [W/m2], no data value -9",
+        "#DNI - Direct normal irradiance [W/m2], no data value -9",
+        "#DIF - Diffuse horizontal irradiance [W/m2], no data value -9",
+        "#GTI - Global tilted irradiance [W/m2], no data value -9",
+        "#SE - Sun altitude angle [deg]",
+        "#SA - Sun aspect angle [deg]",
+        "#PVOUT - PV output [kW]",
+        "#TEMP - Air temperature at 2 m [deg_C]",
+        "#WS - Wind speed at 10 m [m/s]",
+        "#WG - Wind gust at 10 m [m/s]",
+        "#WD - Wind direction at 10 m [deg]",
+        "#RH - Relative humidity [%]",
+        "#AP - Atmospheric pressure [hPa]",
+        "#",
+        "#Data:",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _append(path: Path, table: pa.Table, delimiter: str = ",") -> None:
+    with open(path, "ab") as f:
+        pacsv.write_csv(table, f, pacsv.WriteOptions(include_header=False, delimiter=delimiter, quoting_style="none"))
+
+
+FILES = {"load": "load.csv", "production": "production.csv", "prices": "prices.csv", "weather": "SolarGIS.csv"}
+
+
+def generate_site(spec: SyntheticSpec, site: Site, index: int, site_dir: Path) -> dict:
+    """Write the four input files of one site; returns the manifest entry (paths, rows)."""
+    site_dir.mkdir(parents=True, exist_ok=True)
+    start = pd.Timestamp(spec.start)
+    end = start + pd.DateOffset(years=spec.years)
+    days = (end - start).days
+    rng = np.random.default_rng([spec.seed, index + 1])
+    daily = {
+        "load": _daily_walk(rng, days, 18.0),
+        "price": _daily_walk(rng, days, 0.006, phi=0.95),
+        "cloud": rng.beta(2.2, 1.3, days),
+        "temp": _daily_walk(rng, days, 1.2, phi=0.8),
+    }
+
+    paths = {key: site_dir / name for key, name in FILES.items()}
+    paths["load"].write_text("datetime,load_kw\n")
+    paths["production"].write_text("datetime,production_ton\n")
+    paths["prices"].write_text("datetime,price_eur_kwh\n")
+    paths["weather"].write_text(
+        _solargis_header(spec, site, start, end - pd.Timedelta(days=1)) + ";".join(SOLARGIS_COLUMNS) + "\n"
+    )
+
+    rows = 0
+    for year in range(spec.years):
+        year_start = start + pd.DateOffset(years=year)
+        year_end = start + pd.DateOffset(years=year + 1)
+        tables = _year_frames(spec, site, year_start, year_end, rng, daily, start)
+        for key, table in tables.items():
+            _append(paths[key], table, ";" if key == "weather" else ",")
+        rows += tables["load"].num_rows
+    return {**asdict(site), "rows": rows, "files": {key: str(p) for key, p in paths.items()}}
+
+
+def generate(spec: SyntheticSpec, out_dir: str | Path) -> dict:
+    """Write every site of ``spec`` below ``out_dir`` (skipped when a manifest of the same spec exists)."""
+    spec.validate()
+    out = Path(out_dir)
+    manifest_path = out / "manifest.json"
+    if manifest_path.is_file():
+        manifest = json.loads(manifest_path.read_text())
+        if manifest.get("spec") == asdict(spec):
+            return manifest
+    sites = [generate_site(spec, site, i, out / site.name) for i, site in enumerate(make_sites(spec))]
+    manifest = {"spec": asdict(spec), "sites": sites}
+    manifest_path.write_text(json.dumps(manifest, indent=1))
+    return manifest
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic pipeline inputs.")
+    parser.add_argument("--out", required=True, help="output directory (one sub-directory per site)")
+    parser.add_argument("--years", type=int, default=1, help=f"span in years (1-{MAX_YEARS})")
+    parser.add_argument("--resolution", type=int, default=15, choices=RESOLUTIONS_MIN, help="minutes per row")
+    parser.add_argument("--sites", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", default=START, help="first timestamp")
+    args = parser.parse_args(argv)
+    spec = SyntheticSpec(args.years, args.resolution, args.sites, args.seed, args.start)
+    manifest = generate(spec, args.out)
+    for site in manifest["sites"]:
+        print(f"[INFO] {site['name']}: {site['rows']:,} rows -> {Path(site['files']['load']).parent}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+
+
+class InputModel(BaseModel):
+    data_path: str = Field(
+        title="History dataset path",
+        description="train_dataset (parquet, feather or csv) from PreprocessEnergyDataPiece"
+    )
+    model_path: str = Field(
+        default="",
+        description="Optional trained model (xgboost_model.pkl) reused for every origin; empty = retrain per fold"
+    )
+    origin_time: str = Field(default="06:00", description="Time of day of the first forecast origin")
+    origin_every_hours: int = Field(default=24, description="Hours between forecast origins")
+    horizon_hours: int = Field(default=24, description="Forecast horizon from each origin")
+    min_train_days: float = Field(default=7, description="History required before the first origin")
+    train_window_days: float = Field(default=0, description="Training window per fold (0 = all history before the fold)")
+    retrain_every_days: float = Field(
+        default=30,
+        description="Days of origins sharing one model; 0 = one model trained before the first origin"
+    )
+    max_workers: int = Field(default=0, description="Processes for the folds (0 = all CPUs, 1 = serial)")
+
+
+class OutputModel(BaseModel):
+    message: str
+    backtest_errors_path: str = Field(description="Per origin and horizon step forecast errors (parquet)")
+    backtest_summary_csv: str = Field(description="MAE/RMSE/MAPE/bias overall and by horizon step, hour and weekday")
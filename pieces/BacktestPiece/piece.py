@@ -0,0 +1,213 @@
+from domino.base_piece import BasePiece
+from .models import InputModel, OutputModel
+
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from pipeline_common.forecast_features import (TARGET, add_features, feature_columns, lag_steps, make_model,
+                                               recursive_forecast)
+from pipeline_common.instrumentation import instrumented_piece, span
+from pipeline_common.interchange import frame_exists, read_frame, write_frame
+from pipeline_common.result_cache import cached_piece
+from pipeline_common.timegrid import infer_interval_hours
+
+
+# =========================================================
+# ORIGINS / FOLDS
+# =========================================================
+
+def rolling_origins(timestamps: pd.Series, origin_time: str, every_hours: float,
+                    horizon_steps: int, min_history_steps: int) -> np.ndarray:
+    """Row indices of forecast origins: origin_time + k * every_hours, with history and a full horizon available."""
+    ts = pd.DatetimeIndex(timestamps)
+    hh, mm = (int(x) for x in origin_time.split(":"))
+    anchor = ts[0].normalize() + pd.Timedelta(hours=hh, minutes=mm)
+    offset_min = ((ts - anchor).total_seconds() / 60).to_numpy()
+    period_min = every_hours * 60
+    is_origin = (offset_min >= 0) & (np.mod(offset_min, period_min) == 0)
+    idx = np.flatnonzero(is_origin)
+    return idx[(idx >= min_history_steps) & (idx + horizon_steps <= len(ts))]
+
+
+def make_folds(timestamps: pd.Series, origins: np.ndarray, retrain_every_days: float) -> list[np.ndarray]:
+    """Origins grouped by the model that forecasts them (one model per retrain_every_days)."""
+    if len(origins) == 0:
+        return []
+    if retrain_every_days <= 0:
+        return [origins]
+    t = pd.DatetimeIndex(timestamps)[origins]
+    fold_id = ((t - t[0]) / pd.Timedelta(days=retrain_every_days)).astype(int)
+    return [origins[fold_id == f] for f in np.unique(fold_id)]
+
+
+# =========================================================
+# FOLD WORKERS (feature arrays shared read-only via np.memmap)
+# =========================================================
+
+_WORKER: dict = {}
+
+
+def _init_worker(array_dir: str, lag_columns: dict[int, int], model_path: str, nthread: int) -> None:
+    _WORKER.clear()
+    _WORKER.update(
+        features=np.load(Path(array_dir) / "features.npy", mmap_mode="r"),
+        target=np.load(Path(array_dir) / "target.npy", mmap_mode="r"),
+        lag_columns=lag_columns,
+        model=joblib.load(model_path) if model_path else None,
+        nthread=nthread,
+    )
+
+
+def _run_fold(task: tuple[np.ndarray, int, int]) -> tuple[np.ndarray, np.ndarray]:
+    origins, horizon, train_start = task
+    features, target = _WORKER["features"], _WORKER["target"]
+
+    model = _WORKER["model"]
+    if model is None:
+        X = np.asarray(features[train_start:origins[0]])
+        y = np.asarray(target[train_start:origins[0]])
+        ok = np.isfinite(X).all(axis=1) & np.isfinite(y)
+        model = make_model(n_jobs=_WORKER["nthread"])
+        model.fit(X[ok], y[ok])
+
+    preds = recursive_forecast(model, features, target, origins, horizon, _WORKER["lag_columns"])
+    return origins, preds
+
+
+# =========================================================
+# ERROR STORE
+# =========================================================
+
+def error_summary(errors: pd.DataFrame) -> pd.DataFrame:
+    """MAE, RMSE, MAPE and bias overall and by horizon step, hour of day and weekday."""
+    errors = errors.assign(
+        sq_error=errors["error"] ** 2,
+        ape_pct=errors["abs_error"] / errors["actual"].abs().where(errors["actual"] != 0) * 100,
+    )
+    parts = []
+    for dimension in ("overall", "step", "hour", "weekday"):
+        keys = pd.Series("all", index=errors.index) if dimension == "overall" else errors[dimension]
+        g = errors.groupby(keys)
+        part = pd.DataFrame({
+            "n": g.size(),
+            "mae": g["abs_error"].mean(),
+            "rmse": np.sqrt(g["sq_error"].mean()),
+            "mape_pct": g["ape_pct"].mean(),
+            "bias": g["error"].mean(),
+        })
+        part.index = part.index.astype(str)
+        part = part.rename_axis("key").reset_index()
+        part.insert(0, "dimension", dimension)
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+class BacktestPiece(BasePiece):
+
+    @instrumented_piece
+    @cached_piece
+    def piece_function(self, input_data: InputModel) -> OutputModel:
+
+        print("\n[INFO] ===== BACKTEST PIECE START =====")
+
+        data_path = Path(input_data.data_path)
+        if not frame_exists(data_path):
+            raise FileNotFoundError(f"History data not found: {data_path}")
+        model_path = Path(input_data.model_path) if input_data.model_path else None
+        if model_path is not None and not model_path.exists():
+            raise FileNotFoundError(f"Model not found: {model_path}")
+
+        df = read_frame(data_path)
+        if "datetime" not in df.columns:
+            raise ValueError("Dataset must contain 'datetime' column")
+        if TARGET not in df.columns:
+            raise ValueError(f"Target column '{TARGET}' not found")
+        df = df.sort_values("datetime").reset_index(drop=True)
+
+        interval_h = infer_interval_hours(df["datetime"])
+
+        # ---- FEATURES (same as TrainModelPiece) ----
+        with span("transform", "features", rows=len(df)):
+            add_features(df, TARGET, interval_h=interval_h)
+            feature_cols = feature_columns(df, TARGET)
+        if model_path is not None:
+            feature_cols = list(joblib.load(model_path).get_booster().feature_names)
+        steps = lag_steps(interval_h)
+        lag_columns = {feature_cols.index(name): lag for name, lag in steps.items() if name in feature_cols}
+
+        steps_per_hour = 1 / interval_h
+        horizon = int(round(input_data.horizon_hours * steps_per_hour))
+        min_history = max(int(round(input_data.min_train_days * 24 * steps_per_hour)), max(steps.values()))
+        train_window = int(round(input_data.train_window_days * 24 * steps_per_hour))
+
+        origins = rolling_origins(df["datetime"], input_data.origin_time, input_data.origin_every_hours, horizon, min_history)
+        if len(origins) == 0:
+            raise ValueError("No forecast origin with enough history and a full horizon in the dataset")
+        folds = make_folds(df["datetime"], origins, 0 if model_path is not None else input_data.retrain_every_days)
+        print(f"[INFO] Origins: {len(origins)} ({df['datetime'].iloc[origins[0]]} – {df['datetime'].iloc[origins[-1]]}), "
+              f"horizon {horizon} steps, folds: {len(folds)}")
+
+        # ---- SHARED ARRAYS ----
+        array_dir = Path(self.results_path) / "_backtest_arrays"
+        array_dir.mkdir(parents=True, exist_ok=True)
+        np.save(array_dir / "features.npy", df[feature_cols].to_numpy(dtype=np.float32))
+        np.save(array_dir / "target.npy", df[TARGET].to_numpy(dtype=np.float64))
+
+        tasks = [(fold, horizon, max(0, fold[0] - train_window) if train_window > 0 else 0) for fold in folds]
+        workers = min(input_data.max_workers or os.cpu_count() or 1, len(tasks))
+        nthread = max(1, (os.cpu_count() or 1) // workers)
+        init_args = (str(array_dir), lag_columns, str(model_path or ""), nthread)
+        with span("compute", f"{len(tasks)} folds on {workers} process(es)", rows=len(origins) * horizon):
+            try:
+                if workers > 1:
+                    print(f"[INFO] Running {len(tasks)} folds on {workers} processes")
+                    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+                        results = list(pool.map(_run_fold, tasks))
+                else:
+                    _init_worker(*init_args)
+                    results = [_run_fold(task) for task in tasks]
+            finally:
+                _WORKER.clear()
+                shutil.rmtree(array_dir, ignore_errors=True)
+
+        # ---- ERROR STORE ----
+        all_origins = np.concatenate([o for o, _ in results])
+        preds = np.concatenate([p for _, p in results])
+        rows = (all_origins[:, None] + np.arange(horizon)).ravel()
+        timestamps = df["datetime"].iloc[rows].reset_index(drop=True)
+        actual = df[TARGET].to_numpy()[rows]
+        forecast = preds.ravel()
+
+        errors = pd.DataFrame({
+            "origin": np.repeat(df["datetime"].to_numpy()[all_origins], horizon),
+            "datetime": timestamps,
+            "step": np.tile(np.arange(1, horizon + 1), len(all_origins)),
+            "lead_hours": np.tile(np.arange(1, horizon + 1) * interval_h, len(all_origins)),
+            "hour": timestamps.dt.hour.to_numpy(),
+            "weekday": timestamps.dt.dayofweek.to_numpy(),
+            "actual": actual,
+            "forecast": forecast,
+            "error": forecast - actual,
+            "abs_error": np.abs(forecast - actual),
+        })
+        summary = error_summary(errors)
+
+        errors_path = write_frame(errors, self.results_path, "backtest_errors", fmt="parquet")
+        summary_path = Path(self.results_path) / "backtest_summary.csv"
+        summary.to_csv(summary_path, index=False)
+
+        overall = summary[summary["dimension"] == "overall"].iloc[0]
+        print(f"[METRIC] Backtest MAE: {overall['mae']:.2f}, RMSE: {overall['rmse']:.2f}, MAPE: {overall['mape_pct']:.2f} %")
+        print(f"[SUCCESS] Backtest errors saved to {errors_path}")
+
+        return OutputModel(
+            message=f"Backtest finished: {len(all_origins)} origins, MAE={overall['mae']:.2f}",
+            backtest_errors_path=str(errors_path),
+            backtest_summary_csv=str(summary_path),
+        )
@@ -6,9 +6,9 @@ class InputModel(BaseModel):
     BatterySimPiece Input Model
     """
     input_load_data: str = Field(
-        title="Path to virtual solar energy generation CSV",
+        title="Path to virtual solar energy generation file",
         default="virtual_solar.csv",
-        description="CSV file containing virtual solar generation data with columns: datetime, solar_kw)",
+        description="CSV, Feather or Parquet file containing virtual solar generation data with columns: datetime, solar_kw",
     )
 
     input_Battery_config: str = Field(
@@ -18,9 +18,9 @@ class InputModel(BaseModel):
     )
 
     input_forecast: str = Field(
-        title="Path to net load forecast CSV",
+        title="Path to net load forecast file",
         default="forecast.csv",
-        description="CSV file containing net load forecast data with columns: datetime, prediction_load_kw, ...",
+        description="CSV, Feather or Parquet file containing net load forecast data with columns: datetime, prediction_load_kw, ...",
     )
 
     input_scenario: str = Field(
@@ -29,14 +29,26 @@ class InputModel(BaseModel):
         description="YAML file containing scenario configuration with battery operation strategy.",
     )
 
+    output_format: str = Field(
+        title="Output format",
+        default="csv",
+        description="Format of virtual_battery_soc output: csv, feather (Arrow IPC) or parquet.",
+    )
+
+    export_csv: bool = Field(
+        title="Export CSV copy",
+        default=False,
+        description="Also write virtual_battery_soc.csv when output_format is feather or parquet.",
+    )
+
 
 class OutputModel(BaseModel):
     """
     BatterySimPiece Output Model
     """
     output_path: str = Field(
-        title="Path to SOC CSV",
-        description="Path to the generated virtual_battery_soc.csv file.",
+        title="Path to SOC file",
+        description="Path to the generated virtual_battery_soc file (CSV, Feather or Parquet).",
         default="",
     )
     summary_csv_path: str = Field(
@@ -44,6 +56,11 @@ class OutputModel(BaseModel):
         description="Path to battery_summary.csv (capacity_kWh, cycles_equivalent, energy_throughput_MWh) for InvestmentEvalPiece.",
         default="",
     )
+    thresholds_csv_path: str = Field(
+        title="Path to monthly peak thresholds CSV",
+        description="battery_thresholds.csv (month, peak_before_kw, threshold_kw, peak_after_kw) of the peak_threshold strategy; empty otherwise.",
+        default="",
+    )
     summary: str = Field(
         title="Results summary",
         description="Summary of battery simulation results (text).",
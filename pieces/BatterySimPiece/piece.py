@@ -1,10 +1,18 @@
+import time
 from pathlib import Path
 
 from domino.base_piece import BasePiece
 from .models import InputModel, OutputModel
+import numpy as np
 import pandas as pd
 import yaml
 
+from pipeline_common.battery import monthly_peak_thresholds, peak_hour_mask, simulate_peak_shaving
+from pipeline_common.instrumentation import instrumented_piece, span
+from pipeline_common.interchange import read_frame, write_frame
+from pipeline_common.result_cache import cached_piece
+from pipeline_common.timegrid import align_to_timestamps, interval_hours
+
 
 class BatteryModel:
     def __init__(self, capacity_kwh: float, charge_eff: float, discharge_eff: float,
@@ -14,6 +22,7 @@ class BatteryModel:
         self.discharge_eff = discharge_eff
         self.max_power = max_c_rate * capacity_kwh  # kW
         self.strategy = strategy  # dict with peak_hours, charge_from, etc.
+        self.thresholds = None  # monthly import thresholds of the peak_threshold strategy
 
     def simulate(self, solar_power_df: pd.DataFrame, load_forecast_df: pd.DataFrame = None) -> tuple[pd.Series, pd.Series]:
         """
@@ -33,14 +42,15 @@ class BatteryModel:
                 lf["load_kw"] = lf["prediction_load_kw"]
             else:
                 lf["load_kw"] = 0.0
-            # Podpora oboch formátov: Solargis :07/:22/:37/:52 aj štandard :00/:15/:30/:45 – zjednotenie cez floor 15 min
-            solar_ts = pd.to_datetime(solar["datetime"])
-            lf_ts = pd.to_datetime(lf["datetime"])
-            solar["_t_15"] = solar_ts.dt.floor("15min")
-            lf["_t_15"] = lf_ts.dt.floor("15min")
-            lf_sel = lf[["_t_15", "load_kw"]].drop_duplicates(subset=["_t_15"], keep="first")
-            merged = solar.merge(lf_sel, on="_t_15", how="left", suffixes=("", "_lf"))
-            merged = merged.drop(columns=["_t_15"], errors="ignore")
+            # Podpora oboch formátov: Solargis :07/:22/:37/:52 aj štandard :00/:15/:30/:45 – zjednotenie cez floor
+            # na hrubší z oboch krokov; jemnejší forecast (napr. 1 min) určuje časovú mriežku simulácie
+            if len(lf) > 1 and interval_hours(lf) < interval_hours(solar) * (1 - 1e-9):
+                merged = lf[["datetime", "load_kw"]].copy()
+                merged["solar_kw"] = align_to_timestamps(merged["datetime"], solar, "solar_kw")
+                merged["solar_kw"] = merged["solar_kw"].fillna(0.0)
+            else:
+                merged = solar.copy()
+                merged["load_kw"] = align_to_timestamps(solar["datetime"], lf, "load_kw")
             merged["load_kw"] = merged["load_kw"].fillna(0.0)
             if merged["load_kw"].eq(0.0).all() and len(lf) > 0:
                 import warnings as _w
@@ -57,79 +67,65 @@ class BatteryModel:
         # compute net load in kW: positive => import (load > solar), negative => export / excess
         merged["net_kw"] = merged["load_kw"] - merged.get("solar_kw", 0.0)
 
-        # infer timestep in hours (e.g. 0.25 for 15 min)
-        if "datetime" in merged.columns and len(merged) >= 2:
-            diffs = pd.to_datetime(merged["datetime"]).diff().dropna()
-            dt_h = diffs.iloc[0].total_seconds() / 3600.0 if len(diffs) > 0 else 0.25
+        # timestep in hours (e.g. 0.25 for 15 min, 1/60 for 1 min)
+        dt_h = interval_hours(merged) if "datetime" in merged.columns else 0.25
+
+        if self.strategy.get("discharge_during") == "peak_threshold" and "datetime" in merged.columns:
+            # najnižší mesačný prah odberu, ktorý batéria udrží; vybíja sa len nad ním
+            t0 = time.perf_counter()
+            self.thresholds, soc, grid = monthly_peak_thresholds(
+                merged["net_kw"].to_numpy(dtype=float),
+                merged["datetime"],
+                self.capacity,
+                self.max_power,
+                dt_h,
+                charge_eff=self.charge_eff,
+                discharge_eff=self.discharge_eff,
+                initial_soc_pct=self.strategy.get("initial_soc", 50.0),
+                grid_charging=self.strategy.get("charge_from") == "grid",
+            )
+            print(f"[METRIC] Peak thresholds for {len(self.thresholds)} months found in "
+                  f"{time.perf_counter() - t0:.3f} s ({int(self.thresholds['probes'].sum())} probes)")
+            soc_series = pd.Series(soc, index=merged["datetime"], name="soc_pct")
+            grid_series = pd.Series(grid, index=merged["datetime"], name="grid_import_kw")
+            return soc_series, grid_series
+
+        # dispatch (shared array kernel): discharge in peak while SOC > 10 % and net > 0,
+        # charge from solar excess (net < 0) up to 90 % SOC
+        if "datetime" in merged.columns:
+            in_peak = peak_hour_mask(merged["datetime"], self.strategy.get("peak_hours"))
         else:
-            dt_h = 0.25
-
-        soc = [self.strategy.get("initial_soc", 50.0)]
-        grid = []
-
-        # helper to parse peak hour values
-        def _parse_hour(v):
-            if isinstance(v, str):
-                return int(v.split(":")[0])
-            return int(v)
-
-        peak = self.strategy.get("peak_hours")
-        if peak and isinstance(peak.get("start"), (str, int)):
-            try:
-                peak = {"start": _parse_hour(peak["start"]), "end": _parse_hour(peak["end"])}
-            except Exception:
-                peak = None
-
-        for _, row in merged.iterrows():
-            net = float(row["net_kw"])  # kW
-            # hour for peak detection
-            hour = row["datetime"].hour if "datetime" in merged.columns else getattr(row, "Index", None)
-            in_peak = False
-            if peak:
-                in_peak = peak["start"] <= hour < peak["end"]
-
-            # Discharge during peak to reduce imports (net > 0 means import)
-            # deliver_kw = power to grid; from battery we take deliver_kw*dt/discharge_eff (kWh)
-            if in_peak and soc[-1] > 10 and net > 0:
-                available_kwh = (soc[-1] / 100.0) * self.capacity
-                # max energy deliverable to grid = available_kwh * discharge_eff
-                max_deliver_kw = min(net, self.max_power, available_kwh * self.discharge_eff / dt_h)
-                deliver_kw = max_deliver_kw
-                grid.append(net - deliver_kw)
-                # SOC decrease: energy taken from battery = deliver_kw * dt / discharge_eff
-                delta_soc = (deliver_kw * dt_h / self.discharge_eff / self.capacity) * 100.0
-                new_soc = soc[-1] - delta_soc
-            # Charge from solar excess (kedykoľvek net < 0), aby sa batéria dobil cez deň a predpoveď bola verná
-            # energy stored = charge_kw * dt * charge_eff
-            elif soc[-1] < 90 and net < 0:
-                excess = -net
-                max_charge_power = (90.0 - soc[-1]) / 100.0 * self.capacity / dt_h
-                charge_kw = min(self.max_power, excess, max_charge_power)
-                grid.append(net + charge_kw)
-                delta_soc = (charge_kw * dt_h * self.charge_eff / self.capacity) * 100.0
-                new_soc = soc[-1] + delta_soc
-            else:
-                grid.append(net)
-                new_soc = soc[-1]
-
-            soc.append(max(0.0, min(100.0, new_soc)))
+            in_peak = np.zeros(len(merged), dtype=bool)
+
+        soc, grid = simulate_peak_shaving(
+            merged["net_kw"].to_numpy(dtype=float),
+            self.capacity,
+            self.max_power,
+            in_peak,
+            dt_h,
+            charge_eff=self.charge_eff,
+            discharge_eff=self.discharge_eff,
+            initial_soc_pct=self.strategy.get("initial_soc", 50.0),
+        )
 
         # create series indexed by datetime if present
         index = merged["datetime"] if "datetime" in merged.columns else merged.index
-        soc_series = pd.Series(soc[1:], index=index, name="soc_pct")
+        soc_series = pd.Series(soc, index=index, name="soc_pct")
         grid_series = pd.Series(grid, index=index, name="grid_import_kw")
         return soc_series, grid_series
 
 
 class BatterySimPiece(BasePiece):
 
+    @instrumented_piece
+    @cached_piece
     def piece_function(self, input_data: InputModel) -> OutputModel:
         # solar generation input (kW)
-        df_solar_power = pd.read_csv(input_data.input_load_data, parse_dates=["datetime"])
+        df_solar_power = read_frame(input_data.input_load_data)
         # load forecast input (MW) — predictions_15min.csv: 'prediction_load_mw'
         df_load_forecast = None
         try:
-            df_load_forecast = pd.read_csv(input_data.input_forecast, parse_dates=["datetime"])
+            df_load_forecast = read_frame(input_data.input_forecast)
         except Exception:
             df_load_forecast = None
 
@@ -157,7 +153,8 @@ class BatterySimPiece(BasePiece):
             strategy=strategy,
         )
 
-        soc, grid = model.simulate(df_solar_power, df_load_forecast)
+        with span("compute", "battery dispatch", rows=len(df_solar_power)):
+            soc, grid = model.simulate(df_solar_power, df_load_forecast)
 
         # SOC + grid_import_kw (pre SimulatePiece – detailný výstup batérie)
         out_df = pd.DataFrame({
@@ -165,12 +162,16 @@ class BatterySimPiece(BasePiece):
             "grid_import_kw": grid.values,
         }, index=soc.index)
         out_df.index.name = "datetime"
-        output_path = Path(self.results_path) / "virtual_battery_soc.csv"
-        summary_path = Path(self.results_path) / "battery_summary.csv"
-        out_df.to_csv(
-            output_path,
+        output_path = write_frame(
+            out_df.reset_index(),
+            self.results_path,
+            "virtual_battery_soc",
+            fmt=input_data.output_format,
+            dataset="virtual_battery_soc",
+            export_csv=input_data.export_csv,
             date_format="%Y-%m-%d %H:%M:%S",
         )
+        summary_path = Path(self.results_path) / "battery_summary.csv"
 
         # compute some summary KPIs: 1 full cycle = 200% SOC change (0→100→0)
         capacity = battery_config.get("capacity_kWh")
@@ -186,19 +187,28 @@ class BatterySimPiece(BasePiece):
 
         pd.DataFrame([summary]).to_csv(summary_path, index=False)
 
+        thresholds_path = ""
+        if model.thresholds is not None:
+            thresholds_path = Path(self.results_path) / "battery_thresholds.csv"
+            model.thresholds.to_csv(thresholds_path, index=False)
+            print(f"[INFO] Monthly peak thresholds saved to {thresholds_path}")
+
         summary_str = "\n".join(f"{k}: {v}" for k, v in summary.items())
         if getattr(self, "logger", None) is not None:
             self.logger.info("Battery simulation finished:\n%s", summary_str)
         print(f"[INFO] Battery simulation finished, saved to {output_path}")
         print(f"[INFO] Battery summary (cycles, throughput) saved to {summary_path}")
 
-        self.display_result = {
-            "file_type": "csv",
-            "file_path": str(output_path),
-        }
+        csv_path = output_path.with_suffix(".csv")
+        if csv_path.is_file():
+            self.display_result = {
+                "file_type": "csv",
+                "file_path": str(csv_path),
+            }
 
         return OutputModel(
             output_path=str(output_path),
             summary_csv_path=str(summary_path),
+            thresholds_csv_path=str(thresholds_path),
             summary=summary_str,
         )
\ No newline at end of file
@@ -6,22 +6,28 @@ from pathlib import Path
 
 import pandas as pd
 import plotly.express as px
+import pyarrow.parquet as pq
 import streamlit as st
 
 
-def _load_payload(path: str = "dashboard_data.json") -> dict:
+def _payload_path(path: str = "dashboard_data.json") -> Path | None:
     json_path = Path(path)
-    if not json_path.is_file():
-        # Fallback: try tests/DashboardPiece_Outputs when run from project root
-        try:
-            app_dir = Path(__file__).resolve().parent
-            fallback = app_dir.parent.parent / "tests" / "DashboardPiece_Outputs" / "dashboard_data.json"
-            if fallback.is_file():
-                json_path = fallback
-            else:
-                return {}
-        except Exception:
-            return {}
+    if json_path.is_file():
+        return json_path
+    # Fallback: try tests/DashboardPiece_Outputs when run from project root
+    try:
+        app_dir = Path(__file__).resolve().parent
+        fallback = app_dir.parent.parent / "tests" / "DashboardPiece_Outputs" / "dashboard_data.json"
+        if fallback.is_file():
+            return fallback
+    except Exception:
+        pass
+    return None
+
+
+def _load_payload(json_path: Path | None) -> dict:
+    if json_path is None:
+        return {}
     try:
         return json.loads(json_path.read_text(encoding="utf-8"))
     except Exception:
@@ -37,6 +43,65 @@ def _records_to_df(records: object) -> pd.DataFrame:
     return df
 
 
+def _dataset_df(entry: object, base_dir: Path) -> pd.DataFrame:
+    """Inline records (summary rows, legacy payloads) or a sidecar Parquet file next to the JSON."""
+    if isinstance(entry, dict) and entry.get("path"):
+        try:
+            return pd.read_parquet(base_dir / entry["path"])
+        except Exception:
+            return pd.DataFrame()
+    return _records_to_df(entry)
+
+
+def _dataset_tiles(entry: object, base_dir: Path) -> pd.DataFrame:
+    """Hourly / daily / LTTB chart tiles written by DashboardPiece for a sidecar dataset (empty if none)."""
+    tiles = entry.get("tiles") if isinstance(entry, dict) else None
+    if not tiles or not tiles.get("path"):
+        return pd.DataFrame()
+    try:
+        return pd.read_parquet(base_dir / tiles["path"])
+    except Exception:
+        return pd.DataFrame()
+
+
+# Finest first; "auto" takes the first resolution with at most MAX_CHART_POINTS points per trace in the period
+MAX_CHART_POINTS = 4000
+CHART_RESOLUTIONS = ["raw", "hourly", "lttb", "daily"]
+
+
+def _chart_frame(raw: pd.DataFrame, tiles: pd.DataFrame, dt_col: str, columns: list[str], start, end,
+                 resolution: str = "auto") -> tuple[pd.DataFrame, str]:
+    """
+    ``dt_col`` + ``columns`` in the chart period at the requested resolution (or the finest one that stays
+    light). ``raw=None`` draws from the tiles only.
+    """
+    candidates = {"raw": raw} if raw is not None else {}
+    if not tiles.empty and {"resolution", dt_col, *columns} <= set(tiles.columns):
+        for name in CHART_RESOLUTIONS[1:]:
+            candidates[name] = tiles[tiles["resolution"] == name]
+
+    def in_period(df: pd.DataFrame) -> pd.DataFrame:
+        if start is None or end is None or dt_col not in df.columns:
+            return df
+        ts = df[dt_col] if pd.api.types.is_datetime64_any_dtype(df[dt_col]) else pd.to_datetime(df[dt_col], errors="coerce")
+        return df[(ts >= start) & (ts < end)]
+
+    if resolution != "auto" and resolution in candidates:
+        name = resolution
+    else:
+        available = [n for n in CHART_RESOLUTIONS if n in candidates]
+        if not available:
+            return pd.DataFrame(columns=[dt_col, *columns]), "raw"
+        name = next((n for n in available if len(in_period(candidates[n])) <= MAX_CHART_POINTS), available[-1])
+    frame = in_period(candidates[name])[[dt_col, *columns]].sort_values(by=dt_col)
+    return frame, name
+
+
+def _resolution_caption(resolution: str, frame: pd.DataFrame) -> None:
+    if resolution != "raw":
+        st.caption(f"Chart resolution: {resolution} ({len(frame):,} points)")
+
+
 def _as_float(value, default=0.0) -> float:
     try:
         return float(value)
@@ -52,6 +117,15 @@ def _pick_existing(columns: list[str], options: list[str]) -> str | None:
     return None
 
 
+def _interval_hours(df: pd.DataFrame, default: float = 0.25) -> float:
+    """Row interval in hours (median step of the datetime column): 0.25 at 15 min, 1/60 at 1 min."""
+    if "datetime" not in df.columns:
+        return default
+    steps = pd.to_datetime(df["datetime"]).drop_duplicates().sort_values().diff().dropna()
+    steps = steps[steps > pd.Timedelta(0)]
+    return steps.median().total_seconds() / 3600 if len(steps) else default
+
+
 def _filter_by_scenario(df: pd.DataFrame, selected_scenario: str) -> pd.DataFrame:
     if df.empty:
         return df
@@ -82,13 +156,22 @@ def _format_eur(value: float) -> str:
     return f"{value:,.0f} €"
 
 
-def _render_dataset_table(title: str, df: pd.DataFrame, missing_message: str) -> None:
+TABLE_PAGE_ROWS = 500
+
+
+def _render_dataset_table(title: str, df: pd.DataFrame, missing_message: str, key: str = "") -> None:
+    """One page of ``df`` at a time, so large time series do not ship to the browser in full."""
     st.markdown(f"**{title}**")
     if df.empty:
         st.info(missing_message)
         return
-    st.caption(f"Rows: {len(df)} | Columns: {len(df.columns)}")
-    st.dataframe(df, use_container_width=True)
+    pages = max(1, -(-len(df) // TABLE_PAGE_ROWS))
+    page = 1
+    if pages > 1:
+        page = int(st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key=f"page_{key or title}"))
+    st.caption(f"Rows: {len(df)} | Columns: {len(df.columns)}" + (f" | Page {page} / {pages}" if pages > 1 else ""))
+    start = (page - 1) * TABLE_PAGE_ROWS
+    st.dataframe(df.iloc[start:start + TABLE_PAGE_ROWS], use_container_width=True)
 
 
 def _find_soc_series(*frames: pd.DataFrame) -> tuple[pd.DataFrame, str | None, str | None]:
@@ -124,6 +207,95 @@ def _simulation_period_days(df: pd.DataFrame, dt_col: str) -> tuple[float | None
     return days, range_str
 
 
+# ----- Cache layers -----
+# Keyed by payload path + mtime: a new DashboardPiece run rewrites dashboard_data.json (after its
+# Parquet sidecars), which invalidates everything below on the next rerun.
+DATASET_KEYS = [
+    "preprocess_predict", "predict_predictions", "simulate_results", "simulate_summary",
+    "kpi_results", "investment_evaluation", "virtual_battery_soc", "backtest_summary",
+]
+TILED_KEYS = ["preprocess_predict", "predict_predictions", "simulate_results", "virtual_battery_soc"]
+MAX_COMPARE_SCENARIOS = 20
+
+
+def _partitions(entry: object) -> dict:
+    """scenario -> {offset, rows, row_groups} of a sidecar DashboardPiece wrote grouped by scenario (payload v3)."""
+    return (entry.get("partitions") or {}) if isinstance(entry, dict) else {}
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _cached_payload(path: str, mtime_ns: int) -> dict:
+    return _load_payload(Path(path))
+
+
+@st.cache_resource(show_spinner="Loading dashboard data…", max_entries=2)
+def _cached_frames(path: str, mtime_ns: int) -> dict[str, pd.DataFrame]:
+    """All datasets and their chart tiles (``<key>_tiles``), shared read-only by every rerun and session."""
+    datasets = _cached_payload(path, mtime_ns).get("datasets", {})
+    base_dir = Path(path).parent
+    # partitioned sidecars are read per scenario in _scenario_frame, never as a whole
+    frames = {
+        key: pd.DataFrame() if _partitions(datasets.get(key)) else _dataset_df(datasets.get(key, []), base_dir)
+        for key in DATASET_KEYS
+    }
+    frames.update({f"{key}_tiles": _dataset_tiles(datasets.get(key), base_dir) for key in TILED_KEYS})
+    return frames
+
+
+@st.cache_resource(show_spinner=False, max_entries=3 * MAX_COMPARE_SCENARIOS)
+def _scenario_frame(path: str, mtime_ns: int, key: str, scenario: str) -> pd.DataFrame:
+    """
+    One dataset (or ``<key>_tiles``) for a scenario; read-only, copy before mutating. Partitioned
+    sidecars read only the scenario's row groups, so memory follows the scenarios in view.
+    """
+    entry = _cached_payload(path, mtime_ns).get("datasets", {}).get(key)
+    part = _partitions(entry).get(scenario)
+    if part:
+        table = pq.ParquetFile(Path(path).parent / entry["path"]).read_row_groups(part["row_groups"])
+        return table.to_pandas()
+    frames = _cached_frames(path, mtime_ns)
+    if _partitions(entry):
+        # scenario without rows in this dataset: same fallback as _filter_by_scenario (whole table)
+        return pd.read_parquet(Path(path).parent / entry["path"])
+    return _filter_by_scenario(frames[key], scenario)
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _cached_periods(path: str, mtime_ns: int) -> dict:
+    """Chart slider bounds and the simulated period (days, range string) of one payload version."""
+    frames = _cached_frames(path, mtime_ns)
+    datasets = _cached_payload(path, mtime_ns).get("datasets", {})
+    series = [
+        # partitioned sidecars: the time range from their descriptor
+        pd.DataFrame({"datetime": pd.to_datetime([datasets[key].get("time_start"), datasets[key].get("time_end")])})
+        if _partitions(datasets.get(key)) else frames[key]
+        for key in ("simulate_results", "predict_predictions", "virtual_battery_soc")
+    ]
+    bounds = [
+        pd.to_datetime(df["datetime"], errors="coerce").agg(["min", "max"])
+        for df in series
+        if not df.empty and "datetime" in df.columns
+    ]
+    bounds = [b for b in bounds if b.notna().all()]
+    result = {
+        "first": min(b["min"] for b in bounds).date() if bounds else None,
+        "last": max(b["max"] for b in bounds).date() if bounds else None,
+        "sim_days": None,
+        "sim_str": "",
+    }
+    for df in (series[0], series[2], series[1]):
+        col = _pick_existing(df.columns.tolist(), ["datetime", "timestamp", "time"])
+        if col:
+            result["sim_days"], result["sim_str"] = _simulation_period_days(df, col)
+            if result["sim_days"] is not None and result["sim_days"] > 0:
+                break
+    return result
+
+
+# st.fragment (Streamlit >= 1.37) reruns only the section whose widget changed, not the whole page
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+
 # Human-readable labels for investment metrics
 METRIC_LABELS = {
     "total_capex_eur": "Total investment (€)",
@@ -131,31 +303,38 @@ METRIC_LABELS = {
     "battery_capex_eur": "Battery CAPEX (€)",
     "annual_savings_eur": "Annual savings (€)",
     "simple_payback_years": "Payback period (years)",
+    "discounted_payback_years": "Discounted payback (years)",
     "npv_eur": "Net present value (€)",
+    "irr": "Internal rate of return",
+    "npv_grid_p10_eur": "NPV P10 over sensitivity grid (€)",
+    "npv_grid_p50_eur": "NPV P50 over sensitivity grid (€)",
+    "npv_grid_p90_eur": "NPV P90 over sensitivity grid (€)",
+    "npv_grid_positive_share": "Share of grid with NPV > 0",
     "solar_lcoe_eur_per_mwh": "Levelized cost of energy (€/MWh)",
     "annual_co2_saved_ton": "CO₂ saved (t/year)",
     "battery_cycles_est": "Battery equivalent full cycles (over period)",
 }
 
 
+
 st.set_page_config(page_title="ISGvRE – Investment & Energy", layout="wide")
 st.title("Virtual RE – Investment & Energy Dashboard")
 
-payload = _load_payload("dashboard_data.json")
+payload_path = _payload_path("dashboard_data.json")
+if payload_path is None:
+    st.warning("No data: dashboard_data.json was not provided or could not be parsed.")
+    st.stop()
+payload_key = (str(payload_path.resolve()), payload_path.stat().st_mtime_ns)
+payload = _cached_payload(*payload_key)
 if not payload:
     st.warning("No data: dashboard_data.json was not provided or could not be parsed.")
     st.stop()
 
-datasets = payload.get("datasets", {})
 status = payload.get("inputs", {})
-
-preprocess_df = _records_to_df(datasets.get("preprocess_predict", []))
-predict_df = _records_to_df(datasets.get("predict_predictions", []))
-simulate_df = _records_to_df(datasets.get("simulate_results", []))
-simulate_summary_df = _records_to_df(datasets.get("simulate_summary", []))
-kpi_df = _records_to_df(datasets.get("kpi_results", []))
-investment_df = _records_to_df(datasets.get("investment_evaluation", []))
-virtual_battery_soc_df = _records_to_df(datasets.get("virtual_battery_soc", []))
+frames = _cached_frames(*payload_key)
+periods = _cached_periods(*payload_key)
+sim_period_days: float | None = periods["sim_days"]
+sim_period_str: str = periods["sim_str"]
 
 scenario_options = payload.get("scenarios") or ["Default"]
 default_scenario = payload.get("default_scenario", scenario_options[0])
@@ -165,9 +344,30 @@ selected_scenario = st.selectbox(
     index=scenario_options.index(default_scenario) if default_scenario in scenario_options else 0,
 )
 
+
+def _scenario(key: str) -> pd.DataFrame:
+    return _scenario_frame(*payload_key, key, selected_scenario)
+
+
+def _chart_controls() -> tuple[pd.Timestamp | None, pd.Timestamp | None, str]:
+    """Chart period and resolution: long periods use the hourly / LTTB / daily tiles from DashboardPiece."""
+    first, last = periods["first"], periods["last"]
+    if first is None:
+        return None, None, "auto"
+    start = end = None
+    range_col, resolution_col = st.columns([3, 1])
+    if first < last:
+        period = range_col.slider("Chart period", min_value=first, max_value=last, value=(first, last),
+                                  format="DD.MM.YYYY", key="chart_period")
+        start = pd.Timestamp(period[0])
+        end = pd.Timestamp(period[1]) + pd.Timedelta(days=1)
+    resolution = resolution_col.selectbox("Chart resolution", ["auto"] + CHART_RESOLUTIONS, key="chart_resolution")
+    return start, end, resolution
+
+
 # Solar PV & battery (from scenario YAML) – visible block
 st.subheader("Solar PV & battery (scenario)")
-scenario_info = payload.get("scenario_info") or {}
+scenario_info = (payload.get("scenario_infos") or {}).get(selected_scenario) or payload.get("scenario_info") or {}
 solar_kwp = scenario_info.get("solar_kwp")
 battery_kwh = scenario_info.get("battery_kwh")
 scenario_desc = (scenario_info.get("description") or "").strip()
@@ -186,22 +386,12 @@ else:
         "Then run DashboardPiece again to refresh dashboard_data.json."
     )
 
-# Simulation period (for battery cycles and captions)
-sim_period_days: float | None = None
-sim_period_str: str = ""
-for _df, _name in [(simulate_df, "datetime"), (virtual_battery_soc_df, "datetime"), (predict_df, "datetime")]:
-    _col = _pick_existing(_df.columns.tolist(), ["datetime", "timestamp", "time"])
-    if _col:
-        sim_period_days, sim_period_str = _simulation_period_days(_df, _col)
-        if sim_period_days is not None and sim_period_days > 0:
-            break
-
 # ----- Executive summary (for financial director) -----
 st.subheader("Executive summary")
 kpi_data = {}
-kpi_data.update(_first_row(simulate_summary_df))
-kpi_data.update(_first_row(kpi_df))
-kpi_data.update(_first_row(investment_df))
+kpi_data.update(_first_row(_scenario("simulate_summary")))
+kpi_data.update(_first_row(_scenario("kpi_results")))
+kpi_data.update(_first_row(_scenario("investment_evaluation")))
 
 total_capex = _kpi_value(kpi_data, ["total_capex_eur", "total_capex", "capex_eur"])
 payback = _kpi_value(kpi_data, ["simple_payback_years", "payback_years", "payback_period", "payback"])
@@ -226,91 +416,35 @@ elif npv_val is not None and npv_val <= 0 and total_capex and total_capex > 0:
     st.info("NPV is not positive in this scenario. Consider reviewing assumptions (tariffs, CAPEX, discount rate) or timeline.")
 st.divider()
 
-# ----- Investment summary (table + short explanation) -----
-st.subheader("Investment summary")
-invest_display = investment_df.copy()
-invest_display = _filter_by_scenario(invest_display, selected_scenario)
-if not invest_display.empty:
-    exclude = {"datetime", "timestamp", "date"}
-    numeric_cols = [c for c in invest_display.columns if c.lower() not in exclude]
-    if numeric_cols:
-        row = invest_display[numeric_cols].apply(pd.to_numeric, errors="coerce").iloc[0]
-        summary_data = []
-        for key, val in row.dropna().items():
-            label = METRIC_LABELS.get(key, key.replace("_", " ").title())
-            if "eur" in key.lower() or "€" in label:
-                summary_data.append({"Metric": label, "Value": _format_eur(val)})
-            elif "year" in key.lower() or "payback" in key.lower():
-                summary_data.append({"Metric": label, "Value": f"{val:.1f} years"})
-            else:
-                summary_data.append({"Metric": label, "Value": f"{val:,.2f}"})
-        if summary_data:
-            st.dataframe(pd.DataFrame(summary_data), use_container_width=True, hide_index=True)
-    # Show simulation period and battery cycles context
-    if sim_period_str:
-        st.caption(f"**Simulated period:** {sim_period_str}" + (f" ({sim_period_days:.0f} days)" if sim_period_days and sim_period_days > 0 else ""))
-    battery_cycles_val = _kpi_value(_first_row(invest_display), ["battery_cycles_est", "cycles_equivalent"])
-    if battery_cycles_val is not None and sim_period_days and sim_period_days > 0:
-        cycles_per_year = battery_cycles_val * (365.0 / sim_period_days)
-        st.caption(f"Battery equivalent full cycles above ({battery_cycles_val:.2f}) are for this period. **Extrapolated to one year: {cycles_per_year:.1f} equivalent full cycles/year.**")
-    st.caption(
-        "Positive NPV means the project is financially favourable over the analysis period. "
-        "Payback is the number of years until cumulative savings cover the initial investment. "
-        "Battery equivalent full cycles: total charge/discharge (SoC change) over the simulation period expressed as full 0↔100% cycles."
-    )
-else:
-    st.info("Investment evaluation data was not provided.")
-st.divider()
-
-# ----- Consumption and cost (period + annual for financial director) -----
-load_df = _filter_by_scenario(simulate_df.copy(), selected_scenario)
-sim_summary_row = _first_row(_filter_by_scenario(simulate_summary_df.copy(), selected_scenario)) or _first_row(simulate_summary_df)
 
-st.caption("**For the financial director:** Use **annual (extrapolated)** figures for planning and budgets. They are scaled from the simulated period when it is shorter than a year.")
-
-# Period figures (consumption)
-total_kwh_baseline = total_kwh_simulated = None
-if not load_df.empty:
-    original_col = _pick_existing(load_df.columns.tolist(), ["baseline_load_kw", "original_load_kw", "load_kw", "original_load"])
-    net_col = _pick_existing(load_df.columns.tolist(), ["simulated_load_kw", "net_load_kw", "net_load", "grid_import_kw"])
-    if original_col and net_col:
-        total_kwh_baseline = (load_df[original_col].astype(float) * 0.25).sum()
-        total_kwh_simulated = (load_df[net_col].astype(float) * 0.25).sum()
-
-cost_baseline = _as_float(sim_summary_row.get("baseline_cost_eur")) if sim_summary_row else None
-cost_scenario = _as_float(sim_summary_row.get("scenario_cost_eur")) if sim_summary_row else None
-cost_savings = _as_float(sim_summary_row.get("savings_eur")) if sim_summary_row else None
-
-# Two columns: "Over simulated period" | "Extrapolated to 1 year"
-col_period, col_year = st.columns(2)
-with col_period:
-    st.subheader("Over simulated period")
-    if sim_period_str:
-        st.caption(sim_period_str + (f" ({sim_period_days:.0f} days)" if sim_period_days and sim_period_days > 0 else ""))
-    if total_kwh_baseline is not None and total_kwh_simulated is not None:
-        st.metric("Consumption without solar PV & battery", f"{total_kwh_baseline:,.0f} kWh")
-        st.metric("Consumption with solar PV & battery", f"{total_kwh_simulated:,.0f} kWh")
-    if cost_baseline is not None and cost_scenario is not None:
-        st.metric("Cost without solar PV & battery", _format_eur(cost_baseline))
-        st.metric("Cost with solar PV & battery", _format_eur(cost_scenario))
-        st.metric("Savings", _format_eur(cost_savings))
-    if total_kwh_baseline is None and cost_baseline is None:
-        st.info("No consumption or cost data for this period.")
-
-with col_year:
-    st.subheader("Extrapolated to 1 year")
-    st.caption("Annual equivalent (for planning). Based on simulated period.")
-    if sim_period_days and sim_period_days > 0:
-        factor = 365.0 / sim_period_days
-        if total_kwh_baseline is not None and total_kwh_simulated is not None:
-            st.metric("Consumption without solar PV & battery (per year)", f"{total_kwh_baseline * factor:,.0f} kWh/year")
-            st.metric("Consumption with solar PV & battery (per year)", f"{total_kwh_simulated * factor:,.0f} kWh/year")
-        if cost_baseline is not None and cost_scenario is not None and cost_savings is not None:
-            st.metric("Cost without solar PV & battery (per year)", _format_eur(cost_baseline * factor))
-            st.metric("Cost with solar PV & battery (per year)", _format_eur(cost_scenario * factor))
-            st.metric("Savings (per year)", _format_eur(cost_savings * factor))
-    else:
-        st.info("Cannot extrapolate: simulated period unknown or zero.")
+# ----- Sections: only the selected one is computed and rendered (st.tabs would run all of them) -----
+@_fragment
+def _section_costs() -> None:
+    load_df = _scenario("simulate_results")
+    sim_summary_row = _first_row(_scenario("simulate_summary")) or _first_row(frames["simulate_summary"])
+
+    st.caption("**For the financial director:** Use **annual (extrapolated)** figures for planning and budgets. They are scaled from the simulated period when it is shorter than a year.")
+
+    # Period figures (consumption)
+    total_kwh_baseline = total_kwh_simulated = None
+    if not load_df.empty:
+        original_col = _pick_existing(load_df.columns.tolist(), ["baseline_load_kw", "original_load_kw", "load_kw", "original_load"])
+        net_col = _pick_existing(load_df.columns.tolist(), ["simulated_load_kw", "net_load_kw", "net_load", "grid_import_kw"])
+        if original_col and net_col:
+            interval_h = _interval_hours(load_df)
+            total_kwh_baseline = (load_df[original_col].astype(float) * interval_h).sum()
+            total_kwh_simulated = (load_df[net_col].astype(float) * interval_h).sum()
+
+    cost_baseline = _as_float(sim_summary_row.get("baseline_cost_eur")) if sim_summary_row else None
+    cost_scenario = _as_float(sim_summary_row.get("scenario_cost_eur")) if sim_summary_row else None
+    cost_savings = _as_float(sim_summary_row.get("savings_eur")) if sim_summary_row else None
+
+    # Two columns: "Over simulated period" | "Extrapolated to 1 year"
+    col_period, col_year = st.columns(2)
+    with col_period:
+        st.subheader("Over simulated period")
+        if sim_period_str:
+            st.caption(sim_period_str + (f" ({sim_period_days:.0f} days)" if sim_period_days and sim_period_days > 0 else ""))
         if total_kwh_baseline is not None and total_kwh_simulated is not None:
             st.metric("Consumption without solar PV & battery", f"{total_kwh_baseline:,.0f} kWh")
             st.metric("Consumption with solar PV & battery", f"{total_kwh_simulated:,.0f} kWh")
@@ -318,16 +452,42 @@ with col_year:
             st.metric("Cost without solar PV & battery", _format_eur(cost_baseline))
             st.metric("Cost with solar PV & battery", _format_eur(cost_scenario))
             st.metric("Savings", _format_eur(cost_savings))
-
-if not sim_summary_row or "baseline_cost_eur" not in (sim_summary_row or {}):
-    st.info("Cost summary (baseline / scenario) is not available – SimulatePiece output (summary.csv) required.")
-st.divider()
-
-# ----- Load curve (with time range) -----
-st.subheader("Predicted consumption over time (without vs with solar PV & battery)")
-if load_df.empty:
-    st.info("Simulated load data was not provided.")
-else:
+        if total_kwh_baseline is None and cost_baseline is None:
+            st.info("No consumption or cost data for this period.")
+
+    with col_year:
+        st.subheader("Extrapolated to 1 year")
+        st.caption("Annual equivalent (for planning). Based on simulated period.")
+        if sim_period_days and sim_period_days > 0:
+            factor = 365.0 / sim_period_days
+            if total_kwh_baseline is not None and total_kwh_simulated is not None:
+                st.metric("Consumption without solar PV & battery (per year)", f"{total_kwh_baseline * factor:,.0f} kWh/year")
+                st.metric("Consumption with solar PV & battery (per year)", f"{total_kwh_simulated * factor:,.0f} kWh/year")
+            if cost_baseline is not None and cost_scenario is not None and cost_savings is not None:
+                st.metric("Cost without solar PV & battery (per year)", _format_eur(cost_baseline * factor))
+                st.metric("Cost with solar PV & battery (per year)", _format_eur(cost_scenario * factor))
+                st.metric("Savings (per year)", _format_eur(cost_savings * factor))
+        else:
+            st.info("Cannot extrapolate: simulated period unknown or zero.")
+            if total_kwh_baseline is not None and total_kwh_simulated is not None:
+                st.metric("Consumption without solar PV & battery", f"{total_kwh_baseline:,.0f} kWh")
+                st.metric("Consumption with solar PV & battery", f"{total_kwh_simulated:,.0f} kWh")
+            if cost_baseline is not None and cost_scenario is not None:
+                st.metric("Cost without solar PV & battery", _format_eur(cost_baseline))
+                st.metric("Cost with solar PV & battery", _format_eur(cost_scenario))
+                st.metric("Savings", _format_eur(cost_savings))
+
+    if not sim_summary_row or "baseline_cost_eur" not in (sim_summary_row or {}):
+        st.info("Cost summary (baseline / scenario) is not available – SimulatePiece output (summary.csv) required.")
+    st.divider()
+
+    # ----- Load curve (with time range) -----
+    st.subheader("Predicted consumption over time (without vs with solar PV & battery)")
+    if load_df.empty:
+        st.info("Simulated load data was not provided.")
+        return
+    chart_start, chart_end, chart_resolution = _chart_controls()
+    load_tiles = _scenario("simulate_results_tiles")
     datetime_col = _pick_existing(load_df.columns.tolist(), ["datetime", "timestamp", "time"])
     period_str = _time_range_str(load_df, datetime_col or "")
     if period_str:
@@ -335,8 +495,11 @@ else:
     original_col = _pick_existing(load_df.columns.tolist(), ["baseline_load_kw", "original_load_kw", "load_kw", "original_load"])
     net_col = _pick_existing(load_df.columns.tolist(), ["simulated_load_kw", "net_load_kw", "net_load", "grid_import_kw"])
     if datetime_col and original_col and net_col:
-        chart_df = load_df[[datetime_col, original_col, net_col]].copy()
-        chart_df = chart_df.sort_values(by=datetime_col)
+        chart_df, load_resolution = _chart_frame(
+            load_df, load_tiles, datetime_col, [original_col, net_col],
+            chart_start, chart_end, chart_resolution,
+        )
+        _resolution_caption(load_resolution, chart_df)
         fig_load = px.line(
             chart_df,
             x=datetime_col,
@@ -348,14 +511,15 @@ else:
     else:
         st.info("Required columns for load curve are missing.")
 
-# Cost over time (if columns available)
-if not load_df.empty:
+    # Cost over time (if columns available)
     cost_baseline_col = _pick_existing(load_df.columns.tolist(), ["baseline_cost_eur"])
     cost_scenario_col = _pick_existing(load_df.columns.tolist(), ["scenario_cost_eur"])
     dt_col_cost = _pick_existing(load_df.columns.tolist(), ["datetime", "timestamp", "time"])
     if dt_col_cost and cost_baseline_col and cost_scenario_col:
-        cost_chart = load_df[[dt_col_cost, cost_baseline_col, cost_scenario_col]].copy()
-        cost_chart = cost_chart.sort_values(by=dt_col_cost)
+        cost_chart, cost_resolution = _chart_frame(
+            load_df, load_tiles, dt_col_cost, [cost_baseline_col, cost_scenario_col],
+            chart_start, chart_end, chart_resolution,
+        )
         cost_chart["Cost without solar PV & battery (€)"] = cost_chart[cost_baseline_col].astype(float)
         cost_chart["Cost with solar PV & battery (€)"] = cost_chart[cost_scenario_col].astype(float)
         fig_cost = px.line(
@@ -364,98 +528,323 @@ if not load_df.empty:
             y=["Cost without solar PV & battery (€)", "Cost with solar PV & battery (€)"],
             title="Predicted electricity cost over time (€ per interval)",
         )
+        _resolution_caption(cost_resolution, cost_chart)
         st.plotly_chart(fig_cost, use_container_width=True)
 
-# ----- Prediction (with time range) -----
-st.subheader("Forecast vs actual load")
-prediction_df = _filter_by_scenario(predict_df.copy(), selected_scenario)
-if prediction_df.empty:
-    st.info("Forecast data was not provided.")
-else:
-    dt_col = _pick_existing(prediction_df.columns.tolist(), ["datetime", "timestamp", "time"])
-    if period_str := _time_range_str(prediction_df, dt_col or ""):
-        st.caption(f"Period: {period_str}")
-    actual_col = _pick_existing(prediction_df.columns.tolist(), ["load_kw", "actual_load_kw", "load"])
-    pred_col = _pick_existing(prediction_df.columns.tolist(), ["prediction_load_kw", "prediction_load_mw", "predicted_load_kw"])
-    if dt_col and actual_col and pred_col:
-        fig_pred = px.line(
-            prediction_df.sort_values(by=dt_col),
-            x=dt_col,
-            y=[actual_col, pred_col],
-            title="Actual load vs forecast",
-        )
-        st.plotly_chart(fig_pred, use_container_width=True)
+
+@_fragment
+def _section_forecast() -> None:
+    # ----- Prediction (with time range) -----
+    st.subheader("Forecast vs actual load")
+    prediction_df = _scenario("predict_predictions")
+    if prediction_df.empty:
+        st.info("Forecast data was not provided.")
     else:
-        st.info("Required columns for forecast chart are missing.")
-
-# ----- Battery SoC (with time range) -----
-st.subheader("Battery state of charge (SoC)")
-soc_source_df, datetime_col, soc_col = _find_soc_series(
-    _filter_by_scenario(virtual_battery_soc_df.copy(), selected_scenario),
-    _filter_by_scenario(preprocess_df.copy(), selected_scenario),
-    _filter_by_scenario(predict_df.copy(), selected_scenario),
-    _filter_by_scenario(simulate_df.copy(), selected_scenario),
-)
-if soc_source_df.empty:
-    st.info(
-        "Battery SoC data was not provided. "
-        "Ensure **virtual_battery_soc.csv** (BatterySimPiece output) is passed to DashboardPiece and the workflow has been run so that dashboard_data.json contains the battery SoC series."
-    )
-else:
+        chart_start, chart_end, chart_resolution = _chart_controls()
+        dt_col = _pick_existing(prediction_df.columns.tolist(), ["datetime", "timestamp", "time"])
+        if period_str := _time_range_str(prediction_df, dt_col or ""):
+            st.caption(f"Period: {period_str}")
+        actual_col = _pick_existing(prediction_df.columns.tolist(), ["load_kw", "actual_load_kw", "load"])
+        pred_col = _pick_existing(prediction_df.columns.tolist(), ["prediction_load_kw", "prediction_load_mw", "predicted_load_kw"])
+        if dt_col and actual_col and pred_col:
+            pred_chart, pred_resolution = _chart_frame(
+                prediction_df, _scenario("predict_predictions_tiles"), dt_col, [actual_col, pred_col],
+                chart_start, chart_end, chart_resolution,
+            )
+            _resolution_caption(pred_resolution, pred_chart)
+            fig_pred = px.line(
+                pred_chart,
+                x=dt_col,
+                y=[actual_col, pred_col],
+                title="Actual load vs forecast",
+            )
+            st.plotly_chart(fig_pred, use_container_width=True)
+        else:
+            st.info("Required columns for forecast chart are missing.")
+
+    # ----- Forecast accuracy (BacktestPiece) -----
+    st.subheader("Forecast accuracy (rolling-origin backtest)")
+    backtest_df = frames["backtest_summary"]
+    if backtest_df.empty or "dimension" not in backtest_df.columns:
+        st.info("Backtest summary was not provided (BacktestPiece: backtest_summary.csv).")
+        return
+    overall = backtest_df[backtest_df["dimension"] == "overall"]
+    if not overall.empty:
+        b1, b2, b3 = st.columns(3)
+        b1.metric("MAE (kW)", f"{_as_float(overall['mae'].iloc[0]):,.1f}")
+        b2.metric("RMSE (kW)", f"{_as_float(overall['rmse'].iloc[0]):,.1f}")
+        b3.metric("MAPE (%)", f"{_as_float(overall['mape_pct'].iloc[0]):,.2f}")
+    by_step = backtest_df[backtest_df["dimension"] == "step"].copy()
+    if not by_step.empty:
+        by_step["step"] = pd.to_numeric(by_step["key"], errors="coerce")
+        fig_bt = px.line(by_step.sort_values("step"), x="step", y=["mae", "rmse"], title="Forecast error by horizon step")
+        st.plotly_chart(fig_bt, use_container_width=True)
+    by_hour = backtest_df[backtest_df["dimension"] == "hour"].copy()
+    if not by_hour.empty:
+        by_hour["hour"] = pd.to_numeric(by_hour["key"], errors="coerce")
+        fig_bt_hour = px.bar(by_hour.sort_values("hour"), x="hour", y="mae", title="MAE by hour of day")
+        st.plotly_chart(fig_bt_hour, use_container_width=True)
+
+
+@_fragment
+def _section_battery() -> None:
+    # ----- Battery SoC (with time range) -----
+    st.subheader("Battery state of charge (SoC)")
+    soc_source_df, datetime_col, soc_col = pd.DataFrame(), None, None
+    soc_tiles = pd.DataFrame()
+    for key in ("virtual_battery_soc", "preprocess_predict", "predict_predictions", "simulate_results"):
+        soc_source_df, datetime_col, soc_col = _find_soc_series(_scenario(key))
+        if not soc_source_df.empty:
+            soc_tiles = _scenario(f"{key}_tiles")
+            break
+    if soc_source_df.empty:
+        st.info(
+            "Battery SoC data was not provided. "
+            "Ensure **virtual_battery_soc.csv** (BatterySimPiece output) is passed to DashboardPiece and the workflow has been run so that dashboard_data.json contains the battery SoC series."
+        )
+        return
+    chart_start, chart_end, chart_resolution = _chart_controls()
     if datetime_col:
         st.caption(f"Period: {_time_range_str(soc_source_df, datetime_col)}")
-    soc_df = soc_source_df[[datetime_col, soc_col]].copy().sort_values(by=datetime_col)
+    soc_df, soc_resolution = _chart_frame(soc_source_df, soc_tiles, datetime_col, [soc_col], chart_start, chart_end, chart_resolution)
+    _resolution_caption(soc_resolution, soc_df)
     fig_soc = px.line(soc_df, x=datetime_col, y=soc_col, title="Battery SoC (%)")
     st.plotly_chart(fig_soc, use_container_width=True)
 
-# ----- Investment metrics (bar chart, human-readable labels) -----
-st.subheader("Investment metrics (chart)")
-invest_df = _filter_by_scenario(investment_df.copy(), selected_scenario)
-if invest_df.empty:
-    st.info(
-        "Investment evaluation data was not provided. "
-        "Ensure **investment_evaluation.csv** (InvestmentEvalPiece output) is passed to DashboardPiece and the workflow has been run."
-    )
-else:
+
+def _section_investment() -> None:
+    # ----- Investment summary (table + short explanation) -----
+    st.subheader("Investment summary")
+    invest_df = _scenario("investment_evaluation")
+    if invest_df.empty:
+        st.info(
+            "Investment evaluation data was not provided. "
+            "Ensure **investment_evaluation.csv** (InvestmentEvalPiece output) is passed to DashboardPiece and the workflow has been run."
+        )
+        return
     exclude = {"datetime", "timestamp", "date"}
     numeric_cols = [c for c in invest_df.columns if c.lower() not in exclude]
+    row = invest_df[numeric_cols].apply(pd.to_numeric, errors="coerce").iloc[0] if numeric_cols else pd.Series(dtype=float)
+    summary_data = []
+    for key, val in row.dropna().items():
+        label = METRIC_LABELS.get(key, key.replace("_", " ").title())
+        if "eur" in key.lower() or "€" in label:
+            summary_data.append({"Metric": label, "Value": _format_eur(val)})
+        elif "year" in key.lower() or "payback" in key.lower():
+            summary_data.append({"Metric": label, "Value": f"{val:.1f} years"})
+        else:
+            summary_data.append({"Metric": label, "Value": f"{val:,.2f}"})
+    if summary_data:
+        st.dataframe(pd.DataFrame(summary_data), use_container_width=True, hide_index=True)
+    # Show simulation period and battery cycles context
+    if sim_period_str:
+        st.caption(f"**Simulated period:** {sim_period_str}" + (f" ({sim_period_days:.0f} days)" if sim_period_days and sim_period_days > 0 else ""))
+    battery_cycles_val = _kpi_value(_first_row(invest_df), ["battery_cycles_est", "cycles_equivalent"])
+    if battery_cycles_val is not None and sim_period_days and sim_period_days > 0:
+        cycles_per_year = battery_cycles_val * (365.0 / sim_period_days)
+        st.caption(f"Battery equivalent full cycles above ({battery_cycles_val:.2f}) are for this period. **Extrapolated to one year: {cycles_per_year:.1f} equivalent full cycles/year.**")
+    st.caption(
+        "Positive NPV means the project is financially favourable over the analysis period. "
+        "Payback is the number of years until cumulative savings cover the initial investment. "
+        "Battery equivalent full cycles: total charge/discharge (SoC change) over the simulation period expressed as full 0↔100% cycles."
+    )
+
+    # ----- Investment metrics (bar chart, human-readable labels) -----
+    st.subheader("Investment metrics (chart)")
     if not numeric_cols:
         st.info("No numeric columns in investment_evaluation data – cannot draw chart.")
+        return
+    metrics_df = row.dropna().reset_index()
+    metrics_df.columns = ["metric", "value"]
+    metrics_df["label"] = metrics_df["metric"].map(lambda x: METRIC_LABELS.get(x, x.replace("_", " ").title()))
+    if metrics_df.empty:
+        st.info("No numeric values in investment_evaluation data – cannot draw chart.")
     else:
-        row = invest_df[numeric_cols].apply(pd.to_numeric, errors="coerce").iloc[0]
-        metrics_df = row.dropna().reset_index()
-        metrics_df.columns = ["metric", "value"]
-        metrics_df["label"] = metrics_df["metric"].map(lambda x: METRIC_LABELS.get(x, x.replace("_", " ").title()))
-        if metrics_df.empty:
-            st.info("No numeric values in investment_evaluation data – cannot draw chart.")
-        else:
-            fig_inv = px.bar(metrics_df, x="label", y="value", title="Investment evaluation")
-            st.plotly_chart(fig_inv, use_container_width=True)
-
-# ----- Technical data (expander) -----
-with st.expander("Technical data – source files and status"):
-    st.subheader("Source file data")
-    _render_dataset_table(
-        "PreprocessEnergyDataPiece: predict_dataset_15min.parquet",
-        preprocess_df,
-        "File not provided or empty.",
+        fig_inv = px.bar(metrics_df, x="label", y="value", title="Investment evaluation")
+        st.plotly_chart(fig_inv, use_container_width=True)
+
+
+COMPARE_SERIES = {
+    "Load with solar PV & battery (kW)": ("simulate_results", ["simulated_load_kw", "net_load_kw", "net_load", "grid_import_kw"]),
+    "Cost with solar PV & battery (€ per interval)": ("simulate_results", ["scenario_cost_eur"]),
+    "Battery SoC (%)": ("simulate_results", ["soc_pct", "battery_soc", "state_of_charge", "soc"]),
+}
+COMPARE_KPIS = [
+    "npv_eur", "annual_savings_eur", "total_capex_eur", "simple_payback_years", "irr",
+    "savings_eur", "peak_reduction_kw", "battery_cycles_est",
+]
+
+
+def _dataset_columns(key: str) -> list[str]:
+    entry = payload.get("datasets", {}).get(key)
+    if isinstance(entry, dict) and entry.get("columns"):
+        return list(entry["columns"])
+    return frames[key].columns.tolist()
+
+
+def _kpis_of(scenario: str) -> dict:
+    """Summary KPIs of a scenario: from the payload's scenario index, else from the summary tables."""
+    kpis = ((payload.get("scenario_index") or {}).get(scenario) or {}).get("kpis")
+    if kpis is not None:
+        return kpis
+    data = {}
+    for key in ("simulate_summary", "kpi_results", "investment_evaluation"):
+        data.update(_first_row(_scenario_frame(*payload_key, key, scenario)))
+    return data
+
+
+@_fragment
+def _section_compare() -> None:
+    # ----- Scenario comparison (KPIs from the index, overlays from the chart tiles) -----
+    st.subheader("Scenario comparison")
+    compared = st.multiselect(
+        f"Scenarios (up to {MAX_COMPARE_SCENARIOS})",
+        scenario_options,
+        default=scenario_options[:4],
+        max_selections=MAX_COMPARE_SCENARIOS,
+        key="compare_scenarios",
     )
-    _render_dataset_table("PredictPiece: predictions_15min.csv", predict_df, "File not provided or empty.")
-    _render_dataset_table("SimulatePiece: simulated_results.csv", simulate_df, "File not provided or empty.")
-    _render_dataset_table("SimulatePiece: summary.csv", simulate_summary_df, "File not provided or empty.")
-    _render_dataset_table("BatterySimPiece: virtual_battery_soc.csv", virtual_battery_soc_df, "File not provided or empty.")
-    _render_dataset_table("KPIPiece: kpi_results.csv", kpi_df, "File not provided or empty.")
-    _render_dataset_table("InvestmentEvalPiece: investment_evaluation.csv", investment_df, "File not provided or empty.")
-    st.subheader("Input files status")
-    status_rows = []
-    for input_name, details in status.items():
-        status_rows.append({
-            "input": input_name,
-            "provided": details.get("provided", False),
-            "rows": details.get("rows", 0),
-            "error": details.get("error"),
-        })
-    if status_rows:
-        st.dataframe(pd.DataFrame(status_rows), use_container_width=True, hide_index=True)
-    else:
-        st.info("No input status metadata available.")
+    if not compared:
+        st.info("Select scenarios to compare.")
+        return
+
+    kpi_rows = []
+    for scenario in compared:
+        kpis = _kpis_of(scenario)
+        row = {"Scenario": scenario}
+        for key in COMPARE_KPIS:
+            if key in kpis:
+                row[METRIC_LABELS.get(key, key.replace("_", " ").title())] = _as_float(kpis[key], None)
+        kpi_rows.append(row)
+    kpi_table = pd.DataFrame(kpi_rows)
+    st.dataframe(kpi_table, use_container_width=True, hide_index=True)
+    npv_label = METRIC_LABELS["npv_eur"]
+    if npv_label in kpi_table.columns and kpi_table[npv_label].notna().any():
+        fig_npv = px.bar(kpi_table, x="Scenario", y=npv_label, title="Net present value by scenario")
+        st.plotly_chart(fig_npv, use_container_width=True)
+
+    options = {
+        label: (key, col)
+        for label, (key, candidates) in COMPARE_SERIES.items()
+        if (col := _pick_existing(_dataset_columns(key), candidates))
+    }
+    if not options:
+        st.info("No per-scenario time series to overlay (SimulatePiece: simulated_results.csv).")
+        return
+    label = st.selectbox("Series", list(options), key="compare_series")
+    key, col = options[label]
+    chart_start, chart_end, chart_resolution = _chart_controls()
+    parts, used = [], set()
+    for scenario in compared:
+        tiles = _scenario_frame(*payload_key, f"{key}_tiles", scenario)
+        # tiles keep an overlay of many scenarios light; raw rows are read only when there are none
+        raw = None if not tiles.empty else _scenario_frame(*payload_key, key, scenario)
+        frame, resolution = _chart_frame(raw, tiles, "datetime", [col], chart_start, chart_end, chart_resolution)
+        parts.append(frame.assign(scenario=scenario))
+        used.add(resolution)
+    overlay = pd.concat(parts, ignore_index=True)
+    if used - {"raw"}:
+        st.caption(f"Chart resolution: {', '.join(sorted(used))} ({len(overlay):,} points)")
+    fig_compare = px.line(overlay, x="datetime", y=col, color="scenario", title=label)
+    st.plotly_chart(fig_compare, use_container_width=True)
+
+
+PERFORMANCE_COLUMNS = {
+    "piece": "Piece",
+    "task_id": "Task",
+    "status": "Status",
+    "result_cache": "Result cache",
+    "wall_s": "Wall (s)",
+    "cpu_s": "CPU (s)",
+    "peak_rss_mb": "Peak RSS (MB)",
+    "input_mb": "Input (MB)",
+    "output_mb": "Output (MB)",
+}
+SPAN_COLUMNS = ["piece", "kind", "label", "depth", "wall_s", "cpu_s", "rows", "rows_per_s", "mb", "peak_rss_mb", "rss_growth_mb", "py_peak_mb"]
+
+
+@_fragment
+def _section_performance() -> None:
+    # ----- Pipeline performance (metrics.json of every piece run, see pipeline_common.instrumentation) -----
+    performance = payload.get("performance") or {}
+    runs = pd.DataFrame(performance.get("pieces") or [])
+    if runs.empty:
+        st.info(
+            "No piece metrics found. Pieces write **metrics.json** next to their outputs; DashboardPiece reads the ones "
+            "next to its inputs and below **metrics_search_dirs**."
+        )
+        return
+    runs["input_mb"] = pd.to_numeric(runs.get("input_bytes"), errors="coerce") / 1e6
+    runs["output_mb"] = pd.to_numeric(runs.get("output_bytes"), errors="coerce") / 1e6
+    table = runs.reindex(columns=list(PERFORMANCE_COLUMNS)).rename(columns=PERFORMANCE_COLUMNS)
+    st.subheader("Pipeline performance")
+    st.dataframe(table.round(2), use_container_width=True, hide_index=True)
+    st.caption(
+        "CPU time includes all threads of the process; peak RSS is the process high-water mark. "
+        "Set PIPELINE_PROFILE=1 on a run to also get profile.pstats (cProfile) and Python allocation peaks per span."
+    )
+
+    spans = pd.DataFrame(performance.get("spans") or [])
+    if spans.empty:
+        return
+    spans["mb"] = pd.to_numeric(spans.get("bytes"), errors="coerce") / 1e6
+    outer = spans[spans["depth"] == 0] if "depth" in spans.columns else spans
+    by_kind = outer.groupby(["piece", "kind"], as_index=False)["wall_s"].sum()
+    other = runs.groupby("piece")["wall_s"].sum() - by_kind.groupby("piece")["wall_s"].sum()
+    other = other.clip(lower=0).dropna().rename("wall_s").reset_index().assign(kind="other")
+    fig_spans = px.bar(
+        pd.concat([by_kind, other], ignore_index=True), x="piece", y="wall_s", color="kind",
+        title="Wall time by piece and phase (s)",
+    )
+    st.plotly_chart(fig_spans, use_container_width=True)
+    st.subheader("Spans")
+    st.dataframe(spans.reindex(columns=[c for c in SPAN_COLUMNS if c in spans.columns or c == "mb"]).round(3),
+                 use_container_width=True, hide_index=True)
+
+
+SOURCE_FILES = {
+    "PreprocessEnergyDataPiece: predict_dataset_15min.parquet": "preprocess_predict",
+    "PredictPiece: predictions_15min.csv": "predict_predictions",
+    "SimulatePiece: simulated_results.csv": "simulate_results",
+    "SimulatePiece: summary.csv": "simulate_summary",
+    "BatterySimPiece: virtual_battery_soc.csv": "virtual_battery_soc",
+    "KPIPiece: kpi_results.csv": "kpi_results",
+    "InvestmentEvalPiece: investment_evaluation.csv": "investment_evaluation",
+    "BacktestPiece: backtest_summary.csv": "backtest_summary",
+}
+
+
+@_fragment
+def _section_technical() -> None:
+    # ----- Technical data (one source file at a time, paginated) -----
+    with st.expander("Technical data – source files and status", expanded=True):
+        st.subheader("Source file data")
+        title = st.selectbox("Source file", list(SOURCE_FILES), key="technical_source")
+        st.caption(f"Rows of scenario **{selected_scenario}** where the file has a scenario column.")
+        _render_dataset_table(title, _scenario(SOURCE_FILES[title]), "File not provided or empty.", key=SOURCE_FILES[title])
+        st.subheader("Input files status")
+        status_rows = []
+        for input_name, details in status.items():
+            status_rows.append({
+                "input": input_name,
+                "provided": details.get("provided", False),
+                "rows": details.get("rows", 0),
+                "error": details.get("error"),
+            })
+        if status_rows:
+            st.dataframe(pd.DataFrame(status_rows), use_container_width=True, hide_index=True)
+        else:
+            st.info("No input status metadata available.")
+
+
+SECTIONS = {
+    "Costs & consumption": _section_costs,
+    "Forecast": _section_forecast,
+    "Battery": _section_battery,
+    "Investment": _section_investment,
+    "Compare scenarios": _section_compare,
+    "Performance": _section_performance,
+    "Technical data": _section_technical,
+}
+section = st.radio("Section", list(SECTIONS), horizontal=True, key="section", label_visibility="collapsed")
+SECTIONS[section]()
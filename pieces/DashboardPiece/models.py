@@ -7,46 +7,64 @@ from pydantic import BaseModel, Field
 FILE_SPECS = {
     "preprocess_predict_parquet": {
         "dataset_key": "preprocess_predict",
+        "storage": "sidecar",
+        "chart_columns": ["load_kw", "soc_pct"],
         "default_path": "predict_dataset_15min.parquet",
         "file_format": "parquet",
         "source_piece": "PreprocessEnergyDataPiece",
     },
     "predict_predictions_csv": {
         "dataset_key": "predict_predictions",
+        "storage": "sidecar",
+        "chart_columns": ["load_kw", "prediction_load_kw"],
         "default_path": "predictions_15min.csv",
         "file_format": "csv",
         "source_piece": "PredictPiece",
     },
     "simulate_results_csv": {
         "dataset_key": "simulate_results",
+        "storage": "sidecar",
+        "chart_columns": ["baseline_load_kw", "simulated_load_kw", "baseline_cost_eur", "scenario_cost_eur", "soc_pct"],
         "default_path": "simulated_results.csv",
         "file_format": "csv",
         "source_piece": "SimulatePiece",
     },
     "simulate_summary_csv": {
         "dataset_key": "simulate_summary",
+        "storage": "inline",
         "default_path": "summary.csv",
         "file_format": "csv",
         "source_piece": "SimulatePiece",
     },
     "kpi_results_csv": {
         "dataset_key": "kpi_results",
+        "storage": "inline",
         "default_path": "kpi_results.csv",
         "file_format": "csv",
         "source_piece": "KPIPiece",
     },
     "virtual_battery_soc_csv": {
         "dataset_key": "virtual_battery_soc",
+        "storage": "sidecar",
+        "chart_columns": ["soc_pct", "grid_import_kw"],
         "default_path": "virtual_battery_soc.csv",
         "file_format": "csv",
         "source_piece": "BatterySimPiece",
     },
     "investment_evaluation_csv": {
         "dataset_key": "investment_evaluation",
+        "storage": "inline",
         "default_path": "investment_evaluation.csv",
         "file_format": "csv",
         "source_piece": "InvestmentEvalPiece",
     },
+    "backtest_summary_csv": {
+        "dataset_key": "backtest_summary",
+        "storage": "inline",
+        "default_path": "backtest_summary.csv",
+        "file_format": "csv",
+        "source_piece": "BacktestPiece",
+    },
 }
 
 
@@ -81,9 +99,29 @@ class InputModel(BaseModel):
         default="/home/shared_storage/investment_evaluation.csv",
         description="InvestmentEvalPiece output: investment_evaluation.csv.",
     )
+    backtest_summary_csv: str | None = Field(
+        default="/home/shared_storage/backtest_summary.csv",
+        description="BacktestPiece output: backtest_summary.csv (forecast error by horizon step, hour and weekday).",
+    )
+    payload_format: str = Field(
+        default="sidecar",
+        description="sidecar: time series in dashboard_<dataset>.parquet next to a slim JSON (summary rows inline); json: every row inline in dashboard_data.json (legacy).",
+    )
+    sidecar_batch_rows: int = Field(
+        default=65536,
+        description="Rows per batch when streaming a time series into its sidecar Parquet file.",
+    )
+    lttb_points: int = Field(
+        default=2000,
+        description="Points per scenario in the LTTB chart tile; hourly and daily tiles are written alongside (0 = no tiles, charts use the raw series).",
+    )
+    metrics_search_dirs: str | None = Field(
+        default=None,
+        description="Optional comma separated directories searched recursively for the metrics.json of upstream pieces (metrics.json next to the inputs above is always read).",
+    )
     scenario_yml: str | None = Field(
         default="/home/shared_storage/scenario.yml",
-        description="Optional scenario YAML (solar capacity_kWp, battery capacity_kWh) for display in dashboard.",
+        description="Optional scenario YAML, directory of scenario YAMLs or comma separated list (solar capacity_kWp, battery capacity_kWh) for display in dashboard.",
     )
 
 
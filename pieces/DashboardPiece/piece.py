@@ -2,31 +2,43 @@
 from __future__ import annotations
 
 import json
+import shutil
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import yaml
 from domino.base_piece import BasePiece
+from pipeline_common.downsample import build_tiles
+from pipeline_common.instrumentation import METRICS_FILE, instrumented_piece, span
+from pipeline_common.interchange import detect_format, memory_frame, read_frame
 
 from .models import FILE_SPECS, InputModel, OutputModel
 
 SCENARIO_COLUMNS = ["scenario", "scenario_name", "case", "variant"]
+DATETIME_COLUMNS = ("datetime", "timestamp", "date_time", "time")
+PAYLOAD_VERSION = 3
+_DATASET_FORMATS = {"csv": "csv", "feather": "ipc", "parquet": "parquet"}
 
 
-def _safe_read_table(path_value: str | None, file_format: str | None = None) -> tuple[pd.DataFrame, str | None]:
+def _safe_read_table(path_value: str | None) -> tuple[pd.DataFrame, str | None]:
     if not path_value:
         return pd.DataFrame(), "file path not provided"
     file_path = Path(path_value)
-    if not file_path.is_file():
+    if not file_path.is_file() and memory_frame(file_path) is None:
         return pd.DataFrame(), f"file not found: {path_value}"
-    inferred = (file_format or file_path.suffix.lstrip(".")).lower()
+    # Upstream pieces may hand over CSV, Feather or Parquet regardless of the default name.
+    inferred = detect_format(file_path)
     try:
-        df = pd.read_parquet(file_path) if inferred == "parquet" else pd.read_csv(file_path)
+        df = read_frame(file_path, parse_dates=())
     except Exception as exc:
         return pd.DataFrame(), f"failed to parse {inferred}: {exc}"
-    for col in ("datetime", "timestamp", "date_time", "time"):
+    for col in DATETIME_COLUMNS:
         if col in df.columns:
             df[col] = pd.to_datetime(df[col], errors="coerce")
     return df, None
@@ -43,10 +55,185 @@ def _dataframe_to_json_rows(df: pd.DataFrame) -> list[dict[str, Any]]:
     return out.to_dict(orient="records")
 
 
+def _normalize_batch(table: pa.Table) -> pa.Table:
+    """Datetime columns as timestamp[ns] (CSV may infer seconds or leave odd formats as strings)."""
+    for col in DATETIME_COLUMNS:
+        if col not in table.column_names:
+            continue
+        i = table.column_names.index(col)
+        try:
+            table = table.set_column(i, col, pc.cast(table[col], pa.timestamp("ns")))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            pass
+    return table
+
+
+def _stream_to_parquet(path_value: str | None, dst: Path, batch_rows: int) -> tuple[dict[str, Any] | None, set[str], str | None]:
+    """
+    Copy one input table into a Parquet sidecar batch by batch (the table is never fully in memory).
+
+    Returns ``(entry, scenarios, error)``: the JSON descriptor (file name, rows, columns, time range),
+    the scenario labels seen on the way and an error message when the input is missing or unreadable.
+    """
+    if not path_value:
+        return None, set(), "file path not provided"
+    src = Path(path_value)
+    in_memory = memory_frame(src)
+    if in_memory is None and not src.is_file():
+        return None, set(), f"file not found: {path_value}"
+    fmt = detect_format(src) if in_memory is None else "memory"
+
+    def batches():
+        if in_memory is not None:
+            yield from pa.Table.from_pandas(in_memory, preserve_index=False).to_batches(batch_rows)
+            return
+        try:
+            yield from ds.dataset(src, format=_DATASET_FORMATS[fmt]).to_batches(batch_size=batch_rows)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # CSV type inference from the first block failed further down: fall back to a full read
+            yield from pa.Table.from_pandas(read_frame(src, parse_dates=()), preserve_index=False).to_batches(batch_rows)
+
+    writer = None
+    rows = 0
+    scenarios: set[str] = set()
+    t_min = t_max = None
+    try:
+        for batch in batches():
+            table = _normalize_batch(pa.Table.from_batches([batch]))
+            if writer is None:
+                writer = pq.ParquetWriter(dst, table.schema)
+                scenario_col = _pick_column(table.column_names, SCENARIO_COLUMNS)
+                time_col = _pick_column(table.column_names, DATETIME_COLUMNS)
+            table = table.cast(writer.schema)
+            writer.write_table(table)
+            rows += table.num_rows
+            if scenario_col:
+                values = pc.unique(table[scenario_col]).drop_null().cast(pa.string()).to_pylist()
+                scenarios.update(v.strip() for v in values if v and v.strip())
+            if time_col and pa.types.is_timestamp(table.schema.field(time_col).type):
+                mm = pc.min_max(table[time_col])
+                lo, hi = mm["min"].as_py(), mm["max"].as_py()
+                if lo is not None:
+                    t_min = lo if t_min is None else min(t_min, lo)
+                    t_max = hi if t_max is None else max(t_max, hi)
+    except Exception as exc:
+        if writer is not None:
+            writer.close()
+        dst.unlink(missing_ok=True)
+        return None, set(), f"failed to stream {fmt}: {exc}"
+    if writer is None:
+        return None, set(), None
+    writer.close()
+
+    entry = {
+        "storage": "parquet",
+        "path": dst.name,
+        "rows": rows,
+        "columns": writer.schema.names,
+        "time_start": t_min.isoformat() if t_min is not None else None,
+        "time_end": t_max.isoformat() if t_max is not None else None,
+    }
+    return entry, scenarios, None
+
+
+def _write_tiles(sidecar: Path, entry: dict[str, Any], chart_columns: list[str], lttb_points: int) -> dict[str, Any] | None:
+    """Hourly / daily / LTTB chart tiles of a sidecar's chart columns in dashboard_<dataset>_tiles.parquet."""
+    columns = entry["columns"]
+    time_col = _pick_column(columns, DATETIME_COLUMNS)
+    value_cols = [c for c in chart_columns if c in columns]
+    if time_col is None or not value_cols:
+        return None
+    scenario_col = _pick_column(columns, SCENARIO_COLUMNS)
+    frame = pq.read_table(sidecar, columns=([scenario_col] if scenario_col else []) + [time_col] + value_cols).to_pandas()
+    tiles = build_tiles(frame, time_col, value_cols, group_col=scenario_col, lttb_points=lttb_points)
+    if tiles.empty:
+        return None
+    path = sidecar.with_name(f"{sidecar.stem}_tiles.parquet")
+    tiles.to_parquet(path, index=False)
+    return {"path": path.name, "rows": tiles["resolution"].value_counts().to_dict()}
+
+
+def _partition_sidecar(sidecar: Path, entry: dict[str, Any], scenarios: set[str], batch_rows: int) -> dict[str, dict[str, Any]]:
+    """
+    Rewrite a sidecar so that every scenario's rows are contiguous row groups. Returns
+    scenario -> {offset, rows, row_groups, time_start, time_end}; rows without a known scenario go
+    to the end of the file and are not indexed.
+
+    One pass splits the batches into a spill file per scenario, a second pass concatenates them, so
+    memory stays at one batch / one scenario whatever the number of scenarios.
+    """
+    columns = entry["columns"]
+    scenario_col = _pick_column(columns, SCENARIO_COLUMNS)
+    time_col = _pick_column(columns, DATETIME_COLUMNS)
+    if scenario_col is None or not scenarios:
+        return {}
+    ordered = sorted(scenarios)
+    spill_dir = sidecar.with_name(f"{sidecar.stem}_partitions")
+    spill_dir.mkdir(exist_ok=True)
+    source = pq.ParquetFile(sidecar)
+    schema = source.schema_arrow
+    writers: dict[int, pq.ParquetWriter] = {}
+    partitions: dict[str, dict[str, Any]] = {}
+    try:
+        for batch in source.iter_batches(batch_size=batch_rows):
+            labels = pc.utf8_trim_whitespace(pc.cast(batch.column(scenario_col), pa.string()))
+            codes = pc.fill_null(pc.index_in(labels, value_set=pa.array(ordered)), len(ordered))
+            for code in pc.unique(codes).to_pylist():
+                if code not in writers:
+                    writers[code] = pq.ParquetWriter(spill_dir / f"{code}.parquet", schema)
+                writers[code].write_table(pa.Table.from_batches([batch.filter(pc.equal(codes, code))]))
+        for writer in writers.values():
+            writer.close()
+        source.close()
+
+        offset = row_group = 0
+        with pq.ParquetWriter(sidecar, schema) as writer:
+            for code in sorted(writers):
+                table = pq.read_table(spill_dir / f"{code}.parquet")
+                writer.write_table(table, row_group_size=batch_rows)
+                groups = -(-table.num_rows // batch_rows)
+                if code < len(ordered):
+                    part = {"offset": offset, "rows": table.num_rows, "row_groups": list(range(row_group, row_group + groups))}
+                    if time_col and pa.types.is_timestamp(table.schema.field(time_col).type):
+                        mm = pc.min_max(table[time_col])
+                        part["time_start"] = mm["min"].as_py().isoformat() if mm["min"].is_valid else None
+                        part["time_end"] = mm["max"].as_py().isoformat() if mm["max"].is_valid else None
+                    partitions[ordered[code]] = part
+                offset += table.num_rows
+                row_group += groups
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+    return partitions
+
+
+def _scenario_kpis(frames: list[pd.DataFrame | None], scenarios: list[str]) -> dict[str, dict[str, float]]:
+    """First row of numeric columns per scenario from the summary tables (tables without a scenario column apply to all)."""
+    kpis: dict[str, dict[str, float]] = {sc: {} for sc in scenarios}
+    for df in frames:
+        if df is None or df.empty:
+            continue
+        scenario_col = _pick_column(df.columns.tolist(), SCENARIO_COLUMNS)
+        numeric = df.select_dtypes("number")
+        for sc in scenarios:
+            rows = numeric[df[scenario_col].astype(str).str.strip() == sc] if scenario_col else numeric
+            if rows.empty:
+                continue
+            kpis[sc].update({k: float(v) for k, v in rows.iloc[0].dropna().items()})
+    return kpis
+
+
+def _pick_column(columns: list[str], options) -> str | None:
+    lower = {c.lower(): c for c in columns}
+    for option in options:
+        if option in lower:
+            return lower[option]
+    return None
+
+
 def _extract_scenarios(*dfs: pd.DataFrame) -> list[str]:
     scenarios: set[str] = set()
     for df in dfs:
-        if df.empty:
+        if df is None or df.empty:
             continue
         lower = {c.lower(): c for c in df.columns}
         for sc in SCENARIO_COLUMNS:
@@ -57,9 +244,64 @@ def _extract_scenarios(*dfs: pd.DataFrame) -> list[str]:
     return sorted(scenarios)
 
 
+def _collect_metrics(input_paths: list[str], search_dirs: str | None) -> dict[str, list[dict[str, Any]]]:
+    """
+    ``metrics.json`` of the upstream pieces: next to each input file and anywhere below the comma
+    separated ``search_dirs``. Returns one row per piece run and one row per span, in run order.
+    """
+    candidates = [Path(p).parent / METRICS_FILE for p in input_paths if p]
+    for part in str(search_dirs or "").split(","):
+        if part.strip() and Path(part.strip()).is_dir():
+            candidates.extend(sorted(Path(part.strip()).rglob(METRICS_FILE)))
+    runs: dict[str, dict[str, Any]] = {}
+    for path in candidates:
+        key = str(path.resolve())
+        if key in runs or not path.is_file():
+            continue
+        try:
+            runs[key] = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+    pieces, spans = [], []
+    for record in sorted(runs.values(), key=lambda r: str(r.get("started_utc", ""))):
+        run = {k: v for k, v in record.items() if k != "spans"}
+        pieces.append(run)
+        spans.extend({"piece": run.get("piece"), "task_id": run.get("task_id"), **sp} for sp in record.get("spans") or [])
+    return {"pieces": pieces, "spans": spans}
+
+
+def _read_scenario_infos(scenario_yml: str) -> dict[str, dict[str, Any]]:
+    """Solar/battery sizing per scenario from one YAML, a directory of YAMLs or a comma separated list."""
+    paths: list[Path] = []
+    for part in str(scenario_yml).split(","):
+        p = Path(part.strip())
+        if p.is_dir():
+            paths.extend(sorted(q for q in p.iterdir() if q.suffix.lower() in (".yml", ".yaml")))
+        elif p.is_file():
+            paths.append(p)
+    infos: dict[str, dict[str, Any]] = {}
+    for p in paths:
+        with open(p) as f:
+            scen = yaml.safe_load(f) or {}
+        solar = scen.get("solar") or {}
+        battery = scen.get("battery") or {}
+        infos[str(scen.get("scenario_id") or p.stem)] = {
+            "solar_kwp": solar.get("capacity_kWp"),
+            "battery_kwh": battery.get("capacity_kWh"),
+            "description": scen.get("description", ""),
+        }
+    return infos
+
+
 class DashboardPiece(BasePiece):
-    """Collects optional CSVs/parquet and writes dashboard_data.json. Same structure as other pieces."""
+    """
+    Collects optional CSVs/parquet and writes dashboard_data.json. Same structure as other pieces.
+
+    With payload_format "sidecar" the time series datasets are streamed into dashboard_<dataset>.parquet
+    files next to the JSON, which keeps metadata, summary rows and a descriptor of each sidecar file.
+    """
 
+    @instrumented_piece
     def piece_function(self, input_data: InputModel) -> OutputModel:
         print("\n[INFO] ===== DASHBOARD PIECE START =====")
         logger = getattr(self, "logger", None)
@@ -73,21 +315,46 @@ class DashboardPiece(BasePiece):
         datasets: dict[str, object] = {spec["dataset_key"]: [] for spec in FILE_SPECS.values()}
         input_status: dict[str, dict[str, object]] = {}
         parsed_frames: dict[str, pd.DataFrame] = {}
+        sidecar = input_data.payload_format == "sidecar"
+        if input_data.payload_format not in ("sidecar", "json"):
+            raise ValueError(f"Unknown payload_format '{input_data.payload_format}', expected sidecar or json")
+        streamed_scenarios: set[str] = set()
 
         for input_field, spec in FILE_SPECS.items():
             dataset_key = spec["dataset_key"]
             path_value = getattr(input_data, input_field, None)
-            frame, error = _safe_read_table(path_value, spec.get("file_format"))
 
-            datasets[dataset_key] = _dataframe_to_json_rows(frame)
-            parsed_frames[dataset_key] = frame
+            if sidecar and spec.get("storage") == "sidecar":
+                # time series: streamed into dashboard_<dataset>.parquet, the JSON only describes the file
+                sidecar_path = output_path.parent / f"dashboard_{dataset_key}.parquet"
+                with span("write", sidecar_path.name) as s:
+                    entry, found, error = _stream_to_parquet(path_value, sidecar_path, input_data.sidecar_batch_rows)
+                    if entry:
+                        s.rows, s.bytes = entry["rows"], sidecar_path.stat().st_size
+                if entry and input_data.lttb_points > 0:
+                    with span("compute", f"chart tiles {dataset_key}", rows=entry["rows"]):
+                        tiles = _write_tiles(sidecar_path, entry, spec.get("chart_columns", []), input_data.lttb_points)
+                    if tiles:
+                        entry["tiles"] = tiles
+                if entry and len(found) > 1:
+                    with span("write", f"scenario partitions {dataset_key}", rows=entry["rows"]):
+                        entry["partitions"] = _partition_sidecar(sidecar_path, entry, found, input_data.sidecar_batch_rows)
+                datasets[dataset_key] = entry or []
+                streamed_scenarios |= found
+                rows = entry["rows"] if entry else 0
+            else:
+                frame, error = _safe_read_table(path_value)
+                datasets[dataset_key] = _dataframe_to_json_rows(frame)
+                parsed_frames[dataset_key] = frame
+                rows = int(len(frame.index))
+
             input_status[input_field] = {
                 "provided": error is None,
                 "path": path_value,
                 "default_filename": spec["default_path"],
                 "source_piece": spec["source_piece"],
                 "file_format": spec["file_format"],
-                "rows": int(len(frame.index)) if error is None else 0,
+                "rows": rows if error is None else 0,
                 "error": error,
             }
 
@@ -95,43 +362,65 @@ class DashboardPiece(BasePiece):
             parsed_frames.get("preprocess_predict"),
             parsed_frames.get("predict_predictions"),
             parsed_frames.get("simulate_results"),
+            parsed_frames.get("simulate_summary"),
             parsed_frames.get("kpi_results"),
             parsed_frames.get("investment_evaluation"),
         )
+        scenarios = sorted(set(scenarios) | streamed_scenarios)
         if not scenarios:
             scenarios = ["Default"]
 
-        scenario_info: dict[str, Any] = {}
+        scenario_infos: dict[str, dict[str, Any]] = {}
         scenario_yml_path = getattr(input_data, "scenario_yml", None)
         if scenario_yml_path:
             try:
-                p = Path(scenario_yml_path)
-                if p.is_file():
-                    with open(p) as f:
-                        scen = yaml.safe_load(f) or {}
-                    solar = scen.get("solar") or {}
-                    battery = scen.get("battery") or {}
-                    scenario_info = {
-                        "solar_kwp": solar.get("capacity_kWp"),
-                        "battery_kwh": battery.get("capacity_kWh"),
-                        "description": scen.get("description", ""),
-                    }
+                scenario_infos = _read_scenario_infos(scenario_yml_path)
             except Exception:
                 pass
+        scenario_info = scenario_infos.get(scenarios[0]) or next(iter(scenario_infos.values()), {})
+
+        # scenario -> row ranges of every partitioned sidecar + summary KPIs (the dashboard loads only
+        # the scenarios in view and compares scenarios from this index)
+        scenario_index = {
+            sc: {
+                "partitions": {
+                    key: {"path": entry["path"], **entry["partitions"][sc]}
+                    for key, entry in datasets.items()
+                    if isinstance(entry, dict) and sc in entry.get("partitions", {})
+                },
+                "kpis": kpis,
+            }
+            for sc, kpis in _scenario_kpis(
+                [parsed_frames.get(k) for k in ("simulate_summary", "kpi_results", "investment_evaluation")], scenarios,
+            ).items()
+        }
+
+        # run metrics of the upstream pieces (pipeline performance panel)
+        performance = _collect_metrics(
+            [getattr(input_data, field, None) for field in FILE_SPECS], input_data.metrics_search_dirs,
+        )
 
         payload = {
             "meta": {
                 "piece": "DashboardPiece",
                 "generated_at_utc": datetime.now(timezone.utc).isoformat(),
+                "payload_version": PAYLOAD_VERSION if sidecar else 1,
             },
             "inputs": input_status,
             "scenarios": scenarios,
             "default_scenario": scenarios[0],
             "datasets": datasets,
             "scenario_info": scenario_info,
+            "scenario_infos": scenario_infos,
+            "scenario_index": scenario_index,
+            "performance": performance,
         }
 
-        output_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2))
+        if sidecar:
+            with open(output_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=1, default=str)
+        else:
+            output_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2))
         print(f"[INFO] Dashboard data written to {output_path}")
         if logger:
             logger.info("Dashboard data JSON written to %s", str(output_path))
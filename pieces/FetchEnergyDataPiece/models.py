@@ -21,6 +21,21 @@ class InputModel(BaseModel):
         description="Path to prices CSV file"
     )
 
+    weather_csv: str = Field(
+        default="",
+        description="Optional SolarGIS weather export (SolarSimPiece input); only scanned for data quality"
+    )
+
+    quality_check: bool = Field(
+        default=True,
+        description="Scan the inputs for gaps, duplicates, flat-lines, spikes and SolarGIS -9 markers (report + mask)"
+    )
+
+    flatline_hours: float = Field(
+        default=3.0,
+        description="A non-zero value repeated for at least this many hours is reported as a flat-line"
+    )
+
 
 class OutputModel(BaseModel):
     """
@@ -29,3 +44,5 @@ class OutputModel(BaseModel):
 
     message: str = Field(default="")
     output_path: str = Field(default="")
+    quality_report_path: str = Field(default="", description="data_quality_report.json")
+    quality_mask_path: str = Field(default="", description="data_quality_mask.parquet (datetime, series, flags) of the flagged rows")
@@ -3,12 +3,17 @@ from .models import InputModel, OutputModel
 import pandas as pd
 from pathlib import Path
 
+from pipeline_common.data_quality import read_solargis, scan_frame, scan_solargis, summary_line, write_report
+from pipeline_common.instrumentation import instrumented_piece, span
+from pipeline_common.interchange import write_frame
+
 
 class FetchEnergyDataPiece(BasePiece):
     """
     Load and merge energy CSV files from shared storage
     """
 
+    @instrumented_piece
     def piece_function(self, input_data):
         # ---- START ----
         print("[INFO] FetchEnergyDataPiece started")
@@ -16,6 +21,8 @@ class FetchEnergyDataPiece(BasePiece):
         print(f"[INFO] Load CSV: {input_data.load_csv}")
         print(f"[INFO] Production CSV: {input_data.production_csv}")
         print(f"[INFO] Prices CSV: {input_data.prices_csv}")
+        if input_data.weather_csv:
+            print(f"[INFO] Weather CSV (quality scan only): {input_data.weather_csv}")
 
         load_csv = Path(input_data.load_csv)
         production_csv = Path(input_data.production_csv)
@@ -28,39 +35,73 @@ class FetchEnergyDataPiece(BasePiece):
                 print(f"[ERROR] {message}")
                 return {
                     "message": message,
-                    "output_path": ""
+                    "output_path": "",
+                    "quality_report_path": "",
+                    "quality_mask_path": "",
                 }
 
         # ---- READ DATA ----
         print("[INFO] Reading CSV files")
 
-        load_df = pd.read_csv(load_csv, parse_dates=["datetime"])
-        production_df = pd.read_csv(production_csv, parse_dates=["datetime"])
-        prices_df = pd.read_csv(prices_csv, parse_dates=["datetime"])
+        with span("load", "load / production / prices CSV") as s:
+            load_df = pd.read_csv(load_csv, parse_dates=["datetime"])
+            production_df = pd.read_csv(production_csv, parse_dates=["datetime"])
+            prices_df = pd.read_csv(prices_csv, parse_dates=["datetime"])
+            s.rows = len(load_df) + len(production_df) + len(prices_df)
+            s.bytes = sum(f.stat().st_size for f in (load_csv, production_csv, prices_csv))
+
+        # ---- DATA QUALITY ----
+        # scan before merge: duplicates and gaps belong to the source export, not to the outer join
+        quality_report_path = quality_mask_path = ""
+        if input_data.quality_check:
+            with span("compute", "data-quality scan") as s:
+                reports, masks = [], []
+                for path, df in ((load_csv, load_df), (production_csv, production_df), (prices_csv, prices_df)):
+                    report, mask = scan_frame(df, flatline_hours=input_data.flatline_hours, name=path.name)
+                    level = "INFO" if report["status"] == "ok" else "WARNING"
+                    print(f"[{level}] Data quality: {summary_line(report)}")
+                    reports.append(report)
+                    masks.append(mask)
+                s.rows = len(load_df) + len(production_df) + len(prices_df)
+                # SolarGIS export: -9 is its no-data marker; the file itself goes to SolarSimPiece
+                weather_csv = Path(input_data.weather_csv) if input_data.weather_csv else None
+                if weather_csv is not None and weather_csv.exists():
+                    weather_df = read_solargis(weather_csv)
+                    report, mask = scan_solargis(weather_df, flatline_hours=input_data.flatline_hours, name=weather_csv.name)
+                    level = "INFO" if report["status"] == "ok" else "WARNING"
+                    print(f"[{level}] Data quality: {summary_line(report)}")
+                    reports.append(report)
+                    masks.append(mask)
+                    s.rows += len(weather_df)
+                elif weather_csv is not None:
+                    print(f"[WARNING] Weather CSV not found, not scanned: {weather_csv}")
+                quality_report_path, quality_mask_path = write_report(reports, masks, self.results_path)
+            print(f"[INFO] Data-quality report: {quality_report_path}")
 
         # ---- MERGE ----
         print("[INFO] Merging data")
 
-        load_df = load_df.set_index("datetime")
-        production_df = production_df.set_index("datetime")
-        prices_df = prices_df.set_index("datetime")
+        with span("transform", "merge") as s:
+            load_df = load_df.set_index("datetime")
+            production_df = production_df.set_index("datetime")
+            prices_df = prices_df.set_index("datetime")
 
-        merged_df = (
-            load_df
-            .join(production_df, how="outer")
-            .join(prices_df, how="outer")
-            .reset_index()
-        )
+            merged_df = (
+                load_df
+                .join(production_df, how="outer")
+                .join(prices_df, how="outer")
+                .reset_index()
+            )
 
-        if "production_ton" in merged_df.columns:
-            merged_df["production_ton"] = merged_df["production_ton"].ffill()
+            if "production_ton" in merged_df.columns:
+                merged_df["production_ton"] = merged_df["production_ton"].ffill()
 
-        if "price_eur_mwh" in merged_df.columns:
-            merged_df["price_eur_mwh"] = merged_df["price_eur_mwh"].ffill()
+            if "price_eur_mwh" in merged_df.columns:
+                merged_df["price_eur_mwh"] = merged_df["price_eur_mwh"].ffill()
+            s.rows = len(merged_df)
 
         # ---- SAVE OUTPUT ----
-        output_path = Path(self.results_path) / "merged_energy_data.parquet"
-        merged_df.to_parquet(output_path, index=False)
+        output_path = write_frame(merged_df, self.results_path, "merged_energy_data", fmt="parquet", sort_by="datetime")
 
         print(f"[SUCCESS] Data merged, rows: {len(merged_df)}")
         print(f"[SUCCESS] Output written to {output_path}")
@@ -74,5 +115,7 @@ class FetchEnergyDataPiece(BasePiece):
         # ---- RETURN PLAIN DICT (CRITICAL) ----
         return {
             "message": f"Data merged successfully ({len(merged_df)} rows)",
-            "output_path": str(output_path)
+            "output_path": str(output_path),
+            "quality_report_path": str(quality_report_path),
+            "quality_mask_path": str(quality_mask_path),
         }
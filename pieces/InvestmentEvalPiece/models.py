@@ -10,3 +10,7 @@ class InputModel(BaseModel):
 class OutputModel(BaseModel):
     message: str
     investment_evaluation_json: str
+    cashflows_csv: str = Field(default="", description="Year-by-year CAPEX, savings, OPEX, replacement and discounted cash flow")
+    tornado_csv: str = Field(default="", description="NPV/IRR at the low/high value of each sensitivity parameter")
+    heatmap_csv: str = Field(default="", description="NPV over the two heat map parameters")
+    grid_parquet: str = Field(default="", description="NPV, IRR and discounted payback for every grid combination")
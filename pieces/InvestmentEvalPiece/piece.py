@@ -2,9 +2,15 @@ from domino.base_piece import BasePiece
 from .models import InputModel, OutputModel
 
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import yaml
 
+from pipeline_common import finance
+from pipeline_common.instrumentation import instrumented_piece, span
+from pipeline_common.interchange import write_frame
+from pipeline_common.result_cache import cached_piece
+
 
 # ===============================
 # FINANCIAL FUNCTIONS
@@ -14,11 +20,6 @@ def simple_payback(capex: float, annual_savings: float) -> float:
     return capex / annual_savings if annual_savings > 0 else 999
 
 
-def npv(capex: float, annual_cash: float, years: int, dr: float) -> float:
-    factor = (1 - (1 + dr) ** -years) / dr
-    return -capex + annual_cash * factor
-
-
 def co2_saved(annual_pv_mwh: float, grid_factor: float = 0.57) -> float:
     return annual_pv_mwh * grid_factor
 
@@ -34,6 +35,8 @@ def lcoe(capex: float, annual_mwh: float, degradation: float, years: int) -> flo
 
 class InvestmentEvalPiece(BasePiece):
 
+    @instrumented_piece
+    @cached_piece
     def piece_function(self, input_data: InputModel) -> OutputModel:
 
         print("\n[INFO] ===== INVESTMENT PIECE START =====")
@@ -86,11 +89,68 @@ class InvestmentEvalPiece(BasePiece):
         # ---------------------------
         # CALCULATIONS
         # ---------------------------
+        base = {
+            "solar_capex_eur": solar_capex,
+            "battery_capex_eur": battery_capex,
+            "annual_savings_eur": annual_savings,
+            "discount_rate": discount_rate,
+            # PV yield degradation only enters LCOE unless savings degradation is asked for
+            "degradation_per_year": float(cfg.get("savings_degradation_per_year", 0.0)),
+        }
+        for key in ("opex_pct_of_capex", "opex_escalation", "savings_escalation", "battery_replacement_pct"):
+            if key in cfg:
+                base[key] = float(cfg[key])
+        replacement_year = int(cfg.get("battery_replacement_year", 0) or 0)
+
+        base_result = finance.evaluate(base, years, replacement_year)
         payback_years = simple_payback(total_capex, annual_savings)
-        npv_value = npv(total_capex, annual_savings, years, discount_rate)
+        npv_value = float(base_result["npv_eur"])
+        irr_value = float(base_result["irr"])
         lcoe_value = lcoe(solar_capex, annual_pv_mwh, degradation, years)
         co2_value = co2_saved(annual_pv_mwh)
 
+        # ---------------------------
+        # YEAR-BY-YEAR CASH FLOWS
+        # ---------------------------
+        components = finance.cash_flow_components(base, years, replacement_year)
+        cashflow_df = pd.DataFrame({"year": np.arange(years + 1), **components})
+        cashflow_df["net_cash_flow_eur"] = finance.cash_flows(base, years, replacement_year)
+        cashflow_df["discounted_cash_flow_eur"] = cashflow_df["net_cash_flow_eur"] / (1 + discount_rate) ** cashflow_df["year"]
+        cashflow_df["cumulative_discounted_eur"] = cashflow_df["discounted_cash_flow_eur"].cumsum()
+        cashflow_path = Path(self.results_path) / "investment_cashflows.csv"
+        cashflow_df.to_csv(cashflow_path, index=False)
+
+        # ---------------------------
+        # SENSITIVITY (tornado, heat map, grid)
+        # ---------------------------
+        tornado_path = ""
+        if cfg.get("sensitivity"):
+            ranges = {k: (float(v[0]), float(v[1])) for k, v in cfg["sensitivity"].items()}
+            tornado_path = Path(self.results_path) / "investment_tornado.csv"
+            finance.tornado(base, ranges, years, replacement_year).to_csv(tornado_path, index=False)
+
+        heatmap_path = ""
+        if cfg.get("heatmap"):
+            hm = cfg["heatmap"]
+            table = finance.heatmap(base, hm["x"], hm["x_values"], hm["y"], hm["y_values"], years, replacement_year)
+            heatmap_path = Path(self.results_path) / "investment_heatmap.csv"
+            table.rename_axis(f"{hm['y']} / {hm['x']}").to_csv(heatmap_path)
+
+        grid_path = ""
+        grid_stats = {}
+        if cfg.get("grid"):
+            axes = {k: np.linspace(float(v[0]), float(v[1]), int(v[2])) for k, v in cfg["grid"].items()}
+            with span("compute", "parameter grid", rows=int(np.prod([len(v) for v in axes.values()]))):
+                grid_df = finance.grid(base, axes, years, replacement_year)
+            print(f"[INFO] Evaluated {len(grid_df):,} parameter combinations")
+            grid_path = write_frame(grid_df, self.results_path, "investment_grid", fmt="parquet")
+            grid_stats = {
+                "npv_grid_p10_eur": float(grid_df["npv_eur"].quantile(0.1)),
+                "npv_grid_p50_eur": float(grid_df["npv_eur"].quantile(0.5)),
+                "npv_grid_p90_eur": float(grid_df["npv_eur"].quantile(0.9)),
+                "npv_grid_positive_share": float((grid_df["npv_eur"] > 0).mean()),
+            }
+
         # ---------------------------
         # SAVE OUTPUT
         # ---------------------------
@@ -100,10 +160,13 @@ class InvestmentEvalPiece(BasePiece):
             "battery_capex_eur": battery_capex,
             "annual_savings_eur": annual_savings,
             "simple_payback_years": payback_years,
+            "discounted_payback_years": float(base_result["discounted_payback_years"]),
             "npv_eur": npv_value,
+            "irr": irr_value,
             "solar_lcoe_eur_per_mwh": lcoe_value,
             "annual_co2_saved_ton": co2_value,
-            "battery_cycles_est": battery_cycles
+            "battery_cycles_est": battery_cycles,
+            **grid_stats,
         }
 
         out_path = Path(self.results_path) / "investment_evaluation.csv"
@@ -114,5 +177,9 @@ class InvestmentEvalPiece(BasePiece):
 
         return OutputModel(
             message="Investment evaluation finished",
-            investment_evaluation_json=str(out_path)
+            investment_evaluation_json=str(out_path),
+            cashflows_csv=str(cashflow_path),
+            tornado_csv=str(tornado_path),
+            heatmap_csv=str(heatmap_path),
+            grid_parquet=str(grid_path)
         )
@@ -2,13 +2,34 @@ from pydantic import BaseModel, Field
 
 
 class InputModel(BaseModel):
-    forecast_csv: str = Field(description="Path to predictions_15min.csv")
-    simulated_load_csv: str = Field(description="Path to simulated_results.csv")
+    forecast_csv: str = Field(description="Path to predictions_15min (csv, feather or parquet)")
+    simulated_load_csv: str = Field(description="Path to simulated_results (csv, feather or parquet)")
     scenario_summary_csv: str = Field(description="Path to summary.csv from SimulatePiece")
     production_csv: str = Field(description="Production tons csv from disk", default="/home/shared_storage/production.csv")
     actual_csv: str = Field(default="", description="Optional actual load csv")
+    monte_carlo_summary_csv: str = Field(
+        default="",
+        description="Optional monte_carlo_summary.csv from SimulatePiece; adds P10/P50/P90 savings and payback columns",
+    )
+    shifts: str = Field(
+        default="A=06:00-14:00,B=14:00-22:00,C=22:00-06:00",
+        description="Shift windows for the KPI cube, e.g. A=06:00-14:00,B=14:00-22:00,C=22:00-06:00",
+    )
+    tariff_yml: str = Field(default="", description="Optional tariff yaml; its ToU bands become a KPI cube dimension")
+    virtual_solar_csv: str = Field(default="", description="Optional virtual_solar from SolarSimPiece for the cube's solar share")
+    backtest_summary_csv: str = Field(
+        default="",
+        description="Optional backtest_summary.csv from BacktestPiece; adds overall MAE/RMSE/MAPE columns",
+    )
+    kpi_state_path: str = Field(
+        default="",
+        description="Optional JSON state of the streaming KPI accumulators (e.g. /home/shared_storage/kpi_state.json); "
+                    "each run adds only intervals after the stored high-water mark",
+    )
 
 
 class OutputModel(BaseModel):
     message: str
     kpi_results_csv: str
+    kpi_cube_parquet: str = ""
+    kpi_streaming_csv: str = ""
@@ -1,12 +1,202 @@
 from domino.base_piece import BasePiece
 from .models import InputModel, OutputModel
 
+import numpy as np
 import pandas as pd
+from functools import partial
 from pathlib import Path
 
+from pipeline_common.instrumentation import instrumented_piece, span
+from pipeline_common.interchange import frame_exists, read_frame, write_frame
+from pipeline_common.kpi_stream import KPIAccumulator, load_states, save_states
+from pipeline_common.result_cache import cached_piece
+from pipeline_common.tariff import Tariff
+from pipeline_common.timegrid import align_to_timestamps, energy_kwh, interval_hours
+
+
+def compute_kpis(sim: pd.DataFrame, prod_daily: pd.Series, scen_row: pd.Series) -> dict:
+    """Whole-period KPIs for one scenario's simulated_results rows and its summary.csv row."""
+
+    # =========================================================
+    # ENERGY PER TON
+    # =========================================================
+    interval_h = interval_hours(sim)
+    sim = sim.copy()
+    sim["energy_kwh"] = energy_kwh(sim["simulated_load_kw"], interval_h)
+    sim_daily = sim.set_index("datetime").resample("D")["energy_kwh"].sum()
+
+    merged = pd.concat([sim_daily, prod_daily], axis=1).dropna()
+
+    if len(merged) == 0:
+        kwh_per_ton = 0.0
+    else:
+        total_energy_kwh = merged["energy_kwh"].sum()
+        total_production_ton = merged["production_ton"].sum()
+        if total_production_ton > 0:
+            kwh_per_ton = total_energy_kwh / total_production_ton
+        else:
+            kwh_per_ton = 0.0
+
+    # =========================================================
+    # PEAKS
+    # =========================================================
+    baseline_peak = sim["baseline_load_kw"].max()
+    simulated_peak = sim["simulated_load_kw"].max()
+    peak_reduction = baseline_peak - simulated_peak
+
+    # =========================================================
+    # MONEY
+    # =========================================================
+    savings = float(scen_row["savings_eur"])
+
+    days = float(scen_row["days_simulated"])
+    yearly_savings = savings * (365 / days) if days > 0 else 0
+
+    # =========================================================
+    # PV MWh estimate (rough from difference)
+    # =========================================================
+    energy_diff = (sim["baseline_load_kw"] - sim["simulated_load_kw"]).clip(lower=0)
+    pv_mwh = energy_kwh(energy_diff, interval_h).sum() / 1000
+
+    co2_saved = pv_mwh * 0.57
+
+    return {
+        "kwh_per_ton": kwh_per_ton,
+        "baseline_peak_kw": baseline_peak,
+        "simulated_peak_kw": simulated_peak,
+        "peak_reduction_kw": peak_reduction,
+        "annual_savings_eur": yearly_savings,
+        "period_savings_eur": savings,
+        "annual_pv_mwh_est": pv_mwh * (365 / days) if days > 0 else 0,
+        "co2_saved_ton_est": co2_saved * (365 / days) if days > 0 else 0,
+    }
+
+
+# =========================================================
+# KPI CUBE
+# =========================================================
+
+CUBE_GRANULARITIES = ("total", "month", "week", "day", "hour_of_day", "shift", "tou_band")
+
+
+def parse_shifts(spec: str) -> tuple[np.ndarray, list[str]]:
+    """
+    "A=06:00-14:00,B=14:00-22:00,C=22:00-06:00" -> shift code per minute of day and shift names.
+    Minutes not covered by any shift get the name "none".
+    """
+    names = ["none"]
+    codes = np.zeros(24 * 60, dtype=np.int16)
+    for part in str(spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, window = part.partition("=")
+        start, _, end = window.partition("-")
+        h0, m0 = (int(x) for x in start.strip().split(":"))
+        h1, m1 = (int(x) for x in end.strip().split(":"))
+        a, b = h0 * 60 + m0, h1 * 60 + m1
+        names.append(name.strip())
+        minutes = np.arange(24 * 60)
+        mask = (minutes >= a) & (minutes < b) if a < b else (minutes >= a) | (minutes < b)
+        codes[mask & (codes == 0)] = len(names) - 1
+    return codes, names
+
+
+def _band_codes(tariff: Tariff, timestamps) -> np.ndarray:
+    return tariff.prepare(timestamps).band_codes
+
+
+def _calendar_keys(timestamps: pd.Series, shift_codes: np.ndarray, band_of=None) -> pd.DataFrame:
+    """Atom keys (day, hour, shift, ToU band) per timestamp, computed once on the unique timestamps."""
+    codes, uniques = pd.factorize(pd.to_datetime(timestamps))
+    ts = pd.DatetimeIndex(uniques)
+    keys = pd.DataFrame({
+        "day": ts.normalize(),
+        "hour_of_day": ts.hour.astype(np.int8),
+        "shift": shift_codes[ts.hour * 60 + ts.minute],
+        "tou_band": band_of(ts) if band_of is not None else np.zeros(len(ts), dtype=np.int16),
+    })
+    return keys.iloc[codes].reset_index(drop=True)
+
+
+def build_kpi_cube(
+    sim: pd.DataFrame,
+    prod: pd.DataFrame,
+    shift_spec: str = "",
+    tariff: Tariff | None = None,
+    solar: pd.DataFrame | None = None,
+) -> pd.DataFrame:
+    """
+    KPIs per scenario by total, month, week, day, hour-of-day, shift and ToU band.
+
+    The rows (any time grid) are grouped once into atoms (scenario, day, hour, shift, band) with additive
+    sums and maxima; every granularity is a roll-up of the atoms, so raw rows are scanned once.
+    Solar share uses the on-site solar (min(solar, baseline load)) when virtual_solar is given,
+    otherwise the load reduction baseline - simulated.
+    """
+    interval_h = interval_hours(sim)
+    shift_codes, shift_names = parse_shifts(shift_spec)
+
+    band_names = list(tariff.band_names) if tariff is not None else ["all"]
+    band_of = partial(_band_codes, tariff) if tariff is not None else None
+
+    scenario = sim["scenario"].astype(str) if "scenario" in sim.columns else pd.Series("", index=sim.index)
+    if solar is not None:
+        solar_kw = pd.Series(np.nan_to_num(align_to_timestamps(sim["datetime"], solar, "solar_kw")), index=sim.index)
+        solar_kwh = np.minimum(solar_kw, sim["baseline_load_kw"]).clip(lower=0) * interval_h
+    else:
+        solar_kwh = (sim["baseline_load_kw"] - sim["simulated_load_kw"]).clip(lower=0) * interval_h
+
+    rows = _calendar_keys(sim["datetime"], shift_codes, band_of)
+    rows["scenario"] = scenario.values
+    rows["baseline_kwh"] = energy_kwh(sim["baseline_load_kw"], interval_h)
+    rows["energy_kwh"] = energy_kwh(sim["simulated_load_kw"], interval_h)
+    rows["baseline_cost_eur"] = sim["baseline_cost_eur"].values if "baseline_cost_eur" in sim else 0.0
+    rows["scenario_cost_eur"] = sim["scenario_cost_eur"].values if "scenario_cost_eur" in sim else 0.0
+    rows["solar_kwh"] = solar_kwh.values
+    rows["baseline_peak_kw"] = sim["baseline_load_kw"].values
+    rows["simulated_peak_kw"] = sim["simulated_load_kw"].values
+
+    atom_keys = ["scenario", "day", "hour_of_day", "shift", "tou_band"]
+    sums = ["baseline_kwh", "energy_kwh", "baseline_cost_eur", "scenario_cost_eur", "solar_kwh"]
+    maxima = ["baseline_peak_kw", "simulated_peak_kw"]
+    atoms = rows.groupby(atom_keys, sort=False).agg({**{c: "sum" for c in sums}, **{c: "max" for c in maxima}}).reset_index()
+
+    # production na rovnakých atómoch (bez scenára), pripojená ku každému scenáru
+    prod_keys = _calendar_keys(prod["datetime"], shift_codes, band_of)
+    prod_keys["production_ton"] = prod["production_ton"].values
+    prod_atoms = prod_keys.groupby(atom_keys[1:], sort=False)["production_ton"].sum().reset_index()
+    atoms = atoms.merge(prod_atoms, on=atom_keys[1:], how="left")
+    atoms["production_ton"] = atoms["production_ton"].fillna(0.0)
+
+    atoms["total"] = "all"
+    atoms["month"] = atoms["day"].dt.strftime("%Y-%m")
+    atoms["week"] = (atoms["day"] - pd.to_timedelta(atoms["day"].dt.dayofweek, unit="D")).dt.strftime("%Y-%m-%d")
+    atoms["hour_of_day"] = atoms["hour_of_day"].map("{:02d}".format)
+    atoms["shift"] = np.asarray(shift_names, dtype=object)[atoms["shift"].to_numpy()]
+    atoms["tou_band"] = np.asarray(band_names, dtype=object)[atoms["tou_band"].to_numpy()]
+    atoms["day"] = atoms["day"].dt.strftime("%Y-%m-%d")
+
+    agg = {**{c: "sum" for c in sums + ["production_ton"]}, **{c: "max" for c in maxima}}
+    parts = []
+    for granularity in CUBE_GRANULARITIES:
+        part = atoms.groupby(["scenario", granularity], sort=True).agg(agg).reset_index()
+        part = part.rename(columns={granularity: "period"})
+        part.insert(1, "granularity", granularity)
+        parts.append(part)
+    cube = pd.concat(parts, ignore_index=True)
+
+    cube["peak_reduction_kw"] = cube["baseline_peak_kw"] - cube["simulated_peak_kw"]
+    cube["savings_eur"] = cube["baseline_cost_eur"] - cube["scenario_cost_eur"]
+    cube["kwh_per_ton"] = np.where(cube["production_ton"] > 0, cube["energy_kwh"] / cube["production_ton"].where(cube["production_ton"] > 0, 1.0), 0.0)
+    cube["solar_share"] = np.where(cube["baseline_kwh"] > 0, cube["solar_kwh"] / cube["baseline_kwh"].where(cube["baseline_kwh"] > 0, 1.0), 0.0)
+    return cube
+
 
 class KPIPiece(BasePiece):
 
+    @instrumented_piece
+    @cached_piece(bypass=("kpi_state_path",))
     def piece_function(self, input_data: InputModel) -> OutputModel:
 
         print("\n[INFO] ===== KPI PIECE START =====")
@@ -16,77 +206,35 @@ class KPIPiece(BasePiece):
         scen_csv = Path(input_data.scenario_summary_csv)
         prod_csv = Path(input_data.production_csv)
         actual_csv = Path(input_data.actual_csv) if input_data.actual_csv else None
+        mc_csv = Path(input_data.monte_carlo_summary_csv) if input_data.monte_carlo_summary_csv else None
 
-        if not forecast_csv.exists():
+        if not frame_exists(forecast_csv):
             raise FileNotFoundError(f"Forecast CSV not found: {forecast_csv}")
-        if not sim_csv.exists():
+        if not frame_exists(sim_csv):
             raise FileNotFoundError(f"Simulated CSV not found: {sim_csv}")
         if not scen_csv.exists():
             raise FileNotFoundError(f"Scenario summary not found: {scen_csv}")
         if not prod_csv.exists():
             raise FileNotFoundError(f"Production CSV not found: {prod_csv}")
 
-        print("[INFO] Loading CSVs")
+        print("[INFO] Loading inputs")
 
-        fc = pd.read_csv(forecast_csv, parse_dates=["datetime"])
-        sim = pd.read_csv(sim_csv, parse_dates=["datetime"])
-        prod = pd.read_csv(prod_csv, parse_dates=["datetime"])
+        fc = read_frame(forecast_csv)
+        sim = read_frame(sim_csv)
+        prod = read_frame(prod_csv)
         scen = pd.read_csv(scen_csv)
 
-        # =========================================================
-        # ENERGY PER TON
-        # =========================================================
-        print("[INFO] Calculating kWh per ton")
-
-        sim["energy_kwh"] = sim["simulated_load_kw"] * 0.25
-        sim_daily = sim.set_index("datetime").resample("D")["energy_kwh"].sum()
+        print("[INFO] Calculating KPIs (kWh per ton, peaks, savings, PV)")
 
         prod_daily = prod.set_index("datetime").resample("D")["production_ton"].sum()
 
-        merged = pd.concat([sim_daily, prod_daily], axis=1).dropna()
-
-        if len(merged) == 0:
-            kwh_per_ton = 0.0
-        else:
-            total_energy_kwh = merged["energy_kwh"].sum()
-            total_production_ton = merged["production_ton"].sum()
-            if total_production_ton > 0:
-                kwh_per_ton = total_energy_kwh / total_production_ton
-            else:
-                kwh_per_ton = 0.0
-
-        # =========================================================
-        # PEAKS
-        # =========================================================
-        baseline_peak = sim["baseline_load_kw"].max()
-        simulated_peak = sim["simulated_load_kw"].max()
-        peak_reduction = baseline_peak - simulated_peak
-
-        # =========================================================
-        # MONEY
-        # =========================================================
-        baseline_cost = float(scen["baseline_cost_eur"].iloc[0])
-        scenario_cost = float(scen["scenario_cost_eur"].iloc[0])
-        savings = float(scen["savings_eur"].iloc[0])
-
-        days = float(scen["days_simulated"].iloc[0])
-        yearly_savings = savings * (365 / days) if days > 0 else 0
-
-        # =========================================================
-        # PV MWh estimate (rough from difference)
-        # =========================================================
-        energy_diff = (sim["baseline_load_kw"] - sim["simulated_load_kw"]).clip(lower=0)
-        pv_mwh = (energy_diff.sum() * 0.25) / 1000
-
-        co2_saved = pv_mwh * 0.57
-
         # =========================================================
         # FORECAST MAPE (optional)
         # =========================================================
         mape_val = None
-        if actual_csv and actual_csv.exists():
+        if actual_csv and frame_exists(actual_csv):
             print("[INFO] Calculating MAPE")
-            act = pd.read_csv(actual_csv, parse_dates=["datetime"])
+            act = read_frame(actual_csv)
 
             merged_fc = pd.merge(
                 fc[["datetime", "prediction_load_kw"]],
@@ -102,29 +250,95 @@ class KPIPiece(BasePiece):
                 ).mean() * 100
 
         # =========================================================
-        # SAVE KPI
+        # SAVE KPI (one row per scenario)
+        # =========================================================
+        if "scenario" in sim.columns and "scenario" in scen.columns:
+            scen_rows = scen.set_index(scen["scenario"].astype(str))
+            groups = [(str(name), group) for name, group in sim.groupby("scenario", sort=False)]
+        else:
+            scen_rows = None
+            groups = [(None, sim)]
+
+        kpi_rows = []
+        with span("compute", f"KPIs of {len(groups)} scenario(s)", rows=len(sim)):
+            for name, group in groups:
+                scen_row = scen_rows.loc[name] if scen_rows is not None else scen.iloc[0]
+                kpi_dict = {"scenario": name} if name is not None else {}
+                kpi_dict.update(compute_kpis(group, prod_daily, scen_row))
+                kpi_dict["forecast_mape_pct"] = mape_val
+                kpi_rows.append(kpi_dict)
+
+        kpi_df = pd.DataFrame(kpi_rows)
+
+        # =========================================================
+        # MONTE CARLO PERCENTILES (optional)
+        # =========================================================
+        if mc_csv and mc_csv.exists():
+            print("[INFO] Adding Monte Carlo P10/P50/P90")
+            mc = pd.read_csv(mc_csv)
+            mc_cols = [c for c in mc.columns if c.startswith(("annual_savings_eur_p", "payback_years_p"))]
+            mc_cols += [c for c in ("prob_positive_savings", "never_payback_share") if c in mc.columns]
+            if "scenario" in kpi_df.columns and "scenario" in mc.columns:
+                mc["scenario"] = mc["scenario"].astype(str)
+                kpi_df = kpi_df.merge(mc[["scenario"] + mc_cols], on="scenario", how="left")
+            elif len(mc):
+                for col in mc_cols:
+                    kpi_df[col] = mc[col].iloc[0]
+
+        # =========================================================
+        # BACKTEST ACCURACY (optional, BacktestPiece)
         # =========================================================
-        kpi_dict = {
-            "kwh_per_ton": kwh_per_ton,
-            "baseline_peak_kw": baseline_peak,
-            "simulated_peak_kw": simulated_peak,
-            "peak_reduction_kw": peak_reduction,
-            "annual_savings_eur": yearly_savings,
-            "period_savings_eur": savings,
-            "annual_pv_mwh_est": pv_mwh * (365 / days) if days > 0 else 0,
-            "co2_saved_ton_est": co2_saved * (365 / days) if days > 0 else 0,
-            "forecast_mape_pct": mape_val
-        }
-
-        kpi_df = pd.DataFrame([kpi_dict])
+        if input_data.backtest_summary_csv and Path(input_data.backtest_summary_csv).exists():
+            bt = pd.read_csv(input_data.backtest_summary_csv)
+            overall = bt[bt["dimension"] == "overall"]
+            if len(overall):
+                print("[INFO] Adding backtest accuracy")
+                kpi_df["backtest_mae_kw"] = overall["mae"].iloc[0]
+                kpi_df["backtest_rmse_kw"] = overall["rmse"].iloc[0]
+                kpi_df["backtest_mape_pct"] = overall["mape_pct"].iloc[0]
 
         out_path = Path(self.results_path) / "kpi_results.csv"
         kpi_df.to_csv(out_path, index=False)
 
+        # =========================================================
+        # STREAMING KPI STATE (optional, only intervals after the last run)
+        # =========================================================
+        streaming_path = ""
+        if input_data.kpi_state_path:
+            states = load_states(input_data.kpi_state_path)
+            interval_h = interval_hours(sim)
+            with span("compute", "streaming KPI update", rows=len(sim)):
+                stream_rows = []
+                for name, group in groups:
+                    key = name if name is not None else ""
+                    acc = states.get(key) or KPIAccumulator(key, interval_h)
+                    new_rows = acc.update(group, prod)
+                    states[key] = acc
+                    print(f"[INFO] Streaming KPI [{key or 'default'}]: {new_rows} new intervals")
+                    stream_rows.append({"scenario": key, **acc.result()})
+            save_states(input_data.kpi_state_path, states)
+            streaming_path = Path(self.results_path) / "kpi_streaming.csv"
+            pd.DataFrame(stream_rows).to_csv(streaming_path, index=False)
+
+        # =========================================================
+        # KPI CUBE (hour-of-day, day, week, month, shift, ToU band)
+        # =========================================================
+        print("[INFO] Building KPI cube")
+        tariff = Tariff.from_yaml(input_data.tariff_yml) if input_data.tariff_yml else None
+        solar = None
+        if frame_exists(input_data.virtual_solar_csv):
+            solar = read_frame(input_data.virtual_solar_csv)
+        with span("compute", "KPI cube", rows=len(sim)):
+            cube = build_kpi_cube(sim, prod, input_data.shifts, tariff, solar)
+        cube_path = write_frame(cube, self.results_path, "kpi_cube", fmt="parquet")
+        print(f"[INFO] KPI cube ({len(cube)} rows) saved to {cube_path}")
+
         print("\n[SUCCESS] KPI computed")
-        print(kpi_dict)
+        print(kpi_df.to_dict(orient="records"))
 
         return OutputModel(
             message="KPI calculation finished",
-            kpi_results_csv=str(out_path)
+            kpi_results_csv=str(out_path),
+            kpi_cube_parquet=str(cube_path),
+            kpi_streaming_csv=str(streaming_path)
         )
@@ -4,6 +4,19 @@ from pydantic import BaseModel, Field
 class InputModel(BaseModel):
     model_path: str = Field(description="Path to trained XGBoost model")
     data_path: str = Field(description="Path to prediction dataset (15min)")
+    window_start: str = Field(
+        default="",
+        description="Only rows at or after this timestamp (e.g. 2024-06-01); empty = from the start. Pushed down to the Parquet scan; keep a day before the forecast for the lag features",
+    )
+    window_end: str = Field(default="", description="Only rows before this timestamp; empty = to the end")
+    output_format: str = Field(
+        default="csv",
+        description="Format of predictions_15min: csv, feather (Arrow IPC, memory-mapped by readers) or parquet",
+    )
+    export_csv: bool = Field(
+        default=False,
+        description="Also write predictions_15min.csv when output_format is feather or parquet",
+    )
 
 
 class OutputModel(BaseModel):
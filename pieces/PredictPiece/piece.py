@@ -7,9 +7,16 @@ from pathlib import Path
 import joblib
 from datetime import datetime
 
+from pipeline_common.forecast_features import TARGET, add_features
+from pipeline_common.instrumentation import instrumented_piece, span
+from pipeline_common.interchange import frame_exists, read_frame, write_frame
+from pipeline_common.result_cache import cached_piece
+
 
 class PredictPiece(BasePiece):
 
+    @instrumented_piece
+    @cached_piece
     def piece_function(self, input_data: InputModel) -> OutputModel:
 
         print("[INFO] PredictPiece started")
@@ -22,17 +29,14 @@ class PredictPiece(BasePiece):
         if not model_path.exists():
             raise FileNotFoundError(f"Model not found: {model_path}")
 
-        if not data_path.exists():
+        if not frame_exists(data_path):
             raise FileNotFoundError(f"Prediction data not found: {data_path}")
 
         # ---- LOAD MODEL ----
         model = joblib.load(model_path)
 
         # ---- LOAD DATA ----
-        if data_path.suffix == ".parquet":
-            df = pd.read_parquet(data_path)
-        else:
-            df = pd.read_csv(data_path)
+        df = read_frame(data_path, parse_dates=(), start=input_data.window_start, end=input_data.window_end)
 
         # =====================================================
         # FIX: sometimes datetime is index, not column
@@ -50,7 +54,7 @@ class PredictPiece(BasePiece):
         df["datetime"] = pd.to_datetime(df["datetime"])
         df = df.sort_values("datetime").reset_index(drop=True)
 
-        target = "load_kw"
+        target = TARGET
 
         if target not in df.columns:
             raise ValueError(
@@ -61,32 +65,33 @@ class PredictPiece(BasePiece):
         # =====================================================
         # SAME FEATURES AS TRAIN
         # =====================================================
-        print("[INFO] Creating time features")
-
-        df["hour"] = df["datetime"].dt.hour
-        df["dayofweek"] = df["datetime"].dt.dayofweek
-        df["month"] = df["datetime"].dt.month
-
-        print("[INFO] Creating lag features")
+        print("[INFO] Creating time and lag features")
+        with span("transform", "features") as s:
+            add_features(df, target)
 
-        df["lag_1"] = df[target].shift(1)
-        df["lag_4"] = df[target].shift(4)
-
-        df = df.dropna().reset_index(drop=True)
+            df = df.dropna().reset_index(drop=True)
+            s.rows = len(df)
 
         feature_names = model.get_booster().feature_names
         X = df[feature_names]
 
         # ---- PREDICT ----
         print("[INFO] Running prediction")
-        preds = model.predict(X)
+        with span("compute", "xgboost predict", rows=len(X)):
+            preds = model.predict(X)
 
         df_out = df.copy()
         df_out["prediction_load_kw"] = preds
 
-        # ---- SAVE CSV ----
-        output_path = Path(self.results_path) / "predictions_15min.csv"
-        df_out.to_csv(output_path, index=False)
+        # ---- SAVE (csv / feather / parquet) ----
+        output_path = write_frame(
+            df_out,
+            self.results_path,
+            "predictions_15min",
+            fmt=input_data.output_format,
+            dataset="predictions",
+            export_csv=input_data.export_csv,
+        )
 
         log_path = Path(self.results_path) / "prediction_log.txt"
         with open(log_path, "w") as f:
@@ -11,6 +11,31 @@ class InputModel(BaseModel):
         description="Forecast horizon in hours"
     )
 
+    resample_minutes: int = Field(
+        default=15,
+        description="Time grid of the outputs in minutes (1, 5, 15, ...); every downstream piece follows it"
+    )
+
+    quality_mask_path: str = Field(
+        default="",
+        description="data_quality_mask from FetchEnergyDataPiece; flagged values are dropped before resampling"
+    )
+
+    quality_drop_flags: str = Field(
+        default="no_data,spike",
+        description="Comma separated mask flags whose values are dropped (no_data, flatline, spike, duplicate, gap, non_monotonic)"
+    )
+
+    window_start: str = Field(
+        default="",
+        description="Only rows at or after this timestamp (e.g. 2024-06-01); empty = from the start. Pushed down to the Parquet scan"
+    )
+
+    window_end: str = Field(
+        default="",
+        description="Only rows before this timestamp; empty = to the end"
+    )
+
 
 class OutputModel(BaseModel):
     message: str
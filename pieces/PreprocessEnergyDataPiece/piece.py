@@ -1,6 +1,11 @@
 
 from domino.base_piece import BasePiece
 from .models import InputModel, OutputModel
+from pipeline_common.data_quality import apply_mask, parse_flags
+from pipeline_common.instrumentation import instrumented_piece, span
+from pipeline_common.interchange import frame_exists, read_frame, write_frame
+from pipeline_common.result_cache import cached_piece
+from pipeline_common.timegrid import set_interval
 from pathlib import Path
 import pandas as pd
 import math
@@ -12,58 +17,78 @@ class PreprocessEnergyDataPiece(BasePiece):
     Fixes datetime column bug + keeps everything simple
     """
 
+    @instrumented_piece
+    @cached_piece
     def piece_function(self, input_data: InputModel) -> OutputModel:
         print("[INFO] PreprocessEnergyDataPiece started")
 
         input_path = Path(input_data.input_path)
         forecast_hours = getattr(input_data, "forecast_hours", 24)
+        minutes = int(input_data.resample_minutes)
+        if minutes <= 0 or 1440 % minutes:
+            raise ValueError(f"resample_minutes must divide a day (1, 5, 15, 60, ...), got {minutes}")
+        freq = f"{minutes}min"
 
         print(f"[INFO] Using input file: {input_path}")
         print(f"[INFO] Forecast horizon: {forecast_hours} hours")
+        print(f"[INFO] Time grid: {freq}")
 
-        if not input_path.exists():
+        if not frame_exists(input_path):
             raise FileNotFoundError(f"Input file not found: {input_path}")
 
         # ---- LOAD ----
-        df = pd.read_parquet(input_path)
+        df = read_frame(input_path, parse_dates=(), start=input_data.window_start, end=input_data.window_end)
 
         if "datetime" not in df.columns:
             raise ValueError(f"Input must contain datetime column. Found: {df.columns}")
 
-        df["datetime"] = pd.to_datetime(df["datetime"])
-        df = df.drop_duplicates(subset=["datetime"])
-        df = df.sort_values("datetime")
-        df = df.set_index("datetime")
+        # ---- DATA QUALITY MASK ----
+        # chybné hodnoty (spike, -9, zaseknutý merač) ako NaN, aby ich resample nespriemeroval
+        if input_data.quality_mask_path:
+            mask = read_frame(input_data.quality_mask_path, parse_dates=())
+            with span("transform", "apply data-quality mask") as s:
+                df, nulled = apply_mask(df, mask, parse_flags(input_data.quality_drop_flags))
+                s.rows = len(df)
+            print(f"[INFO] Data-quality mask: {nulled} flagged values dropped ({input_data.quality_drop_flags})")
 
-        # ---- RESAMPLE ----
-        df_15min = df.resample("15min").mean().ffill()
+        with span("transform", f"dedupe + {minutes} min resample") as s:
+            df["datetime"] = pd.to_datetime(df["datetime"])
+            df = df.drop_duplicates(subset=["datetime"])
+            df = df.sort_values("datetime")
+            df = df.set_index("datetime")
 
-        train_df = df_15min.copy()
+            # ---- RESAMPLE ----
+            df_grid = df.resample(freq).mean().ffill()
+            s.rows = len(df_grid)
+
+        train_df = df_grid.copy()
 
         # ---- FUTURE (simple replay last week) ----
         print("[INFO] Building future dataset using last week replay")
 
-        last_timestamp = df_15min.index.max()
-        last_week = df_15min.last("7D")
+        last_timestamp = df_grid.index.max()
+        last_week = df_grid.last("7D")
 
         if len(last_week) == 0:
             raise ValueError("Not enough historical data")
 
-        steps = int(forecast_hours * 60 / 15)
+        steps = int(forecast_hours * 60 / minutes)
         repeat_count = math.ceil(steps / len(last_week))
 
-        future_pattern = pd.concat([last_week] * repeat_count)
-        future_pattern = future_pattern.iloc[:steps].copy()
+        with span("transform", "future replay") as s:
+            future_pattern = pd.concat([last_week] * repeat_count)
+            future_pattern = future_pattern.iloc[:steps].copy()
 
-        future_index = pd.date_range(
-            start=last_timestamp + pd.Timedelta(minutes=15),
-            periods=steps,
-            freq="15min"
-        )
+            future_index = pd.date_range(
+                start=last_timestamp + pd.Timedelta(minutes=minutes),
+                periods=steps,
+                freq=freq
+            )
 
-        future_pattern.index = future_index
+            future_pattern.index = future_index
 
-        predict_df = pd.concat([df_15min, future_pattern])
+            predict_df = pd.concat([df_grid, future_pattern])
+            s.rows = len(predict_df)
 
         # ---- IMPORTANT FIX ----
         # ensure datetime column is preserved correctly
@@ -72,13 +97,12 @@ class PreprocessEnergyDataPiece(BasePiece):
 
         train_df.rename(columns={"index": "datetime"}, inplace=True)
         predict_df.rename(columns={"index": "datetime"}, inplace=True)
+        set_interval(train_df, minutes / 60)
+        set_interval(predict_df, minutes / 60)
 
         # ---- SAVE ----
-        train_path = Path(self.results_path) / "train_dataset.parquet"
-        predict_path = Path(self.results_path) / "predict_dataset_15min.parquet"
-
-        train_df.to_parquet(train_path, index=False)
-        predict_df.to_parquet(predict_path, index=False)
+        train_path = write_frame(train_df, self.results_path, "train_dataset", fmt="parquet", sort_by="datetime")
+        predict_path = write_frame(predict_df, self.results_path, "predict_dataset_15min", fmt="parquet", sort_by="datetime")
 
         print("[SUCCESS] Preprocessing finished")
         print(f"[INFO] Train rows: {len(train_df)}")
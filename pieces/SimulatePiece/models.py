@@ -3,13 +3,67 @@ from pydantic import BaseModel, Field
 
 
 class InputModel(BaseModel):
-    forecast_csv: str = Field(description="Path to predictions_15min.csv from PredictPiece")
-    virtual_solar_csv: str = Field(description="Path to virtual_solar.csv", default="")
-    virtual_battery_soc_csv: str = Field(description="Path to virtual_battery_soc.csv", default="")
-    scenario_yml: str = Field(description="Path to scenario yaml file", default="/home/shared_storage/scenario.yml")
+    forecast_csv: str = Field(description="Path to predictions_15min (csv, feather or parquet) from PredictPiece")
+    virtual_solar_csv: str = Field(description="Path to virtual_solar (csv, feather or parquet)", default="")
+    virtual_battery_soc_csv: str = Field(description="Path to virtual_battery_soc (csv, feather or parquet)", default="")
+    scenario_yml: str = Field(
+        description="Scenario yaml file, a directory of scenario yamls or a comma separated list of yaml paths",
+        default="/home/shared_storage/scenario.yml",
+    )
+    virtual_solar_kwp: float = Field(
+        description="PV capacity (kWp) virtual_solar was simulated for; when > 0 each scenario's solar.capacity_kWp rescales the profile",
+        default=0.0,
+    )
+    tariff_yml: str = Field(
+        description="Optional tariff yaml (ToU bands, demand charge, grid/reactive/fixed fees); empty = spot price * energy",
+        default="",
+    )
+    max_workers: int = Field(description="Processes for evaluating several scenarios (0 = all CPUs, 1 = serial)", default=0)
+    monte_carlo_samples: int = Field(
+        description="Number of Monte Carlo trajectories (load residual, solar day and price block resampling); 0 = deterministic only",
+        default=0,
+    )
+    monte_carlo_seed: int = Field(description="Random seed of the Monte Carlo sampling", default=42)
+    monte_carlo_chunk_samples: int = Field(
+        description="Samples evaluated per array chunk (0 = sized automatically to ~256 MB)",
+        default=0,
+    )
+    residuals_csv: str = Field(
+        description="test_residuals.csv from TrainModelPiece for the load forecast bootstrap",
+        default="",
+    )
+    investment_config_yml: str = Field(
+        description="Optional investment config; solar + battery capex give the payback distribution (scenario capex_eur overrides)",
+        default="",
+    )
+    representative_days: int = Field(
+        description="Cluster the days into this many representative days and simulate only those (weighted annual figures); 0 = full horizon",
+        default=0,
+    )
+    representative_method: str = Field(description="Day clustering: kmedoids or kmeans", default="kmedoids")
+    representative_check: bool = Field(
+        description="Also run the full horizon and write representative_errors.csv (switch off for pure screening)",
+        default=True,
+    )
+    representative_tolerance_pct: float = Field(
+        description="Allowed relative error (%) of the representative-day costs, savings and peak vs the full run",
+        default=5.0,
+    )
+    output_minutes: int = Field(
+        description="Time grid of simulated_results in minutes (0 = the forecast grid); e.g. 15 with a 1 min forecast "
+                    "simulates at 1 min and writes 15 min rows (kW and prices averaged, EUR summed)",
+        default=0,
+    )
+    output_format: str = Field(description="Format of simulated_results: csv, feather (Arrow IPC) or parquet", default="csv")
+    export_csv: bool = Field(description="Also write simulated_results.csv when output_format is feather or parquet", default=False)
 
 
 class OutputModel(BaseModel):
     message: str
     simulated_load_csv: str
     scenario_summary_csv: str
+    bill_line_items_csv: str = ""
+    monte_carlo_samples_csv: str = ""
+    monte_carlo_summary_csv: str = ""
+    representative_days_csv: str = ""
+    representative_errors_csv: str = ""
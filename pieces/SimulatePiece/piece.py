@@ -1,13 +1,395 @@
 from domino.base_piece import BasePiece
 from .models import InputModel, OutputModel
 
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 from pathlib import Path
 import yaml
 
+from pipeline_common.battery import discharge_above_rate
+from pipeline_common.instrumentation import instrumented_piece, span
+from pipeline_common.interchange import frame_exists, read_frame, write_frame
+from pipeline_common.montecarlo import MonteCarloSimulation, summarize_samples
+from pipeline_common.representative_days import RepresentativeDays
+from pipeline_common.result_cache import cached_piece
+from pipeline_common.tariff import Tariff
+from pipeline_common.timegrid import align_to_timestamps, energy_kwh, interval_hours, resample_power, set_interval
+
+
+# =========================================================
+# SCENARIOS
+# =========================================================
+
+def load_scenarios(scenario_spec: str) -> list[tuple[str, dict]]:
+    """
+    Scenario YAMLs from one file, a directory (*.yml / *.yaml) or a comma/newline separated list.
+    Returns (scenario name, scenario dict) pairs; the name is `scenario_id` or the file stem.
+    """
+    paths: list[Path] = []
+    for part in str(scenario_spec).replace("\n", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        p = Path(part)
+        if p.is_dir():
+            paths.extend(sorted(q for q in p.iterdir() if q.suffix.lower() in (".yml", ".yaml")))
+        elif p.exists():
+            paths.append(p)
+        else:
+            raise FileNotFoundError(f"Scenario file not found: {p}")
+
+    if not paths:
+        raise FileNotFoundError(f"No scenario YAML found in: {scenario_spec}")
+
+    scenarios = []
+    for p in paths:
+        with open(p) as f:
+            scen = yaml.safe_load(f) or {}
+        name = str(scen.get("scenario_id") or p.stem)
+        if any(name == existing for existing, _ in scenarios):
+            raise ValueError(f"Duplicate scenario name '{name}' ({p})")
+        scenarios.append((name, scen))
+    return scenarios
+
+
+def _align_to_forecast(fc: pd.DataFrame, df: pd.DataFrame, col: str) -> pd.Series:
+    # Podpora oboch formátov: Solargis :07/:22/:37/:52 aj štandard :00/:15/:30/:45 – zjednotenie cez floor na hrubší z oboch krokov
+    return pd.Series(align_to_timestamps(fc["datetime"], df, col), index=fc.index, name=col)
+
+
+def load_shared_inputs(fc: pd.DataFrame, solar_csv: Path | None, battery_csv: Path | None,
+                       tariff: Tariff | None = None) -> dict:
+    """
+    Forecast, price, solar and battery series aligned to the forecast rows, loaded once for all scenarios.
+    A tariff is prepared here as well, so its band masks and billing periods are built once per index.
+    """
+    if "prediction_load_kw" not in fc.columns:
+        raise ValueError("prediction_load_kw column missing in forecast csv")
+
+    if "price_eur_kwh" in fc.columns:
+        price_series = fc["price_eur_kwh"]
+    elif "price_eur_mwh" in fc.columns:
+        price_series = fc["price_eur_mwh"] / 1000.0  # EUR/MWh → EUR/kWh
+    elif tariff is not None and not tariff.uses_spot_price:
+        price_series = None  # fixed tariff: band prices only
+    else:
+        raise ValueError("forecast CSV must contain price_eur_kwh or price_eur_mwh")
+
+    battery_present = bool(battery_csv and frame_exists(battery_csv))
+    battery_grid = None
+    if battery_present:
+        battery_df = read_frame(battery_csv)
+        if "grid_import_kw" in battery_df.columns:
+            battery_grid = _align_to_forecast(fc, battery_df, "grid_import_kw")
+
+    solar_kw = None
+    solar_profile = None
+    if solar_csv and frame_exists(solar_csv):
+        solar_df = read_frame(solar_csv)
+        if "solar_kw" not in solar_df.columns:
+            raise ValueError("solar_kw column missing in solar csv")
+        solar_kw = _align_to_forecast(fc, solar_df, "solar_kw").fillna(0)
+        solar_profile = solar_df[["datetime", "solar_kw"]].fillna(0)
+
+    return {
+        "datetime": fc["datetime"],
+        "interval_h": interval_hours(fc),
+        "base_load": fc["prediction_load_kw"].copy(),
+        "price": price_series,
+        "solar_kw": solar_kw,
+        "solar_profile": solar_profile,
+        "battery_grid_kw": battery_grid,
+        "battery_present": battery_present,
+        "tariff": tariff.prepare(fc["datetime"]) if tariff is not None else None,
+    }
+
+
+def scenario_load(
+    name: str,
+    scen: dict,
+    base_load: pd.Series,
+    solar_kw: pd.Series | None,
+    battery_grid_kw: pd.Series | None,
+    use_battery_output: bool = True,
+    battery_enabled: bool = False,
+    solar_scale: float = 1.0,
+    interval_h: float = 0.25,
+) -> pd.Series:
+    """Scenario grid load: BatterySimPiece output when usable, else load - scaled solar and the simple battery."""
+    simulated = base_load.copy()
+
+    # ================= BATTERY (detailný výstup z BatterySimPiece) =================
+    use_detailed_battery = use_battery_output and battery_grid_kw is not None
+    if use_detailed_battery:
+        print(f"[INFO] [{name}] Using detailed battery output (grid_import_kw from BatterySimPiece)")
+        simulated = battery_grid_kw.fillna(base_load)
+        print(f"[DEBUG] [{name}] Simulated load from battery CSV (min/mean/max): {simulated.min():.1f} / {simulated.mean():.1f} / {simulated.max():.1f} kW")
+        return simulated
+
+    # ================= SOLAR (ak nemáme detailný battery výstup) =================
+    if solar_kw is not None:
+        print(f"[INFO] [{name}] Applying solar (datetime aligned, scale {solar_scale:.3f})")
+        solar_kw = solar_kw * solar_scale
+
+        print(f"[DEBUG] [{name}] Solar total kWh: {energy_kwh(solar_kw, interval_h).sum():.2f}")
+
+        simulated = simulated - solar_kw
+        simulated[simulated < 0] = 0
+    else:
+        print(f"[INFO] [{name}] No solar applied")
+
+    # ================= BATTERY (jednoduchý model, len ak nie je detailný výstup) =================
+    if battery_enabled and "battery" in scen:
+        print(f"[INFO] [{name}] Applying simple battery model (no grid_import_kw in battery CSV)")
+        capacity = scen["battery"].get("capacity_kWh", 0)
+        max_rate = scen["battery"].get("max_c_rate", 0) * capacity
+
+        new_load, soc = discharge_above_rate(simulated.values, capacity, max_rate, interval_h=interval_h)
+        simulated = pd.Series(new_load, index=simulated.index)
+        print(f"[DEBUG] [{name}] Battery remaining SOC kWh: {float(soc):.2f}")
+    return simulated
+
+
+def simulate_scenario(
+    name: str,
+    scen: dict,
+    shared: dict,
+    use_battery_output: bool = True,
+    battery_enabled: bool | None = None,
+    solar_scale: float = 1.0,
+) -> tuple[pd.DataFrame, dict, pd.DataFrame | None]:
+    """
+    Baseline vs scenario load and cost for one scenario, plus bill line items when a tariff is set.
+
+    `use_battery_output` takes grid_import_kw from BatterySimPiece when available; it is only valid
+    for the battery configuration that BatterySimPiece simulated. Otherwise solar is subtracted
+    (scaled by `solar_scale`) and the simple battery model runs when `battery_enabled`.
+
+    With `shared["representative_days"]` the loads are simulated on the representative days only and
+    mapped back to the full index (baseline included), so the costs below are the weighted annual figures.
+    """
+    price_series = shared["price"]
+    if battery_enabled is None:
+        battery_enabled = shared["battery_present"]
+    interval_h = shared["interval_h"]
+    options = {"use_battery_output": use_battery_output, "battery_enabled": battery_enabled, "solar_scale": solar_scale,
+               "interval_h": interval_h}
+
+    rep = shared.get("representative_days")
+    if rep is None:
+        base_load = shared["base_load"]
+        simulated = scenario_load(name, scen, base_load, shared["solar_kw"], shared["battery_grid_kw"], **options)
+    else:
+        def take(series):
+            return None if series is None else rep.take(series)
+
+        full_index = shared["base_load"].index
+        reduced_load = rep.take(shared["base_load"])
+        reduced = scenario_load(name, scen, reduced_load, take(shared["solar_kw"]), take(shared["battery_grid_kw"]), **options)
+        base_load = pd.Series(rep.expand(reduced_load.values), index=full_index)
+        simulated = pd.Series(rep.expand(reduced.values), index=full_index)
+        if price_series is not None:
+            price_series = pd.Series(rep.expand(rep.take(price_series).values), index=full_index)
+
+    # ================= COST =================
+    prepared = shared.get("tariff")
+    bill_df = None
+    tariff_summary = {}
+    if prepared is not None:
+        price_values = price_series.values if price_series is not None else None
+        baseline_cost_series = pd.Series(prepared.interval_costs(base_load.values, price_values)["total_eur"], index=base_load.index)
+        scenario_cost_series = pd.Series(prepared.interval_costs(simulated.values, price_values)["total_eur"], index=base_load.index)
+        price_series = pd.Series(prepared.energy_price(price_values), index=base_load.index)
+
+        keys = ["site", "period_start", "line_item", "unit"]
+        baseline_bill = prepared.bill(base_load.values, price_values)
+        scenario_bill = prepared.bill(simulated.values, price_values)
+        bill_df = baseline_bill.merge(scenario_bill, on=keys, how="outer", suffixes=("_baseline", "_scenario")).fillna(0.0)
+        bill_df = bill_df.rename(columns={
+            "quantity_baseline": "baseline_quantity",
+            "amount_eur_baseline": "baseline_eur",
+            "quantity_scenario": "scenario_quantity",
+            "amount_eur_scenario": "scenario_eur",
+        })
+        bill_df["savings_eur"] = bill_df["baseline_eur"] - bill_df["scenario_eur"]
+        bill_df.insert(0, "scenario", name)
+
+        baseline_cost = baseline_bill["amount_eur"].sum()
+        scenario_cost = scenario_bill["amount_eur"].sum()
+        demand = bill_df[bill_df["line_item"] == "demand_charge"]
+        tariff_summary = {
+            "baseline_demand_charge_eur": demand["baseline_eur"].sum(),
+            "scenario_demand_charge_eur": demand["scenario_eur"].sum(),
+            "demand_savings_eur": demand["savings_eur"].sum(),
+        }
+    else:
+        baseline_cost_series = pd.Series(energy_kwh(base_load, interval_h), index=base_load.index) * price_series
+        scenario_cost_series = pd.Series(energy_kwh(simulated, interval_h), index=base_load.index) * price_series
+
+        baseline_cost = baseline_cost_series.sum()
+        scenario_cost = scenario_cost_series.sum()
+    savings = baseline_cost - scenario_cost
+
+    print(f"\n[DEBUG] ===== COST DEBUG [{name}] =====")
+    print(f"Baseline cost €: {baseline_cost:.2f}")
+    print(f"Scenario cost €: {scenario_cost:.2f}")
+    print(f"Savings €: {savings:.2f}")
+
+    rows = len(base_load)
+    days = rows * interval_h / 24
+
+    if days < 40:
+        yearly_estimate = savings * (365 / days)
+        print(f"[DEBUG] [{name}] Estimated yearly savings €: {yearly_estimate:.2f}")
+
+    out_df = pd.DataFrame({
+        "scenario": name,
+        "datetime": shared["datetime"],
+        "baseline_load_kw": base_load,
+        "simulated_load_kw": simulated,
+        "price_eur_kwh": price_series,
+        "baseline_cost_eur": baseline_cost_series,
+        "scenario_cost_eur": scenario_cost_series
+    })
+
+    summary = {
+        "scenario": name,
+        "description": scen.get("description", ""),
+        "solar_kwp": (scen.get("solar") or {}).get("capacity_kWp"),
+        "battery_kwh": (scen.get("battery") or {}).get("capacity_kWh"),
+        "rows": rows,
+        "days_simulated": days,
+        "baseline_cost_eur": baseline_cost,
+        "scenario_cost_eur": scenario_cost,
+        "savings_eur": savings,
+        "estimated_yearly_savings_eur": savings * (365 / days) if days > 0 else 0,
+        **tariff_summary,
+    }
+    return out_df, summary, bill_df
+
+
+def monte_carlo_scenario(
+    name: str,
+    scen: dict,
+    shared: dict,
+    residuals,
+    n_samples: int,
+    seed: int = 42,
+    battery_enabled: bool | None = None,
+    solar_scale: float = 1.0,
+    capex_eur: float | None = None,
+    chunk_samples: int = 0,
+    max_workers: int = 0,
+) -> tuple[pd.DataFrame, dict]:
+    """
+    Savings distribution of one scenario over `n_samples` perturbed load/solar/price trajectories.
+
+    Every sample uses the simple battery model (the BatterySimPiece output is one fixed trajectory).
+    All scenarios share `seed`, so they are compared on the same sampled trajectories.
+    """
+    if battery_enabled is None:
+        battery_enabled = shared["battery_present"]
+    battery = scen.get("battery") if battery_enabled else None
+
+    sim = MonteCarloSimulation(
+        shared["datetime"],
+        shared["base_load"].values,
+        shared["price"].values if shared["price"] is not None else None,
+        interval_h=shared["interval_h"],
+        residuals=residuals,
+        solar=shared.get("solar_profile"),
+        solar_scale=solar_scale,
+        battery=battery,
+        tariff=shared.get("tariff"),
+    )
+    samples = sim.run(n_samples, seed=seed, chunk_samples=chunk_samples, max_workers=max_workers, capex_eur=capex_eur)
+    samples.insert(0, "scenario", name)
+
+    summary = {"scenario": name, **summarize_samples(samples)}
+    print(
+        f"[INFO] [{name}] Monte Carlo annual savings € P10/P50/P90: "
+        f"{summary['annual_savings_eur_p10']:.0f} / {summary['annual_savings_eur_p50']:.0f} / {summary['annual_savings_eur_p90']:.0f}"
+    )
+    return samples, summary
+
+
+def _load_residuals(residuals_csv: str):
+    path = Path(residuals_csv) if residuals_csv else None
+    if path is None or not path.exists():
+        print("[INFO] No residuals file – Monte Carlo keeps the load forecast unperturbed")
+        return None
+    df = read_frame(path)
+    if "residual_kw" not in df.columns:
+        raise ValueError("residual_kw column missing in residuals file")
+    return df["residual_kw"].values
+
+
+def _scenario_capex(scen: dict, investment_yml: str) -> float | None:
+    # capex_eur v scenári má prednosť pred investment_config (solar + battery capex)
+    if scen.get("capex_eur") is not None:
+        return float(scen["capex_eur"])
+    if not investment_yml:
+        return None
+    with open(investment_yml) as f:
+        cfg = yaml.safe_load(f) or {}
+    return float(cfg.get("solar_capex_eur", 0)) + float(cfg.get("battery_capex_eur", 0))
+
+
+COST_COLUMNS = ("baseline_cost_eur", "scenario_cost_eur")
+REPRESENTATIVE_METRICS = ["baseline_cost_eur", "scenario_cost_eur", "savings_eur", "simulated_peak_kw"]
+
+
+def representative_errors(reduced: list, full: list, tolerance_pct: float) -> pd.DataFrame:
+    """Per scenario and metric: representative-day estimate vs the full-horizon run."""
+    rows = []
+    for (rep_df, rep_summary, _), (full_df, full_summary, _) in zip(reduced, full):
+        rep_values = {**rep_summary, "simulated_peak_kw": rep_df["simulated_load_kw"].max()}
+        full_values = {**full_summary, "simulated_peak_kw": full_df["simulated_load_kw"].max()}
+        for metric in REPRESENTATIVE_METRICS:
+            full_value = float(full_values[metric])
+            rep_value = float(rep_values[metric])
+            error_pct = (rep_value - full_value) / abs(full_value) * 100 if full_value else 0.0
+            rows.append({
+                "scenario": full_summary["scenario"],
+                "metric": metric,
+                "full_value": full_value,
+                "representative_value": rep_value,
+                "error": rep_value - full_value,
+                "error_pct": error_pct,
+                "within_tolerance": abs(error_pct) <= tolerance_pct,
+            })
+    return pd.DataFrame(rows)
+
+
+# Process pool workers receive the shared inputs once (initializer), not once per scenario.
+_WORKER_SHARED: dict = {}
+
+
+def _init_worker(shared: dict) -> None:
+    _WORKER_SHARED.clear()
+    _WORKER_SHARED.update(shared)
+
+
+def _run_scenario(task: tuple[str, dict, dict]) -> tuple[pd.DataFrame, dict, pd.DataFrame | None]:
+    name, scen, options = task
+    return simulate_scenario(name, scen, _WORKER_SHARED, **options)
+
+
+def _evaluate(tasks: list, shared: dict, max_workers: int) -> list:
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if workers > 1:
+        print(f"[INFO] Evaluating {len(tasks)} scenarios on {workers} processes")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared,)) as pool:
+            return list(pool.map(_run_scenario, tasks))
+    return [simulate_scenario(name, scen, shared, **options) for name, scen, options in tasks]
+
 
 class SimulatePiece(BasePiece):
 
+    @instrumented_piece
+    @cached_piece
     def piece_function(self, input_data: InputModel) -> OutputModel:
 
         print("\n[INFO] ===== SIMULATE PIECE START =====")
@@ -15,152 +397,153 @@ class SimulatePiece(BasePiece):
         forecast_csv = Path(input_data.forecast_csv)
         solar_csv = Path(input_data.virtual_solar_csv) if input_data.virtual_solar_csv else None
         battery_csv = Path(input_data.virtual_battery_soc_csv) if input_data.virtual_battery_soc_csv else None
-        scenario_yml = Path(input_data.scenario_yml)
 
-        if not forecast_csv.exists():
+        if not frame_exists(forecast_csv):
             raise FileNotFoundError(f"Forecast CSV not found: {forecast_csv}")
 
-        if not scenario_yml.exists():
-            raise FileNotFoundError(f"Scenario file not found: {scenario_yml}")
+        scenarios = load_scenarios(input_data.scenario_yml)
+        batch = len(scenarios) > 1
+        print(f"[INFO] Scenarios: {len(scenarios)} ({', '.join(name for name, _ in scenarios)})")
 
         print(f"[INFO] Loading forecast: {forecast_csv}")
-        fc = pd.read_csv(forecast_csv, parse_dates=["datetime"])
-
-        with open(scenario_yml) as f:
-            scen = yaml.safe_load(f)
-
-        if "prediction_load_kw" not in fc.columns:
-            raise ValueError("prediction_load_kw column missing in forecast csv")
+        fc = read_frame(forecast_csv)
 
-        base_load = fc["prediction_load_kw"].copy()
-        simulated = base_load.copy()
+        tariff = None
+        if input_data.tariff_yml:
+            print(f"[INFO] Loading tariff: {input_data.tariff_yml}")
+            tariff = Tariff.from_yaml(input_data.tariff_yml)
+        with span("transform", "align solar / battery / tariff", rows=len(fc)):
+            shared = load_shared_inputs(fc, solar_csv, battery_csv, tariff)
 
         print(f"[INFO] Rows in simulation: {len(fc)}")
 
-        # ================= BATTERY (detailný výstup z BatterySimPiece) =================
-        use_detailed_battery = False
-        if battery_csv and battery_csv.exists():
-            battery_df = pd.read_csv(battery_csv, parse_dates=["datetime"])
-            if "grid_import_kw" in battery_df.columns:
-                use_detailed_battery = True
-                print("[INFO] Using detailed battery output (grid_import_kw from BatterySimPiece)")
-                # Podpora oboch formátov: Solargis :07/:22/:37/:52 aj štandard :00/:15/:30/:45 – zjednotenie cez floor 15 min
-                fc_dt = pd.to_datetime(fc["datetime"])
-                batt_dt = pd.to_datetime(battery_df["datetime"])
-                fc_15 = fc[["datetime", "prediction_load_kw"]].copy()
-                fc_15["_dt15"] = fc_dt.dt.floor("15min")
-                batt_15 = battery_df[["grid_import_kw"]].copy()
-                batt_15["_dt15"] = batt_dt.dt.floor("15min")
-                # jedna 15-min bunka môže mať viac riadkov batérie (duplicity) – berieme prvý/priemer
-                batt_15 = batt_15.groupby("_dt15", as_index=False)["grid_import_kw"].first()
-                merged = fc_15.merge(batt_15, on="_dt15", how="left")
-                simulated = merged["grid_import_kw"].fillna(merged["prediction_load_kw"]).values
-                simulated = pd.Series(simulated, index=fc.index)
-                print(f"[DEBUG] Simulated load from battery CSV (min/mean/max): {simulated.min():.1f} / {simulated.mean():.1f} / {simulated.max():.1f} kW")
-
-        if not use_detailed_battery:
-            # ================= SOLAR (ak nemáme detailný battery výstup) =================
-            if solar_csv and solar_csv.exists():
-                print("[INFO] Applying solar (datetime aligned)")
-                solar_df = pd.read_csv(solar_csv, parse_dates=["datetime"])
-
-                if "solar_kw" not in solar_df.columns:
-                    raise ValueError("solar_kw column missing in solar csv")
-
-                # Podpora oboch formátov: Solargis :07/:22/:37/:52 aj štandard :00/:15/:30/:45
-                fc_dt = pd.to_datetime(fc["datetime"])
-                solar_dt = pd.to_datetime(solar_df["datetime"])
-                fc_15 = fc[["datetime"]].copy()
-                fc_15["_dt15"] = fc_dt.dt.floor("15min")
-                solar_15 = solar_df[["solar_kw"]].copy()
-                solar_15["_dt15"] = solar_dt.dt.floor("15min")
-                solar_15 = solar_15.groupby("_dt15", as_index=False)["solar_kw"].first()
-                merged = fc_15.merge(solar_15, on="_dt15", how="left")
-                merged["solar_kw"] = merged["solar_kw"].fillna(0)
-
-                print(f"[DEBUG] Solar total kWh: {(merged['solar_kw'].sum()*0.25):.2f}")
-
-                simulated = simulated - merged["solar_kw"]
-                simulated[simulated < 0] = 0
-            else:
-                print("[INFO] No solar applied")
-
-            # ================= BATTERY (jednoduchý model, len ak nie je detailný výstup) =================
-            if battery_csv and battery_csv.exists() and "battery" in scen:
-                print("[INFO] Applying simple battery model (no grid_import_kw in battery CSV)")
-                capacity = scen["battery"].get("capacity_kWh", 0)
-                max_rate = scen["battery"].get("max_c_rate", 0) * capacity
-
-                soc = capacity * 0.5
-                new_load = []
-
-                for val in simulated:
-                    if val > max_rate and soc > 0:
-                        discharge = min(val - max_rate, soc, max_rate)
-                        new_load.append(val - discharge)
-                        soc -= discharge
-                    else:
-                        new_load.append(val)
-
-                simulated = pd.Series(new_load)
-                print(f"[DEBUG] Battery remaining SOC kWh: {soc:.2f}")
-
-        # ================= COST =================
-        if "price_eur_kwh" in fc.columns:
-            price_series = fc["price_eur_kwh"]
-        elif "price_eur_mwh" in fc.columns:
-            price_series = fc["price_eur_mwh"] / 1000.0  # EUR/MWh → EUR/kWh
+        if batch and shared["battery_grid_kw"] is not None:
+            # virtual_battery_soc is simulated for one battery configuration only
+            print("[INFO] Batch mode: battery CSV ignored, simple battery model is evaluated per scenario")
+
+        tasks = []
+        for name, scen in scenarios:
+            solar_scale = 1.0
+            scen_kwp = (scen.get("solar") or {}).get("capacity_kWp")
+            if input_data.virtual_solar_kwp and scen_kwp is not None:
+                solar_scale = float(scen_kwp) / float(input_data.virtual_solar_kwp)
+            options = {
+                "use_battery_output": not batch,
+                "battery_enabled": shared["battery_present"] or batch,
+                "solar_scale": solar_scale,
+            }
+            tasks.append((name, scen, options))
+
+        # ================= REPRESENTATIVE DAYS =================
+        rep_days_path = ""
+        rep_errors_path = ""
+        if input_data.representative_days > 0:
+            rep = RepresentativeDays(
+                shared["datetime"],
+                {"load": shared["base_load"].values, "solar": shared["solar_kw"], "price": shared["price"]},
+                input_data.representative_days,
+                shared["interval_h"],
+                method=input_data.representative_method,
+            )
+            print(f"[INFO] Representative days: {rep.k} ({input_data.representative_method}), "
+                  f"{len(rep.rows)} of {len(fc)} rows simulated ({rep.reduction:.1f}x fewer)")
+            rep_days_path = Path(self.results_path) / "representative_days.csv"
+            rep.table().to_csv(rep_days_path, index=False)
+
+            start = time.perf_counter()
+            with span("compute", f"{len(tasks)} scenario(s), representative days", rows=len(rep.rows) * len(tasks)):
+                results = _evaluate(tasks, {**shared, "representative_days": rep}, input_data.max_workers)
+            rep_seconds = time.perf_counter() - start
+
+            if input_data.representative_check:
+                start = time.perf_counter()
+                with span("compute", f"{len(tasks)} scenario(s), full horizon check", rows=len(fc) * len(tasks)):
+                    full_results = _evaluate(tasks, shared, input_data.max_workers)
+                full_seconds = time.perf_counter() - start
+                print(f"[METRIC] Scenario evaluation: representative days {rep_seconds:.2f} s, full horizon {full_seconds:.2f} s")
+
+                errors = representative_errors(results, full_results, input_data.representative_tolerance_pct)
+                rep_errors_path = Path(self.results_path) / "representative_errors.csv"
+                errors.to_csv(rep_errors_path, index=False)
+                outside = errors[~errors["within_tolerance"]]
+                if len(outside):
+                    print(f"[WARNING] {len(outside)} representative-day estimates outside ±{input_data.representative_tolerance_pct} %:")
+                    print(outside[["scenario", "metric", "error_pct"]].to_string(index=False))
+                else:
+                    print(f"[SUCCESS] All representative-day estimates within ±{input_data.representative_tolerance_pct} %")
         else:
-            raise ValueError("forecast CSV must contain price_eur_kwh or price_eur_mwh")
-
-        baseline_cost_series = base_load * price_series * 0.25
-        scenario_cost_series = simulated * price_series * 0.25
-
-        baseline_cost = baseline_cost_series.sum()
-        scenario_cost = scenario_cost_series.sum()
-        savings = baseline_cost - scenario_cost
-
-        print("\n[DEBUG] ===== COST DEBUG =====")
-        print(f"Baseline cost €: {baseline_cost:.2f}")
-        print(f"Scenario cost €: {scenario_cost:.2f}")
-        print(f"Savings €: {savings:.2f}")
-
-        days = len(fc) * 15 / 60 / 24
-        print(f"[DEBUG] Simulated days: {days:.1f}")
-
-        if days < 40:
-            yearly_estimate = savings * (365 / days)
-            print(f"[DEBUG] Estimated yearly savings €: {yearly_estimate:.2f}")
+            with span("compute", f"{len(tasks)} scenario(s)", rows=len(fc) * len(tasks)):
+                results = _evaluate(tasks, shared, input_data.max_workers)
 
         # ================= SAVE =================
-        out_df = pd.DataFrame({
-            "datetime": fc["datetime"],
-            "baseline_load_kw": base_load,
-            "simulated_load_kw": simulated,
-            "price_eur_kwh": price_series,
-            "baseline_cost_eur": baseline_cost_series,
-            "scenario_cost_eur": scenario_cost_series
-        })
-
-        out_path = Path(self.results_path) / "simulated_results.csv"
-        out_df.to_csv(out_path, index=False)
+        out_df = set_interval(pd.concat([frame for frame, _, _ in results], ignore_index=True), shared["interval_h"])
+        if input_data.output_minutes and input_data.output_minutes / 60 > shared["interval_h"] * (1 + 1e-9):
+            # e.g. 1 min simulation, 15 min results: kW and prices averaged, EUR per interval summed
+            out_df = resample_power(out_df, input_data.output_minutes, sum_columns=COST_COLUMNS, by="scenario")
+            print(f"[INFO] simulated_results aggregated to {input_data.output_minutes} min ({len(out_df)} rows)")
+
+        out_path = write_frame(
+            out_df,
+            self.results_path,
+            "simulated_results",
+            fmt=input_data.output_format,
+            dataset="simulated_results",
+            export_csv=input_data.export_csv,
+        )
 
-        summary_df = pd.DataFrame([{
-            "rows": len(fc),
-            "days_simulated": days,
-            "baseline_cost_eur": baseline_cost,
-            "scenario_cost_eur": scenario_cost,
-            "savings_eur": savings,
-            "estimated_yearly_savings_eur": savings * (365 / days) if days > 0 else 0
-        }])
+        summary_df = pd.DataFrame([summary for _, summary, _ in results])
 
         summary_path = Path(self.results_path) / "summary.csv"
         summary_df.to_csv(summary_path, index=False)
 
+        bill_path = ""
+        bills = [bill for _, _, bill in results if bill is not None]
+        if bills:
+            bill_path = Path(self.results_path) / "bill_line_items.csv"
+            pd.concat(bills, ignore_index=True).to_csv(bill_path, index=False)
+            print(f"[INFO] Bill line items (baseline vs scenario) saved to {bill_path}")
+
+        # ================= MONTE CARLO =================
+        mc_samples_path = ""
+        mc_summary_path = ""
+        if input_data.monte_carlo_samples > 0:
+            print(f"\n[INFO] ===== MONTE CARLO ({input_data.monte_carlo_samples} samples) =====")
+            residuals = _load_residuals(input_data.residuals_csv)
+            mc_frames = []
+            mc_summaries = []
+            with span("compute", "monte carlo", rows=len(fc) * len(tasks) * input_data.monte_carlo_samples):
+                for name, scen, options in tasks:
+                    samples, mc_summary = monte_carlo_scenario(
+                        name,
+                        scen,
+                        shared,
+                        residuals,
+                        input_data.monte_carlo_samples,
+                        seed=input_data.monte_carlo_seed,
+                        battery_enabled=options["battery_enabled"],
+                        solar_scale=options["solar_scale"],
+                        capex_eur=_scenario_capex(scen, input_data.investment_config_yml),
+                        chunk_samples=input_data.monte_carlo_chunk_samples,
+                        max_workers=input_data.max_workers,
+                    )
+                    mc_frames.append(samples)
+                    mc_summaries.append(mc_summary)
+
+            mc_samples_path = Path(self.results_path) / "monte_carlo_samples.csv"
+            pd.concat(mc_frames, ignore_index=True).to_csv(mc_samples_path, index=False)
+            mc_summary_path = Path(self.results_path) / "monte_carlo_summary.csv"
+            pd.DataFrame(mc_summaries).to_csv(mc_summary_path, index=False)
+            print(f"[INFO] Monte Carlo summary saved to {mc_summary_path}")
+
         print("[SUCCESS] ===== SIMULATION COMPLETE =====")
 
         return OutputModel(
-            message="Simulation finished (v2 realistic)",
+            message=f"Simulation finished (v2 realistic, {len(results)} scenario(s))",
             simulated_load_csv=str(out_path),
-            scenario_summary_csv=str(summary_path)
+            scenario_summary_csv=str(summary_path),
+            bill_line_items_csv=str(bill_path),
+            monte_carlo_samples_csv=str(mc_samples_path),
+            monte_carlo_summary_csv=str(mc_summary_path),
+            representative_days_csv=str(rep_days_path),
+            representative_errors_csv=str(rep_errors_path),
         )
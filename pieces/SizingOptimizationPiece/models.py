@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field
+
+
+class InputModel(BaseModel):
+    forecast_csv: str = Field(description="Path to predictions_15min (csv, feather or parquet) from PredictPiece")
+    virtual_solar_csv: str = Field(description="Path to virtual_solar (csv, feather or parquet) from SolarSimPiece")
+    virtual_solar_kwp: float = Field(default=500.0, description="PV capacity (kWp) virtual_solar was simulated for")
+    battery_config_yml: str = Field(
+        default="/home/shared_storage/battery_config.yml",
+        description="Battery config (efficiencies, max_c_rate, initial_soc)",
+    )
+    scenario_yml: str = Field(
+        default="/home/shared_storage/scenario.yml",
+        description="Scenario yaml with the battery strategy (peak_hours); also the template of optimal_scenario.yml",
+    )
+    investment_config_yml: str = Field(
+        default="/home/shared_storage/investment_config.yml",
+        description="Investment config; solar_capex_eur_per_kwp / battery_capex_eur_per_kwh or the absolute capex of the reference sizes",
+    )
+    tariff_yml: str = Field(default="", description="Optional tariff yaml; empty = spot price * energy")
+    pv_kwp_min: float = Field(default=0.0, description="Smallest PV size searched (kWp)")
+    pv_kwp_max: float = Field(default=1500.0, description="Largest PV size searched (kWp)")
+    battery_kwh_min: float = Field(default=0.0, description="Smallest battery searched (kWh)")
+    battery_kwh_max: float = Field(default=1000.0, description="Largest battery searched (kWh)")
+    representative_days: int = Field(
+        default=0,
+        description="Dispatch each candidate on this many clustered representative days instead of every day (0 = full horizon)",
+    )
+    grid_points: int = Field(default=7, description="Coarse grid points per dimension")
+    refine_levels: int = Field(default=3, description="Refinement levels (grid spacing halves per level)")
+    keep_best: int = Field(default=4, description="Best-NPV candidates refined per level, besides the Pareto front")
+
+
+class OutputModel(BaseModel):
+    message: str
+    candidates_csv: str = Field(description="Every evaluated PV/battery size with CAPEX, savings, NPV, IRR and payback")
+    pareto_csv: str = Field(description="CAPEX vs NPV Pareto front")
+    optimal_scenario_yml: str = Field(description="Scenario yaml with the best-NPV sizes")
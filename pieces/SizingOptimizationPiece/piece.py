@@ -0,0 +1,306 @@
+from domino.base_piece import BasePiece
+from .models import InputModel, OutputModel
+
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import yaml
+
+from pipeline_common import finance
+from pipeline_common.battery import peak_hour_mask, simulate_peak_shaving
+from pipeline_common.instrumentation import instrumented_piece, span
+from pipeline_common.interchange import frame_exists, read_frame
+from pipeline_common.representative_days import RepresentativeDays
+from pipeline_common.result_cache import cached_piece
+from pipeline_common.tariff import Tariff
+from pipeline_common.timegrid import align_to_timestamps, infer_interval_hours
+
+# candidates simulated per kernel call (bounds the candidates x time arrays)
+_BATCH = 64
+
+
+# =========================================================
+# CANDIDATE EVALUATION
+# =========================================================
+
+class SizingProblem:
+    """Load, normalized PV profile, prices and cost settings shared by all PV/battery candidates."""
+
+    def __init__(self, load_kw, solar_per_kwp, price, in_peak, interval_h: float, battery_cfg: dict,
+                 invest_cfg: dict, solar_capex_per_kwp: float, battery_capex_per_kwh: float, tariff=None,
+                 rep: RepresentativeDays | None = None):
+        self.load = np.asarray(load_kw, dtype=float)
+        self.solar_per_kwp = np.asarray(solar_per_kwp, dtype=float)
+        self.price = None if price is None else np.asarray(price, dtype=float)
+        self.in_peak = np.asarray(in_peak, dtype=bool)
+        self.interval_h = interval_h
+        self.battery_cfg = battery_cfg
+        self.tariff = tariff
+        self.solar_capex_per_kwp = solar_capex_per_kwp
+        self.battery_capex_per_kwh = battery_capex_per_kwh
+        self.days = len(self.load) * interval_h / 24
+
+        # representative days: dispatch runs on the reduced rows, the bill on the year mapped back
+        self.rep = rep
+        if rep is not None:
+            self.load = rep.expand(rep.take(self.load))
+            self.solar_per_kwp = rep.expand(rep.take(self.solar_per_kwp))
+            if self.price is not None:
+                self.price = rep.expand(rep.take(self.price))
+
+        self.years = int(invest_cfg.get("analysis_years", 15))
+        self.replacement_year = int(invest_cfg.get("battery_replacement_year", 0) or 0)
+        self.finance_params = {
+            k: float(invest_cfg[k]) for k in (
+                "discount_rate", "opex_pct_of_capex",
+                "opex_escalation", "savings_escalation", "battery_replacement_pct",
+            ) if k in invest_cfg
+        }
+        # as InvestmentEvalPiece: degradation_per_year is the PV yield (LCOE), savings only degrade on request
+        if "savings_degradation_per_year" in invest_cfg:
+            self.finance_params["degradation_per_year"] = float(invest_cfg["savings_degradation_per_year"])
+        self.baseline_cost = float(self._cost(self.load[None, :])[0])
+
+    def _cost(self, grid_kw: np.ndarray) -> np.ndarray:
+        if self.tariff is not None:
+            return self.tariff.total_cost(grid_kw, self.price)
+        return (grid_kw * self.price).sum(axis=-1) * self.interval_h
+
+    def _dispatch_rows(self, x: np.ndarray) -> np.ndarray:
+        return x if self.rep is None else self.rep.take(x)
+
+    def annual_savings(self, pv_kwp: np.ndarray, battery_kwh: np.ndarray) -> np.ndarray:
+        out = np.empty(len(pv_kwp))
+        for start in range(0, len(pv_kwp), _BATCH):
+            pv = pv_kwp[start:start + _BATCH]
+            bat = battery_kwh[start:start + _BATCH]
+            net = self._dispatch_rows(self.load)[None, :] - pv[:, None] * self._dispatch_rows(self.solar_per_kwp)[None, :]
+            _, grid = simulate_peak_shaving(
+                net,
+                bat,
+                bat * float(self.battery_cfg.get("max_c_rate", 0.5)),
+                self._dispatch_rows(self.in_peak),
+                self.interval_h,
+                charge_eff=float(self.battery_cfg.get("charge_efficiency", 0.95)),
+                discharge_eff=float(self.battery_cfg.get("discharge_efficiency", 0.95)),
+                initial_soc_pct=float(self.battery_cfg.get("initial_soc", 50.0)),
+            )
+            if self.rep is None:
+                cost = self._cost(grid)
+            elif self.tariff is None:
+                cost = self.rep.weighted_sum(grid * self.rep.take(self.price)) * self.interval_h
+            else:
+                cost = self._cost(self.rep.expand(grid))
+            out[start:start + _BATCH] = self.baseline_cost - cost
+        return out * (365 / self.days) if self.days > 0 else out
+
+    def evaluate(self, pv_kwp, battery_kwh) -> pd.DataFrame:
+        pv_kwp = np.asarray(pv_kwp, dtype=float)
+        battery_kwh = np.asarray(battery_kwh, dtype=float)
+        savings = self.annual_savings(pv_kwp, battery_kwh)
+        solar_capex = pv_kwp * self.solar_capex_per_kwp
+        battery_capex = battery_kwh * self.battery_capex_per_kwh
+        fin = finance.evaluate(
+            {
+                **self.finance_params,
+                "solar_capex_eur": solar_capex,
+                "battery_capex_eur": battery_capex,
+                "annual_savings_eur": savings,
+            },
+            self.years,
+            self.replacement_year,
+        )
+        return pd.DataFrame({
+            "pv_kwp": pv_kwp,
+            "battery_kwh": battery_kwh,
+            "capex_eur": solar_capex + battery_capex,
+            "annual_savings_eur": savings,
+            **fin,
+        })
+
+
+# =========================================================
+# SEARCH
+# =========================================================
+
+def pareto_front(df: pd.DataFrame) -> np.ndarray:
+    """Mask of candidates not dominated in (lower CAPEX, higher NPV)."""
+    order = np.lexsort((-df["npv_eur"].to_numpy(), df["capex_eur"].to_numpy()))
+    npv = df["npv_eur"].to_numpy()[order]
+    best_before = np.maximum.accumulate(np.concatenate([[-np.inf], npv[:-1]]))
+    mask = np.zeros(len(df), dtype=bool)
+    mask[order] = npv > best_before
+    return mask
+
+
+def coarse_to_fine(problem: SizingProblem, pv_range: tuple[float, float], battery_range: tuple[float, float],
+                   grid_points: int = 7, refine_levels: int = 3, keep_best: int = 4) -> pd.DataFrame:
+    """
+    Coarse grid over both sizes, then per level: keep the best-NPV candidates and the Pareto front,
+    drop the rest (dominated regions are not refined) and evaluate the 3 x 3 neighbourhood of each
+    survivor at half the previous spacing.
+
+    Candidates live on integer lattice points of the finest spacing, so a size is never evaluated twice.
+    """
+    pv_lo, pv_hi = pv_range
+    bat_lo, bat_hi = battery_range
+    steps = max(grid_points - 1, 1) * 2 ** refine_levels
+    pv_res = (pv_hi - pv_lo) / steps
+    bat_res = (bat_hi - bat_lo) / steps
+
+    def evaluate(points: list[tuple[int, int]], level: int) -> pd.DataFrame:
+        i, j = (np.array(v) for v in zip(*points))
+        return problem.evaluate(pv_lo + i * pv_res, bat_lo + j * bat_res).assign(level=level, _i=i, _j=j)
+
+    stride = 2 ** refine_levels
+    coarse = [(i * stride, j * stride) for i in range(grid_points) for j in range(grid_points)]
+    seen = set(coarse)
+    results = evaluate(coarse, 0)
+    print(f"[INFO] Level 0: {len(results)} candidates, best NPV {results['npv_eur'].max():,.0f} €")
+
+    for level in range(1, refine_levels + 1):
+        stride //= 2
+        survivors = results.nlargest(keep_best, "npv_eur")
+        survivors = pd.concat([survivors, results[pareto_front(results)]]).drop_duplicates(["_i", "_j"])
+
+        new_points = []
+        for i, j in zip(survivors["_i"], survivors["_j"]):
+            for di in (-stride, 0, stride):
+                for dj in (-stride, 0, stride):
+                    key = (min(max(i + di, 0), steps), min(max(j + dj, 0), steps))
+                    if key not in seen:
+                        seen.add(key)
+                        new_points.append(key)
+        if not new_points:
+            break
+        results = pd.concat([results, evaluate(new_points, level)], ignore_index=True)
+        print(f"[INFO] Level {level}: +{len(new_points)} candidates, best NPV {results['npv_eur'].max():,.0f} €")
+
+    results = results.drop(columns=["_i", "_j"])
+    results["pareto"] = pareto_front(results)
+    return results.sort_values("npv_eur", ascending=False).reset_index(drop=True)
+
+
+class SizingOptimizationPiece(BasePiece):
+
+    @instrumented_piece
+    @cached_piece
+    def piece_function(self, input_data: InputModel) -> OutputModel:
+
+        print("\n[INFO] ===== SIZING OPTIMIZATION START =====")
+
+        for path in (input_data.forecast_csv, input_data.virtual_solar_csv, input_data.battery_config_yml,
+                     input_data.investment_config_yml):
+            if not frame_exists(path):
+                raise FileNotFoundError(f"Input not found: {path}")
+        if input_data.virtual_solar_kwp <= 0:
+            raise ValueError("virtual_solar_kwp must be > 0 to normalize the PV profile")
+
+        fc = read_frame(input_data.forecast_csv)
+        if "prediction_load_kw" not in fc.columns:
+            raise ValueError("prediction_load_kw column missing in forecast csv")
+        solar_df = read_frame(input_data.virtual_solar_csv)
+
+        with open(input_data.battery_config_yml) as f:
+            battery_cfg = yaml.safe_load(f) or {}
+        with open(input_data.investment_config_yml) as f:
+            invest_cfg = yaml.safe_load(f) or {}
+        scenario = {}
+        if input_data.scenario_yml and Path(input_data.scenario_yml).exists():
+            with open(input_data.scenario_yml) as f:
+                scenario = yaml.safe_load(f) or {}
+
+        tariff = None
+        if input_data.tariff_yml:
+            tariff = Tariff.from_yaml(input_data.tariff_yml)
+
+        if "price_eur_kwh" in fc.columns:
+            price = fc["price_eur_kwh"].to_numpy(dtype=float)
+        elif "price_eur_mwh" in fc.columns:
+            price = fc["price_eur_mwh"].to_numpy(dtype=float) / 1000.0
+        elif tariff is not None and not tariff.uses_spot_price:
+            price = None
+        else:
+            raise ValueError("forecast CSV must contain price_eur_kwh or price_eur_mwh")
+
+        # one normalized PV profile (kW per kWp), scaled per candidate
+        solar_per_kwp = np.nan_to_num(align_to_timestamps(fc["datetime"], solar_df, "solar_kw")) / input_data.virtual_solar_kwp
+
+        strategy = scenario.get("strategy") or {}
+        peak = strategy.get("peak_hours") or (scenario.get("time_window") or {}).get("peak_hours")
+
+        # unit costs: explicit per kWp / kWh, else the absolute capex of the reference system
+        solar_unit = invest_cfg.get("solar_capex_eur_per_kwp")
+        if solar_unit is None:
+            solar_unit = float(invest_cfg.get("solar_capex_eur", 0)) / input_data.virtual_solar_kwp
+        battery_unit = invest_cfg.get("battery_capex_eur_per_kwh")
+        if battery_unit is None:
+            ref_kwh = float(battery_cfg.get("capacity_kWh") or 0)
+            battery_unit = float(invest_cfg.get("battery_capex_eur", 0)) / ref_kwh if ref_kwh > 0 else 0.0
+        print(f"[INFO] Unit CAPEX: {float(solar_unit):.0f} €/kWp, {float(battery_unit):.0f} €/kWh")
+
+        interval_h = infer_interval_hours(fc["datetime"])
+        rep = None
+        if input_data.representative_days > 0:
+            rep = RepresentativeDays(
+                fc["datetime"],
+                {"load": fc["prediction_load_kw"].to_numpy(dtype=float), "solar": solar_per_kwp, "price": price},
+                input_data.representative_days,
+                interval_h,
+            )
+            print(f"[INFO] Dispatch on {rep.k} representative days ({rep.reduction:.1f}x fewer rows)")
+
+        problem = SizingProblem(
+            fc["prediction_load_kw"].to_numpy(dtype=float),
+            solar_per_kwp,
+            price,
+            peak_hour_mask(fc["datetime"], peak),
+            interval_h,
+            battery_cfg,
+            invest_cfg,
+            float(solar_unit),
+            float(battery_unit),
+            tariff=tariff.prepare(fc["datetime"]) if tariff is not None else None,
+            rep=rep,
+        )
+
+        with span("compute", "coarse-to-fine sizing search") as s:
+            results = coarse_to_fine(
+                problem,
+                (input_data.pv_kwp_min, input_data.pv_kwp_max),
+                (input_data.battery_kwh_min, input_data.battery_kwh_max),
+                grid_points=input_data.grid_points,
+                refine_levels=input_data.refine_levels,
+                keep_best=input_data.keep_best,
+            )
+            s.rows = len(results)
+
+        # ================= SAVE =================
+        candidates_path = Path(self.results_path) / "sizing_candidates.csv"
+        results.to_csv(candidates_path, index=False)
+        pareto = results[results["pareto"]].sort_values("capex_eur")
+        pareto_path = Path(self.results_path) / "sizing_pareto.csv"
+        pareto.to_csv(pareto_path, index=False)
+
+        best = results.iloc[0]
+        optimal = dict(scenario)
+        optimal["scenario_id"] = "optimal"
+        optimal["description"] = (
+            f"Sizing optimum: {best['pv_kwp']:.0f} kWp PV + {best['battery_kwh']:.0f} kWh battery "
+            f"(NPV {best['npv_eur']:,.0f} €)"
+        )
+        optimal["solar"] = {**(scenario.get("solar") or {}), "capacity_kWp": round(float(best["pv_kwp"]), 1)}
+        optimal["battery"] = {**(scenario.get("battery") or {}), "capacity_kWh": round(float(best["battery_kwh"]), 1)}
+        optimal_path = Path(self.results_path) / "optimal_scenario.yml"
+        with open(optimal_path, "w") as f:
+            yaml.safe_dump(optimal, f, sort_keys=False, allow_unicode=True)
+
+        print(f"[SUCCESS] {len(results)} candidates evaluated, {len(pareto)} on the Pareto front")
+        print(f"[SUCCESS] Best: {optimal['description']}")
+
+        return OutputModel(
+            message=f"Sizing finished: {optimal['description']}",
+            candidates_csv=str(candidates_path),
+            pareto_csv=str(pareto_path),
+            optimal_scenario_yml=str(optimal_path),
+        )
@@ -17,12 +17,24 @@ class InputModel(BaseModel):
         description="YAML file containing configuration for virtual solar generation.",
     )
 
+    output_format: str = Field(
+        title="Output format",
+        default="csv",
+        description="Format of virtual_solar output: csv, feather (Arrow IPC) or parquet.",
+    )
+
+    export_csv: bool = Field(
+        title="Export CSV copy",
+        default=False,
+        description="Also write virtual_solar.csv when output_format is feather or parquet.",
+    )
+
 
 class OutputModel(BaseModel):
     """
     SolarSimPiece Output Model
     """
     output_path: str = Field(
-        title="Virtual solar CSV output path",
-        description="Path to generated virtual solar data CSV file.",
+        title="Virtual solar output path",
+        description="Path to generated virtual solar data file (CSV, Feather or Parquet).",
     )
\ No newline at end of file
@@ -6,40 +6,55 @@ import pandas as pd
 import yaml
 from pvlib import location, pvsystem, modelchain, temperature
 
+from pipeline_common.instrumentation import instrumented_piece, span
+from pipeline_common.interchange import write_frame
+from pipeline_common.result_cache import cached_piece
+
 
 class SolarSimPiece(BasePiece):
     
+    @instrumented_piece
+    @cached_piece
     def piece_function(self, input_data: InputModel):
     
         print(f"[INFO] Reading weather data from {input_data.input_weather_data}")
         # Prefer Solargis preprocessing, but gracefully fall back to plain CSV
         # with columns: datetime, ghi, dni, dhi, temp_air, wind_speed.
-        df_weather = preprocess_solargis(input_data.input_weather_data)
-        if df_weather is None or df_weather.empty or len(df_weather.columns) == 0:
-            df_weather = pd.read_csv(
-                input_data.input_weather_data,
-                parse_dates=["datetime"],
-                index_col="datetime",
-            )
+        with span("load", "weather", nbytes=Path(input_data.input_weather_data).stat().st_size) as s:
+            df_weather = preprocess_solargis(input_data.input_weather_data)
+            if df_weather is None or df_weather.empty or len(df_weather.columns) == 0:
+                df_weather = pd.read_csv(
+                    input_data.input_weather_data,
+                    parse_dates=["datetime"],
+                    index_col="datetime",
+                )
+            s.rows = len(df_weather)
 
         print(f"[INFO] Reading solar config from {input_data.input_Virtual_RE_config}")
         with open(input_data.input_Virtual_RE_config, "r") as f:
             cfg = yaml.safe_load(f)
 
-        solar_kw = get_solar_profile(df_weather, cfg)
-        solar_kw = solar_kw.clip(lower=0.0)
-        solar_kw.name = "solar_kw"
-        output_path = Path(self.results_path) / "virtual_solar.csv"
-        solar_kw.to_frame().to_csv(
-            output_path,
-            index_label="datetime",
+        with span("compute", "pvlib model chain", rows=len(df_weather)):
+            solar_kw = get_solar_profile(df_weather, cfg)
+            solar_kw = solar_kw.clip(lower=0.0)
+            solar_kw.name = "solar_kw"
+        solar_df = solar_kw.rename_axis("datetime").reset_index()
+        output_path = write_frame(
+            solar_df,
+            self.results_path,
+            "virtual_solar",
+            fmt=input_data.output_format,
+            dataset="virtual_solar",
+            export_csv=input_data.export_csv,
             date_format="%Y-%m-%d %H:%M:%S",
         )
         print(f"[INFO] Virtual solar profile saved to {output_path}")
-        self.display_result = {
-            "file_type": "csv",
-            "file_path": str(output_path),
-        }
+        csv_path = output_path.with_suffix(".csv")
+        if csv_path.is_file():
+            self.display_result = {
+                "file_type": "csv",
+                "file_path": str(csv_path),
+            }
         return OutputModel(output_path=str(output_path))
 
 
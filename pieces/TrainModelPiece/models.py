@@ -5,6 +5,16 @@ class InputModel(BaseModel):
         title="Training dataset path",
         description="Path to preprocessed parquet or CSV dataset"
     )
+    window_start: str = Field(
+        default="",
+        title="Training window start",
+        description="Only rows at or after this timestamp (e.g. 2024-06-01); empty = from the start. Pushed down to the Parquet scan"
+    )
+    window_end: str = Field(
+        default="",
+        title="Training window end",
+        description="Only rows before this timestamp; empty = to the end"
+    )
 
 class OutputModel(BaseModel):
     message: str = Field(
@@ -16,3 +26,7 @@ class OutputModel(BaseModel):
     train_log_path: str = Field(
         description="Path to training log file"
     )
+    test_residuals_path: str = Field(
+        default="",
+        description="Path to test set residuals (actual - predicted), used by SimulatePiece Monte Carlo"
+    )
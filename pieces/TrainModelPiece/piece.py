@@ -5,13 +5,19 @@ from .models import InputModel, OutputModel
 import pandas as pd
 from pathlib import Path
 import joblib
-from xgboost import XGBRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 from datetime import datetime
 
+from pipeline_common.forecast_features import TARGET, add_features, feature_columns, make_model
+from pipeline_common.instrumentation import instrumented_piece, span
+from pipeline_common.interchange import frame_exists, read_frame
+from pipeline_common.result_cache import cached_piece
+
 
 class TrainModelPiece(BasePiece):
 
+    @instrumented_piece
+    @cached_piece
     def piece_function(self, input_data: InputModel) -> OutputModel:
 
         print("[INFO] TrainModelPiece started")
@@ -19,14 +25,11 @@ class TrainModelPiece(BasePiece):
 
         data_path = Path(input_data.data_path)
 
-        if not data_path.exists():
+        if not frame_exists(data_path):
             raise FileNotFoundError(f"Training data not found: {data_path}")
 
         # ---- LOAD DATA ----
-        if data_path.suffix == ".parquet":
-            df = pd.read_parquet(data_path)
-        else:
-            df = pd.read_csv(data_path)
+        df = read_frame(data_path, parse_dates=(), start=input_data.window_start, end=input_data.window_end)
 
         if "datetime" not in df.columns:
             raise ValueError("Dataset must contain 'datetime' column")
@@ -34,25 +37,19 @@ class TrainModelPiece(BasePiece):
         df["datetime"] = pd.to_datetime(df["datetime"])
         df = df.sort_values("datetime")
 
-        target = "load_kw"
+        target = TARGET
         if target not in df.columns:
             raise ValueError(f"Target column '{target}' not found")
 
         # =========================================================
         # SIMPLE FEATURES FOR SIMULATION MODEL
         # =========================================================
-        print("[INFO] Creating time features")
-
-        df["hour"] = df["datetime"].dt.hour
-        df["dayofweek"] = df["datetime"].dt.dayofweek
-        df["month"] = df["datetime"].dt.month
-
-        # lag features
-        print("[INFO] Creating lag features")
-        df["lag_1"] = df[target].shift(1)
-        df["lag_4"] = df[target].shift(4)
+        print("[INFO] Creating time and lag features")
+        with span("transform", "features") as s:
+            add_features(df, target)
 
-        df = df.dropna().reset_index(drop=True)
+            df = df.dropna().reset_index(drop=True)
+            s.rows = len(df)
 
         # =========================================================
         # TRAIN / TEST SPLIT (simple time split)
@@ -62,7 +59,7 @@ class TrainModelPiece(BasePiece):
         train_df = df.iloc[:split_index]
         test_df = df.iloc[split_index:]
 
-        feature_cols = [c for c in df.columns if c not in ["datetime", target]]
+        feature_cols = feature_columns(df, target)
 
         X_train = train_df[feature_cols]
         y_train = train_df[target]
@@ -78,23 +75,18 @@ class TrainModelPiece(BasePiece):
         # =========================================================
         print("[INFO] Training XGBoost model")
 
-        model = XGBRegressor(
-            objective="reg:squarederror",
-            learning_rate=0.05,
-            max_depth=6,
-            n_estimators=350,
-            subsample=0.8,
-            colsample_bytree=0.8
-        )
+        model = make_model()
 
-        model.fit(X_train, y_train)
+        with span("compute", "xgboost fit", rows=len(X_train)):
+            model.fit(X_train, y_train)
 
         # =========================================================
         # EVALUATION
         # =========================================================
         print("[INFO] Evaluating model")
 
-        preds = model.predict(X_test)
+        with span("compute", "xgboost predict (test)", rows=len(X_test)):
+            preds = model.predict(X_test)
 
         mae = mean_absolute_error(y_test, preds)
         mse = mean_squared_error(y_test, preds)
@@ -108,22 +100,34 @@ class TrainModelPiece(BasePiece):
         # =========================================================
         model_path = Path(self.results_path) / "xgboost_model.pkl"
         log_path = Path(self.results_path) / "training_log.txt"
-
-        joblib.dump(model, model_path)
-
-        with open(log_path, "w") as f:
-            f.write(f"Training time (UTC): {datetime.utcnow()}\n")
-            f.write(f"Rows total: {len(df)}\n")
-            f.write(f"Train rows: {len(train_df)}\n")
-            f.write(f"Test rows: {len(test_df)}\n")
-            f.write(f"Features: {feature_cols}\n")
-            f.write(f"MAE: {mae:.4f}\n")
-            f.write(f"RMSE: {rmse:.4f}\n")
+        residuals_path = Path(self.results_path) / "test_residuals.csv"
+
+        with span("write", "model + residuals + log", rows=len(test_df)) as s:
+            joblib.dump(model, model_path)
+
+            # test chyby (actual - predicted) pre Monte Carlo bootstrap v SimulatePiece
+            pd.DataFrame({
+                "datetime": test_df["datetime"].values,
+                "actual_kw": y_test.values,
+                "predicted_kw": preds,
+                "residual_kw": y_test.values - preds,
+            }).to_csv(residuals_path, index=False)
+
+            with open(log_path, "w") as f:
+                f.write(f"Training time (UTC): {datetime.utcnow()}\n")
+                f.write(f"Rows total: {len(df)}\n")
+                f.write(f"Train rows: {len(train_df)}\n")
+                f.write(f"Test rows: {len(test_df)}\n")
+                f.write(f"Features: {feature_cols}\n")
+                f.write(f"MAE: {mae:.4f}\n")
+                f.write(f"RMSE: {rmse:.4f}\n")
+            s.bytes = sum(f.stat().st_size for f in (model_path, residuals_path, log_path))
 
         print(f"[SUCCESS] Model saved to {model_path}")
 
         return OutputModel(
             message=f"Model trained. MAE={mae:.2f}, RMSE={rmse:.2f}",
             model_file_path=str(model_path),
-            train_log_path=str(log_path)
+            train_log_path=str(log_path),
+            test_residuals_path=str(residuals_path)
         )
@@ -0,0 +1,231 @@
+"""Array battery kernels shared by BatterySimPiece, SimulatePiece, the Monte Carlo mode and sizing."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+def discharge_above_rate(load, capacity_kwh: float, max_rate_kw: float, soc_kwh=None, interval_h: float = 0.25):
+    """
+    SimulatePiece's simple battery without the per-step loop.
+
+    The battery starts at ``soc_kwh`` (default 50 % of capacity), never recharges and in every
+    step of ``interval_h`` hours shaves ``min(load - max_rate, max_rate, soc / interval_h)`` off the
+    load when load exceeds max_rate. Because the wanted discharge does not depend on the SOC, the
+    energy left before each step is the start SOC minus the cumulative wanted energy of the previous
+    steps, so the whole series is one cumulative sum.
+
+    The shaved power is integrated over the interval (kW * interval_h kWh per step). The original
+    SimulatePiece loop took the kW value as kWh per step, so at 15 min it emptied the battery four
+    times faster; ``interval_h=1.0`` reproduces it.
+
+    ``load`` is 1-D (time) or 2-D (samples x time). Returns ``(new_load, soc_end)``; passing
+    ``soc_end`` as ``soc_kwh`` of the next chunk evaluates a long series chunk by chunk.
+    """
+    load = np.asarray(load, dtype=float)
+    if soc_kwh is None:
+        soc_kwh = capacity_kwh * 0.5
+    soc = np.asarray(soc_kwh, dtype=float)
+    if load.ndim > 1 and soc.ndim == 1:
+        soc = soc[:, None]
+
+    wanted = np.clip(load - max_rate_kw, 0.0, max_rate_kw) * interval_h  # kWh per step
+    used_before = np.cumsum(wanted, axis=-1) - wanted
+    discharge = np.minimum(wanted, np.maximum(soc - used_before, 0.0))
+
+    soc_end = np.maximum(soc - discharge.sum(axis=-1, keepdims=load.ndim > 1), 0.0)
+    if load.ndim > 1:
+        soc_end = soc_end[..., 0]
+    return load - discharge / interval_h, soc_end
+
+
+def peak_hour_mask(timestamps, peak: dict | None) -> np.ndarray:
+    """True for timestamps with start <= hour < end of a BatteryModel ``peak_hours`` dict ("08:00" or 8)."""
+    hours = pd.DatetimeIndex(pd.to_datetime(timestamps)).hour.to_numpy()
+    if not peak:
+        return np.zeros(len(hours), dtype=bool)
+
+    def _hour(v):
+        return int(v.split(":")[0]) if isinstance(v, str) else int(v)
+
+    try:
+        start, end = _hour(peak["start"]), _hour(peak["end"])
+    except (KeyError, TypeError, ValueError):
+        return np.zeros(len(hours), dtype=bool)
+    return (hours >= start) & (hours < end)
+
+
+def simulate_peak_shaving(net_kw, capacity_kwh, max_power_kw, in_peak, dt_h: float,
+                          charge_eff: float = 0.95, discharge_eff: float = 0.95,
+                          initial_soc_pct=50.0, min_soc_pct: float = 10.0, max_soc_pct: float = 90.0):
+    """
+    BatteryModel (BatterySimPiece) dispatch for many battery candidates at once.
+
+    Discharges in peak hours while SOC > min_soc and the site imports, charges from solar excess
+    (net < 0) up to max_soc, otherwise passes the net load through. ``net_kw`` is (time,) or
+    (candidates x time); capacity, power and initial SOC are scalars or (candidates,). The time
+    loop is sequential (SOC dependency), every step is vectorised over the candidates.
+
+    Returns ``(soc_pct, grid_kw)``, both (candidates x time), or (time,) for 1-D input.
+    """
+    net = np.asarray(net_kw, dtype=float)
+    one_d = net.ndim == 1
+    capacity = np.atleast_1d(np.asarray(capacity_kwh, dtype=float))
+    n = max(len(capacity), 1 if one_d else net.shape[0])
+    net = np.broadcast_to(net, (n, net.shape[-1]))
+    capacity = np.broadcast_to(capacity, (n,))
+    max_power = np.broadcast_to(np.asarray(max_power_kw, dtype=float), (n,))
+    in_peak = np.asarray(in_peak, dtype=bool)
+
+    if n == 1 and np.isfinite(net).all():
+        soc_1, grid_1 = _peak_shaving_scalar(net[0], float(capacity[0]), float(max_power[0]), in_peak, dt_h,
+                                             charge_eff, discharge_eff, float(np.ravel(initial_soc_pct)[0]),
+                                             min_soc_pct, max_soc_pct)
+        return (soc_1, grid_1) if one_d else (soc_1[None, :], grid_1[None, :])
+
+    active = capacity > 0
+    safe_capacity = np.where(active, capacity, 1.0)
+    soc = np.broadcast_to(np.asarray(initial_soc_pct, dtype=float), (n,)).copy()
+    soc_out = np.empty((n, net.shape[-1]))
+    grid_out = np.empty((n, net.shape[-1]))
+    to_pct = 100.0 / safe_capacity
+
+    for t in range(net.shape[-1]):
+        x = net[:, t]
+        if in_peak[t]:
+            discharge = active & (soc > min_soc_pct) & (x > 0)
+            deliver = np.minimum(np.minimum(x, max_power), soc / 100.0 * capacity * discharge_eff / dt_h)
+            deliver = np.where(discharge, deliver, 0.0)
+            charge = active & ~discharge & (soc < max_soc_pct) & (x < 0)
+        else:
+            deliver = 0.0
+            charge = active & (soc < max_soc_pct) & (x < 0)
+        charge_kw = np.minimum(np.minimum(max_power, -x), (max_soc_pct - soc) / 100.0 * capacity / dt_h)
+        charge_kw = np.where(charge, charge_kw, 0.0)
+
+        grid_out[:, t] = x - deliver + charge_kw
+        soc = soc - deliver * dt_h / discharge_eff * to_pct + charge_kw * dt_h * charge_eff * to_pct
+        np.clip(soc, 0.0, 100.0, out=soc)
+        soc_out[:, t] = soc
+
+    if one_d:
+        return soc_out[0], grid_out[0]
+    return soc_out, grid_out
+
+
+def _peak_shaving_scalar(net, capacity, max_power, in_peak, dt_h, charge_eff, discharge_eff,
+                         soc, min_soc_pct, max_soc_pct) -> tuple[np.ndarray, np.ndarray]:
+    """
+    ``simulate_peak_shaving`` for one battery on Python floats: the same operations in the same order
+    (identical results), without the per-step array overhead that dominates at 1 min resolution.
+    """
+    grid_out = [0.0] * len(net)
+    soc_out = [0.0] * len(net)
+    if capacity <= 0:
+        return np.full(len(net), min(max(soc, 0.0), 100.0)), np.asarray(net, dtype=float).copy()
+    to_pct = 100.0 / capacity
+    for t, (x, peak) in enumerate(zip(net.tolist(), np.asarray(in_peak, dtype=bool).tolist())):
+        deliver = 0.0
+        discharge = peak and soc > min_soc_pct and x > 0
+        if discharge:
+            deliver = min(min(x, max_power), soc / 100.0 * capacity * discharge_eff / dt_h)
+        charge_kw = 0.0
+        if not discharge and soc < max_soc_pct and x < 0:
+            charge_kw = min(min(max_power, -x), (max_soc_pct - soc) / 100.0 * capacity / dt_h)
+        grid_out[t] = x - deliver + charge_kw
+        soc = soc - deliver * dt_h / discharge_eff * to_pct + charge_kw * dt_h * charge_eff * to_pct
+        soc = min(max(soc, 0.0), 100.0)
+        soc_out[t] = soc
+    return np.asarray(soc_out), np.asarray(grid_out)
+
+
+def _threshold_pass(net: list, threshold: float, capacity: float, max_power: float, dt_h: float,
+                    charge_eff: float, discharge_eff: float, soc: float, min_soc_pct: float, max_soc_pct: float,
+                    grid_charging: bool, record: bool):
+    """
+    One battery over ``net`` (Python floats) holding the grid import at ``threshold``: discharges
+    only the part of the net load above it, charges from solar excess (and from the grid below the
+    threshold with ``grid_charging``). Without ``record`` it stops at the first interval the import
+    goes above the threshold. Returns ``(feasible, soc_end, soc_out, grid_out)``.
+    """
+    to_pct = 100.0 / capacity
+    usable_min = min_soc_pct / 100.0 * capacity
+    tol = 1e-6 * max(abs(threshold), 1.0)
+    feasible = True
+    soc_out = [0.0] * len(net) if record else None
+    grid_out = [0.0] * len(net) if record else None
+    for t, x in enumerate(net):
+        if x > threshold:
+            deliver = min(x - threshold, max_power,
+                          max(soc / 100.0 * capacity - usable_min, 0.0) * discharge_eff / dt_h)
+            grid = x - deliver
+            soc -= deliver * dt_h / discharge_eff * to_pct
+            if grid > threshold + tol:
+                feasible = False
+                if not record:
+                    return False, soc, None, None
+        else:
+            room = (max_soc_pct - soc) / 100.0 * capacity / (charge_eff * dt_h)
+            headroom = threshold - x if grid_charging else -x
+            charge_kw = min(max_power, headroom, room) if soc < max_soc_pct else 0.0
+            charge_kw = max(charge_kw, 0.0)
+            grid = x + charge_kw
+            soc += charge_kw * dt_h * charge_eff * to_pct
+        if record:
+            soc_out[t] = soc
+            grid_out[t] = grid
+    return feasible, soc, soc_out, grid_out
+
+
+def monthly_peak_thresholds(net_kw, timestamps, capacity_kwh: float, max_power_kw: float, dt_h: float,
+                            charge_eff: float = 0.95, discharge_eff: float = 0.95, initial_soc_pct: float = 50.0,
+                            min_soc_pct: float = 10.0, max_soc_pct: float = 90.0, grid_charging: bool = False,
+                            tol_kw: float = 0.1) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """
+    Peak-shaving dispatch with the lowest grid import threshold the battery can hold in every
+    billing (calendar) month.
+
+    Per month the threshold is bisected between ``max(net) - max_power`` (the battery cannot shave
+    more) and ``max(net)`` (nothing to shave) down to ``tol_kw``; every probe is a single-battery
+    SOC pass that stops at the first interval above the threshold. Months run in order, each
+    starting from the SOC the previous one ended with.
+
+    Returns ``(thresholds, soc_pct, grid_kw)``: a frame with month, peak_before_kw, threshold_kw and
+    probes, and the dispatch of the whole series at those thresholds.
+    """
+    net = np.asarray(net_kw, dtype=float)
+    months = pd.DatetimeIndex(pd.to_datetime(timestamps)).to_period("M")
+    codes = np.asarray(pd.factorize(months)[0])
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], dtype=int)
+    bounds = np.r_[starts, len(net)]
+    soc = float(initial_soc_pct)
+    soc_all, grid_all, rows = np.empty(len(net)), np.empty(len(net)), []
+
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        chunk = np.nan_to_num(net[a:b]).tolist()
+        peak = max(chunk)
+        hi, probes = peak, 0
+        if capacity_kwh > 0 and max_power_kw > 0 and peak > 0:
+            lo = max(peak - max_power_kw, 0.0)
+            args = (capacity_kwh, max_power_kw, dt_h, charge_eff, discharge_eff, soc, min_soc_pct, max_soc_pct,
+                    grid_charging)
+            probes += 1
+            if _threshold_pass(chunk, lo, *args, record=False)[0]:
+                hi = lo
+            while hi - lo > tol_kw:
+                mid = 0.5 * (lo + hi)
+                probes += 1
+                if _threshold_pass(chunk, mid, *args, record=False)[0]:
+                    hi = mid
+                else:
+                    lo = mid
+        if capacity_kwh > 0:
+            _, soc, soc_out, grid_out = _threshold_pass(chunk, hi, capacity_kwh, max_power_kw, dt_h, charge_eff,
+                                                        discharge_eff, soc, min_soc_pct, max_soc_pct, grid_charging,
+                                                        record=True)
+        else:
+            soc_out, grid_out = [soc] * len(chunk), chunk
+        soc_all[a:b], grid_all[a:b] = soc_out, grid_out
+        rows.append({"month": str(months[a]), "peak_before_kw": peak, "threshold_kw": hi,
+                     "peak_after_kw": max(grid_out), "probes": probes})
+    return pd.DataFrame(rows, columns=["month", "peak_before_kw", "threshold_kw", "peak_after_kw", "probes"]), soc_all, grid_all
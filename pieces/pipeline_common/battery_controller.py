@@ -0,0 +1,618 @@
+"""
+Receding-horizon (MPC) battery controller: every interval it takes the newest meter reading, updates
+the PredictPiece forecast for the next ``horizon_h`` hours, solves the battery dispatch over that
+horizon as a linear program and emits the set-point of the first interval. SOC, month peak and the
+last plan are persisted, so a restarted controller carries on where it stopped.
+
+Meter reading (JSON object, or a CSV row)::
+
+    {"datetime": "2025-03-20 10:00", "load_kw": 812.0, "solar_kw": 140.5,
+     "price_eur_kwh": 0.105, "soc_pct": 61.0, "grid_kw": 668.2}
+
+``datetime`` is the start of the measured interval; the set-point is for the interval after it.
+``solar_kw``, ``price_eur_kwh``, ``soc_pct`` (battery management system) and ``grid_kw`` (meter at
+the grid connection) are optional. Set-point: ``battery_kw`` > 0 charges, < 0 discharges, and
+``grid_limit_kw`` – the import the plan allows (at least the month peak so far) – which the battery
+side enforces on the actual load: it charges less, or discharges, when the load runs above forecast.
+
+LP per step (H intervals, all kW; charge c, discharge d, grid import g, export e, SOC s in %, x kW
+above the month peak so far)::
+
+    min  sum(price * g - export_price * e + cycle_cost * (c + d)) * dt + demand_charge * x
+    s.t. g - e - c + d = load - solar
+         s_t = s_(t-1) + (charge_eff * c - d / discharge_eff) * dt * 100 / capacity
+         g - x <= month peak,  min_soc <= s <= max_soc,  s_(H-1) >= terminal SOC
+
+The constraint matrices depend only on H and the battery, they are built once. HiGHS (scipy) takes
+no starting basis, so the warm start is a plan reuse: when the SOC and the forecast still match
+the previous plan, its next step is emitted without solving (at most ``max_reuse_steps`` in a
+row); the shifted plan is also the fallback when a solve fails or runs out of ``time_limit_s``.
+
+    python -m pipeline_common.battery_controller replay --predictions predictions_15min.csv \\
+        --solar virtual_solar.csv --battery-config battery_config.yml --out /tmp/mpc_replay
+    python -m pipeline_common.battery_controller watch --predictions predictions_15min.csv \\
+        --battery-config battery_config.yml --inbox /data/meter --state /data/mpc_state.json
+    python -m pipeline_common.battery_controller serve --predictions predictions_15min.csv \\
+        --battery-config battery_config.yml --port 8765 --state /data/mpc_state.json
+
+The replay drives a history (``load_kw`` = actual load of predictions_15min, else the forecast
+itself) through the loop with a simulated battery and writes ``controller_replay.csv`` and
+``controller_replay_summary.json`` (latency p50 / p99, cost and monthly peaks vs no battery and vs
+the BatterySim rule).
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import socketserver
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import yaml
+from scipy.optimize import linprog
+
+from .battery import peak_hour_mask, simulate_peak_shaving
+from .interchange import read_frame
+from .timegrid import align_to_timestamps, interval_hours
+
+READING_FIELDS = ("datetime", "load_kw", "solar_kw", "price_eur_kwh", "soc_pct", "grid_kw")
+
+
+# =====================================================================
+# Battery
+# =====================================================================
+def battery_params(config: dict) -> dict[str, float]:
+    """battery_config.yml (or a scenario's ``battery``) -> capacity, power, efficiencies and SOC limits."""
+    capacity = float(config.get("capacity_kWh", config.get("capacity_kwh", 0.0)) or 0.0)
+    if capacity <= 0:
+        raise ValueError("battery config needs capacity_kWh > 0")
+    return {
+        "capacity_kwh": capacity,
+        "max_power_kw": float(config.get("max_power_kw", float(config.get("max_c_rate", 0.5)) * capacity)),
+        "charge_eff": float(config.get("charge_efficiency", 0.95)),
+        "discharge_eff": float(config.get("discharge_efficiency", 0.95)),
+        "min_soc_pct": float(config.get("min_soc", 10.0)),
+        "max_soc_pct": float(config.get("max_soc", 90.0)),
+        "initial_soc_pct": float(config.get("initial_soc", config.get("initial_soc_pct", 50.0))),
+    }
+
+
+class SimulatedBattery:
+    """Stand-in for the real battery: applies a set-point to the actual net load within power and SOC limits."""
+
+    def __init__(self, params: dict[str, float], soc_pct: float | None = None):
+        self.p = params
+        self.soc_pct = float(params["initial_soc_pct"] if soc_pct is None else soc_pct)
+
+    def apply(self, battery_kw: float, net_kw: float, dt_h: float, grid_limit_kw: float | None = None) -> tuple[float, float]:
+        """
+        Run one interval; returns (battery_kw actually applied, grid import kW). With ``grid_limit_kw``
+        the battery charges less, or discharges, so that the import stays under the limit (as far as it can).
+        """
+        p = self.p
+        cap = p["capacity_kwh"]
+        if grid_limit_kw is not None:
+            battery_kw = min(battery_kw, grid_limit_kw - net_kw)
+        if battery_kw >= 0:
+            room = max(p["max_soc_pct"] - self.soc_pct, 0.0) / 100.0 * cap
+            kw = min(battery_kw, p["max_power_kw"], room / (p["charge_eff"] * dt_h))
+            self.soc_pct += kw * p["charge_eff"] * dt_h / cap * 100.0
+        else:
+            stored = max(self.soc_pct - p["min_soc_pct"], 0.0) / 100.0 * cap
+            kw = -min(-battery_kw, p["max_power_kw"], stored * p["discharge_eff"] / dt_h)
+            self.soc_pct += kw / p["discharge_eff"] * dt_h / cap * 100.0
+        return kw, max(net_kw + kw, 0.0)
+
+
+# =====================================================================
+# Readings and forecast
+# =====================================================================
+def parse_reading(raw: dict[str, Any]) -> dict[str, Any]:
+    """Meter reading with a Timestamp and floats; missing optional fields are None."""
+    if "datetime" not in raw or "load_kw" not in raw:
+        raise ValueError(f"meter reading needs datetime and load_kw, got {sorted(raw)}")
+    reading = {"datetime": pd.Timestamp(raw["datetime"])}
+    for key in READING_FIELDS[1:]:
+        value = raw.get(key)
+        reading[key] = None if value is None or value == "" or pd.isna(value) else float(value)
+    return reading
+
+
+def read_readings(path: str | Path) -> list[dict[str, Any]]:
+    """Readings of one inbox file: a JSON object, a JSON list or a CSV with the reading columns."""
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        data = json.loads(path.read_text())
+        rows = data if isinstance(data, list) else [data]
+    return sorted((parse_reading(r) for r in rows), key=lambda r: r["datetime"])
+
+
+class ForecastUpdater:
+    """
+    Load, solar and price for the next H intervals from the PredictPiece predictions (and the
+    virtual_solar profile), with the error of the latest meter reading carried forward and decaying
+    by ``error_decay`` per interval. Past the end of the predictions the last values persist.
+    """
+
+    def __init__(self, predictions: pd.DataFrame, solar: pd.DataFrame | None = None, error_decay: float = 0.9,
+                 predictions_path: str | Path | None = None, solar_path: str | Path | None = None):
+        self.error_decay = float(error_decay)
+        self.predictions_path = Path(predictions_path) if predictions_path else None
+        self.solar_path = Path(solar_path) if solar_path else None
+        self._mtime = self._current_mtime()
+        self._load(predictions, solar)
+
+    @classmethod
+    def from_files(cls, predictions_path, solar_path=None, error_decay: float = 0.9) -> "ForecastUpdater":
+        return cls(read_frame(predictions_path), read_frame(solar_path) if solar_path else None, error_decay,
+                   predictions_path, solar_path)
+
+    def _current_mtime(self) -> tuple:
+        return tuple(p.stat().st_mtime_ns if p.exists() else 0 for p in (self.predictions_path, self.solar_path) if p)
+
+    def _load(self, predictions: pd.DataFrame, solar: pd.DataFrame | None) -> None:
+        df = predictions.copy()
+        df["datetime"] = pd.to_datetime(df["datetime"])
+        df = df.sort_values("datetime").reset_index(drop=True)
+        self.interval_h = interval_hours(df)
+        self.ts = df["datetime"].to_numpy(dtype="datetime64[ns]").astype("int64")
+        if "prediction_load_kw" in df.columns:
+            self.load = df["prediction_load_kw"].to_numpy(dtype=float)
+        elif "prediction_load_mw" in df.columns:
+            self.load = df["prediction_load_mw"].to_numpy(dtype=float) * 1000.0
+        else:
+            raise ValueError("predictions need prediction_load_kw or prediction_load_mw")
+        if "price_eur_kwh" in df.columns:
+            self.price = df["price_eur_kwh"].to_numpy(dtype=float)
+        elif "price_eur_mwh" in df.columns:
+            self.price = df["price_eur_mwh"].to_numpy(dtype=float) / 1000.0
+        else:
+            self.price = None
+        if solar is not None and "solar_kw" in df.columns:
+            df = df.drop(columns="solar_kw")
+        if solar is not None:
+            df["solar_kw"] = align_to_timestamps(df["datetime"], solar, "solar_kw")
+        self.solar = np.nan_to_num(df["solar_kw"].to_numpy(dtype=float)) if "solar_kw" in df.columns else None
+        self.frame = df
+
+    def refresh(self) -> bool:
+        """Reload the files when PredictPiece (or SolarSim) wrote newer ones; True if reloaded."""
+        mtime = self._current_mtime()
+        if not self.predictions_path or mtime == self._mtime:
+            return False
+        self._load(read_frame(self.predictions_path), read_frame(self.solar_path) if self.solar_path else None)
+        self._mtime = mtime
+        print(f"[INFO] MPC forecast reloaded from {self.predictions_path}")
+        return True
+
+    def _window(self, values: np.ndarray | None, i0: int, horizon: int, fallback: float) -> np.ndarray:
+        if values is None or i0 >= len(values):
+            return np.full(horizon, fallback)
+        out = values[i0:i0 + horizon]
+        if len(out) < horizon:
+            out = np.concatenate([out, np.full(horizon - len(out), out[-1])])
+        return np.nan_to_num(out, nan=fallback)
+
+    def forecast(self, start: pd.Timestamp, horizon: int, reading: dict[str, Any] | None = None) -> dict[str, np.ndarray]:
+        """load_kw, solar_kw and price_eur_kwh for the H intervals from ``start``."""
+        i0 = int(np.searchsorted(self.ts, start.value))
+        last_load = reading["load_kw"] if reading else 0.0
+        load = self._window(self.load, i0, horizon, last_load)
+        if reading is not None:
+            j = int(np.searchsorted(self.ts, reading["datetime"].value))
+            if j < len(self.ts) and self.ts[j] == reading["datetime"].value and np.isfinite(self.load[j]):
+                error = reading["load_kw"] - self.load[j]
+                load = load + error * self.error_decay ** np.arange(1, horizon + 1)
+        last_solar = (reading or {}).get("solar_kw") or 0.0
+        if self.solar is not None and i0 < len(self.solar):
+            solar = self._window(self.solar, i0, horizon, 0.0)
+        else:
+            solar = last_solar * self.error_decay ** np.arange(1, horizon + 1)
+        last_price = (reading or {}).get("price_eur_kwh") or 0.0
+        price = self._window(self.price, i0, horizon, last_price)
+        return {"load_kw": load, "solar_kw": solar, "price_eur_kwh": price}
+
+
+# =====================================================================
+# Controller
+# =====================================================================
+class MPCController:
+    """Receding-horizon battery dispatch; ``step(reading)`` -> set-point of the next interval."""
+
+    def __init__(self, battery: dict[str, float], forecaster: ForecastUpdater, horizon_h: float = 24.0,
+                 interval_h: float | None = None, demand_charge_eur_kw: float = 10.0,
+                 cycle_cost_eur_kwh: float = 0.005, export_price_eur_kwh: float = 0.0,
+                 grid_charging: bool = True, terminal_soc_pct: float | None = None,
+                 reuse_tolerance_kw: float = 0.0, reuse_tolerance_soc_pct: float = 0.5,
+                 max_reuse_steps: int = 4, time_limit_s: float = 0.5, state_path: str | Path | None = None):
+        self.p = battery
+        self.forecaster = forecaster
+        self.dt = float(interval_h or forecaster.interval_h)
+        self.horizon = max(int(round(horizon_h / self.dt)), 1)
+        self.demand_charge = float(demand_charge_eur_kw)
+        self.cycle_cost = float(cycle_cost_eur_kwh)
+        self.export_price = float(export_price_eur_kwh)
+        self.grid_charging = grid_charging
+        self.terminal_soc = battery["initial_soc_pct"] if terminal_soc_pct is None else float(terminal_soc_pct)
+        self.reuse_tolerance_kw = float(reuse_tolerance_kw)
+        self.reuse_tolerance_soc = float(reuse_tolerance_soc_pct)
+        self.max_reuse_steps = int(max_reuse_steps)
+        self.time_limit_s = float(time_limit_s)
+        self.state_path = Path(state_path) if state_path else None
+        self._build_matrices()
+        self.state = self._initial_state()
+        if self.state_path and self.state_path.exists():
+            self.state.update(json.loads(self.state_path.read_text()))
+            print(f"[INFO] MPC state restored from {self.state_path} (SOC {self.state['soc_pct']:.1f} %)")
+        self.stats = {"steps": 0, "solves": 0, "reused": 0, "fallbacks": 0}
+
+    def _initial_state(self) -> dict[str, Any]:
+        return {"soc_pct": self.p["initial_soc_pct"], "last_datetime": None, "month": None,
+                "month_peak_kw": 0.0, "battery_kw": 0.0, "plan": None, "reused": 0}
+
+    def _build_matrices(self) -> None:
+        # premenné: c, d, g, e, s (po H) + x; matice závisia len od H a batérie, počítajú sa raz
+        H, dt, p = self.horizon, self.dt, self.p
+        eye = sp.identity(H, format="csr")
+        zero = sp.csr_matrix((H, H))
+        col0 = sp.csr_matrix((H, 1))
+        k_c = p["charge_eff"] * dt * 100.0 / p["capacity_kwh"]
+        k_d = dt * 100.0 / (p["discharge_eff"] * p["capacity_kwh"])
+        soc_diff = sp.identity(H, format="csr") - sp.eye(H, k=-1, format="csr")
+        balance = sp.hstack([-eye, eye, eye, -eye, zero, col0])
+        soc = sp.hstack([-k_c * eye, k_d * eye, zero, zero, soc_diff, col0])
+        self._a_eq = sp.vstack([balance, soc]).tocsr()
+        self._a_ub = sp.hstack([zero, zero, eye, zero, zero, sp.csr_matrix(-np.ones((H, 1)))]).tocsr()
+        self._n_vars = 5 * H + 1
+
+    def _solve(self, soc_pct: float, fc: dict[str, np.ndarray], month_peak: float) -> dict[str, np.ndarray] | None:
+        H, dt, p = self.horizon, self.dt, self.p
+        net = fc["load_kw"] - fc["solar_kw"]
+        cost = np.concatenate([
+            np.full(H, self.cycle_cost * dt), np.full(H, self.cycle_cost * dt),
+            fc["price_eur_kwh"] * dt, np.full(H, -self.export_price * dt), np.zeros(H), [self.demand_charge],
+        ])
+        b_eq = np.concatenate([net, np.zeros(H)])
+        b_eq[H] = soc_pct
+        s_lo, s_hi = min(p["min_soc_pct"], soc_pct), max(p["max_soc_pct"], soc_pct)
+        charge_hi = np.full(H, p["max_power_kw"]) if self.grid_charging else np.clip(-net, 0.0, p["max_power_kw"])
+        s_bounds = [(s_lo, s_hi)] * (H - 1) + [(min(self.terminal_soc, soc_pct, s_hi), s_hi)]
+        bounds = ([(0.0, float(h)) for h in charge_hi] + [(0.0, p["max_power_kw"])] * H
+                  + [(0.0, None)] * (2 * H) + s_bounds + [(0.0, None)])
+        res = linprog(cost, A_ub=self._a_ub, b_ub=np.full(H, month_peak), A_eq=self._a_eq, b_eq=b_eq,
+                      bounds=bounds, method="highs", options={"time_limit": self.time_limit_s})
+        if res.status != 0:
+            return None
+        x = res.x
+        return {"battery_kw": x[:H] - x[H:2 * H], "soc_pct": x[4 * H:5 * H], "grid_kw": x[2 * H:3 * H], "net_kw": net}
+
+    def _month_peak(self, reading: dict[str, Any]) -> None:
+        ts = reading["datetime"]
+        month = f"{ts.year:04d}-{ts.month:02d}"
+        if month != self.state["month"]:
+            self.state["month"], self.state["month_peak_kw"] = month, 0.0
+        grid = reading.get("grid_kw")
+        if grid is None:
+            grid = reading["load_kw"] - (reading.get("solar_kw") or 0.0) + self.state["battery_kw"]
+        self.state["month_peak_kw"] = max(self.state["month_peak_kw"], float(grid))
+
+    def observe(self, reading: dict[str, Any]) -> None:
+        """Take a reading into the state (SOC, month peak) without deciding; for readings that arrive late."""
+        if reading.get("soc_pct") is not None:
+            self.state["soc_pct"] = reading["soc_pct"]
+        self._month_peak(reading)
+        self.state["last_datetime"] = str(reading["datetime"])
+
+    def _reusable(self, start: pd.Timestamp, soc_pct: float, net: np.ndarray) -> bool:
+        plan = self.state["plan"]
+        if plan is None or self.state["reused"] >= self.max_reuse_steps or len(plan["battery_kw"]) < 2:
+            return False
+        if pd.Timestamp(plan["start"]) + pd.Timedelta(hours=self.dt) != start:
+            return False
+        if abs(plan["soc_pct"][0] - soc_pct) > self.reuse_tolerance_soc:
+            return False
+        overlap = min(len(plan["net_kw"]) - 1, len(net))
+        drift = np.abs(np.asarray(plan["net_kw"][1:overlap + 1]) - net[:overlap])
+        return bool(drift.max(initial=0.0) <= max(self.reuse_tolerance_kw, 0.02 * self.p["max_power_kw"]))
+
+    def step(self, reading: dict[str, Any]) -> dict[str, Any]:
+        """Set-point for the interval after ``reading["datetime"]``; persists the state."""
+        t0 = time.perf_counter()
+        self.observe(reading)
+        start = reading["datetime"] + pd.Timedelta(hours=self.dt)
+        soc = float(self.state["soc_pct"])
+        peak = self.state["month_peak_kw"] if (start.year, start.month) == (reading["datetime"].year,
+                                                                            reading["datetime"].month) else 0.0
+        fc = self.forecaster.forecast(start, self.horizon, reading)
+        net = fc["load_kw"] - fc["solar_kw"]
+        self.stats["steps"] += 1
+
+        plan, source = None, "solve"
+        if self._reusable(start, soc, net):
+            plan, source = self._shifted_plan(), "reuse"
+        else:
+            plan = self._solve(soc, fc, peak)
+            self.stats["solves"] += 1
+            if plan is None:
+                plan, source = (self._shifted_plan(), "fallback") if self.state["plan"] else (None, "idle")
+        if plan is None:
+            plan = {"battery_kw": np.zeros(1), "soc_pct": np.array([soc]), "grid_kw": np.maximum(net[:1], 0.0),
+                    "net_kw": net[:1]}
+        if source == "reuse":
+            self.stats["reused"] += 1
+        elif source != "solve":
+            self.stats["fallbacks"] += 1
+
+        battery_kw = self._feasible(float(plan["battery_kw"][0]), soc)
+        # import limit for the battery side: the plan's peak, never below the month peak already paid for
+        grid_limit = max(peak, float(np.max(plan["grid_kw"])))
+        self.state.update({
+            "battery_kw": battery_kw,
+            "soc_pct": self._soc_after(soc, battery_kw),
+            "reused": self.state["reused"] + 1 if source == "reuse" else 0,
+            "plan": {"start": str(start), **{k: np.asarray(v, dtype=float).round(4).tolist() for k, v in plan.items()}},
+        })
+        self.save_state()
+        return {
+            "datetime": str(start),
+            "battery_kw": round(battery_kw, 3),
+            "expected_grid_kw": round(max(net[0] + battery_kw, 0.0), 3),
+            "grid_limit_kw": round(grid_limit, 3),
+            "soc_pct": round(soc, 3),
+            "planned_soc_pct": round(self.state["soc_pct"], 3),
+            "month_peak_kw": round(self.state["month_peak_kw"], 3),
+            "source": source,
+            "latency_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+        }
+
+    def _shifted_plan(self) -> dict[str, np.ndarray]:
+        return {k: np.asarray(v[1:], dtype=float) for k, v in self.state["plan"].items() if k != "start"}
+
+    def _feasible(self, battery_kw: float, soc: float) -> float:
+        p, dt = self.p, self.dt
+        charge_max = max(p["max_soc_pct"] - soc, 0.0) / 100.0 * p["capacity_kwh"] / (p["charge_eff"] * dt)
+        discharge_max = max(soc - p["min_soc_pct"], 0.0) / 100.0 * p["capacity_kwh"] * p["discharge_eff"] / dt
+        return float(np.clip(battery_kw, -min(p["max_power_kw"], discharge_max), min(p["max_power_kw"], charge_max)))
+
+    def _soc_after(self, soc: float, battery_kw: float) -> float:
+        p = self.p
+        energy = battery_kw * p["charge_eff"] if battery_kw >= 0 else battery_kw / p["discharge_eff"]
+        return soc + energy * self.dt / p["capacity_kwh"] * 100.0
+
+    def save_state(self) -> None:
+        if not self.state_path:
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp.write_text(json.dumps(self.state))
+        os.replace(tmp, self.state_path)
+
+
+# =====================================================================
+# Replay harness
+# =====================================================================
+def _monthly_peaks(ts: pd.Series, grid_kw: np.ndarray) -> pd.Series:
+    return pd.Series(grid_kw).groupby(pd.to_datetime(ts).dt.to_period("M").values).max()
+
+
+def replay(controller: MPCController, history: pd.DataFrame, out_dir: str | Path | None = None,
+           peak_hours: dict | None = None) -> dict[str, Any]:
+    """
+    Drive ``history`` (datetime, load_kw, solar_kw, price_eur_kwh) through the control loop with a
+    ``SimulatedBattery`` as fast as possible; returns the summary (and writes it with the rows to ``out_dir``).
+    """
+    h = history.sort_values("datetime").reset_index(drop=True)
+    ts = pd.to_datetime(h["datetime"])
+    load = h["load_kw"].to_numpy(dtype=float)
+    solar = h["solar_kw"].to_numpy(dtype=float) if "solar_kw" in h.columns else np.zeros(len(h))
+    price = h["price_eur_kwh"].to_numpy(dtype=float) if "price_eur_kwh" in h.columns else np.zeros(len(h))
+    net = load - solar
+    dt = controller.dt
+    battery = SimulatedBattery(controller.p, controller.state["soc_pct"])
+    n = len(h)
+    battery_kw, grid, soc, latency = np.zeros(n), np.maximum(net, 0.0), np.zeros(n), np.zeros(n)
+    source = np.full(n, "", dtype=object)
+    soc[0] = battery.soc_pct
+
+    t_start = time.perf_counter()
+    for i in range(1, n):
+        reading = {"datetime": ts.iat[i - 1], "load_kw": load[i - 1], "solar_kw": solar[i - 1],
+                   "price_eur_kwh": price[i - 1], "soc_pct": battery.soc_pct, "grid_kw": grid[i - 1]}
+        setpoint = controller.step(reading)
+        battery_kw[i], grid[i] = battery.apply(setpoint["battery_kw"], net[i], dt, setpoint["grid_limit_kw"])
+        soc[i] = battery.soc_pct
+        latency[i], source[i] = setpoint["latency_ms"], setpoint["source"]
+    elapsed = time.perf_counter() - t_start
+
+    baseline = np.maximum(net, 0.0)
+    rule_soc, rule_grid = simulate_peak_shaving(net, controller.p["capacity_kwh"], controller.p["max_power_kw"],
+                                                peak_hour_mask(ts, peak_hours), dt,
+                                                charge_eff=controller.p["charge_eff"],
+                                                discharge_eff=controller.p["discharge_eff"],
+                                                initial_soc_pct=controller.p["initial_soc_pct"])
+
+    def _cost(g):
+        peaks = _monthly_peaks(ts, g)
+        energy = float(np.sum(g * price) * dt)
+        return {"energy_cost_eur": round(energy, 2), "demand_cost_eur": round(float(peaks.sum()) * controller.demand_charge, 2),
+                "mean_monthly_peak_kw": round(float(peaks.mean()), 3)}
+
+    lat = latency[1:]
+    summary = {
+        "steps": n - 1,
+        "interval_h": dt,
+        "horizon_steps": controller.horizon,
+        **controller.stats,
+        "latency_p50_ms": round(float(np.percentile(lat, 50)), 3) if len(lat) else 0.0,
+        "latency_p99_ms": round(float(np.percentile(lat, 99)), 3) if len(lat) else 0.0,
+        "latency_max_ms": round(float(lat.max()), 3) if len(lat) else 0.0,
+        "steps_per_s": round((n - 1) / elapsed, 1) if elapsed > 0 else 0.0,
+        "no_battery": _cost(baseline),
+        "rule_based": _cost(rule_grid),
+        "mpc": _cost(grid),
+    }
+    for key in ("no_battery", "rule_based", "mpc"):
+        summary[key]["total_cost_eur"] = round(summary[key]["energy_cost_eur"] + summary[key]["demand_cost_eur"], 2)
+    summary["mpc_savings_eur"] = round(summary["no_battery"]["total_cost_eur"] - summary["mpc"]["total_cost_eur"], 2)
+
+    if out_dir:
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame({
+            "datetime": ts, "load_kw": load, "solar_kw": solar, "price_eur_kwh": price, "battery_kw": battery_kw,
+            "grid_import_kw": grid, "soc_pct": soc, "source": source, "latency_ms": latency,
+        }).to_csv(out / "controller_replay.csv", index=False)
+        (out / "controller_replay_summary.json").write_text(json.dumps(summary, indent=1))
+    print(f"[METRIC] MPC replay: {n - 1} steps in {elapsed:.1f} s, latency p50 {summary['latency_p50_ms']} ms, "
+          f"p99 {summary['latency_p99_ms']} ms, max {summary['latency_max_ms']} ms")
+    print(f"[METRIC] MPC replay cost {summary['mpc']['total_cost_eur']} EUR vs {summary['no_battery']['total_cost_eur']} "
+          f"EUR without battery ({summary['rule_based']['total_cost_eur']} EUR rule-based)")
+    return summary
+
+
+def replay_history(forecaster: ForecastUpdater) -> pd.DataFrame:
+    """History for ``replay`` from the forecast frame: actual ``load_kw`` if present, else the forecast itself."""
+    df = forecaster.frame
+    history = pd.DataFrame({"datetime": df["datetime"]})
+    history["load_kw"] = df["load_kw"].to_numpy(dtype=float) if "load_kw" in df.columns else forecaster.load
+    history["load_kw"] = history["load_kw"].fillna(pd.Series(forecaster.load))
+    history["solar_kw"] = forecaster.solar if forecaster.solar is not None else 0.0
+    history["price_eur_kwh"] = forecaster.price if forecaster.price is not None else 0.0
+    return history
+
+
+# =====================================================================
+# Live loop: watched directory or socket
+# =====================================================================
+def _publish(setpoint: dict[str, Any], out_dir: Path) -> None:
+    """Latest set-point to setpoint.json (atomic, for the battery side to pick up) + setpoints.csv log."""
+    tmp = out_dir / "setpoint.json.tmp"
+    tmp.write_text(json.dumps(setpoint))
+    os.replace(tmp, out_dir / "setpoint.json")
+    log = out_dir / "setpoints.csv"
+    new = not log.exists()
+    with open(log, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(setpoint))
+        if new:
+            writer.writeheader()
+        writer.writerow(setpoint)
+
+
+def watch(controller: MPCController, inbox: str | Path, out_dir: str | Path | None = None,
+          poll_s: float = 1.0, max_idle_s: float | None = None) -> None:
+    """
+    Poll ``inbox`` for reading files (*.json, *.csv), decide on the newest reading and move the files
+    to ``inbox/processed``; older readings of the same batch only update the state. Set-points go to
+    ``out_dir`` (default ``inbox/setpoints``).
+    """
+    inbox = Path(inbox)
+    out = Path(out_dir) if out_dir else inbox / "setpoints"
+    (inbox / "processed").mkdir(parents=True, exist_ok=True)
+    out.mkdir(parents=True, exist_ok=True)
+    idle_since = time.monotonic()
+    print(f"[INFO] MPC watching {inbox} every {poll_s} s")
+    while True:
+        files = sorted(p for p in inbox.iterdir() if p.is_file() and p.suffix.lower() in (".json", ".csv"))
+        if not files:
+            if max_idle_s is not None and time.monotonic() - idle_since > max_idle_s:
+                return
+            time.sleep(poll_s)
+            continue
+        readings = []
+        for path in files:
+            try:
+                readings.extend(read_readings(path))
+            except (ValueError, KeyError, json.JSONDecodeError) as e:
+                print(f"[WARNING] MPC skipping unreadable reading {path.name}: {e}")
+            path.replace(inbox / "processed" / path.name)
+        idle_since = time.monotonic()
+        if not readings:
+            continue
+        readings.sort(key=lambda r: r["datetime"])
+        for r in readings[:-1]:
+            controller.observe(r)
+        controller.forecaster.refresh()
+        setpoint = controller.step(readings[-1])
+        _publish(setpoint, out)
+        print(f"[INFO] MPC {setpoint['datetime']}: battery {setpoint['battery_kw']} kW "
+              f"({setpoint['source']}, {setpoint['latency_ms']} ms)")
+
+
+def serve(controller: MPCController, host: str = "127.0.0.1", port: int = 8765) -> None:
+    """TCP server: one JSON reading per line in, one JSON set-point per line back (one client at a time)."""
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    controller.forecaster.refresh()
+                    reply = controller.step(parse_reading(json.loads(line)))
+                except (ValueError, KeyError, json.JSONDecodeError) as e:
+                    reply = {"error": str(e)}
+                self.wfile.write((json.dumps(reply) + "\n").encode())
+
+    with socketserver.TCPServer((host, port), Handler) as server:
+        print(f"[INFO] MPC listening on {host}:{port}")
+        server.serve_forever()
+
+
+# =====================================================================
+# CLI
+# =====================================================================
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Receding-horizon battery controller on PredictPiece forecasts.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--predictions", required=True, help="predictions_15min (csv, feather or parquet)")
+    common.add_argument("--solar", default="", help="virtual_solar profile (optional)")
+    common.add_argument("--battery-config", required=True, help="battery_config.yml")
+    common.add_argument("--horizon-h", type=float, default=24.0)
+    common.add_argument("--demand-charge", type=float, default=10.0, help="EUR per kW of monthly peak")
+    common.add_argument("--cycle-cost", type=float, default=0.005, help="EUR per kWh charged or discharged")
+    common.add_argument("--no-grid-charging", action="store_true", help="charge only from solar excess")
+    common.add_argument("--max-reuse", type=int, default=4, help="steps a plan is reused without solving")
+    common.add_argument("--state", default="", help="persisted controller state (JSON)")
+    p_replay = sub.add_parser("replay", parents=[common], help="drive the history through the loop")
+    p_replay.add_argument("--out", default="")
+    p_replay.add_argument("--scenario", default="", help="scenario.yml whose peak_hours drive the rule-based comparison")
+    p_watch = sub.add_parser("watch", parents=[common], help="decide on reading files dropped into a directory")
+    p_watch.add_argument("--inbox", required=True)
+    p_watch.add_argument("--out", default="", help="setpoint.json / setpoints.csv directory (default: <inbox>/setpoints)")
+    p_watch.add_argument("--poll-s", type=float, default=1.0)
+    p_serve = sub.add_parser("serve", parents=[common], help="decide on readings sent over TCP")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    with open(args.battery_config) as f:
+        params = battery_params(yaml.safe_load(f) or {})
+    forecaster = ForecastUpdater.from_files(args.predictions, args.solar or None)
+    controller = MPCController(params, forecaster, horizon_h=args.horizon_h, demand_charge_eur_kw=args.demand_charge,
+                               cycle_cost_eur_kwh=args.cycle_cost, grid_charging=not args.no_grid_charging,
+                               max_reuse_steps=args.max_reuse, state_path=args.state or None)
+    if args.command == "replay":
+        peak_hours = None
+        if args.scenario:
+            with open(args.scenario) as f:
+                scenario = yaml.safe_load(f) or {}
+            peak_hours = (scenario.get("strategy") or {}).get("peak_hours") or (scenario.get("time_window") or {}).get("peak_hours")
+        replay(controller, replay_history(forecaster), args.out or None, peak_hours)
+    elif args.command == "watch":
+        watch(controller, args.inbox, args.out or None, args.poll_s)
+    else:
+        serve(controller, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Data-quality scan of incoming meter, production, price and SolarGIS weather series
+(FetchEnergyDataPiece and PreprocessEnergyDataPiece).
+
+One vectorised pass per file finds:
+
+- time axis: duplicate stamps, non-monotonic stamps, gap runs (with DST-transition gaps and
+  duplicates counted separately);
+- every value column: missing values, zeros, flat-lines (a non-zero value stuck for at least
+  ``flatline_hours``; zero runs – night, weekend stops – are only counted) and spikes; no-data
+  markers only where the source defines them (-9 in the SolarGIS weather columns, never in load,
+  production or prices, where -9 can be a real value). A spike is more than ``spike_k`` times the rolling MAD away from the
+  centred median of 5; the MAD is the mean absolute residual of the surrounding ``spike_window``
+  values, never below the median step of the series, so level shifts of a plant are no spikes.
+
+The report is a small JSON document (counts, largest gaps, flagged share per series). The mask is
+long-format and holds only the flagged rows (``datetime``, ``series``, ``flags`` bit field). Downstream
+pieces null the flagged values (``apply_mask``, by default no-data and spikes; flat-lines are only
+reported, a plant can legitimately hold a value for hours) instead of averaging them into the grid::
+
+    python -m pipeline_common.data_quality load.csv production.csv prices.csv --weather SolarGIS.csv --out /tmp/dq
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .interchange import read_frame, write_frame
+
+# bity masky (stĺpec flags)
+GAP = 1            # first row after a gap in the time axis
+DUPLICATE = 2      # same stamp as the previous row
+NON_MONOTONIC = 4  # stamp earlier than the previous row
+NO_DATA = 8        # no-data marker (-9)
+FLATLINE = 16      # part of a run of identical values
+SPIKE = 32         # outlier vs the local median
+FLAG_NAMES = {"gap": GAP, "duplicate": DUPLICATE, "non_monotonic": NON_MONOTONIC,
+              "no_data": NO_DATA, "flatline": FLATLINE, "spike": SPIKE}
+VALUE_FLAGS = NO_DATA | FLATLINE | SPIKE
+# values that should not reach the resampled grid by default (flat-lines are report-only)
+DROP_FLAGS = NO_DATA | SPIKE
+
+# SolarGIS no-data marker and the weather columns it applies to (the ones SolarSimPiece reads, + GTI)
+NO_DATA_MARKERS = (-9.0,)
+SOLARGIS_COLUMNS = ("GHI", "DNI", "DIF", "GTI", "TEMP", "WS")
+
+
+def parse_flags(names: str | list[str]) -> int:
+    """ "spike,no_data" -> bit field; unknown names raise ValueError."""
+    if isinstance(names, str):
+        names = [n.strip() for n in names.split(",") if n.strip()]
+    bits = 0
+    for name in names:
+        if name not in FLAG_NAMES:
+            raise ValueError(f"unknown data-quality flag '{name}', expected one of {sorted(FLAG_NAMES)}")
+        bits |= FLAG_NAMES[name]
+    return bits
+
+
+def _runs(change: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Start index and length of the runs of a series whose run boundaries are ``change`` (len n-1, True = new run)."""
+    starts = np.flatnonzero(np.r_[True, change])
+    lengths = np.diff(np.r_[starts, len(change) + 1])
+    return starts, lengths
+
+
+def _median5(x: np.ndarray) -> np.ndarray:
+    """Centred rolling median of 5 (edges repeated) with a min/max network instead of a sort."""
+    p = np.pad(x, 2, mode="edge")
+    a, b, c, d, e = (p[i:i + len(x)] for i in range(5))
+    a, b = np.minimum(a, b), np.maximum(a, b)
+    d, e = np.minimum(d, e), np.maximum(d, e)
+    d = np.maximum(a, d)  # bez globálneho minima
+    b = np.minimum(b, e)  # bez globálneho maxima
+    return np.maximum(np.minimum(b, c), np.minimum(np.maximum(b, c), d))
+
+
+def _dst_dates(years) -> set:
+    """EU DST transition days (last Sunday of March and October) of ``years``."""
+    out = set()
+    for y in years:
+        for month in (3, 10):
+            last = pd.Timestamp(year=int(y), month=month, day=31)
+            out.add((last - pd.Timedelta(days=(last.dayofweek + 1) % 7)).date())
+    return out
+
+
+def scan_time(ts: np.ndarray, interval_ns: int | None = None) -> tuple[dict[str, Any], np.ndarray, np.ndarray]:
+    """
+    Time-axis checks of ``ts`` (datetime64[ns] in file order). Returns ``(report, flags, order)``:
+    the per-row time flags and the stable order that sorts the stamps (None if already sorted).
+    """
+    n = len(ts)
+    t = ts.astype("int64")
+    flags = np.zeros(n, dtype=np.uint8)
+    d = np.diff(t)
+    back = d < 0
+    flags[1:][back] |= NON_MONOTONIC
+    order = np.argsort(t, kind="stable") if back.any() else None
+    ts_sorted = t if order is None else t[order]
+    d_sorted = d if order is None else np.diff(ts_sorted)
+    dup = d_sorted == 0
+    step = interval_ns or (int(np.median(d_sorted[d_sorted > 0])) if (d_sorted > 0).any() else 0)
+    gap = d_sorted > 1.5 * step if step else np.zeros(len(d_sorted), dtype=bool)
+    rows = np.arange(n) if order is None else order
+    flags[rows[1:][dup]] |= DUPLICATE
+    flags[rows[1:][gap]] |= GAP
+
+    gap_idx = np.flatnonzero(gap)
+    missing = np.rint(d_sorted[gap_idx] / step).astype("int64") - 1 if step else np.zeros(0, dtype="int64")
+    dst_days = _dst_dates(range(pd.Timestamp(ts_sorted[0]).year, pd.Timestamp(ts_sorted[-1]).year + 1)) if n else set()
+
+    def _on_dst(idx):
+        if not len(idx) or not dst_days:
+            return 0
+        days = pd.DatetimeIndex(ts_sorted[idx].astype("datetime64[ns]")).date
+        return int(sum(day in dst_days for day in days))
+
+    largest = gap_idx[np.argsort(-missing, kind="stable")[:5]] if len(gap_idx) else gap_idx
+    report = {
+        "rows": int(n),
+        "start": str(pd.Timestamp(ts_sorted[0])) if n else None,
+        "end": str(pd.Timestamp(ts_sorted[-1])) if n else None,
+        "interval_min": round(step / 6e10, 3) if step else None,
+        "duplicates": int(dup.sum()),
+        "non_monotonic": int(back.sum()),
+        "gaps": int(len(gap_idx)),
+        "missing_intervals": int(missing.sum()),
+        "longest_gap_h": round(float(d_sorted[gap_idx].max()) / 3.6e12, 3) if len(gap_idx) else 0.0,
+        "dst_events": _on_dst(gap_idx) + _on_dst(np.flatnonzero(dup)),
+        "largest_gaps": [
+            {"after": str(pd.Timestamp(ts_sorted[i])), "before": str(pd.Timestamp(ts_sorted[i + 1])),
+             "missing_intervals": int(np.rint(d_sorted[i] / step)) - 1}
+            for i in largest
+        ],
+    }
+    return report, flags, order
+
+
+def scan_values(values: np.ndarray, flatline_steps: int, spike_k: float = 8.0, spike_window: int = 13,
+                no_data_markers=()) -> tuple[dict[str, Any], np.ndarray]:
+    """Value checks of one series (time-sorted float array). Returns ``(report, flags)``."""
+    v = np.asarray(values, dtype=float)
+    n = len(v)
+    flags = np.zeros(n, dtype=np.uint8)
+    no_data = np.zeros(n, dtype=bool)
+    for marker in no_data_markers:
+        no_data |= v == marker
+    flags[no_data] |= NO_DATA
+    x = np.where(no_data, np.nan, v)
+    finite = np.isfinite(x)
+
+    # flat-line: run of identical consecutive values (NaN never equal); zero runs are only counted
+    flat_runs = flat_rows = zero_runs = 0
+    if n > 1 and flatline_steps > 1:
+        starts, lengths = _runs(x[1:] != x[:-1])
+        long = (lengths >= flatline_steps) & finite[starts]
+        zero = long & (x[starts] == 0)
+        long &= ~zero
+        zero_runs = int(zero.sum())
+        if long.any():
+            flags[np.repeat(long, lengths)] |= FLATLINE
+            flat_runs, flat_rows = int(long.sum()), int(lengths[long].sum())
+
+    # spike: residual vs the centred median of 5, scaled by the rolling MAD (mean absolute residual
+    # of the neighbours, without the value itself, so a spike does not hide itself)
+    spikes = 0
+    if n >= 5 and finite.any():
+        filled = x if finite.all() else pd.Series(x).ffill().bfill().to_numpy()
+        resid = np.abs(filled - _median5(filled))
+        h = max(int(spike_window), 3) // 2
+        csum = np.concatenate([[0.0], np.cumsum(np.pad(resid, h))])
+        count = np.minimum(np.arange(n), h) + np.minimum(np.arange(n)[::-1], h)  # neighbours in the window
+        local = (csum[2 * h + 1:] - csum[:n] - resid) / np.maximum(count, 1.0)
+        steps = np.abs(np.diff(filled[:: max(n // 1_000_000, 1)]))
+        steps = steps[steps > 0]
+        floor = float(np.median(steps)) if len(steps) else 1e-9
+        with np.errstate(invalid="ignore"):
+            spike = resid > spike_k * np.maximum(local, floor)
+        spike &= finite & ((flags & FLATLINE) == 0)
+        flags[spike] |= SPIKE
+        spikes = int(spike.sum())
+
+    report = {
+        "missing": int((~np.isfinite(v)).sum()),
+        "no_data": int(no_data.sum()),
+        "zeros": int((x == 0).sum()),
+        "zero_runs": zero_runs,
+        "flatline_runs": flat_runs,
+        "flatline_rows": flat_rows,
+        "spikes": spikes,
+        # flat-lines are report-only, so they do not count towards the status
+        "flagged_pct": round(100.0 * float(np.count_nonzero(flags & ~np.uint8(FLATLINE))) / n, 3) if n else 0.0,
+    }
+    if finite.any():
+        report.update(min=float(np.nanmin(x)), max=float(np.nanmax(x)))
+    return report, flags
+
+
+def scan_frame(df: pd.DataFrame, columns=None, flatline_hours: float = 3.0, spike_k: float = 8.0,
+               no_data_markers=(), name: str = "") -> tuple[dict[str, Any], pd.DataFrame]:
+    """
+    Scan a frame with a ``datetime`` column and numeric value columns (all numeric by default).
+    ``no_data_markers`` apply to the scanned columns only, so pass them just for sources that use them.
+    Returns ``(report, mask)``; the mask has one row per flagged (row, series): datetime, series, flags.
+    """
+    ts = pd.to_datetime(df["datetime"]).to_numpy(dtype="datetime64[ns]")
+    time_report, time_flags, order = scan_time(ts)
+    step_h = (time_report["interval_min"] or 15.0) / 60.0
+    flatline_steps = max(int(round(flatline_hours / step_h)), 2)
+    if columns is None:
+        columns = [c for c in df.columns if c != "datetime" and pd.api.types.is_numeric_dtype(df[c])]
+
+    ts_sorted = ts if order is None else ts[order]
+    masks, series = [], {}
+    for col in columns:
+        values = df[col].to_numpy(dtype=float)
+        values = values if order is None else values[order]
+        rep, flags = scan_values(values, flatline_steps, spike_k, no_data_markers=no_data_markers)
+        flags |= time_flags if order is None else time_flags[order]
+        series[col] = rep
+        hit = np.flatnonzero(flags)
+        if len(hit):
+            masks.append(pd.DataFrame({"datetime": ts_sorted[hit], "series": col, "flags": flags[hit]}))
+
+    worst = max((r["flagged_pct"] for r in series.values()), default=0.0)
+    status = "ok"
+    if time_report["non_monotonic"] or worst > 5.0:
+        status = "error"
+    elif time_report["duplicates"] or time_report["gaps"] or worst > 0.5:
+        status = "warning"
+    report = {"name": name, "status": status, "time": time_report, "series": series}
+    mask = pd.concat(masks, ignore_index=True) if masks else pd.DataFrame(
+        {"datetime": pd.Series(dtype="datetime64[ns]"), "series": pd.Series(dtype=str), "flags": pd.Series(dtype=np.uint8)})
+    return report, mask
+
+
+def read_solargis(path: str | Path) -> pd.DataFrame:
+    """Raw SolarGIS ';' export: ``datetime`` (Date DD.MM.YYYY + Time) and numeric columns, -9 kept."""
+    df = pd.read_csv(path, sep=";", comment="#")
+    stamp = df["Date"].astype(str).str.strip()
+    if "Time" in df.columns:
+        stamp = stamp + " " + df["Time"].astype(str).str.strip()
+    values = df.drop(columns=["Date", "Time"], errors="ignore").apply(pd.to_numeric, errors="coerce")
+    values.insert(0, "datetime", pd.to_datetime(stamp, dayfirst=True, errors="coerce"))
+    return values
+
+
+def scan_solargis(df: pd.DataFrame, flatline_hours: float = 3.0, spike_k: float = 8.0,
+                  name: str = "") -> tuple[dict[str, Any], pd.DataFrame]:
+    """``scan_frame`` of the SolarGIS weather columns (``read_solargis``) with the -9 no-data marker."""
+    columns = [c for c in SOLARGIS_COLUMNS if c in df.columns]
+    return scan_frame(df, columns, flatline_hours, spike_k, no_data_markers=NO_DATA_MARKERS, name=name)
+
+
+def apply_mask(df: pd.DataFrame, mask: pd.DataFrame, flags: int = DROP_FLAGS) -> tuple[pd.DataFrame, int]:
+    """``df`` with the values of ``mask`` rows carrying any of ``flags`` set to NaN; returns (df, values nulled)."""
+    hit = mask[(mask["flags"].to_numpy() & flags) != 0]
+    if hit.empty:
+        return df, 0
+    out = df.copy()
+    ts = pd.to_datetime(out["datetime"])
+    nulled = 0
+    for col, rows in hit.groupby("series"):
+        if col not in out.columns:
+            continue
+        bad = ts.isin(pd.to_datetime(rows["datetime"])).to_numpy()
+        out[col] = out[col].astype(float).mask(bad)
+        nulled += int(bad.sum())
+    return out, nulled
+
+
+def summary_line(report: dict[str, Any]) -> str:
+    """One log line of a scan report."""
+    t = report["time"]
+    parts = [f"{t['rows']} rows", f"{t['duplicates']} duplicates", f"{t['gaps']} gaps ({t['missing_intervals']} missing)"]
+    if t["non_monotonic"]:
+        parts.append(f"{t['non_monotonic']} non-monotonic")
+    if t["dst_events"]:
+        parts.append(f"{t['dst_events']} at DST")
+    for col, r in report["series"].items():
+        found = [f"{r[k]} {k.replace('_rows', '').replace('_', '-')}" for k in ("no_data", "flatline_rows", "spikes") if r[k]]
+        if found:
+            parts.append(f"{col}: " + ", ".join(found))
+    return f"{report['name'] or 'data'} [{report['status']}] " + "; ".join(parts)
+
+
+def write_report(reports: list[dict[str, Any]], masks: list[pd.DataFrame], results_dir: str | Path) -> tuple[Path, Path]:
+    """``data_quality_report.json`` and the concatenated ``data_quality_mask.parquet`` in ``results_dir``."""
+    results_dir = Path(results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    status = "error" if any(r["status"] == "error" for r in reports) else (
+        "warning" if any(r["status"] == "warning" for r in reports) else "ok")
+    report_path = results_dir / "data_quality_report.json"
+    report_path.write_text(json.dumps({"status": status, "sources": reports}, indent=1))
+    mask = pd.concat(masks, ignore_index=True) if masks else pd.DataFrame(columns=["datetime", "series", "flags"])
+    mask_path = write_frame(mask, results_dir, "data_quality_mask", fmt="parquet")
+    return report_path, mask_path
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Scan energy time series (csv, feather, parquet) for data-quality issues.")
+    parser.add_argument("paths", nargs="*", help="load / production / price files")
+    parser.add_argument("--weather", action="append", default=[], help="SolarGIS weather export (repeatable)")
+    parser.add_argument("--out", required=True, help="directory for data_quality_report.json and data_quality_mask.parquet")
+    parser.add_argument("--flatline-hours", type=float, default=3.0)
+    parser.add_argument("--spike-k", type=float, default=8.0)
+    args = parser.parse_args(argv)
+    reports, masks = [], []
+    for path in args.paths + args.weather:
+        if path in args.weather:
+            report, mask = scan_solargis(read_solargis(path), args.flatline_hours, args.spike_k, name=Path(path).name)
+        else:
+            report, mask = scan_frame(read_frame(path), flatline_hours=args.flatline_hours, spike_k=args.spike_k,
+                                      name=Path(path).name)
+        print(f"[INFO] {summary_line(report)}")
+        reports.append(report)
+        masks.append(mask)
+    report_path, mask_path = write_report(reports, masks, args.out)
+    print(f"[SUCCESS] Data-quality report {report_path}, mask {mask_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Chart downsampling for DashboardPiece: Largest-Triangle-Three-Buckets (LTTB) and calendar tiles.
+
+``build_tiles`` turns one time series table into the resolutions the dashboard chooses from
+(hourly and daily means, and an LTTB selection of real points that keeps peaks and dips), per
+scenario when the table has several.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+TILE_RESOLUTIONS = {"hourly": "1h", "daily": "1D"}
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """
+    Indices of the ``n_out`` points LTTB keeps from the series (x ascending).
+
+    First and last points are always kept; every bucket in between contributes the point forming
+    the largest triangle with the previously kept point and the mean of the next bucket.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    y = np.where(np.isfinite(y), y, np.nanmean(y) if np.isfinite(y).any() else 0.0)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        nxt_lo = edges[i + 1]
+        nxt_hi = edges[i + 2] if i + 2 < len(edges) else n
+        nxt_hi = max(nxt_hi, nxt_lo + 1)
+        avg_x = x[nxt_lo:nxt_hi].mean()
+        avg_y = y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return np.unique(out)
+
+
+def lttb_frame(df: pd.DataFrame, time_col: str, value_cols: list[str], n_out: int) -> pd.DataFrame:
+    """Rows of ``df`` (sorted by time) kept by LTTB on any of ``value_cols``; about ``n_out`` rows in total."""
+    if len(df) <= n_out or not value_cols:
+        return df
+    x = df[time_col].to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+    per_col = max(3, n_out // len(value_cols))
+    keep = np.unique(np.concatenate([lttb_indices(x, df[c].to_numpy(dtype=float), per_col) for c in value_cols]))
+    return df.iloc[keep]
+
+
+def build_tiles(df: pd.DataFrame, time_col: str, value_cols: list[str], group_col: str | None = None,
+                lttb_points: int = 2000) -> pd.DataFrame:
+    """
+    Hourly, daily and LTTB versions of ``value_cols`` (per ``group_col`` value), stacked with a
+    ``resolution`` column.
+    """
+    value_cols = [c for c in value_cols if c in df.columns]
+    if not value_cols or time_col not in df.columns:
+        return pd.DataFrame()
+    keys = [group_col] if group_col else []
+    data = df[keys + [time_col] + value_cols].dropna(subset=[time_col]).sort_values(keys + [time_col], kind="stable")
+
+    parts = []
+    groups = data.groupby(group_col, sort=False) if group_col else [(None, data)]
+    for key, frame in groups:
+        indexed = frame.set_index(time_col)[value_cols]
+        for resolution, rule in TILE_RESOLUTIONS.items():
+            tile = indexed.resample(rule).mean().dropna(how="all").reset_index()
+            tile.insert(0, "resolution", resolution)
+            parts.append(tile.assign(**{group_col: key}) if group_col else tile)
+        tile = lttb_frame(frame, time_col, value_cols, lttb_points)[[time_col] + value_cols]
+        tile.insert(0, "resolution", "lttb")
+        parts.append(tile.assign(**{group_col: key}) if group_col else tile)
+    return pd.concat(parts, ignore_index=True)
@@ -0,0 +1,187 @@
+"""
+Vectorised investment finance for InvestmentEvalPiece.
+
+Every parameter may be a scalar or an array; arrays broadcast against each other, so one call
+evaluates a whole parameter grid. Cash flows are (..., years + 1) matrices (year 0 = CAPEX),
+NPV uses Horner's scheme over the years and IRR is a safeguarded Newton/bisection solver that
+runs on all grid points at once.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+# parameter -> default; *_pct parameters are percentage changes applied to the base value
+DEFAULTS = {
+    "solar_capex_eur": 0.0,
+    "battery_capex_eur": 0.0,
+    "annual_savings_eur": 0.0,
+    "discount_rate": 0.08,
+    "savings_escalation": 0.0,
+    "degradation_per_year": 0.0,
+    "opex_pct_of_capex": 0.0,
+    "opex_escalation": 0.0,
+    "battery_replacement_pct": 0.0,
+    "capex_pct": 0.0,
+    "annual_savings_pct": 0.0,
+}
+
+NO_PAYBACK = 999
+
+
+def _params(params: dict) -> dict[str, np.ndarray]:
+    unknown = set(params) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown finance parameters: {sorted(unknown)}")
+    merged = {k: np.asarray(params.get(k, v), dtype=float) for k, v in DEFAULTS.items()}
+    return dict(zip(merged, np.broadcast_arrays(*merged.values())))
+
+
+def cash_flow_components(params: dict, years: int, battery_replacement_year: int = 0) -> dict[str, np.ndarray]:
+    """Year-by-year CAPEX, savings, OPEX and battery replacement, each shaped (..., years + 1)."""
+    p = _params(params)
+    t = np.arange(years + 1)
+    growth = np.maximum(t - 1, 0)
+    operating = (t >= 1).astype(float)
+    capex_factor = (1 + p["capex_pct"] / 100)[..., None]
+
+    capex = (p["solar_capex_eur"] + p["battery_capex_eur"])[..., None] * capex_factor
+    savings = (
+        (p["annual_savings_eur"] * (1 + p["annual_savings_pct"] / 100))[..., None]
+        * (1 + p["savings_escalation"][..., None]) ** growth
+        * (1 - p["degradation_per_year"][..., None]) ** growth
+        * operating
+    )
+    opex = capex * p["opex_pct_of_capex"][..., None] * (1 + p["opex_escalation"][..., None]) ** growth * operating
+    replacement = np.zeros_like(savings)
+    if 0 < battery_replacement_year <= years:
+        replacement[..., battery_replacement_year] = (
+            p["battery_capex_eur"] * (1 + p["capex_pct"] / 100) * p["battery_replacement_pct"]
+        )
+    return {
+        "capex_eur": capex * (t == 0),
+        "savings_eur": savings,
+        "opex_eur": opex,
+        "battery_replacement_eur": replacement,
+    }
+
+
+def cash_flows(params: dict, years: int, battery_replacement_year: int = 0) -> np.ndarray:
+    c = cash_flow_components(params, years, battery_replacement_year)
+    return c["savings_eur"] - c["capex_eur"] - c["opex_eur"] - c["battery_replacement_eur"]
+
+
+def npv(cf: np.ndarray, rate) -> np.ndarray:
+    """sum_t cf_t / (1 + rate)^t along the last axis."""
+    x = 1.0 / (1.0 + np.asarray(rate, dtype=float))
+    acc = cf[..., -1].copy()
+    for t in range(cf.shape[-1] - 2, -1, -1):
+        acc = acc * x + cf[..., t]
+    return acc
+
+
+def _npv_and_slope(cf: np.ndarray, rate: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    x = 1.0 / (1.0 + rate)
+    value = cf[..., -1].copy()
+    weighted = cf[..., -1] * (cf.shape[-1] - 1)
+    for t in range(cf.shape[-1] - 2, -1, -1):
+        value = value * x + cf[..., t]
+        weighted = weighted * x + cf[..., t] * t
+    return value, -weighted * x
+
+
+def irr(cf: np.ndarray, low: float = -0.99, high: float = 10.0, tol: float = 1e-10, max_iter: int = 100) -> np.ndarray:
+    """
+    Internal rate of return per cash-flow row (NaN without a sign change of NPV in [low, high]).
+
+    Newton steps from 10 %, replaced by bisection whenever a step leaves the current bracket.
+    """
+    shape = cf.shape[:-1]
+    lo = np.full(shape, low)
+    hi = np.full(shape, high)
+    f_lo = npv(cf, lo)
+    valid = np.sign(f_lo) * np.sign(npv(cf, hi)) < 0
+
+    rate = np.full(shape, 0.1)
+    for _ in range(max_iter):
+        f, slope = _npv_and_slope(cf, rate)
+        same = np.sign(f) == np.sign(f_lo)
+        lo = np.where(same, rate, lo)
+        f_lo = np.where(same, f, f_lo)
+        hi = np.where(same, hi, rate)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = rate - f / slope
+        inside = np.isfinite(step) & (step > lo) & (step < hi)
+        new_rate = np.where(inside, step, 0.5 * (lo + hi))
+        done = np.abs(new_rate - rate) < tol
+        rate = new_rate
+        if done[valid].all():
+            break
+    return np.where(valid, rate, np.nan)
+
+
+def discounted_payback(cf: np.ndarray, rate) -> np.ndarray:
+    """Years until the cumulative discounted cash flow turns positive (interpolated), NO_PAYBACK if never."""
+    t = np.arange(cf.shape[-1])
+    disc = cf / (1.0 + np.asarray(rate, dtype=float)[..., None]) ** t
+    cum = np.cumsum(disc, axis=-1)
+    positive = cum >= 0
+    reached = positive[..., 1:].any(axis=-1)
+    first = np.argmax(positive[..., 1:], axis=-1) + 1
+    before = np.take_along_axis(cum, (first - 1)[..., None], axis=-1)[..., 0]
+    step = np.take_along_axis(disc, first[..., None], axis=-1)[..., 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        years = first - 1 + np.where(step > 0, -before / step, 1.0)
+    return np.where(reached, years, NO_PAYBACK)
+
+
+def evaluate(params: dict, years: int, battery_replacement_year: int = 0) -> dict[str, np.ndarray]:
+    """NPV, IRR and discounted payback for every (broadcast) parameter combination."""
+    cf = cash_flows(params, years, battery_replacement_year)
+    rate = _params(params)["discount_rate"]
+    return {
+        "npv_eur": npv(cf, rate),
+        "irr": irr(cf),
+        "discounted_payback_years": discounted_payback(cf, rate),
+    }
+
+
+def grid(base: dict, axes: dict[str, np.ndarray], years: int, battery_replacement_year: int = 0) -> pd.DataFrame:
+    """Full factorial grid over ``axes`` (other parameters from ``base``), one row per combination."""
+    names = list(axes)
+    mesh = np.meshgrid(*[np.asarray(axes[n], dtype=float) for n in names], indexing="ij")
+    flat = {n: m.ravel() for n, m in zip(names, mesh)}
+    out = pd.DataFrame(flat)
+    for key, values in evaluate({**base, **flat}, years, battery_replacement_year).items():
+        out[key] = values
+    return out
+
+
+def tornado(base: dict, ranges: dict[str, tuple[float, float]], years: int, battery_replacement_year: int = 0) -> pd.DataFrame:
+    """NPV/IRR with one parameter at a time at its low and high value, sorted by NPV swing."""
+    names = list(ranges)
+    n = len(names)
+    params = {k: np.full(2 * n, float(base.get(k, DEFAULTS[k]))) for k in DEFAULTS}
+    for i, name in enumerate(names):
+        params[name][2 * i] = ranges[name][0]
+        params[name][2 * i + 1] = ranges[name][1]
+    res = evaluate(params, years, battery_replacement_year)
+    out = pd.DataFrame({
+        "parameter": names,
+        "base_value": [float(base.get(k, DEFAULTS[k])) for k in names],
+        "low_value": [ranges[k][0] for k in names],
+        "high_value": [ranges[k][1] for k in names],
+        "npv_low_eur": res["npv_eur"][0::2],
+        "npv_high_eur": res["npv_eur"][1::2],
+        "irr_low": res["irr"][0::2],
+        "irr_high": res["irr"][1::2],
+    })
+    out["npv_swing_eur"] = (out["npv_high_eur"] - out["npv_low_eur"]).abs()
+    return out.sort_values("npv_swing_eur", ascending=False).reset_index(drop=True)
+
+
+def heatmap(base: dict, x: str, x_values, y: str, y_values, years: int, battery_replacement_year: int = 0,
+            metric: str = "npv_eur") -> pd.DataFrame:
+    """``metric`` over a two-parameter grid as a table: rows = y values, columns = x values."""
+    table = grid(base, {y: y_values, x: x_values}, years, battery_replacement_year)
+    return table.pivot(index=y, columns=x, values=metric)
@@ -0,0 +1,71 @@
+"""Load forecast features and model settings shared by TrainModelPiece, PredictPiece and BacktestPiece."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .timegrid import interval_hours
+
+TARGET = "load_kw"
+# lag column -> lag in hours; the names come from the 15 min grid and stay fixed on every resolution
+LAGS = {"lag_1": 0.25, "lag_4": 1.0}
+
+XGB_PARAMS = {
+    "objective": "reg:squarederror",
+    "learning_rate": 0.05,
+    "max_depth": 6,
+    "n_estimators": 350,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+}
+
+
+def lag_steps(interval_h: float, lags=LAGS) -> dict[str, int]:
+    """Lag column -> shift in rows on a grid of ``interval_h`` hours (at least one row)."""
+    return {name: max(1, int(round(hours / interval_h))) for name, hours in lags.items()}
+
+
+def add_features(df: pd.DataFrame, target: str = TARGET, lags=LAGS, interval_h: float | None = None) -> pd.DataFrame:
+    """
+    Time features (hour, dayofweek, month) and target lags (lag_1 = 15 min, lag_4 = 1 h), in place;
+    rows are not dropped. The lag shifts follow ``interval_h`` (default: the interval of ``df``).
+    """
+    df["hour"] = df["datetime"].dt.hour
+    df["dayofweek"] = df["datetime"].dt.dayofweek
+    df["month"] = df["datetime"].dt.month
+    for name, steps in lag_steps(interval_hours(df) if interval_h is None else interval_h, lags).items():
+        df[name] = df[target].shift(steps)
+    return df
+
+
+def feature_columns(df: pd.DataFrame, target: str = TARGET) -> list[str]:
+    return [c for c in df.columns if c not in ["datetime", target]]
+
+
+def make_model(**overrides):
+    from xgboost import XGBRegressor
+
+    return XGBRegressor(**{**XGB_PARAMS, **overrides})
+
+
+def recursive_forecast(model, features: np.ndarray, target: np.ndarray, origins: np.ndarray,
+                       horizon: int, lag_columns: dict[int, int]) -> np.ndarray:
+    """
+    Multi-step forecasts from several origins at once; returns (origins x horizon).
+
+    Row ``o + k`` of ``features`` supplies the exogenous features of step k for origin o. Lag
+    columns (``lag_columns``: column index -> lag in rows) take the actual target before the origin and
+    the model's own earlier predictions after it, so one ``predict`` call per step covers all
+    origins.
+    """
+    origins = np.asarray(origins, dtype=np.int64)
+    preds = np.empty((len(origins), horizon))
+    for k in range(horizon):
+        X = features[origins + k].astype(np.float32, copy=True)
+        for col, lag in lag_columns.items():
+            if k >= lag:
+                X[:, col] = preds[:, k - lag]
+            else:
+                X[:, col] = target[origins + k - lag]
+        preds[:, k] = model.predict(X)
+    return preds
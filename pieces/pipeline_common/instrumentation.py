@@ -0,0 +1,262 @@
+"""
+Per-piece performance instrumentation: timed spans, rows/s, memory and bytes in / out.
+
+``instrumented_piece`` wraps a piece's ``piece_function`` (outside ``cached_piece``) and writes
+``metrics.json`` next to the piece outputs::
+
+    {"piece", "task_id", "status", "started_utc", "wall_s", "cpu_s", "peak_rss_mb", "rss_growth_mb",
+     "input_bytes", "output_bytes", "result_cache", "profile",
+     "spans": [{"kind", "label", "depth", "wall_s", "cpu_s", "rows", "rows_per_s", "bytes", "peak_rss_mb", "rss_growth_mb"}]}
+
+Pieces mark their phases with ``span("load" | "transform" | "compute" | "write", label)``;
+``interchange.read_frame`` and ``write_frame`` record their load / write spans themselves. A span
+costs two clock reads and one ``getrusage`` call; outside an instrumented piece it records nothing.
+
+CPU time is process CPU (it includes the threads of xgboost / numpy, and of concurrent stages under
+``local_runner``). Peak RSS is the high-water mark of the process at the end of the span;
+``rss_growth_mb`` is how much the span raised it. ``depth`` > 0 marks a span inside another one
+(e.g. a ``read_frame`` load inside a transform).
+
+Environment:
+    PIPELINE_PROFILE   "1" / "on" also writes ``profile.pstats`` (cProfile of piece_function) and
+                       adds the peak Python allocation of every span (``py_peak_mb``, tracemalloc)
+"""
+from __future__ import annotations
+
+import cProfile
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_FILE = "metrics.json"
+PROFILE_FILE = "profile.pstats"
+SPAN_KINDS = ("load", "transform", "compute", "write")
+
+_current: ContextVar[PieceMetrics | None] = ContextVar("piece_metrics", default=None)
+
+
+def profiling_enabled() -> bool:
+    return os.environ.get("PIPELINE_PROFILE", "").strip().lower() in ("1", "on", "true", "yes")
+
+
+def _peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def snapshot(directory: Path) -> dict[str, tuple[int, int]]:
+    """path -> (size, mtime_ns) of every file under ``directory``."""
+    if not directory.is_dir():
+        return {}
+    out = {}
+    for p in directory.rglob("*"):
+        if p.is_file():
+            st = p.stat()
+            out[str(p)] = (st.st_size, st.st_mtime_ns)
+    return out
+
+
+def input_bytes(inputs: dict[str, Any]) -> int:
+    """Size of the files and directories the string inputs of a piece name (comma separated lists included)."""
+    total = 0
+    for value in inputs.values():
+        if not isinstance(value, str) or not value:
+            continue
+        for part in value.split(","):
+            p = Path(part.strip())
+            try:
+                if p.is_file():
+                    total += p.stat().st_size
+                elif p.is_dir():
+                    total += sum(q.stat().st_size for q in p.rglob("*") if q.is_file())
+            except OSError:
+                continue
+    return total
+
+
+class Span:
+    """Handle yielded by ``span``: set ``rows`` / ``bytes`` once they are known."""
+
+    __slots__ = ("kind", "label", "rows", "bytes")
+
+    def __init__(self, kind: str, label: str, rows: int | None, nbytes: int | None):
+        self.kind = kind
+        self.label = label
+        self.rows = rows
+        self.bytes = nbytes
+
+
+class PieceMetrics:
+    """Spans and totals of one piece run."""
+
+    def __init__(self, piece: str, task_id: str | None = None, profile: bool = False):
+        self.piece = piece
+        self.task_id = task_id
+        self.profile = profile
+        self.spans: list[dict[str, Any]] = []
+        self.info: dict[str, Any] = {}
+        self._py_peaks: list[int] = []
+        self._depth = 0
+
+    def _begin(self) -> tuple[float, float, float]:
+        if self.profile and tracemalloc.is_tracing():
+            # nested spans: the enclosing span keeps the peak seen so far, this one starts from zero
+            if self._py_peaks:
+                self._py_peaks[-1] = max(self._py_peaks[-1], tracemalloc.get_traced_memory()[1])
+            self._py_peaks.append(0)
+            tracemalloc.reset_peak()
+        return time.perf_counter(), time.process_time(), _peak_rss_mb()
+
+    def _end(self, start: tuple[float, float, float]) -> dict[str, Any]:
+        wall = time.perf_counter() - start[0]
+        cpu = time.process_time() - start[1]
+        rss = _peak_rss_mb()
+        out = {
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "peak_rss_mb": round(rss, 1),
+            "rss_growth_mb": round(rss - start[2], 1),
+        }
+        if self.profile and tracemalloc.is_tracing() and self._py_peaks:
+            peak = max(self._py_peaks.pop(), tracemalloc.get_traced_memory()[1])
+            if self._py_peaks:
+                self._py_peaks[-1] = max(self._py_peaks[-1], peak)
+            out["py_peak_mb"] = round(peak / 1e6, 1)
+        return out
+
+    @contextmanager
+    def span(self, kind: str, label: str = "", rows: int | None = None, nbytes: int | None = None):
+        record = Span(kind, label, rows, nbytes)
+        depth = self._depth
+        self._depth += 1
+        start = self._begin()
+        try:
+            yield record
+        finally:
+            measured = self._end(start)
+            self._depth = depth
+            rows = int(record.rows) if record.rows is not None else None
+            self.spans.append({
+                "kind": record.kind,
+                "label": record.label,
+                "depth": depth,
+                **measured,
+                "rows": rows,
+                "rows_per_s": round(rows / measured["wall_s"], 1) if rows and measured["wall_s"] > 0 else None,
+                "bytes": int(record.bytes) if record.bytes is not None else None,
+            })
+
+
+@contextmanager
+def span(kind: str, label: str = "", rows: int | None = None, nbytes: int | None = None):
+    """
+    Time a phase of the running piece (``kind`` one of SPAN_KINDS). The yielded handle takes
+    ``rows`` and ``bytes`` when they are only known at the end; no-op outside ``instrumented_piece``.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield Span(kind, label, rows, nbytes)
+        return
+    with metrics.span(kind, label, rows, nbytes) as record:
+        yield record
+
+
+def annotate(**values: Any) -> None:
+    """Add top-level fields to the ``metrics.json`` of the running piece (e.g. result_cache="hit")."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.info.update(values)
+
+
+def instrumented_piece(piece_function):
+    """
+    Decorator for ``piece_function(self, input_data)``: collect the spans of the run and write
+    ``metrics.json`` (and ``profile.pstats`` with PIPELINE_PROFILE) to the piece's ``results_path``,
+    also when the piece fails.
+    """
+    @functools.wraps(piece_function)
+    def wrapper(self, input_data):
+        results_dir = Path(getattr(self, "results_path", None) or ".")
+        metrics = PieceMetrics(type(self).__name__, getattr(self, "task_id", None), profile=profiling_enabled())
+        inputs = input_data.model_dump() if hasattr(input_data, "model_dump") else {}
+        before = snapshot(results_dir)
+        started_utc = datetime.now(timezone.utc).isoformat()
+
+        profiler = None
+        started_tracing = False
+        if metrics.profile:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:  # another profiler is active (concurrent stages on Python >= 3.12)
+                profiler = None
+
+        token = _current.set(metrics)
+        status = "failed"
+        start = metrics._begin()
+        try:
+            output = piece_function(self, input_data)
+            status = "ok"
+            return output
+        finally:
+            totals = metrics._end(start)
+            _current.reset(token)
+            if profiler is not None:
+                profiler.disable()
+            if started_tracing:
+                tracemalloc.stop()
+            _write_metrics(metrics, results_dir, before, inputs, started_utc, status, totals, profiler)
+
+    return wrapper
+
+
+def _write_metrics(metrics: PieceMetrics, results_dir: Path, before: dict[str, tuple[int, int]], inputs: dict[str, Any],
+                   started_utc: str, status: str, totals: dict[str, Any], profiler: cProfile.Profile | None) -> None:
+    try:
+        results_dir.mkdir(parents=True, exist_ok=True)
+        own = {METRICS_FILE, PROFILE_FILE}
+        output_bytes = sum(
+            stamp[0] for path, stamp in snapshot(results_dir).items()
+            if before.get(path) != stamp and Path(path).name not in own
+        )
+        profile_path = None
+        if profiler is not None:
+            profile_path = results_dir / PROFILE_FILE
+            profiler.dump_stats(profile_path)
+        record = {
+            "piece": metrics.piece,
+            "task_id": metrics.task_id,
+            "status": status,
+            "started_utc": started_utc,
+            **totals,
+            "input_bytes": input_bytes(inputs),
+            "output_bytes": output_bytes,
+            "result_cache": "off",
+            **metrics.info,
+            "profile": str(profile_path) if profile_path else None,
+            "spans": metrics.spans,
+        }
+        (results_dir / METRICS_FILE).write_text(json.dumps(record, indent=1, default=str))
+        print(f"[METRIC] {metrics.piece}: {totals['wall_s']:.2f} s wall, {totals['cpu_s']:.2f} s CPU, "
+              f"peak RSS {totals['peak_rss_mb']:.0f} MB, in {record['input_bytes'] / 1e6:.1f} MB, "
+              f"out {output_bytes / 1e6:.1f} MB ({len(metrics.spans)} spans, {results_dir / METRICS_FILE})")
+    except OSError as exc:
+        print(f"[WARNING] Could not write {METRICS_FILE} for {metrics.piece}: {exc}")
@@ -0,0 +1,322 @@
+"""Table hand-off between pieces: CSV, Arrow IPC (Feather) or Parquet.
+
+Producers call ``write_frame`` with the ``output_format`` chosen in their InputModel;
+consumers call ``read_frame``, which detects the format from the file itself, so a
+downstream piece never needs to know how the upstream one was configured.
+
+Inside ``in_memory_interchange`` (used by ``local_runner``) the frames stay in the process:
+``write_frame`` keeps the DataFrame under its path and ``read_frame`` of that path returns it
+without any file round trip.
+
+The interval length of a frame (``df.attrs["interval_h"]``, see ``timegrid``) is kept in the schema
+metadata of feather / parquet files and restored by ``read_frame``.
+
+``read_frame(path, columns=..., start=..., end=...)`` pushes the column projection and the time
+window down to the pyarrow dataset scan: Parquet files (and hive-partitioned Parquet directories,
+pruned on a ``year`` partition) decode only the row groups whose ``datetime`` statistics overlap
+the window. ``write_frame`` writes Parquet in row groups of ``PARQUET_ROW_GROUP_ROWS`` with
+statistics; ``sort_by`` orders the rows first, so every row group covers a narrow time range.
+"""
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from .instrumentation import span
+from .timegrid import INTERVAL_KEY
+
+INTERCHANGE_FORMATS = {
+    "csv": ".csv",
+    "feather": ".feather",
+    "parquet": ".parquet",
+}
+
+_SUFFIX_FORMATS = {
+    ".csv": "csv",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".ipc": "feather",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+}
+
+# ~1 year at 15 min or ~3 weeks at 1 min per row group: a few weeks' window decodes one or two groups
+PARQUET_ROW_GROUP_ROWS = 32_768
+
+_TS = pa.timestamp("ns")
+_F64 = pa.float64()
+
+# Explicit Arrow types for the columns handed between pieces. Columns that are not
+# listed keep the type inferred from pandas (e.g. feature columns in predictions).
+DATASET_SCHEMAS: dict[str, dict[str, pa.DataType]] = {
+    "predictions": {
+        "datetime": _TS,
+        "load_kw": _F64,
+        "production_ton": _F64,
+        "price_eur_kwh": _F64,
+        "price_eur_mwh": _F64,
+        "prediction_load_kw": _F64,
+    },
+    "virtual_solar": {
+        "datetime": _TS,
+        "solar_kw": _F64,
+    },
+    "virtual_battery_soc": {
+        "datetime": _TS,
+        "soc_pct": _F64,
+        "grid_import_kw": _F64,
+    },
+    "simulated_results": {
+        "datetime": _TS,
+        "baseline_load_kw": _F64,
+        "simulated_load_kw": _F64,
+        "price_eur_kwh": _F64,
+        "baseline_cost_eur": _F64,
+        "scenario_cost_eur": _F64,
+    },
+}
+
+
+_memory: dict[str, pd.DataFrame] | None = None
+_memory_materialize = True
+_memory_lock = threading.Lock()
+
+
+@contextmanager
+def in_memory_interchange(materialize: bool = False):
+    """
+    Hand frames between pieces of one process in memory: ``write_frame`` keeps the DataFrame under
+    its path (files are still written with ``materialize=True``), ``read_frame`` of that path gets it
+    back. Runs under pandas copy-on-write, so the hand-off is a lazy shallow copy and a consumer
+    changing its input never changes what the producer or other consumers see.
+    """
+    global _memory, _memory_materialize
+    if _memory is not None:
+        raise RuntimeError("in_memory_interchange is already active")
+    _memory, _memory_materialize = {}, materialize
+    try:
+        with pd.option_context("mode.copy_on_write", True):
+            yield _memory
+    finally:
+        _memory, _memory_materialize = None, True
+
+
+def memory_active() -> bool:
+    return _memory is not None
+
+
+def _memory_key(path: str | Path) -> str:
+    return str(Path(path).resolve())
+
+
+def memory_frame(path: str | Path | None) -> pd.DataFrame | None:
+    """The frame ``write_frame`` kept for ``path`` inside ``in_memory_interchange`` (a lazy copy), else None."""
+    if _memory is None or not path:
+        return None
+    with _memory_lock:
+        df = _memory.get(_memory_key(path))
+    return df.copy(deep=False) if df is not None else None
+
+
+def frame_exists(path: str | Path | None) -> bool:
+    """``path`` is a file or a frame held by ``in_memory_interchange``."""
+    return bool(path) and (Path(path).exists() or memory_frame(path) is not None)
+
+
+def validate_format(fmt: str) -> str:
+    fmt = (fmt or "csv").lower()
+    if fmt == "arrow":
+        fmt = "feather"
+    if fmt not in INTERCHANGE_FORMATS:
+        raise ValueError(f"Unsupported interchange format '{fmt}'. Use one of: {sorted(INTERCHANGE_FORMATS)}")
+    return fmt
+
+
+def detect_format(path: str | Path) -> str:
+    """Format of an interchange file: magic bytes first, file suffix as fallback."""
+    path = Path(path)
+    try:
+        with open(path, "rb") as f:
+            head = f.read(6)
+    except OSError:
+        head = b""
+    if head == b"ARROW1":
+        return "feather"
+    if head[:4] == b"PAR1":
+        return "parquet"
+    return _SUFFIX_FORMATS.get(path.suffix.lower(), "csv")
+
+
+def to_arrow(df: pd.DataFrame, dataset: str | None = None) -> pa.Table:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if df.attrs.get(INTERVAL_KEY):
+        metadata = {**(table.schema.metadata or {}), INTERVAL_KEY.encode(): str(df.attrs[INTERVAL_KEY]).encode()}
+        table = table.replace_schema_metadata(metadata)
+    schema = DATASET_SCHEMAS.get(dataset or "", {})
+    if not schema:
+        return table
+    fields = [
+        pa.field(f.name, schema[f.name]) if f.name in schema else f
+        for f in table.schema
+    ]
+    return table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+
+def _conform(df: pd.DataFrame, dataset: str | None) -> pd.DataFrame:
+    """``df`` with the float columns of its ``DATASET_SCHEMAS`` entry as float64, as after a columnar round trip."""
+    schema = DATASET_SCHEMAS.get(dataset or "", {})
+    cast = {c: "float64" for c, t in schema.items() if t == _F64 and c in df.columns and df[c].dtype != "float64"}
+    return df.astype(cast) if cast else df.copy(deep=False)
+
+
+def write_frame(
+    df: pd.DataFrame,
+    results_dir: str | Path,
+    stem: str,
+    fmt: str = "csv",
+    dataset: str | None = None,
+    export_csv: bool = False,
+    date_format: str | None = None,
+    sort_by: str | None = None,
+) -> Path:
+    """
+    Write ``df`` as ``<results_dir>/<stem>.<ext>`` and return the path.
+
+    Feather files are written uncompressed so readers can memory-map them without a
+    decode step. ``export_csv`` additionally writes ``<stem>.csv`` next to a columnar file.
+    ``sort_by`` (e.g. "datetime") sorts the rows first so Parquet row-group statistics
+    are tight for ``read_frame(start=..., end=...)``.
+    """
+    fmt = validate_format(fmt)
+    path = Path(results_dir) / f"{stem}{INTERCHANGE_FORMATS[fmt]}"
+    if sort_by and sort_by in df.columns and not df[sort_by].is_monotonic_increasing:
+        df = df.sort_values(sort_by, kind="stable", ignore_index=True)
+    with span("write", path.name, rows=len(df), nbytes=0) as record:
+        if _memory is not None:
+            with _memory_lock:
+                _memory[_memory_key(path)] = _conform(df, dataset)
+            if not _memory_materialize:
+                return path
+        if fmt == "csv":
+            df.to_csv(path, index=False, date_format=date_format)
+        else:
+            table = to_arrow(df, dataset)
+            if fmt == "feather":
+                feather.write_feather(table, path, compression="uncompressed")
+            else:
+                pq.write_table(table, path, row_group_size=PARQUET_ROW_GROUP_ROWS, write_statistics=True)
+            if export_csv:
+                df.to_csv(path.with_suffix(".csv"), index=False, date_format=date_format)
+                record.bytes += path.with_suffix(".csv").stat().st_size
+        record.bytes += path.stat().st_size
+    return path
+
+
+def _timestamp(value) -> pd.Timestamp | None:
+    return None if value is None or value == "" else pd.Timestamp(value)
+
+
+def _window_filter(schema: pa.Schema, time_column: str, start, end) -> ds.Expression | None:
+    """``start <= time_column < end`` as a dataset expression, None if the column is not a timestamp."""
+    if time_column not in schema.names or not pa.types.is_timestamp(schema.field(time_column).type):
+        return None
+    ts_type = schema.field(time_column).type
+    expr = None
+    for bound, op in ((start, "ge"), (end, "lt")):
+        if bound is None:
+            continue
+        value = pa.scalar(bound.value, type=pa.int64()).cast(pa.timestamp("ns", tz=ts_type.tz)).cast(ts_type)
+        term = ds.field(time_column) >= value if op == "ge" else ds.field(time_column) < value
+        expr = term if expr is None else expr & term
+    if "year" in schema.names and pa.types.is_integer(schema.field("year").type):
+        # hive partície podľa roku: celé adresáre mimo okna sa ani neotvoria
+        if start is not None:
+            expr &= ds.field("year") >= start.year
+        if end is not None:
+            expr &= ds.field("year") <= end.year
+    return expr
+
+
+def _slice_window(df: pd.DataFrame, time_column: str, start, end) -> pd.DataFrame:
+    if time_column not in df.columns:
+        return df
+    ts = pd.to_datetime(df[time_column])
+    keep = pd.Series(True, index=df.index)
+    if start is not None:
+        keep &= ts >= start
+    if end is not None:
+        keep &= ts < end
+    return df if keep.all() else df[keep.to_numpy()].reset_index(drop=True)
+
+
+def read_frame(
+    path: str | Path,
+    columns: Sequence[str] | None = None,
+    parse_dates: Iterable[str] = ("datetime",),
+    start=None,
+    end=None,
+    time_column: str = "datetime",
+) -> pd.DataFrame:
+    """
+    Read a table written by ``write_frame`` (or any plain CSV/Feather/Parquet file, or a
+    hive-partitioned Parquet directory).
+
+    Columnar files are memory-mapped; CSV date columns listed in ``parse_dates`` are
+    converted when present. Frames held by ``in_memory_interchange`` are served without I/O.
+    ``start`` / ``end`` (inclusive / exclusive, anything ``pd.Timestamp`` takes) keep only the rows of
+    that window of ``time_column``; for Parquet the window and ``columns`` are pushed down to the scan.
+    """
+    path = Path(path)
+    cols = list(columns) if columns is not None else None
+    start, end = _timestamp(start), _timestamp(end)
+    windowed = start is not None or end is not None
+    # the time column is read for the filter even when it is not projected
+    read_cols = cols + [time_column] if windowed and cols is not None and time_column not in cols else cols
+    with span("load", path.name) as record:
+        df = memory_frame(path)
+        if df is not None:
+            df = df[read_cols] if read_cols is not None else df
+            record.bytes = 0
+        else:
+            fmt = "parquet" if path.is_dir() else detect_format(path)
+            if fmt == "csv":
+                df = pd.read_csv(path, usecols=read_cols)
+            else:
+                if fmt == "parquet" and (windowed or path.is_dir()):
+                    dataset = ds.dataset(path, format="parquet", partitioning="hive" if path.is_dir() else None)
+                    expr = _window_filter(dataset.schema, time_column, start, end) if windowed else None
+                    table = dataset.to_table(columns=cols if expr is not None else read_cols, filter=expr)
+                    metadata = dataset.schema.metadata
+                else:
+                    read = feather.read_table if fmt == "feather" else pq.read_table
+                    table = read(path, columns=read_cols, memory_map=True)
+                    expr = _window_filter(table.schema, time_column, start, end) if windowed else None
+                    if expr is not None:
+                        table = table.filter(expr)
+                        table = table.select(cols) if cols is not None else table
+                    metadata = table.schema.metadata
+                if expr is not None:
+                    windowed = False  # already filtered by the scan
+                df = table.to_pandas()
+                interval = (metadata or {}).get(INTERVAL_KEY.encode())
+                if interval:
+                    df.attrs[INTERVAL_KEY] = float(interval)
+            record.bytes = sum(f.stat().st_size for f in path.rglob("*.parquet")) if path.is_dir() else path.stat().st_size
+        for col in parse_dates:
+            if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = pd.to_datetime(df[col])
+        if windowed:
+            attrs = dict(df.attrs)
+            df = _slice_window(df, time_column, start, end)
+            df = df[cols] if cols is not None else df
+            df.attrs.update(attrs)
+        record.rows = len(df)
+    return df
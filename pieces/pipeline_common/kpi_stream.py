@@ -0,0 +1,262 @@
+"""
+Mergeable KPI accumulators for continuous operation.
+
+A ``KPIAccumulator`` keeps only additive state (sums, row counts, daily energy and production
+totals, running peak maxima) plus a bottom-k sample of the simulated load for percentiles, and a
+high-water mark per input so each update touches only intervals newer than the last run.
+
+The percentile sample keeps the k rows with the smallest hash of (timestamp, accumulator name).
+That choice does not depend on the order of updates, so chunked updates, merged partial states
+and one batch pass all keep the same sample (and exact quantiles while rows <= k).
+
+Annual figures are scaled by the covered time, kept as a union of [start, end) periods rather than
+derived from the row count: consecutive time chunks of one site add up, while several sites over the
+same year still cover one year (so merged savings are the sum of the site figures, not their mean).
+"""
+from __future__ import annotations
+
+import json
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SUM_KEYS = ("rows", "baseline_kwh", "energy_kwh", "baseline_cost_eur", "scenario_cost_eur", "pv_kwh")
+
+
+def _priority(ts_ns: np.ndarray, salt: int) -> np.ndarray:
+    """Deterministic uniform [0, 1) per timestamp (splitmix64 of the nanoseconds)."""
+    x = ts_ns.astype(np.uint64) ^ np.uint64(salt)
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(float) / float(1 << 53)
+
+
+def _covered_periods(ts_ns: np.ndarray, step_ns: int) -> list[list[int]]:
+    """[start, end) runs of sorted timestamps; a step longer than the interval starts a new run."""
+    if not len(ts_ns):
+        return []
+    breaks = np.flatnonzero(np.diff(ts_ns) > step_ns) + 1
+    starts = ts_ns[np.r_[0, breaks]]
+    ends = ts_ns[np.r_[breaks - 1, len(ts_ns) - 1]] + step_ns
+    return [[int(a), int(b)] for a, b in zip(starts, ends)]
+
+
+def _union(periods: list[list[int]]) -> list[list[int]]:
+    """Sorted, non-overlapping union of [start, end) periods (touching periods are joined)."""
+    out: list[list[int]] = []
+    for start, end in sorted(periods):
+        if out and start <= out[-1][1]:
+            out[-1][1] = max(out[-1][1], end)
+        else:
+            out.append([start, end])
+    return out
+
+
+def _add_daily(target: dict, values: pd.Series) -> None:
+    for day, value in values.items():
+        key = day.strftime("%Y-%m-%d")
+        target[key] = target.get(key, 0.0) + float(value)
+
+
+class KPIAccumulator:
+    """Streaming state of one scenario/site; ``result()`` gives the KPIPiece whole-period KPIs."""
+
+    def __init__(self, name: str = "", interval_h: float = 0.25, sample_size: int = 4096):
+        self.name = name
+        self.interval_h = interval_h
+        self.sample_size = sample_size
+        self.sums = dict.fromkeys(SUM_KEYS, 0.0)
+        self.baseline_peak_kw = float("-inf")
+        self.simulated_peak_kw = float("-inf")
+        self.daily_energy_kwh: dict[str, float] = {}
+        self.daily_production_ton: dict[str, float] = {}
+        self.sample_keys = np.empty(0)
+        self.sample_values = np.empty(0)
+        self.periods: list[list[int]] = []  # covered [start, end) in ns since epoch
+        self.last_sim_ts: pd.Timestamp | None = None
+        self.last_prod_ts: pd.Timestamp | None = None
+
+    @property
+    def covered_hours(self) -> float:
+        return sum(end - start for start, end in self.periods) / 3.6e12
+
+    # ---------------- updates ----------------
+
+    def update(self, sim: pd.DataFrame, prod: pd.DataFrame | None = None) -> int:
+        """Add simulated_results (and production) rows newer than the high-water marks; returns new sim rows."""
+        sim = sim.sort_values("datetime")
+        if self.last_sim_ts is not None:
+            sim = sim[sim["datetime"] > self.last_sim_ts]
+        if len(sim):
+            self._add_sim(sim)
+            self.last_sim_ts = sim["datetime"].iloc[-1]
+
+        if prod is not None:
+            prod = prod.sort_values("datetime")
+            if self.last_prod_ts is not None:
+                prod = prod[prod["datetime"] > self.last_prod_ts]
+            if len(prod):
+                daily = prod.set_index("datetime")["production_ton"].groupby(lambda t: t.normalize()).sum()
+                _add_daily(self.daily_production_ton, daily)
+                self.last_prod_ts = prod["datetime"].iloc[-1]
+        return len(sim)
+
+    def _add_sim(self, sim: pd.DataFrame) -> None:
+        h = self.interval_h
+        baseline = sim["baseline_load_kw"].to_numpy(dtype=float)
+        simulated = sim["simulated_load_kw"].to_numpy(dtype=float)
+
+        self.sums["rows"] += len(sim)
+        self.sums["baseline_kwh"] += baseline.sum() * h
+        self.sums["energy_kwh"] += simulated.sum() * h
+        self.sums["pv_kwh"] += np.clip(baseline - simulated, 0, None).sum() * h
+        for col in ("baseline_cost_eur", "scenario_cost_eur"):
+            if col in sim.columns:
+                self.sums[col] += float(sim[col].sum())
+        self.baseline_peak_kw = max(self.baseline_peak_kw, float(baseline.max()))
+        self.simulated_peak_kw = max(self.simulated_peak_kw, float(simulated.max()))
+
+        energy = pd.Series(simulated * h, index=pd.DatetimeIndex(sim["datetime"]))
+        _add_daily(self.daily_energy_kwh, energy.groupby(energy.index.normalize()).sum())
+
+        ts_ns = sim["datetime"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        self.periods = _union(self.periods + _covered_periods(ts_ns, int(round(h * 3.6e12))))
+
+        keys = _priority(ts_ns, zlib.crc32(self.name.encode()))
+        self._keep_sample(np.concatenate([self.sample_keys, keys]), np.concatenate([self.sample_values, simulated]))
+
+    def _keep_sample(self, keys: np.ndarray, values: np.ndarray) -> None:
+        if len(keys) > self.sample_size:
+            idx = np.argpartition(keys, self.sample_size - 1)[: self.sample_size]
+            keys, values = keys[idx], values[idx]
+        self.sample_keys, self.sample_values = keys, values
+
+    def merge(self, other: "KPIAccumulator", name: str | None = None) -> "KPIAccumulator":
+        """
+        Combined state of two sites/periods (e.g. a portfolio total); inputs are not modified.
+        The covered time is the union of both, so only consecutive chunks extend the annualisation base.
+        """
+        out = KPIAccumulator(name if name is not None else self.name, self.interval_h, min(self.sample_size, other.sample_size))
+        out.sums = {k: self.sums[k] + other.sums[k] for k in SUM_KEYS}
+        out.baseline_peak_kw = max(self.baseline_peak_kw, other.baseline_peak_kw)
+        out.simulated_peak_kw = max(self.simulated_peak_kw, other.simulated_peak_kw)
+        for attr in ("daily_energy_kwh", "daily_production_ton"):
+            merged = dict(getattr(self, attr))
+            for day, value in getattr(other, attr).items():
+                merged[day] = merged.get(day, 0.0) + value
+            setattr(out, attr, merged)
+        out.periods = _union(self.periods + other.periods)
+        out._keep_sample(np.concatenate([self.sample_keys, other.sample_keys]),
+                         np.concatenate([self.sample_values, other.sample_values]))
+        marks = [t for t in (self.last_sim_ts, other.last_sim_ts) if t is not None]
+        out.last_sim_ts = max(marks) if marks else None
+        marks = [t for t in (self.last_prod_ts, other.last_prod_ts) if t is not None]
+        out.last_prod_ts = max(marks) if marks else None
+        return out
+
+    # ---------------- results ----------------
+
+    def quantile(self, q: float) -> float:
+        return float(np.quantile(self.sample_values, q)) if len(self.sample_values) else 0.0
+
+    def _kwh_per_ton(self) -> float:
+        # ako KPIPiece: dni v spoločnom rozsahu simulácie a produkcie (dni bez dát = 0)
+        if not self.daily_energy_kwh or not self.daily_production_ton:
+            return 0.0
+        start = max(min(self.daily_energy_kwh), min(self.daily_production_ton))
+        end = min(max(self.daily_energy_kwh), max(self.daily_production_ton))
+        energy = sum(v for d, v in self.daily_energy_kwh.items() if start <= d <= end)
+        production = sum(v for d, v in self.daily_production_ton.items() if start <= d <= end)
+        return energy / production if production > 0 else 0.0
+
+    def result(self) -> dict:
+        rows = self.sums["rows"]
+        days = self.covered_hours / 24
+        scale = 365 / days if days > 0 else 0
+        savings = self.sums["baseline_cost_eur"] - self.sums["scenario_cost_eur"]
+        pv_mwh = self.sums["pv_kwh"] / 1000
+        return {
+            "kwh_per_ton": self._kwh_per_ton(),
+            "baseline_peak_kw": self.baseline_peak_kw if rows else 0.0,
+            "simulated_peak_kw": self.simulated_peak_kw if rows else 0.0,
+            "peak_reduction_kw": self.baseline_peak_kw - self.simulated_peak_kw if rows else 0.0,
+            "annual_savings_eur": savings * scale,
+            "period_savings_eur": savings,
+            "annual_pv_mwh_est": pv_mwh * scale,
+            "co2_saved_ton_est": pv_mwh * 0.57 * scale,
+            "simulated_load_p50_kw": self.quantile(0.5),
+            "simulated_load_p95_kw": self.quantile(0.95),
+            "rows": int(rows),
+            "last_timestamp": str(self.last_sim_ts) if self.last_sim_ts is not None else "",
+        }
+
+    # ---------------- persistence ----------------
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "interval_h": self.interval_h,
+            "sample_size": self.sample_size,
+            "sums": self.sums,
+            "baseline_peak_kw": self.baseline_peak_kw,
+            "simulated_peak_kw": self.simulated_peak_kw,
+            "daily_energy_kwh": self.daily_energy_kwh,
+            "daily_production_ton": self.daily_production_ton,
+            "sample_keys": self.sample_keys.tolist(),
+            "sample_values": self.sample_values.tolist(),
+            "periods": self.periods,
+            "last_sim_ts": str(self.last_sim_ts) if self.last_sim_ts is not None else None,
+            "last_prod_ts": str(self.last_prod_ts) if self.last_prod_ts is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "KPIAccumulator":
+        acc = cls(state.get("name", ""), state.get("interval_h", 0.25), state.get("sample_size", 4096))
+        acc.sums = {k: float(state["sums"].get(k, 0.0)) for k in SUM_KEYS}
+        acc.baseline_peak_kw = float(state["baseline_peak_kw"])
+        acc.simulated_peak_kw = float(state["simulated_peak_kw"])
+        acc.daily_energy_kwh = dict(state["daily_energy_kwh"])
+        acc.daily_production_ton = dict(state["daily_production_ton"])
+        acc.sample_keys = np.asarray(state["sample_keys"], dtype=float)
+        acc.sample_values = np.asarray(state["sample_values"], dtype=float)
+        acc.last_sim_ts = pd.Timestamp(state["last_sim_ts"]) if state.get("last_sim_ts") else None
+        acc.last_prod_ts = pd.Timestamp(state["last_prod_ts"]) if state.get("last_prod_ts") else None
+        if "periods" in state:
+            acc.periods = [[int(a), int(b)] for a, b in state["periods"]]
+        elif acc.last_sim_ts is not None and acc.sums["rows"]:
+            # stav zo starej verzie: súvislé obdobie končiace poslednou hodnotou
+            step = int(round(acc.interval_h * 3.6e12))
+            end = pd.Timestamp(acc.last_sim_ts).value + step
+            acc.periods = [[end - int(acc.sums["rows"]) * step, end]]
+        return acc
+
+
+def load_states(path: str | Path) -> dict[str, KPIAccumulator]:
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        raw = json.load(f)
+    return {name: KPIAccumulator.from_dict(state) for name, state in raw.items()}
+
+
+def save_states(path: str | Path, states: dict[str, KPIAccumulator]) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump({name: acc.to_dict() for name, acc in states.items()}, f)
+    tmp.replace(path)
+
+
+def merge_states(states) -> KPIAccumulator:
+    """Portfolio total of several accumulators (sites or periods)."""
+    states = list(states)
+    total = KPIAccumulator("portfolio", states[0].interval_h if states else 0.25)
+    for acc in states:
+        total = total.merge(acc, name="portfolio")
+    return total
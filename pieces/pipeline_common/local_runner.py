@@ -0,0 +1,202 @@
+"""
+In-process runner for the piece DAG (development, backtests, sweeps) – no Domino, no file hand-off.
+
+Every stage instantiates a piece and calls its ``piece_function`` with an InputModel built from the
+outputs of the stages it depends on. Tables written with ``interchange.write_frame`` stay in memory
+(``in_memory_interchange``) and are written to ``results_dir`` only with ``materialize=True``;
+``in_memory=False`` hands them over as files, as under Domino.
+Stages whose dependencies are done run concurrently on a thread pool, e.g. SolarSimPiece next to
+Fetch → Preprocess → Train. ``report()`` returns the per-stage timing.
+
+From ``pieces/``, on the sample inputs of the repository:
+
+    python -m pipeline_common.local_runner --out /tmp/local_run [--materialize] [--workers 2]
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable
+
+import pandas as pd
+
+from .interchange import in_memory_interchange
+
+PIECES_DIR = Path(__file__).resolve().parent.parent
+
+# Sample inputs shipped with the pieces (same files as the pieces' own defaults in the repository)
+SAMPLE_INPUTS = {
+    "load_csv": PIECES_DIR / "FetchEnergyDataPiece" / "load.csv",
+    "production_csv": PIECES_DIR / "FetchEnergyDataPiece" / "production.csv",
+    "prices_csv": PIECES_DIR / "FetchEnergyDataPiece" / "prices.csv",
+    "weather_csv": PIECES_DIR / "SolarSimPiece" / "SolarGIS.csv",
+    "solar_config_yml": PIECES_DIR / "SolarSimPiece" / "solar_config.yml",
+    "battery_config_yml": PIECES_DIR / "BatterySimPiece" / "battery_config.yml",
+    "battery_scenario_yml": PIECES_DIR / "BatterySimPiece" / "scenario.yml",
+    "scenario_yml": PIECES_DIR / "SimulatePiece" / "scenario.yml",
+    "kpi_production_csv": PIECES_DIR / "KPIPiece" / "production.csv",
+    "investment_config_yml": PIECES_DIR / "InvestmentEvalPiece" / "investment_config.yml",
+}
+
+
+class Stage:
+    """One piece run: ``inputs`` is a dict or a function of the outputs of the finished stages."""
+
+    def __init__(self, name: str, piece: str, inputs: dict[str, Any] | Callable[[dict[str, Any]], dict[str, Any]],
+                 after: tuple[str, ...] = ()):
+        self.name = name
+        self.piece = piece
+        self.inputs = inputs
+        self.after = tuple(after)
+
+
+def output_value(output: Any, key: str) -> Any:
+    """Field of a piece output (OutputModel, or the plain dict FetchEnergyDataPiece returns)."""
+    return output[key] if isinstance(output, dict) else getattr(output, key)
+
+
+class LocalRunner:
+    def __init__(self, results_dir: str | Path, materialize: bool = False, max_workers: int = 2, in_memory: bool = True):
+        self.results_dir = Path(results_dir)
+        self.materialize = materialize
+        self.in_memory = in_memory
+        self.max_workers = max(1, int(max_workers))
+        self.timings: list[dict[str, Any]] = []
+        self._t0 = 0.0
+
+    def run(self, stages: list[Stage]) -> dict[str, Any]:
+        """Run the stages in dependency order (independent ones concurrently); returns name -> piece output."""
+        names = {s.name for s in stages}
+        for stage in stages:
+            unknown = set(stage.after) - names
+            if unknown:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s): {sorted(unknown)}")
+
+        outputs: dict[str, Any] = {}
+        pending = {s.name: s for s in stages}
+        self.timings = []
+        self._t0 = time.perf_counter()
+        hand_off = in_memory_interchange(materialize=self.materialize) if self.in_memory else nullcontext()
+        with hand_off, ThreadPoolExecutor(self.max_workers) as pool:
+            running = {}
+            while pending or running:
+                for stage in [s for s in pending.values() if all(d in outputs for d in s.after)]:
+                    running[pool.submit(self._run_stage, stage, dict(outputs))] = stage.name
+                    del pending[stage.name]
+                if not running:
+                    raise ValueError(f"Dependency cycle between stages: {sorted(pending)}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    outputs[running.pop(future)] = future.result()
+        return outputs
+
+    def _run_stage(self, stage: Stage, outputs: dict[str, Any]) -> Any:
+        module = importlib.import_module(f"{stage.piece}.piece")
+        models = importlib.import_module(f"{stage.piece}.models")
+        piece = getattr(module, stage.piece)(deploy_mode="dry_run", task_id=stage.name, dag_id="local_runner")
+        piece.results_path = str(self.results_dir / stage.name)
+        Path(piece.results_path).mkdir(parents=True, exist_ok=True)
+        kwargs = stage.inputs(outputs) if callable(stage.inputs) else dict(stage.inputs)
+
+        start = time.perf_counter()
+        cpu = time.thread_time()
+        output = piece.piece_function(models.InputModel(**kwargs))
+        self.timings.append({
+            "stage": stage.name,
+            "piece": stage.piece,
+            "start_s": start - self._t0,
+            "wall_s": time.perf_counter() - start,
+            "cpu_s": time.thread_time() - cpu,
+        })
+        return output
+
+    def report(self) -> pd.DataFrame:
+        """Per-stage start offset, wall time and CPU time of the calling thread (child processes not included)."""
+        return pd.DataFrame(self.timings, columns=["stage", "piece", "start_s", "wall_s", "cpu_s"]).sort_values("start_s")
+
+    def print_report(self) -> None:
+        report = self.report()
+        for row in report.itertuples(index=False):
+            print(f"[METRIC] {row.stage:<12s} start {row.start_s:7.2f} s  wall {row.wall_s:7.2f} s  cpu {row.cpu_s:7.2f} s")
+        if not report.empty:
+            total = (report["start_s"] + report["wall_s"]).max()
+            print(f"[METRIC] pipeline wall {total:.2f} s (sum of stages {report['wall_s'].sum():.2f} s)")
+
+
+def default_stages(inputs: dict[str, Any] | None = None, metrics_dir: str | Path | None = None) -> list[Stage]:
+    """
+    The pipeline DAG: Fetch → Preprocess → Train → Predict, Solar → Battery → Simulate → KPI →
+    Investment → Dashboard. ``inputs`` overrides entries of ``SAMPLE_INPUTS``; the dashboard's
+    performance panel reads the ``metrics.json`` of every stage below ``metrics_dir``.
+    """
+    src = {k: str(v) for k, v in {**SAMPLE_INPUTS, **(inputs or {})}.items()}
+    v = output_value
+    return [
+        Stage("fetch", "FetchEnergyDataPiece", {
+            "load_csv": src["load_csv"], "production_csv": src["production_csv"], "prices_csv": src["prices_csv"],
+            "weather_csv": src["weather_csv"],
+        }),
+        Stage("preprocess", "PreprocessEnergyDataPiece", lambda o: {
+            "input_path": v(o["fetch"], "output_path"), "quality_mask_path": v(o["fetch"], "quality_mask_path"),
+        }, after=("fetch",)),
+        Stage("train", "TrainModelPiece", lambda o: {"data_path": v(o["preprocess"], "train_file_path")}, after=("preprocess",)),
+        Stage("predict", "PredictPiece", lambda o: {
+            "model_path": v(o["train"], "model_file_path"), "data_path": v(o["preprocess"], "predict_file_path"),
+        }, after=("train", "preprocess")),
+        Stage("solar", "SolarSimPiece", {
+            "input_weather_data": src["weather_csv"], "input_Virtual_RE_config": src["solar_config_yml"],
+        }),
+        Stage("battery", "BatterySimPiece", lambda o: {
+            "input_load_data": v(o["solar"], "output_path"), "input_forecast": v(o["predict"], "prediction_file_path"),
+            "input_Battery_config": src["battery_config_yml"], "input_scenario": src["battery_scenario_yml"],
+        }, after=("solar", "predict")),
+        Stage("simulate", "SimulatePiece", lambda o: {
+            "forecast_csv": v(o["predict"], "prediction_file_path"), "virtual_solar_csv": v(o["solar"], "output_path"),
+            "virtual_battery_soc_csv": v(o["battery"], "output_path"), "scenario_yml": src["scenario_yml"],
+            "residuals_csv": v(o["train"], "test_residuals_path"), "investment_config_yml": src["investment_config_yml"],
+        }, after=("predict", "solar", "battery", "train")),
+        Stage("kpi", "KPIPiece", lambda o: {
+            "forecast_csv": v(o["predict"], "prediction_file_path"), "simulated_load_csv": v(o["simulate"], "simulated_load_csv"),
+            "scenario_summary_csv": v(o["simulate"], "scenario_summary_csv"), "production_csv": src["kpi_production_csv"],
+            "monte_carlo_summary_csv": v(o["simulate"], "monte_carlo_summary_csv"), "virtual_solar_csv": v(o["solar"], "output_path"),
+        }, after=("predict", "simulate", "solar")),
+        Stage("investment", "InvestmentEvalPiece", lambda o: {
+            "kpi_results_csv": v(o["kpi"], "kpi_results_csv"), "battery_summary_csv": v(o["battery"], "summary_csv_path"),
+            "investment_config_yml": src["investment_config_yml"],
+        }, after=("kpi", "battery")),
+        Stage("dashboard", "DashboardPiece", lambda o: {
+            "preprocess_predict_parquet": v(o["preprocess"], "predict_file_path"),
+            "predict_predictions_csv": v(o["predict"], "prediction_file_path"),
+            "simulate_results_csv": v(o["simulate"], "simulated_load_csv"),
+            "simulate_summary_csv": v(o["simulate"], "scenario_summary_csv"),
+            "kpi_results_csv": v(o["kpi"], "kpi_results_csv"),
+            "virtual_battery_soc_csv": v(o["battery"], "output_path"),
+            "investment_evaluation_csv": v(o["investment"], "investment_evaluation_json"),
+            "backtest_summary_csv": "",
+            "scenario_yml": src["scenario_yml"],
+            "metrics_search_dirs": str(metrics_dir) if metrics_dir else None,
+        }, after=("preprocess", "predict", "simulate", "kpi", "battery", "investment")),
+    ]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the piece DAG in one process.")
+    parser.add_argument("--out", required=True, help="results directory (one sub-directory per stage)")
+    parser.add_argument("--materialize", action="store_true", help="also write the tables handed between stages as files")
+    parser.add_argument("--workers", type=int, default=2, help="stages running at the same time")
+    args = parser.parse_args(argv)
+
+    runner = LocalRunner(args.out, materialize=args.materialize, max_workers=args.workers)
+    runner.run(default_stages(metrics_dir=args.out))
+    runner.print_report()
+    report_path = Path(args.out) / "timing_report.csv"
+    runner.report().to_csv(report_path, index=False)
+    print(f"[INFO] Timing report written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Monte Carlo uncertainty for SimulatePiece.
+
+Each sample perturbs the deterministic inputs three ways:
+  - load: block bootstrap of forecast residuals (TrainModelPiece test errors)
+  - solar: every target day draws a simulated solar day within +/- window days of the same
+    day-of-year, from any year available in virtual_solar (weather-year resampling)
+  - price: block bootstrap of whole days of the price path
+
+Costs and savings are evaluated for a chunk of samples at once as (samples x time) arrays; chunks
+run on a thread pool (NumPy releases the GIL) and get independent seeds, so results do not depend
+on the number of workers.
+"""
+from __future__ import annotations
+
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .battery import discharge_above_rate
+
+# bytes per (sample, time) element across the temporaries of one chunk evaluation
+_BYTES_PER_ELEMENT = 8 * 10
+
+
+def day_slots(timestamps, interval_h: float) -> tuple[np.ndarray, np.ndarray, pd.DatetimeIndex, int]:
+    """Day index and time-of-day slot for each timestamp, the day labels and the number of slots per day."""
+    ts = pd.DatetimeIndex(pd.to_datetime(timestamps))
+    day_codes, day_labels = pd.factorize(ts.normalize(), sort=True)
+    interval_min = max(interval_h * 60.0, 1e-9)
+    slot = ((ts.hour * 60 + ts.minute).to_numpy() // interval_min).astype(np.int64)
+    n_slots = max(int(round(24 * 60 / interval_min)), int(slot.max(initial=0)) + 1)
+    return day_codes.astype(np.int64), slot, pd.DatetimeIndex(day_labels), n_slots
+
+
+def daily_matrix(values, day_idx: np.ndarray, slot: np.ndarray, n_days: int, n_slots: int) -> np.ndarray:
+    """(days x slots) matrix of mean values; gaps are filled with the slot mean over all days."""
+    total = np.zeros((n_days, n_slots))
+    count = np.zeros((n_days, n_slots))
+    np.add.at(total, (day_idx, slot), np.asarray(values, dtype=float))
+    np.add.at(count, (day_idx, slot), 1.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        matrix = total / count
+        slot_mean = total.sum(axis=0) / count.sum(axis=0)
+    slot_mean = np.nan_to_num(slot_mean)
+    gaps = np.isnan(matrix)
+    matrix[gaps] = np.broadcast_to(slot_mean, matrix.shape)[gaps]
+    return matrix
+
+
+def residual_block_bootstrap(rng: np.random.Generator, residuals: np.ndarray, n: int, length: int, block: int) -> np.ndarray:
+    """(n x length) residual paths built from contiguous blocks of the residual series."""
+    if len(residuals) == 0:
+        return np.zeros((n, length))
+    block = max(1, min(block, len(residuals)))
+    n_blocks = math.ceil(length / block)
+    starts = rng.integers(0, len(residuals) - block + 1, size=(n, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block)).reshape(n, -1)[:, :length]
+    return residuals[idx]
+
+
+def day_block_bootstrap(rng: np.random.Generator, matrix: np.ndarray, day_idx: np.ndarray, slot: np.ndarray,
+                        n: int, block_days: int) -> np.ndarray:
+    """(n x time) paths assembled from blocks of whole days of a (days x slots) matrix."""
+    n_days = matrix.shape[0]
+    block = max(1, min(block_days, n_days))
+    n_blocks = math.ceil(n_days / block)
+    starts = rng.integers(0, n_days - block + 1, size=(n, n_blocks))
+    src = (starts[:, :, None] + np.arange(block)).reshape(n, -1)[:, :n_days]
+    return matrix[src[:, day_idx], slot]
+
+
+def seasonal_day_resample(rng: np.random.Generator, matrix: np.ndarray, source_doy: np.ndarray,
+                          target_doy: np.ndarray, day_idx: np.ndarray, slot: np.ndarray,
+                          n: int, window_days: int) -> np.ndarray:
+    """(n x time) paths where each target day is a random source day within +/- window of its day-of-year."""
+    src = np.empty((n, len(target_doy)), dtype=np.int64)
+    for d, doy in enumerate(target_doy):
+        dist = np.abs(source_doy - doy)
+        dist = np.minimum(dist, 366 - dist)
+        candidates = np.flatnonzero(dist <= window_days)
+        if len(candidates) == 0:
+            candidates = np.array([int(np.argmin(dist))])
+        src[:, d] = candidates[rng.integers(0, len(candidates), size=n)]
+    return matrix[src[:, day_idx], slot]
+
+
+class MonteCarloSimulation:
+    """Perturbation model and cost evaluation for one scenario on one forecast horizon."""
+
+    def __init__(self, timestamps, base_load_kw, price_eur_kwh, interval_h: float = 0.25,
+                 residuals=None, solar: pd.DataFrame | None = None, solar_scale: float = 1.0,
+                 battery: dict | None = None, tariff=None, residual_block_steps: int | None = None,
+                 price_block_days: int = 7, solar_window_days: int = 7):
+        self.interval_h = float(interval_h)
+        self.base_load = np.asarray(base_load_kw, dtype=float)
+        self.price = None if price_eur_kwh is None else np.asarray(price_eur_kwh, dtype=float)
+        self.residuals = np.asarray(residuals if residuals is not None else [], dtype=float)
+        self.residuals = self.residuals[np.isfinite(self.residuals)]
+        # residual blocks of one day by default, whatever the time grid
+        self.residual_block_steps = residual_block_steps or max(1, int(round(24 / self.interval_h)))
+        self.price_block_days = price_block_days
+        self.solar_window_days = solar_window_days
+        self.tariff = tariff
+        self.battery = battery
+
+        self.day_idx, self.slot, days, n_slots = day_slots(timestamps, self.interval_h)
+        self.n_days = len(days)
+        self.price_matrix = None
+        if self.price is not None:
+            self.price_matrix = daily_matrix(self.price, self.day_idx, self.slot, self.n_days, n_slots)
+
+        self.solar_matrix = None
+        if solar is not None and len(solar):
+            s_day, s_slot, s_days, _ = day_slots(solar["datetime"], self.interval_h)
+            s_slot = np.minimum(s_slot, n_slots - 1)
+            self.solar_matrix = daily_matrix(solar["solar_kw"].to_numpy() * solar_scale, s_day, s_slot, len(s_days), n_slots)
+            self.solar_doy = s_days.dayofyear.to_numpy()
+            self.target_doy = days.dayofyear.to_numpy()
+
+    def _cost(self, load: np.ndarray, price: np.ndarray | None) -> np.ndarray:
+        if self.tariff is not None:
+            return self.tariff.total_cost(load, price)
+        return (load * price).sum(axis=-1) * self.interval_h
+
+    def evaluate_chunk(self, n: int, seed: np.random.SeedSequence) -> dict[str, np.ndarray]:
+        rng = np.random.default_rng(seed)
+        length = len(self.base_load)
+
+        load = self.base_load + residual_block_bootstrap(rng, self.residuals, n, length, self.residual_block_steps)
+        np.maximum(load, 0.0, out=load)
+
+        price = None
+        if self.price_matrix is not None:
+            price = day_block_bootstrap(rng, self.price_matrix, self.day_idx, self.slot, n, self.price_block_days)
+
+        scenario = load
+        if self.solar_matrix is not None:
+            solar = seasonal_day_resample(rng, self.solar_matrix, self.solar_doy, self.target_doy,
+                                          self.day_idx, self.slot, n, self.solar_window_days)
+            scenario = np.maximum(load - solar, 0.0)
+        if self.battery:
+            capacity = float(self.battery.get("capacity_kWh", 0) or 0)
+            max_rate = float(self.battery.get("max_c_rate", 0) or 0) * capacity
+            scenario, _ = discharge_above_rate(scenario, capacity, max_rate, interval_h=self.interval_h)
+
+        baseline_cost = self._cost(load, price)
+        scenario_cost = self._cost(scenario, price)
+        return {"baseline_cost_eur": baseline_cost, "scenario_cost_eur": scenario_cost}
+
+    def run(self, n_samples: int, seed: int = 42, chunk_samples: int = 0, max_workers: int = 0,
+            capex_eur: float | None = None) -> pd.DataFrame:
+        """One row per sample: baseline/scenario cost, savings, annualised savings and simple payback (NaN = never)."""
+        length = max(len(self.base_load), 1)
+        if chunk_samples <= 0:
+            chunk_samples = max(1, int(256e6 // (length * _BYTES_PER_ELEMENT)))
+        sizes = [min(chunk_samples, n_samples - start) for start in range(0, n_samples, chunk_samples)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+        workers = min(max_workers or os.cpu_count() or 1, len(sizes)) or 1
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(self.evaluate_chunk, sizes, seeds))
+        else:
+            parts = [self.evaluate_chunk(n, s) for n, s in zip(sizes, seeds)]
+
+        out = pd.DataFrame({
+            key: np.concatenate([part[key] for part in parts]) for key in ("baseline_cost_eur", "scenario_cost_eur")
+        })
+        out.insert(0, "sample", np.arange(len(out)))
+        out["savings_eur"] = out["baseline_cost_eur"] - out["scenario_cost_eur"]
+        days = length * self.interval_h / 24.0
+        out["annual_savings_eur"] = out["savings_eur"] * (365 / days) if days > 0 else 0.0
+        if capex_eur is not None:
+            annual = out["annual_savings_eur"]
+            out["payback_years"] = np.where(annual > 0, capex_eur / annual.where(annual > 0, 1.0), np.nan)
+        return out
+
+
+def summarize_samples(samples: pd.DataFrame, quantiles=(0.1, 0.5, 0.9)) -> dict:
+    """
+    Mean and P10/P50/P90 of each distribution column, plus the probability of positive savings.
+    Payback statistics cover the samples that pay back; ``never_payback_share`` is the rest.
+    """
+    summary: dict = {"samples": len(samples)}
+    for col in ("savings_eur", "annual_savings_eur", "payback_years"):
+        if col not in samples.columns:
+            continue
+        values = samples[col].to_numpy(dtype=float)
+        finite = values[np.isfinite(values)]
+        summary[f"{col}_mean"] = float(np.mean(finite)) if len(finite) else np.nan
+        stats = np.quantile(finite, quantiles) if len(finite) else np.full(len(quantiles), np.nan)
+        for q, v in zip(quantiles, stats):
+            summary[f"{col}_p{int(round(q * 100))}"] = float(v)
+        if col == "payback_years":
+            summary["never_payback_share"] = 1.0 - len(finite) / len(values) if len(values) else 0.0
+    if "savings_eur" in samples.columns:
+        summary["prob_positive_savings"] = float((samples["savings_eur"] > 0).mean()) if len(samples) else 0.0
+    return summary
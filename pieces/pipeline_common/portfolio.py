@@ -0,0 +1,488 @@
+"""
+Portfolio mode: the piece chain (Fetch → Preprocess → Train → Predict, Solar → Battery → Simulate →
+KPI → Investment) for every site of a manifest, on a local process pool or a file-based work queue
+that several nodes pull from.
+
+Manifest (YAML or JSON; ``benchmarks/synthetic_data.py`` manifests work as they are)::
+
+    defaults:                       # optional, any key of local_runner.SAMPLE_INPUTS
+      battery_config_yml: configs/battery_config.yml
+    sites:
+      - site_id: plant_a            # or "name"
+        load_csv: plant_a/load.csv  # relative paths are relative to the manifest
+        production_csv: plant_a/production.csv
+        prices_csv: prices.csv
+        weather_csv: plant_a/SolarGIS.csv
+        solar_config_yml: plant_a/solar_config.yml
+
+Every site runs with ``LocalRunner`` in ``<out>/sites/<site_id>/`` and ends with ``site_status.json``.
+Its tables are appended to the hive-partitioned dataset ``<out>/dataset/<table>/site_id=<id>/``
+(kpi_results, scenario_summary, investment and simulated_results). ``collect`` sums the annual figures
+of the sites' streaming KPI states and the investment table into ``portfolio_kpis.csv`` (peaks are the
+coincident peaks of the summed simulated_results) and writes ``portfolio_report.json`` (sites ok /
+failed, sites per hour).
+
+Resume: a site whose ``site_status.json`` is "ok" for the same inputs (fingerprint) is skipped, so
+a rerun after a partial failure only runs the failed and missing sites (``--force`` runs all).
+
+Queue (``<queue>/pending|running|done|failed/<site_id>.json``): a worker claims a job by renaming
+it from pending/ to running/, an atomic step on a shared file system, and touches it while the site
+runs. ``requeue`` moves jobs whose worker stopped touching them back to pending/::
+
+    python -m pipeline_common.portfolio run --manifest sites.yml --out /tmp/portfolio --workers 4
+    python -m pipeline_common.portfolio enqueue --manifest sites.yml --out /home/shared_storage/portfolio
+    python -m pipeline_common.portfolio worker --queue /home/shared_storage/portfolio/queue   # on every node
+    python -m pipeline_common.portfolio requeue --queue /home/shared_storage/portfolio/queue --stale-minutes 30
+    python -m pipeline_common.portfolio collect --out /home/shared_storage/portfolio
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import yaml
+
+from .interchange import read_frame
+from .kpi_stream import load_states, merge_states
+from .local_runner import SAMPLE_INPUTS, LocalRunner, default_stages
+
+STATUS_FILE = "site_status.json"
+KPI_STATE_FILE = "kpi_state.json"
+QUEUE_STATES = ("pending", "running", "done", "failed")
+DEFAULT_QUEUE_DIR = "/home/shared_storage/portfolio/queue"
+
+# dataset table -> (stage, output field); read with read_frame, so any interchange format works
+SITE_TABLES = {
+    "kpi_results": ("kpi", "kpi_results_csv"),
+    "scenario_summary": ("simulate", "scenario_summary_csv"),
+    "investment": ("investment", "investment_evaluation_json"),
+    "simulated_results": ("simulate", "simulated_load_csv"),
+}
+_SYNTHETIC_FILES = {"load": "load_csv", "production": "production_csv", "prices": "prices_csv", "weather": "weather_csv"}
+
+
+# =========================================================
+# MANIFEST
+# =========================================================
+
+def load_manifest(path: str | Path) -> list[dict[str, Any]]:
+    """Sites of a manifest as ``{"site_id", "inputs"}`` with absolute input paths (defaults applied)."""
+    path = Path(path)
+    with open(path) as f:
+        raw = json.load(f) if path.suffix.lower() == ".json" else yaml.safe_load(f)
+    raw = raw or {}
+    entries = raw if isinstance(raw, list) else raw.get("sites") or []
+    defaults = {} if isinstance(raw, list) else dict(raw.get("defaults") or {})
+
+    def resolve(value: Any) -> str:
+        p = Path(str(value))
+        return str(p if p.is_absolute() else (path.parent / p).resolve())
+
+    sites, seen = [], set()
+    for entry in entries:
+        entry = dict(entry)
+        site_id = str(entry.pop("site_id", None) or entry.pop("name", None) or "")
+        if not site_id:
+            raise ValueError(f"Manifest entry without site_id: {entry}")
+        if site_id in seen:
+            raise ValueError(f"Duplicate site_id '{site_id}' in {path}")
+        seen.add(site_id)
+        for key, name in _SYNTHETIC_FILES.items():  # synthetic_data manifest: files {load, production, ...}
+            if key in (entry.get("files") or {}):
+                entry.setdefault(name, entry["files"][key])
+        if "production_csv" in entry:
+            entry.setdefault("kpi_production_csv", entry["production_csv"])
+        inputs = {k: resolve(v) for k, v in {**defaults, **entry}.items() if k in SAMPLE_INPUTS and v}
+        sites.append({"site_id": site_id, "inputs": inputs})
+    if not sites:
+        raise ValueError(f"No sites in manifest {path}")
+    return sites
+
+
+def fingerprint(site: dict[str, Any]) -> str:
+    """Inputs of a site: paths with size and mtime, so a changed file reruns the site."""
+    h = hashlib.sha256()
+    for key, value in sorted(site["inputs"].items()):
+        p = Path(value)
+        stamp = (p.stat().st_size, p.stat().st_mtime_ns) if p.is_file() else None
+        h.update(json.dumps([key, value, stamp]).encode())
+    return h.hexdigest()[:16]
+
+
+def site_stages(inputs: dict[str, str], kpi_state_path: Path) -> list:
+    """``default_stages`` up to InvestmentEvalPiece, with the KPI streaming state of the site."""
+    stages = [s for s in default_stages(inputs) if s.name != "dashboard"]
+    for stage in stages:
+        if stage.name == "kpi":
+            kpi_inputs = stage.inputs
+            stage.inputs = lambda o, f=kpi_inputs: {**f(o), "kpi_state_path": str(kpi_state_path)}
+    return stages
+
+
+# =========================================================
+# ONE SITE
+# =========================================================
+
+def site_status(out_dir: str | Path, site_id: str) -> dict[str, Any]:
+    path = Path(out_dir) / "sites" / site_id / STATUS_FILE
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def is_done(out_dir: str | Path, site: dict[str, Any], fp: str | None = None) -> bool:
+    status = site_status(out_dir, site["site_id"])
+    return status.get("status") == "ok" and status.get("fingerprint") == (fp or fingerprint(site))
+
+
+def _write_partitions(out_dir: Path, site_id: str, outputs: dict[str, Any]) -> dict[str, int]:
+    """Replace the site's partition of every dataset table; returns rows per table."""
+    rows = {}
+    for table, (stage, field) in SITE_TABLES.items():
+        output = outputs.get(stage)
+        value = (output.get(field) if isinstance(output, dict) else getattr(output, field, "")) if output else ""
+        if not value or not Path(value).is_file():
+            continue
+        part = out_dir / "dataset" / table / f"site_id={site_id}"
+        tmp = part.with_name(f".{part.name}.tmp")  # hidden from dataset readers until renamed
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        df = read_frame(value)
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp / "part-0.parquet")
+        shutil.rmtree(part, ignore_errors=True)
+        tmp.replace(part)
+        rows[table] = len(df)
+    return rows
+
+
+def run_site(site: dict[str, Any], out_dir: str | Path, stage_workers: int = 1) -> dict[str, Any]:
+    """Run the chain for one site; never raises, the returned (and written) status says ok / failed."""
+    out_dir = Path(out_dir)
+    site_dir = out_dir / "sites" / site["site_id"]
+    site_dir.mkdir(parents=True, exist_ok=True)
+    state_path = site_dir / KPI_STATE_FILE
+    state_path.unlink(missing_ok=True)  # a rerun recomputes the site from scratch
+    status = {
+        "site_id": site["site_id"],
+        "fingerprint": fingerprint(site),
+        "host": socket.gethostname(),
+        "pid": os.getpid(),
+        "started_utc": datetime.now(timezone.utc).isoformat(),
+    }
+    start = time.perf_counter()
+    try:
+        missing = [f"{key}={value}" for key, value in site["inputs"].items() if not Path(value).exists()]
+        if missing:
+            raise FileNotFoundError(f"Missing site inputs: {', '.join(missing)}")
+        runner = LocalRunner(site_dir, materialize=True, max_workers=stage_workers)
+        outputs = runner.run(site_stages(site["inputs"], state_path))
+        status["rows"] = _write_partitions(out_dir, site["site_id"], outputs)
+        status["status"] = "ok"
+        print(f"[SUCCESS] Site {site['site_id']} finished in {time.perf_counter() - start:.1f} s")
+    except Exception as exc:
+        status["status"] = "failed"
+        status["error"] = f"{type(exc).__name__}: {exc}"
+        status["traceback"] = traceback.format_exc()
+        print(f"[WARNING] Site {site['site_id']} failed: {status['error']}")
+    status["finished_utc"] = datetime.now(timezone.utc).isoformat()
+    status["wall_s"] = round(time.perf_counter() - start, 3)
+    tmp = site_dir / (STATUS_FILE + ".tmp")
+    tmp.write_text(json.dumps(status, indent=1))
+    tmp.replace(site_dir / STATUS_FILE)
+    return status
+
+
+# =========================================================
+# PROCESS POOL
+# =========================================================
+
+def run_portfolio(sites: list[dict[str, Any]], out_dir: str | Path, max_workers: int = 0,
+                  force: bool = False, stage_workers: int = 1) -> dict[str, Any]:
+    """Every site not done yet on a process pool; returns the portfolio report (see ``collect``)."""
+    out_dir = Path(out_dir)
+    todo = [s for s in sites if force or not is_done(out_dir, s)]
+    skipped = len(sites) - len(todo)
+    if skipped:
+        print(f"[INFO] Resume: {skipped} of {len(sites)} sites already done")
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(todo) or 1))
+    print(f"[INFO] Portfolio: {len(todo)} sites on {workers} processes")
+
+    start = time.perf_counter()
+    finished = 0
+    if todo:
+        # spawn: xgboost / BLAS thread pools of the parent must not be forked
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {pool.submit(run_site, site, str(out_dir), stage_workers): site for site in todo}
+            for future in as_completed(futures):
+                site = futures[future]
+                try:
+                    status = future.result()
+                except BrokenProcessPool as exc:  # worker killed (e.g. out of memory)
+                    status = {"site_id": site["site_id"], "status": "failed", "error": f"worker process died: {exc}"}
+                finished += 1
+                hours = (time.perf_counter() - start) / 3600
+                print(f"[METRIC] {finished}/{len(todo)} sites ({status['site_id']}: {status['status']}), "
+                      f"{finished / hours:.1f} sites/hour")
+    report = collect(out_dir, [s["site_id"] for s in sites])
+    report["run"] = {"sites": len(todo), "skipped": skipped, "workers": workers,
+                     "wall_s": round(time.perf_counter() - start, 3),
+                     "sites_per_hour": round(len(todo) / ((time.perf_counter() - start) / 3600), 2) if todo else None}
+    (out_dir / "portfolio_report.json").write_text(json.dumps(report, indent=1, default=str))
+    return report
+
+
+# =========================================================
+# FILE QUEUE
+# =========================================================
+
+def _queue_dirs(queue_dir: str | Path) -> dict[str, Path]:
+    dirs = {state: Path(queue_dir) / state for state in QUEUE_STATES}
+    for d in dirs.values():
+        d.mkdir(parents=True, exist_ok=True)
+    return dirs
+
+
+def enqueue(sites: list[dict[str, Any]], out_dir: str | Path, queue_dir: str | Path, force: bool = False) -> int:
+    """One job file per site not done yet (and not already queued or running); returns jobs added."""
+    dirs = _queue_dirs(queue_dir)
+    added = 0
+    for site in sites:
+        name = f"{site['site_id']}.json"
+        fp = fingerprint(site)
+        if (dirs["pending"] / name).exists() or (dirs["running"] / name).exists():
+            continue
+        if not force and is_done(out_dir, site, fp):
+            continue
+        (dirs["failed"] / name).unlink(missing_ok=True)
+        job = {"site": site, "out_dir": str(Path(out_dir).resolve()), "fingerprint": fp,
+               "queued_utc": datetime.now(timezone.utc).isoformat()}
+        tmp = dirs["pending"] / f".{name}.tmp"
+        tmp.write_text(json.dumps(job, indent=1))
+        tmp.replace(dirs["pending"] / name)
+        added += 1
+    print(f"[INFO] Queued {added} of {len(sites)} sites in {queue_dir}")
+    return added
+
+
+def claim(queue_dir: str | Path) -> Path | None:
+    """Move the first pending job to running/ (atomic rename; losing a race just tries the next one)."""
+    dirs = _queue_dirs(queue_dir)
+    for job in sorted(dirs["pending"].glob("*.json")):
+        target = dirs["running"] / job.name
+        try:
+            job.rename(target)
+        except (FileNotFoundError, OSError):
+            continue
+        os.utime(target)
+        return target
+    return None
+
+
+def _heartbeat(path: Path, stop: threading.Event, every_s: float) -> None:
+    while not stop.wait(every_s):
+        try:
+            os.utime(path)
+        except OSError:
+            return
+
+
+def work(queue_dir: str | Path, max_jobs: int = 0, idle_exit: bool = True, poll_s: float = 10.0,
+         heartbeat_s: float = 30.0, stage_workers: int = 1) -> int:
+    """Worker loop of one process: claim, run, file under done/ or failed/; returns jobs run."""
+    dirs = _queue_dirs(queue_dir)
+    done = 0
+    start = time.perf_counter()
+    while not max_jobs or done < max_jobs:
+        job_path = claim(queue_dir)
+        if job_path is None:
+            if idle_exit:
+                break
+            time.sleep(poll_s)
+            continue
+        job = json.loads(job_path.read_text())
+        stop = threading.Event()
+        beat = threading.Thread(target=_heartbeat, args=(job_path, stop, heartbeat_s), daemon=True)
+        beat.start()
+        try:
+            status = run_site(job["site"], job["out_dir"], stage_workers)
+        finally:
+            stop.set()
+            beat.join()
+        job["status"] = {k: v for k, v in status.items() if k != "traceback"}
+        target = dirs["done" if status["status"] == "ok" else "failed"] / job_path.name
+        target.write_text(json.dumps(job, indent=1))
+        job_path.unlink(missing_ok=True)
+        done += 1
+        hours = (time.perf_counter() - start) / 3600
+        print(f"[METRIC] Worker {socket.gethostname()}:{os.getpid()}: {done} sites, {done / hours:.1f} sites/hour")
+    return done
+
+
+def requeue(queue_dir: str | Path, stale_minutes: float = 30.0, failed: bool = False) -> int:
+    """Back to pending/: running jobs without a heartbeat for ``stale_minutes`` (and failed ones with ``failed``)."""
+    dirs = _queue_dirs(queue_dir)
+    moved = 0
+    now = time.time()
+    candidates = [p for p in dirs["running"].glob("*.json") if now - p.stat().st_mtime > stale_minutes * 60]
+    if failed:
+        candidates += list(dirs["failed"].glob("*.json"))
+    for path in candidates:
+        try:
+            path.rename(dirs["pending"] / path.name)
+            moved += 1
+        except OSError:
+            continue
+    print(f"[INFO] Requeued {moved} job(s)")
+    return moved
+
+
+# =========================================================
+# COLLECT
+# =========================================================
+
+SITE_SUM_KEYS = ("annual_savings_eur", "period_savings_eur", "annual_pv_mwh_est", "co2_saved_ton_est")
+
+
+def coincident_peaks(out_dir: str | Path, site_ids: list[str]) -> dict[str, dict[str, float]]:
+    """Per scenario: peaks of the load summed over the sites per timestamp (simulated_results table)."""
+    sim_dir = Path(out_dir) / "dataset" / "simulated_results"
+    if not site_ids or not sim_dir.is_dir():
+        return {}
+    partitioning = ds.partitioning(pa.schema([("site_id", pa.string())]), flavor="hive")
+    dataset = ds.dataset(sim_dir, format="parquet", partitioning=partitioning)
+    loads = ["baseline_load_kw", "simulated_load_kw"]
+    keys = ["scenario", "datetime"] if "scenario" in dataset.schema.names else ["datetime"]
+    table = dataset.to_table(columns=keys + loads, filter=ds.field("site_id").isin(site_ids))
+    if not table.num_rows:
+        return {}
+    total = table.group_by(keys).aggregate([(c, "sum") for c in loads]).to_pandas()
+    if "scenario" not in total.columns:
+        total["scenario"] = ""
+    peaks = {}
+    for scenario, group in total.groupby("scenario"):
+        baseline, simulated = float(group["baseline_load_kw_sum"].max()), float(group["simulated_load_kw_sum"].max())
+        peaks[str(scenario)] = {"baseline_peak_kw": baseline, "simulated_peak_kw": simulated,
+                                "peak_reduction_kw": baseline - simulated}
+    return peaks
+
+
+def collect(out_dir: str | Path, site_ids: list[str] | None = None) -> dict[str, Any]:
+    """
+    Portfolio KPIs from the finished sites, per scenario: annual savings / PV / CO2 as sums of the
+    site figures (each site annualised over its own period), kWh/ton and load percentiles of the
+    merged streaming KPI states, and coincident peaks of the summed load (``max_site_peak_kw`` keeps
+    the largest single-site peak). Plus the summed CAPEX, annual savings and NPV of the investment table.
+    """
+    out_dir = Path(out_dir)
+    sites_dir = out_dir / "sites"
+    if site_ids is None:
+        site_ids = sorted(p.name for p in sites_dir.iterdir() if p.is_dir()) if sites_dir.is_dir() else []
+    statuses = [site_status(out_dir, s) or {"site_id": s, "status": "missing"} for s in site_ids]
+    ok = [s["site_id"] for s in statuses if s.get("status") == "ok"]
+
+    by_scenario: dict[str, list] = {}
+    for site_id in ok:
+        for scenario, acc in load_states(sites_dir / site_id / KPI_STATE_FILE).items():
+            by_scenario.setdefault(scenario, []).append(acc)
+    peaks = coincident_peaks(out_dir, ok)
+    rows = []
+    for scenario, accs in sorted(by_scenario.items()):
+        row = {"scenario": scenario, "sites": len(accs), **merge_states(accs).result()}
+        site_results = [acc.result() for acc in accs]
+        for key in SITE_SUM_KEYS:
+            row[key] = sum(r[key] for r in site_results)
+        row["max_site_peak_kw"] = row["simulated_peak_kw"]
+        row.update(peaks.get(scenario, {}))
+        rows.append(row)
+    kpis = pd.DataFrame(rows)
+
+    investment_dir = out_dir / "dataset" / "investment"
+    if ok and investment_dir.is_dir():
+        inv = ds.dataset(investment_dir, format="parquet", partitioning="hive").to_table().to_pandas()
+        inv = inv[inv["site_id"].astype(str).isin(ok)]
+        totals = {f"portfolio_{c}": float(inv[c].sum()) for c in ("total_capex_eur", "annual_savings_eur", "npv_eur")
+                  if c in inv.columns}
+        if totals.get("portfolio_annual_savings_eur", 0) > 0 and "portfolio_total_capex_eur" in totals:
+            totals["portfolio_simple_payback_years"] = totals["portfolio_total_capex_eur"] / totals["portfolio_annual_savings_eur"]
+        for key, value in totals.items():
+            kpis[key] = value
+    kpis.to_csv(out_dir / "portfolio_kpis.csv", index=False)
+
+    status_df = pd.DataFrame(statuses)
+    status_df.drop(columns=["traceback"], errors="ignore").to_csv(out_dir / "site_status.csv", index=False)
+    report = {"sites": len(site_ids), "ok": len(ok), "failed": [s["site_id"] for s in statuses if s.get("status") == "failed"],
+              "missing": [s["site_id"] for s in statuses if s.get("status") == "missing"]}
+    finished = status_df[status_df["status"] == "ok"] if len(status_df) else status_df
+    if len(finished):
+        span_h = (pd.to_datetime(finished["finished_utc"]).max() - pd.to_datetime(finished["started_utc"]).min()).total_seconds() / 3600
+        report["sites_per_hour"] = round(len(finished) / span_h, 2) if span_h > 0 else None
+        report["site_wall_s_mean"] = round(float(finished["wall_s"].mean()), 3)
+    print(f"[INFO] Portfolio: {report['ok']}/{report['sites']} sites ok, {len(report['failed'])} failed, "
+          f"{len(report['missing'])} missing; KPIs in {out_dir / 'portfolio_kpis.csv'}")
+    if report.get("sites_per_hour"):
+        print(f"[METRIC] Throughput {report['sites_per_hour']:.1f} sites/hour")
+    return report
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the piece chain for a portfolio of sites.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_run = sub.add_parser("run", help="all sites on a local process pool, then collect")
+    p_run.add_argument("--manifest", required=True)
+    p_run.add_argument("--out", required=True)
+    p_run.add_argument("--workers", type=int, default=0, help="site processes (0 = all CPUs)")
+    p_run.add_argument("--force", action="store_true", help="also rerun sites that are done")
+    p_enq = sub.add_parser("enqueue", help="write one queue job per site not done yet")
+    p_enq.add_argument("--manifest", required=True)
+    p_enq.add_argument("--out", required=True)
+    p_enq.add_argument("--queue", help="queue directory (default <out>/queue)")
+    p_enq.add_argument("--force", action="store_true")
+    p_work = sub.add_parser("worker", help="pull and run queued sites")
+    p_work.add_argument("--queue", default=DEFAULT_QUEUE_DIR)
+    p_work.add_argument("--max-jobs", type=int, default=0)
+    p_work.add_argument("--wait", action="store_true", help="keep polling when the queue is empty")
+    p_req = sub.add_parser("requeue", help="move stale running (and failed) jobs back to pending")
+    p_req.add_argument("--queue", default=DEFAULT_QUEUE_DIR)
+    p_req.add_argument("--stale-minutes", type=float, default=30.0)
+    p_req.add_argument("--failed", action="store_true", help="also retry failed jobs")
+    p_col = sub.add_parser("collect", help="portfolio KPIs and report from the finished sites")
+    p_col.add_argument("--out", required=True)
+    p_col.add_argument("--manifest", help="report missing sites of this manifest as well")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = run_portfolio(load_manifest(args.manifest), args.out, args.workers, args.force)
+        if report["failed"]:
+            raise SystemExit(f"[WARNING] {len(report['failed'])} site(s) failed: {', '.join(report['failed'])}")
+    elif args.command == "enqueue":
+        enqueue(load_manifest(args.manifest), args.out, args.queue or Path(args.out) / "queue", args.force)
+    elif args.command == "worker":
+        work(args.queue, args.max_jobs, idle_exit=not args.wait)
+    elif args.command == "requeue":
+        requeue(args.queue, args.stale_minutes, args.failed)
+    else:
+        site_ids = [s["site_id"] for s in load_manifest(args.manifest)] if args.manifest else None
+        report = collect(args.out, site_ids)
+        (Path(args.out) / "portfolio_report.json").write_text(json.dumps(report, indent=1, default=str))
+
+
+if __name__ == "__main__":
+    main()
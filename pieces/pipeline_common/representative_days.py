@@ -0,0 +1,192 @@
+"""
+Representative days for scenario screening (SimulatePiece, SizingOptimizationPiece).
+
+The days of the horizon are clustered on their daily load / solar / price profiles (each series
+scaled by its own standard deviation, so kW and EUR/kWh weigh alike) into K clusters with k-medoids
+or k-means. Every cluster is represented by one real day (the medoid, or the member closest to the
+centroid for k-means) weighted by the number of days it stands for; the day with the highest load is kept as a cluster of
+its own (clustering would average the annual peak away). A simulation runs on the K days
+only; ``expand`` maps the reduced result back to the full timestamp index (every day takes its
+representative's profile), so costs, bills and KPIs are computed exactly as for a full run.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .montecarlo import daily_matrix, day_slots
+
+METHODS = ("kmedoids", "kmeans")
+
+
+def _sq_distances(x: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    d = (x ** 2).sum(axis=1)[:, None] - 2 * x @ centers.T + (centers ** 2).sum(axis=1)[None, :]
+    return np.maximum(d, 0.0)
+
+
+def _plus_plus_init(rng: np.random.Generator, dist: np.ndarray, k: int, candidates: np.ndarray) -> np.ndarray:
+    """k-means++ seeding on a (days x days) squared distance matrix, picking only ``candidates`` days."""
+    cand = np.flatnonzero(candidates)
+    chosen = [int(cand[rng.integers(len(cand))])]
+    for _ in range(1, k):
+        closest = dist[:, chosen].min(axis=1)
+        p = np.where(candidates, closest, 0.0)
+        if p.sum() <= 0:
+            rest = np.setdiff1d(cand, chosen)
+            if len(rest) == 0:
+                break
+            chosen.append(int(rest[0]))
+            continue
+        chosen.append(int(rng.choice(len(p), p=p / p.sum())))
+    return np.array(chosen, dtype=np.int64)
+
+
+def cluster_days(features: np.ndarray, k: int, method: str = "kmedoids", seed: int = 42,
+                 max_iter: int = 100, candidates: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Cluster the rows of a (days x features) matrix; returns ``(representatives, labels)``.
+
+    ``representatives`` are row indices of real days (one per cluster), ``labels`` the cluster of
+    every row. Only ``candidates`` rows (default all) may become representatives, e.g. to keep
+    incomplete first/last days out.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown clustering method '{method}', expected one of {METHODS}")
+    x = np.asarray(features, dtype=float)
+    n = len(x)
+    if candidates is None or not np.any(candidates):
+        candidates = np.ones(n, dtype=bool)
+    k = max(1, min(int(k), int(candidates.sum())))
+
+    rng = np.random.default_rng(seed)
+    dist = _sq_distances(x, x)
+    medoids = _plus_plus_init(rng, dist, k, candidates)
+
+    if method == "kmeans":
+        centers = x[medoids]
+        for _ in range(max_iter):
+            labels = np.argmin(_sq_distances(x, centers), axis=1)
+            new = np.array([x[labels == c].mean(axis=0) if np.any(labels == c) else centers[c] for c in range(len(centers))])
+            if np.allclose(new, centers):
+                break
+            centers = new
+        # representative = candidate member closest to the centroid
+        to_center = np.where(candidates[:, None], _sq_distances(x, centers), np.inf)
+        medoids = np.array([
+            int(np.argmin(np.where(labels == c, to_center[:, c], np.inf))) if np.any((labels == c) & candidates)
+            else int(np.argmin(to_center[:, c]))
+            for c in range(len(centers))
+        ])
+        return medoids, np.argmin(dist[:, medoids], axis=1)
+
+    # k-medoids (alternating): assign to the nearest medoid, move each medoid to the member with
+    # the smallest total distance to its cluster, until the medoids stop changing
+    for _ in range(max_iter):
+        labels = np.argmin(dist[:, medoids], axis=1)
+        new = medoids.copy()
+        for c in range(len(medoids)):
+            members = np.flatnonzero(labels == c)
+            eligible = members[candidates[members]]
+            if len(eligible) == 0:
+                continue
+            cost = dist[np.ix_(eligible, members)].sum(axis=1)
+            new[c] = eligible[np.argmin(cost)]
+        if np.array_equal(new, medoids):
+            break
+        medoids = new
+    return medoids, np.argmin(dist[:, medoids], axis=1)
+
+
+class RepresentativeDays:
+    """K representative days of one timestamp index and the mapping back to all of its rows."""
+
+    def __init__(self, timestamps, profiles: dict[str, np.ndarray], k: int, interval_h: float,
+                 method: str = "kmedoids", seed: int = 42, keep_peak_day: bool = True):
+        self.interval_h = float(interval_h)
+        self.day_idx, self.slot, self.days, self.n_slots = day_slots(timestamps, self.interval_h)
+        n_days = len(self.days)
+        counts = np.bincount(self.day_idx, minlength=n_days)
+
+        blocks = []
+        peak_day = None
+        for values in profiles.values():
+            if values is None:
+                continue
+            m = daily_matrix(np.nan_to_num(np.asarray(values, dtype=float)), self.day_idx, self.slot, n_days, self.n_slots)
+            if peak_day is None and keep_peak_day and k > 1 and n_days > 1:
+                peak_day = int(np.argmax(m.max(axis=1)))  # first profile = load
+            scale = m.std()
+            blocks.append(m / scale if scale > 0 else m)
+        features = np.hstack(blocks) if blocks else np.zeros((n_days, 1))
+
+        self.method = method
+        rest = np.ones(n_days, dtype=bool)
+        if peak_day is not None:
+            rest[peak_day] = False
+        complete = counts >= self.n_slots
+        rep, labels = cluster_days(features[rest], k - (peak_day is not None), method=method, seed=seed,
+                                   candidates=complete[rest])
+        rep = np.flatnonzero(rest)[rep]
+        self.labels = np.empty(n_days, dtype=np.int64)
+        self.labels[rest] = labels
+        if peak_day is not None:
+            rep = np.append(rep, peak_day)
+            self.labels[peak_day] = len(rep) - 1
+        order = np.argsort(rep)  # chronological order of the representative days
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        self.rep_days = rep[order]
+        self.labels = rank[self.labels]
+        self.weights = np.bincount(self.labels, minlength=len(self.rep_days)).astype(float)
+
+        # rows of the representative days in the full index, in time order
+        self.rows = np.flatnonzero(np.isin(self.day_idx, self.rep_days))
+        self.row_cluster = np.searchsorted(self.rep_days, self.day_idx[self.rows])
+        self.row_weights = self.weights[self.row_cluster]
+
+        # (cluster, slot) -> reduced row; slots missing on a representative day take the nearest earlier
+        # (else later) slot of that day
+        lookup = np.full((self.k, self.n_slots), -1, dtype=np.int64)
+        reduced_rows = np.arange(len(self.rows))
+        lookup[self.row_cluster[::-1], self.slot[self.rows][::-1]] = reduced_rows[::-1]
+        for c in range(self.k):
+            filled = pd.Series(np.where(lookup[c] >= 0, lookup[c], np.nan)).ffill().bfill()
+            lookup[c] = filled.fillna(0).to_numpy(dtype=np.int64)
+        self._source_row = lookup[self.labels[self.day_idx], self.slot]
+
+    @property
+    def k(self) -> int:
+        return len(self.rep_days)
+
+    @property
+    def reduction(self) -> float:
+        """Full rows per simulated row."""
+        return len(self.day_idx) / max(len(self.rows), 1)
+
+    def take(self, values):
+        """The rows of the representative days (last axis) of a full-length series or array."""
+        if isinstance(values, pd.Series):
+            return values.iloc[self.rows].reset_index(drop=True)
+        return np.take(np.asarray(values), self.rows, axis=-1)
+
+    def weighted_sum(self, reduced) -> np.ndarray:
+        """Sum over the full horizon estimated from the representative rows (last axis)."""
+        return (np.asarray(reduced, dtype=float) * self.row_weights).sum(axis=-1)
+
+    def expand(self, reduced) -> np.ndarray:
+        """
+        A (..., reduced rows) result mapped back to the full index: row (day d, slot s) takes slot s
+        of the representative day of d's cluster.
+        """
+        return np.take(np.asarray(reduced, dtype=float), self._source_row, axis=-1)
+
+    def table(self) -> pd.DataFrame:
+        """One row per representative day: date, cluster weight (days) and the days it represents."""
+        members = [self.days[self.labels == c] for c in range(self.k)]
+        return pd.DataFrame({
+            "cluster": np.arange(self.k),
+            "date": self.days[self.rep_days].date,
+            "weight_days": self.weights.astype(int),
+            "first_member": [m.min().date() for m in members],
+            "last_member": [m.max().date() for m in members],
+        })
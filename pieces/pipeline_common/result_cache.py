@@ -0,0 +1,282 @@
+"""
+Content-addressed result cache for piece executions.
+
+``cached_piece`` wraps a piece's ``piece_function``. The cache key is a SHA-256 over the piece name,
+its code (the piece package and pipeline_common sources), the InputModel values and the content of
+every file or directory an input points to (config YAMLs included). On a hit the outputs stored
+under that key are copied into this run's ``results_path`` and the stored OutputModel is returned
+with its paths rewritten; the piece does not run. On a miss the piece runs and every file it wrote
+under ``results_path`` is stored. Entries are evicted least-recently-used above a size limit.
+
+File contents are hashed once per (path, size, mtime): the digests are remembered in
+``file_hashes.json`` in the cache directory, so unchanged multi-MB inputs cost one ``stat``.
+
+Environment:
+    PIPELINE_RESULT_CACHE          "off" / "0" disables the cache (default on)
+    PIPELINE_RESULT_CACHE_DIR      cache directory (default /home/shared_storage/.result_cache)
+    PIPELINE_RESULT_CACHE_MAX_MB   total size above which least recently used entries are evicted (default 2048)
+"""
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+from .instrumentation import annotate, snapshot
+from .interchange import memory_active
+
+DEFAULT_CACHE_DIR = "/home/shared_storage/.result_cache"
+DEFAULT_MAX_MB = 2048.0
+_CHUNK = 1 << 20
+_COMMON_DIR = Path(__file__).resolve().parent
+
+
+def _sha_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def code_version(package_dir: str) -> str:
+    """Digest of the ``.py`` sources of a piece package and of pipeline_common."""
+    h = hashlib.sha256()
+    for base in (Path(package_dir), _COMMON_DIR):
+        for path in sorted(base.rglob("*.py")):
+            h.update(str(path.relative_to(base)).encode())
+            h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Cache entries under ``<root>/<key[:2]>/<key>/`` ({entry.json, files/}); see the module docstring."""
+
+    def __init__(self, root: str | Path, max_mb: float = DEFAULT_MAX_MB):
+        self.root = Path(root)
+        self.max_bytes = int(max_mb * 1e6)
+        self._hash_index_path = self.root / "file_hashes.json"
+        self._hash_index: dict[str, list] | None = None
+        self._hash_index_dirty = False
+
+    @classmethod
+    def from_env(cls) -> ResultCache | None:
+        if os.environ.get("PIPELINE_RESULT_CACHE", "on").strip().lower() in ("0", "off", "false", "no"):
+            return None
+        return cls(
+            os.environ.get("PIPELINE_RESULT_CACHE_DIR") or DEFAULT_CACHE_DIR,
+            float(os.environ.get("PIPELINE_RESULT_CACHE_MAX_MB") or DEFAULT_MAX_MB),
+        )
+
+    # ------------------------------------------------------------------ hashing
+    def file_digest(self, path: Path) -> str:
+        """Content digest of a file, reused while its size and mtime are unchanged."""
+        if self._hash_index is None:
+            try:
+                self._hash_index = json.loads(self._hash_index_path.read_text())
+            except (OSError, ValueError):
+                self._hash_index = {}
+        st = path.stat()
+        key = str(path.resolve())
+        known = self._hash_index.get(key)
+        if known and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+            return known[2]
+        digest = _sha_file(path)
+        self._hash_index[key] = [st.st_size, st.st_mtime_ns, digest]
+        self._hash_index_dirty = True
+        return digest
+
+    def _path_digest(self, value: str) -> str | None:
+        """Digest of the file(s) or directory a string input names; None when it is not a path."""
+        parts = [p.strip() for p in value.split(",")] if "," in value else [value]
+        paths = [Path(p) for p in parts if p]
+        if not paths or not all(p.exists() for p in paths):
+            return None
+        h = hashlib.sha256()
+        for p in paths:
+            files = sorted(q for q in p.rglob("*") if q.is_file()) if p.is_dir() else [p]
+            for q in files:
+                h.update(str(q.relative_to(p) if p.is_dir() else q.name).encode())
+                h.update(self.file_digest(q).encode())
+        return h.hexdigest()
+
+    def key(self, piece_name: str, package_dir: str, inputs: dict[str, Any]) -> str:
+        h = hashlib.sha256()
+        h.update(piece_name.encode())
+        h.update(code_version(package_dir).encode())
+        # path inputs count by content only, so the same file under another run directory still hits
+        values = {}
+        for name, value in inputs.items():
+            digest = self._path_digest(value) if isinstance(value, str) and value else None
+            values[name] = {"content": digest} if digest else value
+        h.update(json.dumps(values, sort_keys=True, default=str).encode())
+        self._save_hash_index()
+        return h.hexdigest()
+
+    def _save_hash_index(self) -> None:
+        if not self._hash_index_dirty:
+            return
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = self._hash_index_path.with_name(f".{uuid.uuid4().hex}.tmp")
+            tmp.write_text(json.dumps(self._hash_index))
+            tmp.replace(self._hash_index_path)
+            self._hash_index_dirty = False
+        except OSError:
+            pass
+
+    # ------------------------------------------------------------------ entries
+    def _entry_dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def restore(self, key: str, results_dir: Path) -> dict[str, Any] | None:
+        """Copy a stored entry into ``results_dir``; returns its metadata (paths rewritten) or None on a miss."""
+        entry_dir = self._entry_dir(key)
+        meta_path = entry_dir / "entry.json"
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+        files_dir = entry_dir / "files"
+        results_dir.mkdir(parents=True, exist_ok=True)
+        for rel in meta["files"]:
+            dst = results_dir / rel
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(files_dir / rel, dst)
+        os.utime(meta_path)  # LRU: last use = entry.json mtime
+        old, new = meta["results_path"], str(results_dir)
+        meta["output"] = _replace_prefix(meta["output"], old, new)
+        meta["display_result"] = _replace_prefix(meta.get("display_result"), old, new)
+        return meta
+
+    def store(self, key: str, piece_name: str, results_dir: Path, before: dict[str, tuple[int, int]],
+              output: Any, display_result: Any) -> None:
+        """Store the files the run added or changed under ``results_dir`` (vs ``before``) and its output values."""
+        files = [p for p, stamp in snapshot(results_dir).items() if before.get(p) != stamp]
+        entry_dir = self._entry_dir(key)
+        tmp_dir = entry_dir.with_name(f".{key}.{uuid.uuid4().hex}.tmp")
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        size = 0
+        rel_files = []
+        for p in map(Path, files):
+            rel = p.relative_to(results_dir)
+            (tmp_dir / "files" / rel).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(p, tmp_dir / "files" / rel)
+            size += p.stat().st_size
+            rel_files.append(str(rel))
+        meta = {
+            "piece": piece_name,
+            "created": time.time(),
+            "results_path": str(results_dir),
+            "files": rel_files,
+            "size_bytes": size,
+            "output": output,
+            "display_result": display_result,
+        }
+        (tmp_dir / "entry.json").write_text(json.dumps(meta, default=str))
+        try:
+            tmp_dir.replace(entry_dir)  # fails when the entry exists (rename onto a non-empty directory)
+        except OSError:  # stored meanwhile by a concurrent run with the same key: keep that one
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict(keep=key)
+
+    def entries(self) -> list[tuple[float, int, Path]]:
+        """(last use, size, directory) of every entry."""
+        out = []
+        for meta_path in self.root.glob("*/*/entry.json"):
+            try:
+                size = json.loads(meta_path.read_text()).get("size_bytes", 0)
+                out.append((meta_path.stat().st_mtime, int(size), meta_path.parent))
+            except (OSError, ValueError):
+                continue
+        return out
+
+    def evict(self, keep: str | None = None) -> int:
+        """Remove least recently used entries until the cache fits ``max_bytes``; returns the number removed."""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path.name == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+
+def _replace_prefix(value: Any, old: str, new: str) -> Any:
+    """``value`` (nested dicts / lists) with paths under directory ``old`` moved to ``new``."""
+    if isinstance(value, str):
+        # only whole path components: /tmp/run1 must not rewrite /tmp/run10/out.csv
+        under = value == old or old.endswith(("/", os.sep)) or value[len(old):len(old) + 1] in ("/", os.sep)
+        return new + value[len(old):] if old and value.startswith(old) and under else value
+    if isinstance(value, dict):
+        return {k: _replace_prefix(v, old, new) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_replace_prefix(v, old, new) for v in value]
+    return value
+
+
+def _dump(model: Any) -> Any:
+    if hasattr(model, "model_dump"):
+        return model.model_dump(mode="json")
+    return model
+
+
+def cached_piece(func=None, *, bypass: tuple[str, ...] = ()):
+    """
+    Decorator for ``piece_function(self, input_data)``: skip the piece when its inputs, configs and
+    code are unchanged since a stored run. ``bypass`` names inputs with side effects outside
+    ``results_path`` (e.g. a state file the piece updates); when any of them is set the piece always runs.
+    """
+    def decorate(piece_function):
+        @functools.wraps(piece_function)
+        def wrapper(self, input_data):
+            cache = ResultCache.from_env()
+            inputs = _dump(input_data)
+            # in-memory hand-off (local_runner): outputs are not files under results_path
+            if cache is None or memory_active() or not isinstance(inputs, dict) or any(inputs.get(name) for name in bypass):
+                annotate(result_cache="off" if cache is None else "bypass")
+                return piece_function(self, input_data)
+
+            piece_name = type(self).__name__
+            module = sys.modules[type(self).__module__]
+            results_dir = Path(getattr(self, "results_path", None) or ".")
+            try:
+                key = cache.key(piece_name, str(Path(module.__file__).resolve().parent), inputs)
+                meta = cache.restore(key, results_dir)
+            except Exception as exc:
+                print(f"[WARNING] Result cache unavailable ({exc}); running {piece_name}")
+                annotate(result_cache="error")
+                return piece_function(self, input_data)
+            if meta is not None:
+                annotate(result_cache="hit", result_cache_key=key[:12])
+                print(f"[INFO] Result cache hit for {piece_name} ({key[:12]}): {len(meta['files'])} output file(s) restored to {results_dir}")
+                if meta.get("display_result") is not None:
+                    self.display_result = meta["display_result"]
+                output_model = getattr(module, "OutputModel", None)
+                return output_model(**meta["output"]) if output_model and isinstance(meta["output"], dict) else meta["output"]
+
+            annotate(result_cache="miss", result_cache_key=key[:12])
+            before = snapshot(results_dir)
+            output = piece_function(self, input_data)
+            try:
+                cache.store(key, piece_name, results_dir, before, _dump(output), getattr(self, "display_result", None))
+                print(f"[INFO] Result cache stored {piece_name} ({key[:12]})")
+            except Exception as exc:
+                print(f"[WARNING] Result cache store failed for {piece_name}: {exc}")
+            return output
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
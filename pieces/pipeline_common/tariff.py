@@ -0,0 +1,327 @@
+"""
+Tariff engine: time-of-use energy bands, peak-demand charges, grid and reactive fees, fixed fees.
+
+All calendar work (band masks, billing periods, demand averaging windows) happens once per
+timestamp index in ``Tariff.prepare``. The returned ``PreparedTariff`` prices any load profile on
+that index with vectorized reductions, including stacked profiles of shape (samples, time).
+
+A billing period only partly covered by the index pays the fixed fee and the demand charge for the
+covered share of the period (``prorate_partial_periods``), so a bill of a few weeks scaled to a year
+does not count a whole month of fixed and demand charges per partial month.
+
+Tariff YAML (see SimulatePiece/tariff.yml)::
+
+    billing_period: month            # month | quarter | year
+    prorate_partial_periods: true    # partial first/last periods pay fixed and demand charges pro rata
+    holidays: ["2025-12-25"]         # billed like Sundays
+    energy:
+      source: spot                   # spot: band price is an adder on price_eur_kwh; fixed: band price only
+      export_credit_factor: 1.0      # share of the energy price credited for exported kWh
+      default_band: offpeak
+      bands:                         # first matching band wins
+        - name: peak
+          price_eur_kwh: 0.035
+          hours: ["08:00", "20:00"]  # or a list of windows; windows may wrap midnight
+          weekdays: [0, 1, 2, 3, 4]  # Monday = 0
+          months: [1, 2, 3]          # optional
+        - name: offpeak
+          price_eur_kwh: 0.012
+    demand_charge:
+      eur_per_kw: 9.5                # per billing period, on the highest averaged import
+      averaging_minutes: 15
+      bands: [peak]                  # optional: only these bands set the peak
+    grid_fees:
+      eur_per_kwh: 0.011
+    reactive:
+      power_factor: 0.93             # assumed cos phi of the load
+      limit_power_factor: 0.95       # reactive energy above this is billed
+      eur_per_kvarh: 0.015
+    fixed:
+      eur_per_month: 120
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from .timegrid import infer_interval_hours
+
+_MONTHS_PER_PERIOD = {"month": 1, "quarter": 3, "year": 12}
+
+
+def _minutes(value) -> int:
+    if isinstance(value, str):
+        hh, _, mm = value.partition(":")
+        return int(hh) * 60 + int(mm or 0)
+    return int(value) * 60
+
+
+def _window_mask(minutes: np.ndarray, windows) -> np.ndarray:
+    if windows and not isinstance(windows[0], (list, tuple)):
+        windows = [windows]
+    mask = np.zeros(len(minutes), dtype=bool)
+    for start, end in windows:
+        s, e = _minutes(start), _minutes(end)
+        if s <= e:
+            mask |= (minutes >= s) & (minutes < e)
+        else:  # wraps midnight, e.g. 22:00 – 06:00
+            mask |= (minutes >= s) | (minutes < e)
+    return mask
+
+
+def _group_starts(codes: np.ndarray) -> np.ndarray:
+    if len(codes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1))
+
+
+class Tariff:
+    """Tariff definition loaded from a tariff YAML."""
+
+    def __init__(self, cfg: dict):
+        self.cfg = cfg or {}
+        self.billing_period = self.cfg.get("billing_period", "month")
+        if self.billing_period not in _MONTHS_PER_PERIOD:
+            raise ValueError(f"billing_period must be one of {sorted(_MONTHS_PER_PERIOD)}, got '{self.billing_period}'")
+        self.prorate = bool(self.cfg.get("prorate_partial_periods", True))
+
+        energy = self.cfg.get("energy") or {}
+        self.energy_source = energy.get("source", "spot")
+        if self.energy_source not in ("spot", "fixed"):
+            raise ValueError(f"energy.source must be 'spot' or 'fixed', got '{self.energy_source}'")
+        self.export_credit_factor = float(energy.get("export_credit_factor", 1.0))
+        self.bands = energy.get("bands") or [{"name": "all", "price_eur_kwh": 0.0}]
+        self.band_names = [str(b.get("name", f"band_{i}")) for i, b in enumerate(self.bands)]
+        default_band = energy.get("default_band", self.band_names[-1])
+        if default_band not in self.band_names:
+            raise ValueError(f"default_band '{default_band}' is not one of the energy bands {self.band_names}")
+        self.default_band = self.band_names.index(default_band)
+        self.band_prices = np.array([float(b.get("price_eur_kwh", 0.0)) for b in self.bands])
+
+        demand = self.cfg.get("demand_charge") or {}
+        self.demand_rate = float(demand.get("eur_per_kw", 0.0))
+        self.demand_minutes = int(demand.get("averaging_minutes", 15))
+        self.demand_bands = demand.get("bands")
+
+        self.grid_fee = float((self.cfg.get("grid_fees") or {}).get("eur_per_kwh", 0.0))
+
+        reactive = self.cfg.get("reactive") or {}
+        self.reactive_rate = float(reactive.get("eur_per_kvarh", 0.0))
+        pf = float(reactive.get("power_factor", 1.0))
+        pf_limit = float(reactive.get("limit_power_factor", 1.0))
+        # billable kvarh per kWh of import: tan(phi) above the allowed tan(phi)
+        self.kvarh_per_kwh = max(np.tan(np.arccos(pf)) - np.tan(np.arccos(pf_limit)), 0.0)
+
+        self.fixed_per_month = float((self.cfg.get("fixed") or {}).get("eur_per_month", 0.0))
+        self.holidays = pd.to_datetime(self.cfg.get("holidays") or []).normalize()
+
+    @classmethod
+    def from_yaml(cls, path) -> "Tariff":
+        with open(path) as f:
+            return cls(yaml.safe_load(f) or {})
+
+    @property
+    def uses_spot_price(self) -> bool:
+        return self.energy_source == "spot"
+
+    def prepare(self, timestamps, sites=None, interval_h: float | None = None) -> "PreparedTariff":
+        """Band codes, billing periods and demand windows for one timestamp index (rows sorted by time per site)."""
+        ts = pd.DatetimeIndex(pd.to_datetime(timestamps))
+        n = len(ts)
+        if interval_h is None:
+            interval_h = infer_interval_hours(ts)
+
+        minutes = (ts.hour * 60 + ts.minute).to_numpy()
+        weekday = ts.dayofweek.to_numpy().copy()
+        month = ts.month.to_numpy()
+        if len(self.holidays):
+            weekday[ts.normalize().isin(self.holidays)] = 6
+
+        band_codes = np.full(n, self.default_band, dtype=np.int8)
+        assigned = np.zeros(n, dtype=bool)
+        for code, band in enumerate(self.bands):
+            mask = ~assigned
+            if band.get("hours"):
+                mask &= _window_mask(minutes, band["hours"])
+            if band.get("weekdays") is not None:
+                mask &= np.isin(weekday, band["weekdays"])
+            if band.get("months") is not None:
+                mask &= np.isin(month, band["months"])
+            band_codes[mask] = code
+            assigned |= mask
+
+        if sites is None:
+            site_codes, site_labels = np.zeros(n, dtype=np.int64), np.array(["site"], dtype=object)
+        else:
+            site_codes, site_labels = pd.factorize(pd.Series(sites).astype(str), sort=True)
+            site_codes = site_codes.astype(np.int64)
+
+        months_since_epoch = ts.to_numpy().astype("datetime64[M]").astype(np.int64)
+        period_int = months_since_epoch // _MONTHS_PER_PERIOD[self.billing_period]
+
+        window_ns = max(int(self.demand_minutes * 60e9), int(round(interval_h * 3.6e12)))
+        window_int = ts.to_numpy().astype("datetime64[ns]").astype(np.int64) // window_ns
+
+        # site-major, time-minor keys: windows and periods stay contiguous after one sort
+        window_key = site_codes * (1 << 40) + window_int
+        period_key = site_codes * (1 << 32) + period_int
+        order = np.argsort(window_key, kind="stable")
+        return PreparedTariff(
+            self,
+            interval_h=float(interval_h),
+            band_codes=band_codes,
+            order=order,
+            window_key=window_key[order],
+            period_key=period_key[order],
+            site_codes=site_codes[order],
+            site_labels=np.asarray(site_labels, dtype=object),
+            period_int=period_int[order],
+        )
+
+
+class PreparedTariff:
+    """A tariff bound to one timestamp index; prices (..., time) load arrays in the original row order."""
+
+    def __init__(self, tariff: Tariff, interval_h: float, band_codes: np.ndarray, order: np.ndarray,
+                 window_key: np.ndarray, period_key: np.ndarray, site_codes: np.ndarray,
+                 site_labels: np.ndarray, period_int: np.ndarray):
+        self.tariff = tariff
+        self.interval_h = interval_h
+        self.band_codes = band_codes
+        self.order = order
+        self.is_sorted = bool(np.all(order[1:] > order[:-1])) if len(order) else True
+
+        self.window_starts = _group_starts(window_key)
+        self.window_size = np.diff(np.append(self.window_starts, len(window_key)))
+        self.period_starts = _group_starts(period_key)
+        window_period = period_key[self.window_starts]
+        self.period_window_starts = _group_starts(window_period)
+
+        starts = self.period_starts
+        months_per_period = _MONTHS_PER_PERIOD[tariff.billing_period]
+        first_month = period_int[starts] * months_per_period
+        self.periods = pd.DataFrame({
+            "site": site_labels[site_codes[starts]] if len(starts) else [],
+            "period_start": first_month.astype("datetime64[M]").astype("datetime64[ns]"),
+        })
+
+        # covered share of each billing period (rows x interval / calendar hours of the period)
+        self.period_coverage = np.ones(len(starts))
+        if tariff.prorate and len(starts):
+            period_hours = ((first_month + months_per_period).astype("datetime64[M]").astype("datetime64[h]")
+                            - first_month.astype("datetime64[M]").astype("datetime64[h]")).astype(np.int64)
+            period_rows = np.diff(np.append(starts, len(period_key)))
+            self.period_coverage = np.minimum(period_rows * interval_h / period_hours, 1.0)
+
+        sorted_bands = band_codes[order]
+        self.window_in_demand_band = np.ones(len(self.window_starts), dtype=bool)
+        if tariff.demand_bands:
+            allowed = [tariff.band_names.index(b) for b in tariff.demand_bands if b in tariff.band_names]
+            self.window_in_demand_band = np.isin(sorted_bands[self.window_starts], allowed)
+        self.band_masks_sorted = [sorted_bands == b for b in range(len(tariff.bands))]
+        self.band_price = tariff.band_prices[band_codes]
+
+    @property
+    def band_labels(self) -> np.ndarray:
+        return np.asarray(self.tariff.band_names, dtype=object)[self.band_codes]
+
+    def energy_price(self, price_eur_kwh=None) -> np.ndarray:
+        """Energy price per interval (EUR/kWh): spot price plus band adder, or the band price alone."""
+        if self.tariff.uses_spot_price:
+            if price_eur_kwh is None:
+                raise ValueError("Tariff energy.source is 'spot' but no price_eur_kwh series was given")
+            return np.asarray(price_eur_kwh, dtype=float) + self.band_price
+        return self.band_price
+
+    def _sorted(self, x: np.ndarray) -> np.ndarray:
+        return x if self.is_sorted else np.take(x, self.order, axis=-1)
+
+    def _period_sum(self, x: np.ndarray) -> np.ndarray:
+        return np.add.reduceat(self._sorted(x), self.period_starts, axis=-1)
+
+    def interval_costs(self, load_kw, price_eur_kwh=None) -> dict[str, np.ndarray]:
+        """Per-interval variable cost components (EUR); demand and fixed fees are only billed per period."""
+        load = np.asarray(load_kw, dtype=float)
+        dt = self.interval_h
+        import_kwh = np.maximum(load, 0.0) * dt
+        export_kwh = np.maximum(-load, 0.0) * dt
+        price = self.energy_price(price_eur_kwh)
+        import_eur = import_kwh * price
+        export_credit = export_kwh * price * self.tariff.export_credit_factor
+        energy = import_eur - export_credit
+        grid = import_kwh * self.tariff.grid_fee
+        reactive = import_kwh * self.tariff.kvarh_per_kwh * self.tariff.reactive_rate
+        return {
+            "import_kwh": import_kwh,
+            "export_kwh": export_kwh,
+            "import_eur": import_eur,
+            "export_credit_eur": export_credit,
+            "energy_eur": energy,
+            "grid_fee_eur": grid,
+            "reactive_eur": reactive,
+            "total_eur": energy + grid + reactive,
+        }
+
+    def period_components(self, load_kw, price_eur_kwh=None) -> dict[str, np.ndarray]:
+        """Bill components per billing period, arrays shaped (..., periods)."""
+        load = np.asarray(load_kw, dtype=float)
+        parts = self.interval_costs(load, price_eur_kwh)
+        out = {
+            "import_kwh": self._period_sum(parts["import_kwh"]),
+            "export_kwh": self._period_sum(parts["export_kwh"]),
+            "export_credit_eur": self._period_sum(parts["export_credit_eur"]),
+            "energy_eur": self._period_sum(parts["energy_eur"]),
+            "grid_fee_eur": self._period_sum(parts["grid_fee_eur"]),
+            "reactive_kvarh": self._period_sum(parts["import_kwh"]) * self.tariff.kvarh_per_kwh,
+            "reactive_eur": self._period_sum(parts["reactive_eur"]),
+        }
+
+        import_sorted = self._sorted(np.broadcast_to(parts["import_kwh"], load.shape))
+        import_eur_sorted = self._sorted(np.broadcast_to(parts["import_eur"], load.shape))
+        for b, name in enumerate(self.tariff.band_names):
+            mask = self.band_masks_sorted[b]
+            out[f"band_kwh:{name}"] = np.add.reduceat(np.where(mask, import_sorted, 0.0), self.period_starts, axis=-1)
+            out[f"band_eur:{name}"] = np.add.reduceat(np.where(mask, import_eur_sorted, 0.0), self.period_starts, axis=-1)
+
+        # demand: average import per window, then the highest window per period (one reduceat each)
+        window_kw = np.add.reduceat(import_sorted, self.window_starts, axis=-1) / (self.window_size * self.interval_h)
+        window_kw = np.where(self.window_in_demand_band, window_kw, 0.0)
+        out["demand_kw"] = np.maximum.reduceat(window_kw, self.period_window_starts, axis=-1)
+        out["demand_eur"] = out["demand_kw"] * self.tariff.demand_rate * self.period_coverage
+
+        months = _MONTHS_PER_PERIOD[self.tariff.billing_period]
+        out["fixed_eur"] = np.broadcast_to(self.tariff.fixed_per_month * months * self.period_coverage,
+                                           out["demand_kw"].shape).copy()
+        out["total_eur"] = (
+            out["energy_eur"] + out["grid_fee_eur"] + out["reactive_eur"] + out["demand_eur"] + out["fixed_eur"]
+        )
+        return out
+
+    def total_cost(self, load_kw, price_eur_kwh=None) -> np.ndarray:
+        """Whole-horizon bill (EUR), shape (...,) for a (..., time) load array."""
+        return self.period_components(load_kw, price_eur_kwh)["total_eur"].sum(axis=-1)
+
+    def bill(self, load_kw, price_eur_kwh=None) -> pd.DataFrame:
+        """Bill line items (site, period_start, line_item, quantity, unit, amount_eur) for one load profile."""
+        comp = self.period_components(np.asarray(load_kw, dtype=float).ravel(), price_eur_kwh)
+        items = []
+        for name in self.tariff.band_names:
+            items.append((f"energy_{name}", comp[f"band_kwh:{name}"], "kWh", comp[f"band_eur:{name}"]))
+        if np.any(comp["export_kwh"] > 0):
+            items.append(("export_credit", comp["export_kwh"], "kWh", 0.0 - comp["export_credit_eur"]))
+        items += [
+            ("demand_charge", comp["demand_kw"], "kW", comp["demand_eur"]),
+            ("grid_fee", comp["import_kwh"], "kWh", comp["grid_fee_eur"]),
+            ("reactive_energy", comp["reactive_kvarh"], "kvarh", comp["reactive_eur"]),
+            ("fixed_fee", _MONTHS_PER_PERIOD[self.tariff.billing_period] * self.period_coverage, "month", comp["fixed_eur"]),
+        ]
+        frames = []
+        for line_item, quantity, unit, amount in items:
+            frame = self.periods.copy()
+            frame["line_item"] = line_item
+            frame["quantity"] = quantity
+            frame["unit"] = unit
+            frame["amount_eur"] = amount
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True).sort_values(["site", "period_start"], kind="stable", ignore_index=True)
@@ -0,0 +1,91 @@
+"""
+Time grid helpers shared by the pieces: interval length of a series, kW -> kWh integration and
+resampling between resolutions (1, 5, 15 min, ...).
+
+The interval length travels with the data: ``interchange.write_frame`` stores ``interval_h`` in
+the Arrow schema metadata of feather / parquet files, ``read_frame`` puts it back into
+``df.attrs``; for CSV (or frames without it) it is inferred from the timestamps.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+INTERVAL_KEY = "interval_h"
+
+
+def infer_interval_hours(timestamps, default: float = 0.25) -> float:
+    """Typical spacing of ``timestamps`` in hours (median of positive steps), ``default`` if unknown."""
+    values = pd.to_datetime(pd.Series(timestamps)).dropna().to_numpy(dtype="datetime64[ns]")
+    if len(values) < 2:
+        return default
+    steps = np.diff(np.sort(values)).astype("int64")
+    steps = steps[steps > 0]
+    if len(steps) == 0:
+        return default
+    return float(np.median(steps)) / 3.6e12
+
+
+def interval_hours(data, default: float = 0.25) -> float:
+    """
+    Interval length (h) of a frame – its ``attrs["interval_h"]`` when set, else inferred from its
+    ``datetime`` column (or index) – or of a timestamp column.
+    """
+    if isinstance(data, pd.DataFrame):
+        value = data.attrs.get(INTERVAL_KEY)
+        if value:
+            return float(value)
+        data = data["datetime"] if "datetime" in data.columns else data.index
+    return infer_interval_hours(data, default)
+
+
+def set_interval(df: pd.DataFrame, interval_h: float) -> pd.DataFrame:
+    """Record the interval length of ``df`` (in place, returns ``df``) for ``write_frame`` and ``interval_hours``."""
+    df.attrs[INTERVAL_KEY] = float(interval_h)
+    return df
+
+
+def interval_freq(interval_h: float) -> str:
+    """Pandas frequency string of an interval length: 0.25 -> "15min", 1/60 -> "1min"."""
+    seconds = max(int(round(interval_h * 3600)), 1)
+    return f"{seconds // 60}min" if seconds % 60 == 0 else f"{seconds}s"
+
+
+def energy_kwh(power_kw, interval_h: float) -> np.ndarray:
+    """Energy (kWh) per interval of a power series (kW, mean over the interval)."""
+    return np.asarray(power_kw, dtype=float) * interval_h
+
+
+def resample_power(df: pd.DataFrame, minutes: int, sum_columns=(), by: str | None = None) -> pd.DataFrame:
+    """
+    ``df`` (``datetime`` column, optional group column ``by``) on a coarser grid of ``minutes``.
+
+    Power and price columns are averaged, so the energy of every interval is kept; ``sum_columns``
+    (amounts per interval, e.g. EUR or kWh) are summed. Other columns take the first value.
+    """
+    keys = [by] if by else []
+    bucket = pd.to_datetime(df["datetime"]).dt.floor(f"{int(minutes)}min")
+    numeric = [c for c in df.columns if c not in keys and c != "datetime" and pd.api.types.is_numeric_dtype(df[c])]
+    agg = {c: "sum" if c in sum_columns else "mean" for c in numeric}
+    agg.update({c: "first" for c in df.columns if c not in keys and c != "datetime" and c not in agg})
+    out = df.assign(datetime=bucket).groupby(keys + ["datetime"], sort=False).agg(agg).reset_index()
+    return set_interval(out[[c for c in df.columns if c in out.columns]], minutes / 60)
+
+
+def align_to_timestamps(timestamps, df: pd.DataFrame, col: str, freq: str | None = None) -> np.ndarray:
+    """
+    Values of ``df[col]`` at ``timestamps``, matched on ``freq`` buckets (floor) so that e.g. Solargis
+    :07/:22/:37/:52 stamps meet :00/:15/:30/:45; gaps are NaN.
+
+    ``freq`` defaults to the coarser of the two grids: a 15 min source is repeated over the 1 min
+    target rows of its bucket, a 1 min source is averaged into each 15 min target row.
+    """
+    target_ts = pd.to_datetime(pd.Series(timestamps))
+    source_ts = pd.to_datetime(df["datetime"])
+    if freq is None:
+        freq = interval_freq(max(infer_interval_hours(target_ts), infer_interval_hours(source_ts)))
+    target = target_ts.dt.floor(freq)
+    source = pd.Series(df[col].to_numpy(dtype=float), index=source_ts.dt.floor(freq).values)
+    if source.index.has_duplicates:
+        source = source.groupby(level=0).mean()
+    return source.reindex(target.values).to_numpy(dtype=float)
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# pieces import shared code as "pipeline_common.*"
+PIECES_DIR = Path(__file__).resolve().parents[1] / "pieces"
+if str(PIECES_DIR) not in sys.path:
+    sys.path.insert(0, str(PIECES_DIR))
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline_common.forecast_features import recursive_forecast
+
+FUTURE = 1e9  # actual values from the origin on; a forecast must never see them
+
+
+class RecordingModel:
+    """Predicts a constant and records every feature matrix it is given."""
+
+    def __init__(self, value=-1.0):
+        self.value = value
+        self.fitted = []
+        self.seen = []
+
+    def fit(self, X, y):
+        self.fitted.append((np.array(X), np.array(y)))
+        return self
+
+    def predict(self, X):
+        self.seen.append(np.array(X))
+        return np.full(len(X), self.value)
+
+
+def test_recursive_lags_use_actuals_only_before_origin():
+    n, horizon = 40, 6
+    target = np.arange(n, dtype=float)
+    origins = np.array([10, 20, 30 - horizon])
+    features = np.zeros((n, 3), dtype=np.float32)
+    lag_columns = {1: 1, 2: 4}  # column -> lag in rows
+    model = RecordingModel()
+
+    preds = recursive_forecast(model, features, target, origins, horizon, lag_columns)
+    assert preds.shape == (len(origins), horizon)
+    for k, X in enumerate(model.seen):
+        for col, lag in lag_columns.items():
+            if k < lag:
+                np.testing.assert_array_equal(X[:, col], target[origins + k - lag])
+                assert (origins + k - lag < origins).all()
+            else:
+                np.testing.assert_array_equal(X[:, col], model.value)
+
+
+def test_recursive_forecast_never_reads_future_actuals():
+    n, horizon, origin = 30, 8, 12
+    target = np.where(np.arange(n) < origin, np.arange(n, dtype=float), FUTURE)
+    features = np.zeros((n, 2), dtype=np.float32)
+    model = RecordingModel()
+    recursive_forecast(model, features, target, np.array([origin]), horizon, {0: 1, 1: 4})
+    assert all((X != np.float32(FUTURE)).all() for X in model.seen)
+
+
+@pytest.fixture
+def backtest():
+    pytest.importorskip("domino")
+    import BacktestPiece.piece as backtest
+    return backtest
+
+
+def test_folds_train_before_their_origins(backtest, monkeypatch, tmp_path):
+    ts = pd.Series(pd.date_range("2025-01-01", periods=10 * 96, freq="15min"))
+    horizon = 96
+    origins = backtest.rolling_origins(ts, "00:00", 24, horizon, min_history_steps=2 * 96)
+    assert origins[0] == 2 * 96 and origins[-1] + horizon <= len(ts)
+    folds = backtest.make_folds(ts, origins, retrain_every_days=3)
+    assert np.array_equal(np.concatenate(folds), origins)
+
+    # feature 0 and the target are the row index, so a fitted row shows where it came from
+    rows = np.arange(len(ts), dtype=float)
+    np.save(tmp_path / "features.npy", np.stack([rows, rows], axis=1).astype(np.float32))
+    np.save(tmp_path / "target.npy", rows)
+    models = []
+    monkeypatch.setattr(backtest, "make_model", lambda **kw: models.append(RecordingModel()) or models[-1])
+    backtest._init_worker(str(tmp_path), {1: 1}, "", 1)
+    try:
+        for fold in folds:
+            for train_window in (0, 96):
+                train_start = max(0, fold[0] - train_window) if train_window else 0
+                backtest._run_fold((fold, horizon, train_start))
+                X, y = models[-1].fitted[0]
+                assert y.max() < fold.min()  # no training row at or after any origin of the fold
+                assert X[:, 0].max() < fold.min()
+                assert y.min() == train_start
+    finally:
+        backtest._WORKER.clear()
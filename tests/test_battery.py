@@ -0,0 +1,218 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline_common.battery import _threshold_pass, discharge_above_rate, monthly_peak_thresholds
+
+
+def legacy_loop(load, capacity, max_rate, soc=None):
+    """SimulatePiece's simple battery before the array kernel (one step = one kWh per kW)."""
+    soc = capacity * 0.5 if soc is None else soc
+    new_load = []
+    for val in load:
+        if val > max_rate and soc > 0:
+            discharge = min(val - max_rate, soc, max_rate)
+            new_load.append(val - discharge)
+            soc -= discharge
+        else:
+            new_load.append(val)
+    return np.array(new_load), soc
+
+
+def interval_loop(load, capacity, max_rate, interval_h, soc=None):
+    """The same loop with kW integrated over ``interval_h`` hours."""
+    soc = capacity * 0.5 if soc is None else soc
+    new_load = []
+    for val in load:
+        discharge = min(max(val - max_rate, 0.0), max_rate, soc / interval_h) if soc > 0 else 0.0
+        new_load.append(val - discharge)
+        soc -= discharge * interval_h
+    return np.array(new_load), soc
+
+
+CASES = [(0.0, 0.0), (200.0, 0.5), (1000.0, 0.25), (5000.0, 1.0), (50.0, 2.0)]
+
+
+@pytest.fixture
+def load():
+    rng = np.random.default_rng(7)
+    return rng.gamma(4.0, 60.0, size=5000)
+
+
+@pytest.mark.parametrize("capacity, c_rate", CASES)
+def test_kernel_matches_legacy_loop(load, capacity, c_rate):
+    # interval_h=1: one kW over one step is one kWh, the unit of the legacy loop
+    expected, soc = legacy_loop(load, capacity, c_rate * capacity)
+    got, soc_end = discharge_above_rate(load, capacity, c_rate * capacity, interval_h=1.0)
+    np.testing.assert_allclose(got, expected, atol=1e-9)
+    assert float(soc_end) == pytest.approx(max(soc, 0.0), abs=1e-9)
+
+
+@pytest.mark.parametrize("interval_h", [0.25, 1 / 12, 1 / 60])
+@pytest.mark.parametrize("capacity, c_rate", CASES)
+def test_kernel_matches_interval_loop(load, capacity, c_rate, interval_h):
+    expected, soc = interval_loop(load, capacity, c_rate * capacity, interval_h)
+    got, soc_end = discharge_above_rate(load, capacity, c_rate * capacity, interval_h=interval_h)
+    np.testing.assert_allclose(got, expected, atol=1e-9)
+    assert float(soc_end) == pytest.approx(max(soc, 0.0), abs=1e-9)
+
+
+def test_soc_floor_and_ceiling(load):
+    capacity, max_rate = 300.0, 150.0
+    got, soc_end = discharge_above_rate(load, capacity, max_rate, interval_h=0.25)
+    shaved = (load - got) * 0.25
+    assert (shaved >= 0).all()
+    assert shaved.sum() == pytest.approx(capacity * 0.5)  # never more than the start SOC
+    assert float(soc_end) == 0.0
+    assert (load - got <= max_rate + 1e-12).all()  # never more than max_rate
+    assert (got >= np.minimum(load, max_rate) - 1e-12).all()  # never shaves below max_rate
+
+    full, soc_full = discharge_above_rate(load, capacity, max_rate, soc_kwh=capacity, interval_h=0.25)
+    assert ((load - full) * 0.25).sum() == pytest.approx(capacity)
+    untouched, soc_empty = discharge_above_rate(load, capacity, max_rate, soc_kwh=0.0, interval_h=0.25)
+    np.testing.assert_array_equal(untouched, load)
+    assert float(soc_empty) == 0.0
+
+
+@pytest.mark.parametrize("chunks", [2, 7])
+def test_chunked_evaluation_matches_one_pass(load, chunks):
+    capacity, max_rate = 2000.0, 400.0
+    expected, soc_expected = discharge_above_rate(load, capacity, max_rate, interval_h=0.25)
+    soc, parts = None, []
+    for part in np.array_split(load, chunks):
+        out, soc = discharge_above_rate(part, capacity, max_rate, soc_kwh=soc, interval_h=0.25)
+        parts.append(out)
+    np.testing.assert_allclose(np.concatenate(parts), expected, atol=1e-9)
+    assert float(soc) == pytest.approx(float(soc_expected))
+
+
+def test_samples_by_time(load):
+    samples = np.stack([load, load * 1.5, load * 0.5])
+    got, soc_end = discharge_above_rate(samples, 1000.0, 250.0, soc_kwh=np.array([500.0, 100.0, 0.0]), interval_h=0.25)
+    assert got.shape == samples.shape and soc_end.shape == (3,)
+    for i, soc in enumerate([500.0, 100.0, 0.0]):
+        row, row_soc = discharge_above_rate(samples[i], 1000.0, 250.0, soc_kwh=soc, interval_h=0.25)
+        np.testing.assert_allclose(got[i], row)
+        assert soc_end[i] == pytest.approx(float(row_soc))
+
+
+def test_scenario_load_keeps_forecast_index():
+    pytest.importorskip("domino")
+    from SimulatePiece.piece import scenario_load
+
+    index = pd.RangeIndex(100, 196)
+    base = pd.Series(np.linspace(100.0, 400.0, 96), index=index)
+    scen = {"battery": {"capacity_kWh": 400.0, "max_c_rate": 0.5}}
+    out = scenario_load("s", scen, base, None, None, use_battery_output=False, battery_enabled=True)
+    assert out.index.equals(index)
+    expected, _ = discharge_above_rate(base.values, 400.0, 200.0, interval_h=0.25)
+    np.testing.assert_allclose(out.values, expected)
+
+
+def test_simple_battery_pinned_at_15_min():
+    # 100 kWh / 1C from 50 % SOC: two 15 min steps at 100 kW use the 50 kWh
+    load = np.array([300.0, 300.0, 300.0, 300.0, 150.0, 100.0])
+    got, soc_end = discharge_above_rate(load, 100.0, 100.0)
+    np.testing.assert_allclose(got, [200.0, 200.0, 300.0, 300.0, 150.0, 100.0])
+    assert float(soc_end) == 0.0
+
+    # the pre-interval behaviour: 50 kW in the first step drains the 50 kWh
+    legacy, _ = discharge_above_rate(load, 100.0, 100.0, interval_h=1.0)
+    np.testing.assert_allclose(legacy, [250.0, 300.0, 300.0, 300.0, 150.0, 100.0])
+
+
+def test_scenario_load_simple_battery_pinned_at_15_min():
+    pytest.importorskip("domino")
+    from SimulatePiece.piece import scenario_load
+
+    base = pd.Series([300.0, 300.0, 300.0, 300.0, 150.0, 100.0])
+    solar = pd.Series([0.0, 0.0, 50.0, 0.0, 0.0, 0.0])
+    scen = {"battery": {"capacity_kWh": 100.0, "max_c_rate": 1.0}}
+    out = scenario_load("s", scen, base, solar, None, use_battery_output=False, battery_enabled=True, interval_h=0.25)
+    np.testing.assert_allclose(out.values, [200.0, 200.0, 250.0, 300.0, 150.0, 100.0])
+
+
+# =====================================================================
+# Monthly peak thresholds
+# =====================================================================
+BATTERY = dict(capacity_kwh=200.0, max_power_kw=80.0, dt_h=1.0, charge_eff=0.9, discharge_eff=0.9,
+               initial_soc_pct=50.0, min_soc_pct=10.0, max_soc_pct=90.0)
+
+
+@pytest.fixture
+def month_net():
+    """Four hourly days over a month boundary: evening peaks, solar excess around noon."""
+    ts = pd.date_range("2025-01-30", periods=96, freq="1h")
+    hour = ts.hour.to_numpy()
+    net = 120.0 + 40.0 * np.sin(hour / 24 * 2 * np.pi)
+    net[(hour >= 11) & (hour <= 13)] = -60.0
+    net[(hour >= 18) & (hour <= 20)] += np.array([90.0, 140.0, 60.0] * 4)
+    return pd.Series(net, index=ts)
+
+
+def _feasible(chunk, threshold, soc, grid_charging=False):
+    p = BATTERY
+    return _threshold_pass(list(chunk), threshold, p["capacity_kwh"], p["max_power_kw"], p["dt_h"], p["charge_eff"],
+                           p["discharge_eff"], soc, p["min_soc_pct"], p["max_soc_pct"], grid_charging, record=False)[0]
+
+
+def _month_start_soc(net, soc_pct):
+    """SOC each month starts from: the initial SOC, then the end of the month before."""
+    months = net.index.to_period("M")
+    first = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+    return [BATTERY["initial_soc_pct"]] + [soc_pct[i - 1] for i in first[1:]]
+
+
+def test_threshold_is_lowest_feasible(month_net):
+    thresholds, soc_pct, _ = monthly_peak_thresholds(month_net.values, month_net.index, **BATTERY, tol_kw=0.1)
+    assert list(thresholds["month"]) == ["2025-01", "2025-02"]
+    for row, (_, chunk), soc in zip(thresholds.itertuples(), month_net.groupby(month_net.index.to_period("M")),
+                                    _month_start_soc(month_net, soc_pct)):
+        assert _feasible(chunk, row.threshold_kw, soc)
+        lower_bound = max(row.peak_before_kw - BATTERY["max_power_kw"], 0.0)
+        if row.threshold_kw - 0.1 >= lower_bound:
+            assert not _feasible(chunk, row.threshold_kw - 0.1, soc)
+        # brute force over a 0.01 kW grid
+        grid = np.arange(lower_bound, row.peak_before_kw + 0.01, 0.01)
+        best = next(t for t in grid if _feasible(chunk, t, soc))
+        assert best - 0.01 <= row.threshold_kw <= best + 0.1
+
+
+def test_peak_after_within_threshold(month_net):
+    thresholds, _, grid_kw = monthly_peak_thresholds(month_net.values, month_net.index, **BATTERY)
+    assert (thresholds["peak_after_kw"] <= thresholds["threshold_kw"] + 1e-6).all()
+    assert (thresholds["threshold_kw"] < thresholds["peak_before_kw"]).all()
+    assert thresholds["peak_after_kw"].max() == pytest.approx(grid_kw.max())
+
+
+def test_soc_carries_over_months(month_net):
+    _, soc_pct, grid_kw = monthly_peak_thresholds(month_net.values, month_net.index, **BATTERY)
+    feb = month_net.index.month == 2
+    end_of_january = soc_pct[~feb][-1]
+    assert end_of_january != BATTERY["initial_soc_pct"]
+
+    # February alone, started from the SOC January ended with, gives the same dispatch
+    p = {**BATTERY, "initial_soc_pct": end_of_january}
+    _, soc_feb, grid_feb = monthly_peak_thresholds(month_net.values[feb], month_net.index[feb], **p)
+    np.testing.assert_allclose(soc_pct[feb], soc_feb)
+    np.testing.assert_allclose(grid_kw[feb], grid_feb)
+
+
+def test_zero_capacity_returns_input(month_net):
+    p = {**BATTERY, "capacity_kwh": 0.0}
+    thresholds, soc_pct, grid_kw = monthly_peak_thresholds(month_net.values, month_net.index, **p)
+    np.testing.assert_allclose(grid_kw, month_net.values)
+    assert (soc_pct == BATTERY["initial_soc_pct"]).all()
+    assert (thresholds["threshold_kw"] == thresholds["peak_before_kw"]).all()
+    assert (thresholds["probes"] == 0).all()
+
+
+def test_grid_charging_recharges_below_threshold(month_net):
+    net = month_net.clip(lower=50.0)  # no solar excess: only the grid can recharge
+    solar_only, _, _ = monthly_peak_thresholds(net.values, net.index, **BATTERY)
+    thresholds, soc_pct, grid_kw = monthly_peak_thresholds(net.values, net.index, **BATTERY, grid_charging=True)
+    assert (thresholds["threshold_kw"] <= solar_only["threshold_kw"] + 1e-9).all()
+    assert thresholds["threshold_kw"].iloc[0] < solar_only["threshold_kw"].iloc[0]
+    assert (grid_kw > net.values + 1e-9).any()
+    assert (thresholds["peak_after_kw"] <= thresholds["threshold_kw"] + 1e-6).all()
+    assert soc_pct.max() <= BATTERY["max_soc_pct"] + 1e-9
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("scipy")
+
+from pipeline_common.battery_controller import ForecastUpdater, MPCController, battery_params, parse_reading
+
+# 100 kWh, 50 kW, lossless, full SOC range: every plan below can be checked on paper.
+BATTERY = battery_params({"capacity_kWh": 100, "max_power_kw": 50, "charge_efficiency": 1.0,
+                          "discharge_efficiency": 1.0, "min_soc": 0, "max_soc": 100, "initial_soc": 50})
+
+
+def _forecaster(load, price):
+    ts = pd.date_range("2025-01-01 00:00", periods=len(load), freq="1h")
+    return ForecastUpdater(pd.DataFrame({"datetime": ts, "prediction_load_kw": load, "price_eur_kwh": price}))
+
+
+def _reading(load_kw=100.0):
+    return parse_reading({"datetime": "2025-01-01 00:00", "load_kw": load_kw})
+
+
+def test_arbitrage_charges_in_cheap_hour():
+    # Cheap hour then expensive hour, SOC has to end at 50 %: charging 50 kWh at 0.1 and discharging
+    # it at 0.3 saves 50 * (0.3 - 0.1) = 10 EUR, so the first set-point is a full-power charge.
+    controller = MPCController(BATTERY, _forecaster([100, 100, 100], [0.2, 0.1, 0.3]), horizon_h=2,
+                               demand_charge_eur_kw=0.0, cycle_cost_eur_kwh=0.0)
+    setpoint = controller.step(_reading())
+    assert setpoint["source"] == "solve"
+    assert setpoint["datetime"] == "2025-01-01 01:00:00"
+    assert setpoint["battery_kw"] == pytest.approx(50.0, abs=1e-6)
+    assert setpoint["expected_grid_kw"] == pytest.approx(150.0, abs=1e-6)
+    assert setpoint["planned_soc_pct"] == pytest.approx(100.0, abs=1e-6)
+    assert controller.state["plan"]["battery_kw"] == pytest.approx([50.0, -50.0], abs=1e-6)
+
+
+def test_demand_charge_shaves_the_peak():
+    # Flat price, month peak 100 kW so far, 200 kW forecast in the second hour: the best the battery
+    # can do is 50 kW there (power limit), so the new peak is 150 kW; cycle cost keeps the first hour idle.
+    controller = MPCController(BATTERY, _forecaster([100, 100, 200], [0.1, 0.1, 0.1]), horizon_h=2,
+                               demand_charge_eur_kw=10.0, cycle_cost_eur_kwh=0.005, terminal_soc_pct=0.0)
+    setpoint = controller.step(_reading())
+    assert setpoint["month_peak_kw"] == pytest.approx(100.0)
+    assert setpoint["battery_kw"] == pytest.approx(0.0, abs=1e-6)
+    assert setpoint["grid_limit_kw"] == pytest.approx(150.0, abs=1e-6)
+    assert controller.state["plan"]["battery_kw"] == pytest.approx([0.0, -50.0], abs=1e-6)
+    assert controller.state["plan"]["soc_pct"] == pytest.approx([50.0, 0.0], abs=1e-6)
+
+
+def test_state_survives_restart(tmp_path):
+    state = tmp_path / "mpc_state.json"
+    kwargs = dict(horizon_h=2, demand_charge_eur_kw=0.0, cycle_cost_eur_kwh=0.0, state_path=state)
+    first = MPCController(BATTERY, _forecaster([100, 100, 100], [0.2, 0.1, 0.3]), **kwargs)
+    first.step(_reading())
+    restarted = MPCController(BATTERY, _forecaster([100, 100, 100], [0.2, 0.1, 0.3]), **kwargs)
+    assert restarted.state["soc_pct"] == pytest.approx(100.0, abs=1e-6)
+    assert restarted.state["month_peak_kw"] == pytest.approx(100.0)
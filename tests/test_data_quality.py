@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from pipeline_common.data_quality import (
+    DROP_FLAGS, FLATLINE, GAP, DUPLICATE, NO_DATA, SPIKE, apply_mask, parse_flags, read_solargis, scan_frame,
+    scan_solargis,
+)
+
+
+def _frame(values, start="2025-01-06", freq="15min"):
+    return pd.DataFrame({"datetime": pd.date_range(start, periods=len(values), freq=freq), "load_kw": values})
+
+
+def _load(n=960, seed=1):
+    rng = np.random.default_rng(seed)
+    day = np.sin(np.arange(n) / 96 * 2 * np.pi)
+    return 400 + 100 * day + rng.normal(0, 5, n)
+
+
+def test_minus_nine_is_a_value_in_load_and_prices():
+    values = _load()
+    values[100:104] = -9.0
+    report, mask = scan_frame(_frame(values))
+    assert report["series"]["load_kw"]["no_data"] == 0
+    assert not (mask["flags"] & NO_DATA).any()
+
+
+def test_solargis_marker_flagged_in_weather_columns(tmp_path):
+    path = tmp_path / "SolarGIS.csv"
+    ghi = np.clip(600 * np.sin(np.arange(192) / 96 * 2 * np.pi), 0, None).round(0)
+    ghi[40] = -9
+    rows = [f"{t:%d.%m.%Y};{t:%H:%M};{g:g};-9.5;{-9 if i == 7 else 2.0 + i % 3}"
+            for i, (t, g) in enumerate(zip(pd.date_range("2025-03-20 00:07", periods=192, freq="15min"), ghi))]
+    path.write_text("#Solargis export\n#\nDate;Time;GHI;SE;TEMP\n" + "\n".join(rows) + "\n")
+
+    df = read_solargis(path)
+    assert df["datetime"].iloc[0] == pd.Timestamp("2025-03-20 00:07")
+    report, mask = scan_solargis(df, name=path.name)
+    assert set(report["series"]) == {"GHI", "TEMP"}  # SE (sun elevation) can be -9 degrees
+    assert report["series"]["GHI"]["no_data"] == 1 and report["series"]["TEMP"]["no_data"] == 1
+    hits = mask[(mask["flags"] & NO_DATA) != 0]
+    assert set(hits["series"]) == {"GHI", "TEMP"}
+
+
+def test_flatline_is_reported_but_not_dropped():
+    values = _load()
+    values[200:220] = 512.0  # 5 h stuck
+    df = _frame(values)
+    report, mask = scan_frame(df, flatline_hours=3.0)
+    assert report["series"]["load_kw"]["flatline_rows"] == 20
+    assert report["series"]["load_kw"]["flagged_pct"] == 0.0
+    assert report["status"] == "ok"
+    kept, nulled = apply_mask(df, mask)
+    assert nulled == 0 and kept["load_kw"].notna().all()
+    dropped, nulled = apply_mask(df, mask, DROP_FLAGS | FLATLINE)
+    assert nulled == 20
+
+
+def test_zero_runs_are_counted_not_flagged():
+    values = _load()
+    values[300:500] = 0.0
+    report, mask = scan_frame(_frame(values))
+    assert report["series"]["load_kw"]["zero_runs"] == 1
+    assert not (mask["flags"] & FLATLINE).any()
+
+
+def test_spike_is_dropped():
+    values = _load()
+    values[321] = 4000.0
+    df = _frame(values)
+    report, mask = scan_frame(df)
+    assert report["series"]["load_kw"]["spikes"] == 1
+    out, nulled = apply_mask(df, mask)
+    assert nulled == 1 and np.isnan(out["load_kw"].iloc[321])
+
+
+def test_time_axis_duplicates_and_gaps():
+    df = _frame(_load(200))
+    df = pd.concat([df.iloc[:50], df.iloc[49:50], df.iloc[60:]], ignore_index=True)
+    report, mask = scan_frame(df)
+    assert report["time"]["duplicates"] == 1
+    assert report["time"]["gaps"] == 1 and report["time"]["missing_intervals"] == 10
+    assert report["status"] == "warning"
+    assert (mask["flags"] & DUPLICATE).any() and (mask["flags"] & GAP).any()
+
+
+def test_parse_flags():
+    assert parse_flags("no_data, spike") == NO_DATA | SPIKE
+    assert parse_flags([]) == 0
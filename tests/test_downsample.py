@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline_common.downsample import build_tiles, lttb_indices
+
+
+@pytest.mark.parametrize("n, n_out", [(10, 3), (11, 10), (1000, 7), (1000, 100), (5000, 999), (97, 96)])
+def test_lttb_keeps_ends_and_returns_n_out_increasing(n, n_out):
+    rng = np.random.default_rng(n)
+    x = np.arange(n, dtype=float)
+    idx = lttb_indices(x, rng.normal(size=n), n_out)
+    assert len(idx) == n_out
+    assert idx[0] == 0 and idx[-1] == n - 1
+    assert (np.diff(idx) > 0).all()
+
+
+def test_lttb_keeps_a_single_spike():
+    y = np.zeros(1000)
+    y[437] = 50.0
+    assert 437 in lttb_indices(np.arange(1000), y, 20)
+
+
+@pytest.mark.parametrize("n_out", [50, 51, 500, 2])
+def test_lttb_short_series_returned_whole(n_out):
+    np.testing.assert_array_equal(lttb_indices(np.arange(50), np.ones(50), n_out), np.arange(50))
+
+
+def test_lttb_ignores_nan():
+    y = np.sin(np.arange(200) / 10.0)
+    y[[5, 80, 81]] = np.nan
+    idx = lttb_indices(np.arange(200), y, 30)
+    assert len(idx) == 30 and idx[0] == 0 and idx[-1] == 199
+
+
+@pytest.fixture
+def series():
+    ts = pd.date_range("2025-01-01", periods=4 * 96, freq="15min")
+    rng = np.random.default_rng(1)
+    return pd.DataFrame({"datetime": ts, "load_kw": rng.uniform(100, 500, len(ts)),
+                         "solar_kw": rng.uniform(0, 80, len(ts))})
+
+
+def _tile(tiles, resolution, **match):
+    part = tiles[tiles["resolution"] == resolution]
+    for col, value in match.items():
+        part = part[part[col] == value]
+    return part.set_index("datetime")[["load_kw", "solar_kw"]]
+
+
+def test_tiles_equal_resample_mean(series):
+    tiles = build_tiles(series, "datetime", ["load_kw", "solar_kw", "missing"], lttb_points=60)
+    indexed = series.set_index("datetime")
+    for resolution, rule in (("hourly", "1h"), ("daily", "1D")):
+        pd.testing.assert_frame_equal(_tile(tiles, resolution), indexed.resample(rule).mean(), check_freq=False)
+    lttb = tiles[tiles["resolution"] == "lttb"]
+    assert len(lttb) <= 60 and lttb["datetime"].is_monotonic_increasing
+    # LTTB keeps real rows, not averages
+    real = lttb.merge(series, on=["datetime", "load_kw", "solar_kw"])
+    assert len(real) == len(lttb)
+
+
+def test_tiles_per_group(series):
+    other = series.assign(load_kw=series["load_kw"] * 2)
+    df = pd.concat([series.assign(scenario="a"), other.assign(scenario="b")], ignore_index=True)
+    tiles = build_tiles(df.sample(frac=1.0, random_state=0), "datetime", ["load_kw", "solar_kw"], group_col="scenario")
+    for name, frame in (("a", series), ("b", other)):
+        expected = frame.set_index("datetime").resample("1h").mean()
+        pd.testing.assert_frame_equal(_tile(tiles, "hourly", scenario=name), expected, check_freq=False)
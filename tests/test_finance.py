@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from pipeline_common import finance
+
+
+def test_npv_matches_direct_sum():
+    cf = np.array([-1000.0, 300.0, 400.0, 500.0])
+    expected = sum(c / 1.08 ** t for t, c in enumerate(cf))
+    assert finance.npv(cf, 0.08) == pytest.approx(expected)
+    assert finance.npv(cf, 0.0) == pytest.approx(200.0)
+
+
+def test_npv_broadcasts_over_rates_and_rows():
+    cf = np.array([[-100.0, 110.0], [-100.0, 121.0]])
+    np.testing.assert_allclose(finance.npv(cf, np.array([0.10, 0.21])), [0.0, 0.0], atol=1e-12)
+
+
+def test_irr_known_cases():
+    # -100 now, 110 in a year -> 10 %; a two-year annuity of 57.619 on 100 -> 10 %
+    cf = np.array([[-100.0, 110.0, 0.0], [-100.0, 57.6190476, 57.6190476], [-100.0, 0.0, 121.0]])
+    np.testing.assert_allclose(finance.irr(cf), [0.10, 0.10, 0.10], atol=1e-6)
+    rates = finance.irr(cf)
+    np.testing.assert_allclose(finance.npv(cf, rates), 0.0, atol=1e-6)
+
+
+def test_irr_without_sign_change_is_nan():
+    cf = np.array([[100.0, 10.0, 10.0], [-100.0, -10.0, -10.0]])
+    assert np.isnan(finance.irr(cf)).all()
+
+
+def test_irr_matches_bisection_on_random_flows():
+    rng = np.random.default_rng(5)
+    cf = np.concatenate([-rng.uniform(500, 1500, (200, 1)), rng.uniform(50, 300, (200, 15))], axis=1)
+    rates = finance.irr(cf)
+    for row, rate in zip(cf, rates):
+        lo, hi = -0.99, 10.0
+        for _ in range(200):
+            mid = 0.5 * (lo + hi)
+            lo, hi = (mid, hi) if finance.npv(row, mid) > 0 else (lo, mid)
+        assert rate == pytest.approx(0.5 * (lo + hi), abs=1e-8)
+
+
+def test_cash_flows_defaults_are_neutral():
+    params = {"solar_capex_eur": 600.0, "battery_capex_eur": 400.0, "annual_savings_eur": 200.0}
+    cf = finance.cash_flows(params, years=5)
+    np.testing.assert_allclose(cf, [-1000.0, 200.0, 200.0, 200.0, 200.0, 200.0])
+    res = finance.evaluate({**params, "discount_rate": 0.0}, years=5)
+    assert res["npv_eur"] == pytest.approx(0.0)
+    assert res["discounted_payback_years"] == pytest.approx(5.0)
+
+
+def test_cash_flow_components():
+    params = {"battery_capex_eur": 1000.0, "annual_savings_eur": 100.0, "savings_escalation": 0.1,
+              "degradation_per_year": 0.5, "opex_pct_of_capex": 0.01, "opex_escalation": 1.0,
+              "battery_replacement_pct": 0.6}
+    c = finance.cash_flow_components(params, years=3, battery_replacement_year=2)
+    np.testing.assert_allclose(c["capex_eur"], [1000.0, 0, 0, 0])
+    np.testing.assert_allclose(c["savings_eur"], [0.0, 100.0, 55.0, 30.25])
+    np.testing.assert_allclose(c["opex_eur"], [0.0, 10.0, 20.0, 40.0])
+    np.testing.assert_allclose(c["battery_replacement_eur"], [0.0, 0.0, 600.0, 0.0])
+
+
+def test_discounted_payback_interpolates():
+    cf = np.array([-250.0, 100.0, 100.0, 100.0])
+    assert finance.discounted_payback(cf, 0.0) == pytest.approx(2.5)
+
+
+def test_grid_and_tornado_match_evaluate():
+    base = {"solar_capex_eur": 1000.0, "annual_savings_eur": 150.0, "discount_rate": 0.05}
+    table = finance.grid(base, {"capex_pct": [-10.0, 10.0], "discount_rate": [0.04, 0.08]}, years=10)
+    assert len(table) == 4
+    for row in table.itertuples():
+        one = finance.evaluate({**base, "capex_pct": row.capex_pct, "discount_rate": row.discount_rate}, years=10)
+        assert row.npv_eur == pytest.approx(float(one["npv_eur"]))
+    tornado = finance.tornado(base, {"capex_pct": (-20.0, 20.0), "discount_rate": (0.04, 0.06)}, years=10)
+    assert list(tornado["parameter"]) == ["capex_pct", "discount_rate"]
+
+
+def test_unknown_parameter_raises():
+    with pytest.raises(ValueError):
+        finance.cash_flows({"capex": 1.0}, years=1)
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline_common.forecast_features import add_features, lag_steps
+
+
+def _frame(freq, periods):
+    ts = pd.date_range("2025-01-01", periods=periods, freq=freq)
+    return pd.DataFrame({"datetime": ts, "load_kw": np.arange(periods, dtype=float)})
+
+
+def test_lag_steps_follow_the_interval():
+    assert lag_steps(0.25) == {"lag_1": 1, "lag_4": 4}
+    assert lag_steps(1 / 60) == {"lag_1": 15, "lag_4": 60}
+    assert lag_steps(5 / 60) == {"lag_1": 3, "lag_4": 12}
+    assert lag_steps(1.0) == {"lag_1": 1, "lag_4": 1}
+
+
+@pytest.mark.parametrize("freq, periods", [("15min", 96), ("1min", 24 * 60)])
+def test_lags_cover_the_same_time_span(freq, periods):
+    df = add_features(_frame(freq, periods))
+    load = df.set_index("datetime")["load_kw"]
+    at = pd.Timestamp("2025-01-01 12:00")
+    row = df.set_index("datetime").loc[at]
+    assert row["lag_1"] == load[at - pd.Timedelta(minutes=15)]
+    assert row["lag_4"] == load[at - pd.Timedelta(hours=1)]
+    # the first hour has no full lag_4 history on either grid
+    assert df.loc[df["datetime"] < pd.Timestamp("2025-01-01 01:00"), "lag_4"].isna().all()
+    assert df.loc[df["datetime"] >= pd.Timestamp("2025-01-01 01:00"), "lag_4"].notna().all()
+
+
+def test_explicit_interval_overrides_inference():
+    df = add_features(_frame("1min", 120), interval_h=0.25)
+    assert df["lag_4"].isna().sum() == 4
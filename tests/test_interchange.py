@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from pipeline_common.interchange import in_memory_interchange, read_frame, to_arrow, write_frame
+from pipeline_common.timegrid import INTERVAL_KEY, set_interval
+
+START, END = "2024-12-31 23:00", "2025-01-01 01:00"
+
+
+@pytest.fixture
+def frame():
+    ts = pd.date_range("2024-12-31 20:00", periods=24, freq="15min")
+    df = pd.DataFrame({"datetime": ts, "load_kw": np.arange(24, dtype=float), "solar_kw": 0.5})
+    return set_interval(df, 0.25)
+
+
+def _expected(frame):
+    keep = (frame["datetime"] >= pd.Timestamp(START)) & (frame["datetime"] < pd.Timestamp(END))
+    return frame.loc[keep, "load_kw"].to_numpy()
+
+
+def _check(df, frame, columns=None, interval=True):
+    expected = _expected(frame)
+    assert len(df) == 8
+    np.testing.assert_array_equal(df["load_kw"].to_numpy(), expected)
+    if columns is None:
+        # start is inclusive, end exclusive
+        assert df["datetime"].iloc[0] == pd.Timestamp(START)
+        assert df["datetime"].iloc[-1] == pd.Timestamp(END) - pd.Timedelta(minutes=15)
+    else:
+        assert list(df.columns) == columns
+    if interval:
+        assert df.attrs[INTERVAL_KEY] == 0.25
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "feather", "csv"])
+def test_window_on_files(tmp_path, frame, fmt):
+    path = write_frame(frame, tmp_path, "data", fmt=fmt)
+    # CSV carries no schema metadata; its interval is inferred from the timestamps instead
+    _check(read_frame(path, start=START, end=END), frame, interval=fmt != "csv")
+    projected = read_frame(path, columns=["load_kw"], start=START, end=END)
+    _check(projected, frame, columns=["load_kw"], interval=fmt != "csv")
+
+
+def test_window_on_memory_frame(tmp_path, frame):
+    with in_memory_interchange():
+        path = write_frame(frame, tmp_path, "data", fmt="parquet")
+        assert not path.exists()
+        _check(read_frame(path, start=START, end=END), frame)
+        _check(read_frame(path, columns=["load_kw"], start=START, end=END), frame, columns=["load_kw"])
+
+
+def test_window_on_hive_year_directory(tmp_path, frame):
+    root = tmp_path / "dataset"
+    table = to_arrow(frame.assign(year=frame["datetime"].dt.year))
+    pq.write_to_dataset(table, root, partition_cols=["year"])
+    assert sorted(p.name for p in root.iterdir()) == ["year=2024", "year=2025"]
+
+    df = read_frame(root, columns=["datetime", "load_kw"], start=START, end=END)
+    _check(df.sort_values("datetime", ignore_index=True), frame, columns=["datetime", "load_kw"])
+    projected = read_frame(root, columns=["load_kw"], start=START, end=END)
+    assert sorted(projected["load_kw"]) == list(_expected(frame))
+    assert projected.attrs[INTERVAL_KEY] == 0.25
+
+    # a window inside one year only needs that partition
+    late = read_frame(root, columns=["load_kw"], start="2025-01-01 00:30")
+    assert sorted(late["load_kw"]) == list(frame.loc[frame["datetime"] >= "2025-01-01 00:30", "load_kw"])
+
+
+def test_open_window_bounds(tmp_path, frame):
+    path = write_frame(frame, tmp_path, "data", fmt="parquet")
+    assert read_frame(path, start=END)["datetime"].min() == pd.Timestamp(END)
+    assert read_frame(path, end=START)["datetime"].max() < pd.Timestamp(START)
+    assert len(read_frame(path, start=START, end=START)) == 0
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline_common.kpi_stream import KPIAccumulator, merge_states
+
+
+def _sim(start: str, periods: int, baseline_kw: float = 100.0, simulated_kw: float = 80.0) -> pd.DataFrame:
+    ts = pd.date_range(start, periods=periods, freq="15min")
+    return pd.DataFrame({
+        "datetime": ts,
+        "baseline_load_kw": baseline_kw,
+        "simulated_load_kw": simulated_kw,
+        "baseline_cost_eur": 1.0,
+        "scenario_cost_eur": 0.5,
+    })
+
+
+YEAR = 365 * 96
+
+
+def test_merge_sites_same_year_sums_annual_figures():
+    a, b = KPIAccumulator("a"), KPIAccumulator("b")
+    a.update(_sim("2025-01-01", YEAR))
+    b.update(_sim("2025-01-01", YEAR))
+
+    single = a.result()
+    total = merge_states([a, b]).result()
+    assert single["annual_savings_eur"] == pytest.approx(0.5 * YEAR)
+    assert total["annual_savings_eur"] == pytest.approx(2 * single["annual_savings_eur"])
+    assert total["annual_pv_mwh_est"] == pytest.approx(2 * single["annual_pv_mwh_est"])
+    assert merge_states([a, b]).covered_hours == pytest.approx(8760)
+
+
+def test_merge_consecutive_chunks_matches_one_pass():
+    full = _sim("2025-01-01", YEAR)
+    one = KPIAccumulator("site")
+    one.update(full)
+    first, second = KPIAccumulator("site"), KPIAccumulator("site")
+    first.update(full.iloc[:10_000])
+    second.update(full.iloc[10_000:])
+
+    merged = first.merge(second)
+    assert merged.covered_hours == pytest.approx(8760)
+    for key, value in one.result().items():
+        if isinstance(value, float):
+            assert merged.result()[key] == pytest.approx(value), key
+
+
+def test_half_year_is_annualised_and_gaps_are_not_covered():
+    acc = KPIAccumulator("site")
+    sim = _sim("2025-01-01", YEAR)
+    acc.update(sim.iloc[: YEAR // 2])
+    assert acc.result()["annual_savings_eur"] == pytest.approx(0.5 * YEAR, rel=1e-3)
+
+    gappy = KPIAccumulator("site")
+    gappy.update(sim.drop(sim.index[96:192]))  # one day missing
+    assert gappy.covered_hours == pytest.approx(8760 - 24)
+
+
+def test_state_round_trip_and_legacy_state():
+    acc = KPIAccumulator("site")
+    acc.update(_sim("2025-01-01", 960))
+    restored = KPIAccumulator.from_dict(acc.to_dict())
+    assert restored.periods == acc.periods
+    assert restored.result() == acc.result()
+
+    legacy = acc.to_dict()
+    del legacy["periods"]
+    assert KPIAccumulator.from_dict(legacy).covered_hours == pytest.approx(240)
+
+
+def test_update_skips_rows_before_high_water_mark():
+    acc = KPIAccumulator("site")
+    sim = _sim("2025-01-01", 200)
+    assert acc.update(sim.iloc[:120]) == 120
+    assert acc.update(sim) == 80
+    assert acc.sums["rows"] == 200
+    assert acc.covered_hours == pytest.approx(50)
+    assert np.isfinite(acc.result()["simulated_load_p95_kw"])
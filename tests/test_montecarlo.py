@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from pipeline_common.montecarlo import MonteCarloSimulation, summarize_samples
+
+
+def test_summary_excludes_never_payback_samples():
+    samples = pd.DataFrame({
+        "savings_eur": [10.0, 20.0, -5.0, 0.0],
+        "payback_years": [2.0, 4.0, np.nan, np.nan],
+    })
+    summary = summarize_samples(samples)
+    assert summary["payback_years_mean"] == 3.0
+    assert summary["payback_years_p50"] == 3.0
+    assert summary["payback_years_p90"] < 999
+    assert summary["never_payback_share"] == 0.5
+    assert summary["prob_positive_savings"] == 0.5
+
+
+def test_summary_all_samples_never_pay_back():
+    samples = pd.DataFrame({"savings_eur": [-1.0, -2.0], "payback_years": [np.nan, np.nan]})
+    summary = summarize_samples(samples)
+    assert np.isnan(summary["payback_years_mean"])
+    assert np.isnan(summary["payback_years_p50"])
+    assert summary["never_payback_share"] == 1.0
+    assert summary["prob_positive_savings"] == 0.0
+
+
+def test_summary_without_savings_column():
+    summary = summarize_samples(pd.DataFrame({"annual_savings_eur": [1.0, 3.0]}))
+    assert summary["annual_savings_eur_mean"] == 2.0
+    assert "prob_positive_savings" not in summary
+    assert "never_payback_share" not in summary
+
+
+def test_run_marks_negative_savings_as_never_payback():
+    ts = pd.date_range("2024-01-01", periods=96, freq="15min")
+    load = np.full(len(ts), 100.0)
+    # A battery that can never discharge gives zero savings on every sample.
+    sim = MonteCarloSimulation(ts, load, np.full(len(ts), 0.2), interval_h=0.25,
+                               battery={"capacity_kWh": 0, "max_c_rate": 0})
+    samples = sim.run(8, seed=1, capex_eur=1000.0)
+    assert samples["payback_years"].isna().all()
+    assert summarize_samples(samples)["never_payback_share"] == 1.0
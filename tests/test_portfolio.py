@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from pipeline_common import portfolio
+from pipeline_common.kpi_stream import KPIAccumulator, save_states
+
+
+def _site(tmp_path, site_id):
+    load = tmp_path / f"{site_id}_load.csv"
+    load.write_text("datetime,load_kw\n2025-01-01 00:00,1\n")
+    return {"site_id": site_id, "inputs": {"load_csv": str(load)}}
+
+
+def _mark_done(out_dir, site, status="ok"):
+    site_dir = out_dir / "sites" / site["site_id"]
+    site_dir.mkdir(parents=True, exist_ok=True)
+    (site_dir / portfolio.STATUS_FILE).write_text(json.dumps({
+        "site_id": site["site_id"], "status": status, "fingerprint": portfolio.fingerprint(site),
+        "started_utc": "2025-01-01T00:00:00+00:00", "finished_utc": "2025-01-01T00:10:00+00:00", "wall_s": 600.0,
+    }))
+
+
+# ---------------- resume ----------------
+
+def test_fingerprint_resume(tmp_path):
+    out = tmp_path / "out"
+    site = _site(tmp_path, "a")
+    assert not portfolio.is_done(out, site)
+    _mark_done(out, site)
+    assert portfolio.is_done(out, site)
+
+    path = site["inputs"]["load_csv"]
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))  # changed input reruns the site
+    assert not portfolio.is_done(out, site)
+
+
+def test_enqueue_skips_done_and_queued_sites(tmp_path):
+    out, queue = tmp_path / "out", tmp_path / "queue"
+    done, todo = _site(tmp_path, "done"), _site(tmp_path, "todo")
+    _mark_done(out, done)
+
+    assert portfolio.enqueue([done, todo], out, queue) == 1
+    assert sorted(p.name for p in (queue / "pending").glob("*.json")) == ["todo.json"]
+    assert portfolio.enqueue([done, todo], out, queue) == 0  # already pending
+    assert portfolio.enqueue([done, todo], out, queue, force=True) == 1
+
+
+# ---------------- queue ----------------
+
+def test_claim_and_work(tmp_path, monkeypatch):
+    out, queue = tmp_path / "out", tmp_path / "queue"
+    sites = [_site(tmp_path, s) for s in ("a", "b", "c")]
+    portfolio.enqueue(sites, out, queue)
+
+    def fake_run_site(site, out_dir, stage_workers=1):
+        return {"site_id": site["site_id"], "status": "failed" if site["site_id"] == "b" else "ok", "traceback": "x"}
+
+    monkeypatch.setattr(portfolio, "run_site", fake_run_site)
+    assert portfolio.work(queue, heartbeat_s=0.05) == 3
+    assert sorted(p.name for p in (queue / "done").glob("*.json")) == ["a.json", "c.json"]
+    failed = json.loads((queue / "failed" / "b.json").read_text())
+    assert failed["status"] == {"site_id": "b", "status": "failed"}
+    assert not list((queue / "pending").glob("*.json")) and not list((queue / "running").glob("*.json"))
+    assert portfolio.claim(queue) is None
+
+
+def test_claim_moves_each_job_once(tmp_path):
+    out, queue = tmp_path / "out", tmp_path / "queue"
+    portfolio.enqueue([_site(tmp_path, s) for s in ("a", "b")], out, queue)
+    first, second = portfolio.claim(queue), portfolio.claim(queue)
+    assert {first.name, second.name} == {"a.json", "b.json"}
+    assert first.parent.name == second.parent.name == "running"
+    assert portfolio.claim(queue) is None
+
+
+def test_heartbeat_and_requeue(tmp_path):
+    out, queue = tmp_path / "out", tmp_path / "queue"
+    portfolio.enqueue([_site(tmp_path, s) for s in ("alive", "stale")], out, queue)
+    alive, stale = portfolio.claim(queue), portfolio.claim(queue)
+    old = time.time() - 3600
+    for path in (alive, stale):
+        os.utime(path, (old, old))
+
+    stop = threading.Event()
+    beat = threading.Thread(target=portfolio._heartbeat, args=(alive, stop, 0.01), daemon=True)
+    beat.start()
+    deadline = time.time() + 5
+    while alive.stat().st_mtime < old + 60 and time.time() < deadline:
+        time.sleep(0.01)
+    stop.set()
+    beat.join()
+
+    assert portfolio.requeue(queue, stale_minutes=30) == 1
+    assert (queue / "pending" / stale.name).exists()
+    assert alive.exists()
+
+
+def test_requeue_failed_jobs(tmp_path):
+    queue = tmp_path / "queue"
+    dirs = portfolio._queue_dirs(queue)
+    (dirs["failed"] / "x.json").write_text("{}")
+    assert portfolio.requeue(queue, stale_minutes=30) == 0
+    assert portfolio.requeue(queue, stale_minutes=30, failed=True) == 1
+    assert (dirs["pending"] / "x.json").exists()
+
+
+# ---------------- collect ----------------
+
+def test_collect_sums_sites_and_uses_coincident_peak(tmp_path):
+    out = tmp_path / "out"
+    ts = pd.date_range("2025-01-01", periods=365 * 96, freq="15min")
+    shapes = {"a": [100.0, 10.0], "b": [10.0, 100.0]}  # peaks at different times
+    for site_id, (even, odd) in shapes.items():
+        site = _site(tmp_path, site_id)
+        _mark_done(out, site)
+        baseline = pd.Series([even, odd] * (len(ts) // 2), dtype=float)
+        sim = pd.DataFrame({"scenario": "s1", "datetime": ts, "baseline_load_kw": baseline,
+                            "simulated_load_kw": baseline * 0.8, "baseline_cost_eur": 1.0, "scenario_cost_eur": 0.5})
+        acc = KPIAccumulator("s1")
+        acc.update(sim)
+        save_states(out / "sites" / site_id / portfolio.KPI_STATE_FILE, {"s1": acc})
+        part = out / "dataset" / "simulated_results" / f"site_id={site_id}"
+        part.mkdir(parents=True)
+        pq.write_table(pa.Table.from_pandas(sim, preserve_index=False), part / "part-0.parquet")
+
+    report = portfolio.collect(out, ["a", "b", "missing"])
+    assert report["ok"] == 2 and report["missing"] == ["missing"]
+    kpis = pd.read_csv(out / "portfolio_kpis.csv").iloc[0]
+    assert kpis["annual_savings_eur"] == pytest.approx(2 * 0.5 * len(ts))
+    assert kpis["baseline_peak_kw"] == pytest.approx(110.0)
+    assert kpis["simulated_peak_kw"] == pytest.approx(88.0)
+    assert kpis["max_site_peak_kw"] == pytest.approx(80.0)
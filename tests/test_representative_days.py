@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline_common.representative_days import METHODS, RepresentativeDays
+
+N_DAYS = 10
+
+
+def _identical_days(n_days=N_DAYS):
+    ts = pd.date_range("2025-03-01", periods=n_days * 96, freq="15min")
+    slot = np.arange(len(ts)) % 96
+    load = 300.0 + 200.0 * np.sin(slot / 96 * 2 * np.pi) ** 2
+    price = 0.08 + 0.06 * (slot >= 32) * (slot < 80)
+    return ts, load, price
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_identical_days_one_cluster_is_exact(method):
+    ts, load, price = _identical_days()
+    rep = RepresentativeDays(ts, {"load": load, "price": price}, k=1, interval_h=0.25, method=method)
+    assert rep.k == 1
+    assert rep.weights.sum() == N_DAYS
+    assert rep.reduction == N_DAYS
+    np.testing.assert_array_equal(rep.expand(rep.take(load)), load)
+    cost = load * price * 0.25
+    assert rep.weighted_sum(rep.take(cost)) == pytest.approx(cost.sum(), rel=1e-12)
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_weights_cover_every_day(method):
+    ts, load, price = _identical_days(30)
+    rng = np.random.default_rng(3)
+    load = load * np.repeat(rng.uniform(0.7, 1.3, 30), 96)
+    rep = RepresentativeDays(ts, {"load": load, "price": price}, k=5, interval_h=0.25, method=method)
+    assert rep.k == 5
+    assert rep.weights.sum() == 30
+    assert (rep.weights >= 1).all()
+    # the peak day is a cluster of its own
+    peak_day = int(np.argmax(load)) // 96
+    assert peak_day in rep.rep_days
+    assert rep.weights[list(rep.rep_days).index(peak_day)] == 1
+    assert rep.table()["weight_days"].sum() == 30
+
+
+def test_simulate_scenario_one_cluster_matches_full_horizon():
+    pytest.importorskip("domino")
+    from SimulatePiece.piece import load_shared_inputs, simulate_scenario
+
+    ts, load, price = _identical_days()
+    fc = pd.DataFrame({"datetime": ts, "prediction_load_kw": load, "price_eur_kwh": price})
+    shared = load_shared_inputs(fc, None, None)
+    slot = np.arange(len(ts)) % 96
+    shared["solar_kw"] = pd.Series(np.clip(150.0 * np.sin((slot - 24) / 48 * np.pi), 0.0, None), index=fc.index)
+    scen = {"description": "solar only"}
+
+    full_df, full, _ = simulate_scenario("s", scen, shared, use_battery_output=False)
+    rep = RepresentativeDays(ts, {"load": load, "solar": shared["solar_kw"].values, "price": price}, k=1,
+                             interval_h=shared["interval_h"])
+    rep_df, reduced, _ = simulate_scenario("s", scen, {**shared, "representative_days": rep}, use_battery_output=False)
+
+    for key in ("baseline_cost_eur", "scenario_cost_eur", "savings_eur"):
+        assert reduced[key] == pytest.approx(full[key], rel=1e-12)
+    np.testing.assert_allclose(rep_df["simulated_load_kw"], full_df["simulated_load_kw"])
+
+
+def test_representative_errors_flags_values_outside_tolerance():
+    pytest.importorskip("domino")
+    from SimulatePiece.piece import representative_errors
+
+    def result(scenario_cost, peak):
+        df = pd.DataFrame({"simulated_load_kw": [100.0, peak]})
+        summary = {"scenario": "s", "baseline_cost_eur": 1000.0, "scenario_cost_eur": scenario_cost,
+                   "savings_eur": 1000.0 - scenario_cost}
+        return df, summary, None
+
+    errors = representative_errors([result(805.0, 200.0)], [result(800.0, 200.0)], tolerance_pct=1.0)
+    errors = errors.set_index("metric")
+    assert errors.loc["scenario_cost_eur", "error_pct"] == pytest.approx(0.625)
+    assert errors.loc["scenario_cost_eur", "within_tolerance"]
+    # savings 195 vs 200: -2.5 % is outside ±1 %
+    assert errors.loc["savings_eur", "error_pct"] == pytest.approx(-2.5)
+    assert not errors.loc["savings_eur", "within_tolerance"]
+    assert errors.loc["baseline_cost_eur", "within_tolerance"]
+    assert errors.loc["simulated_peak_kw", "error"] == 0.0
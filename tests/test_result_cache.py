@@ -0,0 +1,229 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+from pydantic import BaseModel
+
+from pipeline_common import result_cache
+from pipeline_common.result_cache import ResultCache, _replace_prefix, cached_piece
+
+PACKAGE_DIR = os.path.dirname(__file__)
+
+
+class OutputModel(BaseModel):  # looked up in the piece's module by cached_piece
+    message: str = ""
+    output_path: str = ""
+
+
+class InputModel(BaseModel):
+    config_yml: str = ""
+    factor: int = 1
+
+
+class FakePiece:
+    calls = 0
+
+    def __init__(self, results_path):
+        self.results_path = str(results_path)
+
+    @cached_piece
+    def piece_function(self, input_data):
+        type(self).calls += 1
+        out = os.path.join(self.results_path, "out.csv")
+        os.makedirs(self.results_path, exist_ok=True)
+        with open(out, "w") as f:
+            f.write(f"x\n{input_data.factor}\n")
+        self.display_result = {"file_path": out}
+        return OutputModel(message="done", output_path=out)
+
+
+@pytest.fixture
+def cache_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("PIPELINE_RESULT_CACHE", "on")
+    monkeypatch.setenv("PIPELINE_RESULT_CACHE_DIR", str(tmp_path / "cache"))
+    FakePiece.calls = 0
+    return tmp_path
+
+
+def _results(tmp_path, name="run", files=None):
+    d = tmp_path / name
+    d.mkdir(parents=True, exist_ok=True)
+    for rel, text in (files or {"out.csv": "a\n1\n"}).items():
+        (d / rel).parent.mkdir(parents=True, exist_ok=True)
+        (d / rel).write_text(text)
+    return d
+
+
+# ---------------- keying ----------------
+
+def test_key_depends_on_file_content_not_path(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    a, b = tmp_path / "a" / "cfg.yml", tmp_path / "b" / "cfg.yml"
+    for p in (a, b):
+        p.parent.mkdir()
+        p.write_text("x: 1\n")
+    key_a = cache.key("P", PACKAGE_DIR, {"config_yml": str(a), "factor": 1})
+    assert cache.key("P", PACKAGE_DIR, {"config_yml": str(b), "factor": 1}) == key_a
+    assert cache.key("P", PACKAGE_DIR, {"config_yml": str(a), "factor": 2}) != key_a
+    assert cache.key("Other", PACKAGE_DIR, {"config_yml": str(a), "factor": 1}) != key_a
+    b.write_text("x: 2\n")
+    assert cache.key("P", PACKAGE_DIR, {"config_yml": str(b), "factor": 1}) != key_a
+
+
+def test_key_hashes_directories_and_path_lists(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    d = tmp_path / "models"
+    d.mkdir()
+    (d / "m.json").write_text("{}")
+    one, two = tmp_path / "s1.yml", tmp_path / "s2.yml"
+    one.write_text("a")
+    two.write_text("b")
+    key = cache.key("P", PACKAGE_DIR, {"model_dir": str(d), "scenarios": f"{one},{two}"})
+    (d / "m.json").write_text('{"v": 2}')
+    assert cache.key("P", PACKAGE_DIR, {"model_dir": str(d), "scenarios": f"{one},{two}"}) != key
+    # a missing path is an ordinary string value
+    assert cache._path_digest(str(tmp_path / "missing.csv")) is None
+
+
+# ---------------- hash index ----------------
+
+def test_hash_index_reuses_digest_while_size_and_mtime_match(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path / "cache")
+    data = tmp_path / "load.csv"
+    data.write_text("aaaa")
+    calls = []
+    real = result_cache._sha_file
+    monkeypatch.setattr(result_cache, "_sha_file", lambda p: calls.append(p) or real(p))
+
+    first = cache.key("P", PACKAGE_DIR, {"path": str(data)})
+    assert len(calls) == 1
+    assert json.loads((tmp_path / "cache" / "file_hashes.json").read_text())[str(data.resolve())][0] == 4
+
+    again = ResultCache(tmp_path / "cache")  # index is read back from file_hashes.json
+    assert again.key("P", PACKAGE_DIR, {"path": str(data)}) == first
+    assert len(calls) == 1
+
+    stat = data.stat()
+    data.write_text("bbbb")  # same size; mtime restored -> the stale digest is reused by design
+    os.utime(data, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert ResultCache(tmp_path / "cache").key("P", PACKAGE_DIR, {"path": str(data)}) == first
+    os.utime(data, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert ResultCache(tmp_path / "cache").key("P", PACKAGE_DIR, {"path": str(data)}) != first
+    assert len(calls) == 2
+
+
+# ---------------- store / restore ----------------
+
+def test_store_and_restore_rewrite_paths(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    run = tmp_path / "run"
+    run.mkdir()
+    before = {}
+    _results(tmp_path, "run", {"out.csv": "a\n", "sub/plot.json": "{}"})
+    output = {"output_path": str(run / "out.csv"), "other": "/elsewhere/x.csv"}
+    cache.store("ab" + "0" * 62, "P", run, before, output, {"file_path": str(run / "sub/plot.json")})
+
+    target = tmp_path / "run2"
+    meta = cache.restore("ab" + "0" * 62, target)
+    assert sorted(meta["files"]) == ["out.csv", os.path.join("sub", "plot.json")]
+    assert (target / "out.csv").read_text() == "a\n"
+    assert meta["output"] == {"output_path": str(target / "out.csv"), "other": "/elsewhere/x.csv"}
+    assert meta["display_result"] == {"file_path": str(target / "sub/plot.json")}
+    assert cache.restore("cd" + "0" * 62, target) is None
+
+
+def test_store_keeps_only_files_the_run_changed(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    run = _results(tmp_path, "run", {"old.csv": "stale"})
+    from pipeline_common.instrumentation import snapshot
+    before = snapshot(run)
+    (run / "new.csv").write_text("fresh")
+    cache.store("ef" + "0" * 62, "P", run, before, {}, None)
+    assert json.loads((tmp_path / "cache" / "ef" / ("ef" + "0" * 62) / "entry.json").read_text())["files"] == ["new.csv"]
+
+
+def test_replace_prefix():
+    assert _replace_prefix("/tmp/run1/out.csv", "/tmp/run1", "/new") == "/new/out.csv"
+    assert _replace_prefix("/tmp/run1", "/tmp/run1", "/new") == "/new"
+    assert _replace_prefix("/tmp/run10/out.csv", "/tmp/run1", "/new") == "/tmp/run10/out.csv"
+    assert _replace_prefix("/tmp/run1/out.csv", "/tmp/run1/", "/new/") == "/new/out.csv"
+    nested = {"a": ["/r/x", {"b": "/r/y"}], "n": 3, "s": "text", "none": None}
+    assert _replace_prefix(nested, "/r", "/q") == {"a": ["/q/x", {"b": "/q/y"}], "n": 3, "s": "text", "none": None}
+    assert _replace_prefix("/r/x", "", "/q") == "/r/x"
+
+
+def test_concurrent_store_keeps_first_entry(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path / "cache")
+    key = "12" + "0" * 62
+    run = _results(tmp_path, "run")
+    other = _results(tmp_path, "other", {"out.csv": "other run\n"})
+
+    # the other run renames its entry into place between this run's copy and its rename
+    real_replace = Path.replace
+    raced = []
+
+    def replace_after_race(self, target):
+        if not raced and Path(target).name == key:
+            raced.append(True)
+            cache.store(key, "P", other, {}, {"who": "other"}, None)
+        return real_replace(self, target)
+
+    monkeypatch.setattr(Path, "replace", replace_after_race)
+    cache.store(key, "P", run, {}, {"who": "this"}, None)
+
+    shard = tmp_path / "cache" / key[:2]
+    assert [p.name for p in shard.iterdir()] == [key]  # no temporary directory left behind
+    meta = cache.restore(key, tmp_path / "restored")
+    assert meta["output"] == {"who": "other"}
+    assert (tmp_path / "restored" / "out.csv").read_text() == "other run\n"
+
+
+# ---------------- eviction ----------------
+
+def test_lru_eviction(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_mb=2500 / 1e6)  # room for two 1000-byte entries
+    run = tmp_path / "run"
+    keys = [f"{i:02d}" + "0" * 62 for i in range(3)]
+    for i, key in enumerate(keys[:2]):
+        shutil.rmtree(run, ignore_errors=True)
+        _results(tmp_path, "run", {"out.bin": "x" * 1000})
+        cache.store(key, "P", run, {}, {}, None)
+        os.utime(cache._entry_dir(key) / "entry.json", (1000 + i, 1000 + i))
+    cache.restore(keys[0], tmp_path / "use")  # keys[0] becomes the most recently used
+
+    shutil.rmtree(run)
+    _results(tmp_path, "run", {"out.bin": "y" * 1000})
+    cache.store(keys[2], "P", run, {}, {}, None)
+    assert cache._entry_dir(keys[0]).exists()
+    assert not cache._entry_dir(keys[1]).exists()
+    assert cache._entry_dir(keys[2]).exists()
+
+    # the entry just stored is kept even when it alone exceeds the limit
+    tiny = ResultCache(tmp_path / "cache", max_mb=1e-6)
+    assert tiny.evict(keep=keys[2]) == 1
+    assert [p.name for _, _, p in tiny.entries()] == [keys[2]]
+
+
+# ---------------- decorator ----------------
+
+def test_cached_piece_hit_miss_and_off(cache_env, monkeypatch):
+    cfg = cache_env / "cfg.yml"
+    cfg.write_text("a: 1\n")
+    first = FakePiece(cache_env / "r1").piece_function(InputModel(config_yml=str(cfg)))
+    assert FakePiece.calls == 1 and first.output_path == str(cache_env / "r1" / "out.csv")
+
+    piece = FakePiece(cache_env / "r2")
+    second = piece.piece_function(InputModel(config_yml=str(cfg)))
+    assert FakePiece.calls == 1  # hit: restored, not run
+    assert isinstance(second, OutputModel) and second.output_path == str(cache_env / "r2" / "out.csv")
+    assert (cache_env / "r2" / "out.csv").read_text() == "x\n1\n"
+    assert piece.display_result == {"file_path": str(cache_env / "r2" / "out.csv")}
+
+    FakePiece(cache_env / "r3").piece_function(InputModel(config_yml=str(cfg), factor=2))
+    assert FakePiece.calls == 2
+
+    monkeypatch.setenv("PIPELINE_RESULT_CACHE", "off")
+    FakePiece(cache_env / "r4").piece_function(InputModel(config_yml=str(cfg)))
+    assert FakePiece.calls == 3
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+pytest.importorskip("domino")
+
+from SimulatePiece.models import InputModel
+from SimulatePiece.piece import SimulatePiece, load_scenarios
+
+
+def _scenario(path, scenario_id, kwp, kwh):
+    path.write_text(yaml.safe_dump({"scenario_id": scenario_id, "solar": {"capacity_kWp": kwp},
+                                    "battery": {"capacity_kWh": kwh, "max_c_rate": 0.5}}))
+    return path
+
+
+def test_load_scenarios_file_directory_and_list(tmp_path):
+    a = _scenario(tmp_path / "a.yml", "small", 100, 50)
+    b = _scenario(tmp_path / "b.yaml", "", 200, 100)
+    (tmp_path / "notes.txt").write_text("not a scenario")
+    assert [name for name, _ in load_scenarios(str(a))] == ["small"]
+    assert [name for name, _ in load_scenarios(str(tmp_path))] == ["small", "b"]
+    assert [name for name, _ in load_scenarios(f"{b},\n{a}")] == ["b", "small"]
+    with pytest.raises(ValueError, match="Duplicate"):
+        load_scenarios(f"{a},{a}")
+    with pytest.raises(FileNotFoundError):
+        load_scenarios(str(tmp_path / "missing.yml"))
+
+
+@pytest.fixture
+def inputs(tmp_path, monkeypatch):
+    monkeypatch.setenv("PIPELINE_RESULT_CACHE", "off")
+    ts = pd.date_range("2025-06-02", periods=3 * 96, freq="15min")
+    slot = np.arange(len(ts)) % 96
+    rng = np.random.default_rng(5)
+    fc = pd.DataFrame({"datetime": ts, "prediction_load_kw": 400 + 150 * np.sin(slot / 96 * np.pi) + rng.normal(0, 20, len(ts)),
+                       "price_eur_kwh": np.where((slot >= 32) & (slot < 80), 0.15, 0.08)})
+    solar = pd.DataFrame({"datetime": ts, "solar_kw": np.clip(300 * np.sin((slot - 24) / 48 * np.pi), 0, None)})
+    # battery output without grid_import_kw: the single run falls back to the simple battery, as batch mode does
+    soc = pd.DataFrame({"datetime": ts, "soc_pct": 50.0})
+    paths = {}
+    for name, df in (("forecast", fc), ("solar", solar), ("soc", soc)):
+        paths[name] = tmp_path / f"{name}.csv"
+        df.to_csv(paths[name], index=False)
+    scen_dir = tmp_path / "scenarios"
+    scen_dir.mkdir()
+    paths["a"] = _scenario(scen_dir / "a.yml", "a", 250, 200)
+    _scenario(scen_dir / "b.yml", "b", 500, 400)
+    return paths
+
+
+def _run(tmp_path, inputs, scenario_yml, out):
+    piece = SimulatePiece()
+    piece.results_path = str(tmp_path / out)
+    (tmp_path / out).mkdir()
+    result = piece.piece_function(InputModel(
+        forecast_csv=str(inputs["forecast"]), virtual_solar_csv=str(inputs["solar"]),
+        virtual_battery_soc_csv=str(inputs["soc"]), scenario_yml=scenario_yml, virtual_solar_kwp=500,
+        max_workers=1,
+    ))
+    return pd.read_csv(result.simulated_load_csv), pd.read_csv(result.scenario_summary_csv)
+
+
+def test_batch_matches_single_scenario(tmp_path, inputs):
+    single_rows, single_summary = _run(tmp_path, inputs, str(inputs["a"]), "single")
+    batch_rows, batch_summary = _run(tmp_path, inputs, str(inputs["a"].parent), "batch")
+    assert list(batch_summary["scenario"]) == ["a", "b"]
+
+    batch_a = batch_rows[batch_rows["scenario"] == "a"].reset_index(drop=True)
+    pd.testing.assert_frame_equal(batch_a, single_rows)
+    pd.testing.assert_frame_equal(batch_summary.iloc[[0]].reset_index(drop=True), single_summary)
+    # the second scenario really is different (more solar and battery)
+    assert batch_summary.loc[1, "savings_eur"] > batch_summary.loc[0, "savings_eur"]
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("domino")
+
+from SizingOptimizationPiece.piece import SizingProblem, coarse_to_fine
+
+
+class QuadraticProblem:
+    """NPV with a single maximum at (pv_best, battery_best); counts the evaluated candidates."""
+
+    def __init__(self, pv_best, battery_best):
+        self.best = (pv_best, battery_best)
+        self.evaluated = []
+
+    def evaluate(self, pv_kwp, battery_kwh):
+        pv_kwp, battery_kwh = np.asarray(pv_kwp, dtype=float), np.asarray(battery_kwh, dtype=float)
+        self.evaluated += list(zip(pv_kwp, battery_kwh))
+        npv = 1e5 - (pv_kwp - self.best[0]) ** 2 - 4 * (battery_kwh - self.best[1]) ** 2
+        return pd.DataFrame({"pv_kwp": pv_kwp, "battery_kwh": battery_kwh, "capex_eur": 500 * pv_kwp + 300 * battery_kwh,
+                             "npv_eur": npv})
+
+
+def test_coarse_grid_returns_best_point():
+    problem = QuadraticProblem(310.0, 140.0)
+    results = coarse_to_fine(problem, (0.0, 1000.0), (0.0, 400.0), grid_points=5, refine_levels=0)
+    assert len(results) == 25
+    # grid 0/250/500/750/1000 x 0/100/200/300/400: the nearest point is (250, 100)
+    assert (results.iloc[0]["pv_kwp"], results.iloc[0]["battery_kwh"]) == (250.0, 100.0)
+    assert results["npv_eur"].iloc[0] == results["npv_eur"].max()
+
+
+def test_refinement_reaches_best_lattice_point():
+    problem = QuadraticProblem(310.0, 140.0)
+    results = coarse_to_fine(problem, (0.0, 1000.0), (0.0, 400.0), grid_points=5, refine_levels=3)
+    # finest spacing 1000/32 and 400/32: brute force over the whole lattice
+    pv = np.linspace(0.0, 1000.0, 33)
+    bat = np.linspace(0.0, 400.0, 33)
+    grid = QuadraticProblem(310.0, 140.0).evaluate(*(a.ravel() for a in np.meshgrid(pv, bat)))
+    best = grid.loc[grid["npv_eur"].idxmax()]
+    assert results.iloc[0]["pv_kwp"] == pytest.approx(best["pv_kwp"])
+    assert results.iloc[0]["battery_kwh"] == pytest.approx(best["battery_kwh"])
+    assert len(problem.evaluated) == len(set(problem.evaluated)) < len(grid)
+    assert results["pareto"].any()
+
+
+def test_sizing_problem_pv_savings_by_hand():
+    # 100 kW flat load, 0.5 kW per kWp, 0.10 EUR/kWh, one day: every kWp saves 0.5 * 24 * 0.10 * 365 = 438 EUR a year
+    n = 24
+    problem = SizingProblem(np.full(n, 100.0), np.full(n, 0.5), np.full(n, 0.10), np.zeros(n, dtype=bool), 1.0,
+                            {"max_c_rate": 0.5}, {"analysis_years": 10, "discount_rate": 0.0}, 1000.0, 400.0)
+    results = coarse_to_fine(problem, (0.0, 200.0), (0.0, 0.0), grid_points=3, refine_levels=0)
+    by_pv = results.drop_duplicates("pv_kwp").set_index("pv_kwp")
+    np.testing.assert_allclose(by_pv.loc[[0.0, 100.0, 200.0], "annual_savings_eur"], [0.0, 43800.0, 87600.0])
+    # 10 years x 438 EUR per kWp at 0 % discount repays 1000 EUR per kWp: the largest PV is best
+    assert results.iloc[0]["pv_kwp"] == 200.0
+    assert results.iloc[0]["npv_eur"] == pytest.approx(10 * 87600.0 - 200 * 1000.0)
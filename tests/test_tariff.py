@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline_common.tariff import Tariff
+
+CFG = {
+    "billing_period": "month",
+    "holidays": ["2025-05-01"],
+    "energy": {
+        "source": "fixed",
+        "default_band": "offpeak",
+        "bands": [
+            {"name": "night", "price_eur_kwh": 0.05, "hours": ["22:00", "06:00"]},
+            {"name": "peak", "price_eur_kwh": 0.20, "hours": ["08:00", "20:00"], "weekdays": [0, 1, 2, 3, 4]},
+            {"name": "offpeak", "price_eur_kwh": 0.10},
+        ],
+    },
+    "demand_charge": {"eur_per_kw": 10.0, "averaging_minutes": 60},
+    "grid_fees": {"eur_per_kwh": 0.01},
+    "fixed": {"eur_per_month": 100.0},
+}
+
+
+def _index(start="2025-04-01", end="2025-06-01", freq="15min"):
+    return pd.date_range(start, end, freq=freq, inclusive="left")
+
+
+def test_band_codes():
+    ts = pd.DatetimeIndex(["2025-04-30 23:00", "2025-04-30 05:45", "2025-04-30 09:00",  # Wednesday
+                           "2025-05-01 09:00",  # holiday -> billed like Sunday
+                           "2025-05-03 09:00", "2025-04-30 20:00", "2025-04-30 07:59"])
+    prepared = Tariff(CFG).prepare(ts, interval_h=0.25)
+    assert list(prepared.band_labels) == ["night", "night", "peak", "offpeak", "offpeak", "offpeak", "offpeak"]
+
+
+def test_period_sums_match_groupby():
+    ts = _index()
+    rng = np.random.default_rng(3)
+    load = rng.uniform(-20, 200, len(ts))
+    prepared = Tariff(CFG).prepare(ts)
+    comp = prepared.period_components(load)
+
+    df = pd.DataFrame({"month": ts.to_period("M"), "band": prepared.band_labels,
+                       "import_kwh": np.maximum(load, 0) * 0.25, "export_kwh": np.maximum(-load, 0) * 0.25})
+    by_month = df.groupby("month")[["import_kwh", "export_kwh"]].sum()
+    np.testing.assert_allclose(comp["import_kwh"], by_month["import_kwh"])
+    np.testing.assert_allclose(comp["export_kwh"], by_month["export_kwh"])
+    by_band = df.pivot_table(index="month", columns="band", values="import_kwh", aggfunc="sum", fill_value=0.0)
+    for band in ("night", "peak", "offpeak"):
+        np.testing.assert_allclose(comp[f"band_kwh:{band}"], by_band[band])
+    np.testing.assert_allclose(comp["grid_fee_eur"], by_month["import_kwh"] * 0.01)
+
+    # stacked samples and shuffled rows give the same figures
+    stacked = prepared.period_components(np.stack([load, load]))
+    np.testing.assert_allclose(stacked["total_eur"][1], comp["total_eur"])
+    perm = rng.permutation(len(ts))
+    shuffled = Tariff(CFG).prepare(ts[perm], interval_h=0.25).period_components(load[perm])
+    np.testing.assert_allclose(shuffled["total_eur"], comp["total_eur"])
+
+
+def test_demand_uses_window_average_per_period():
+    ts = _index()
+    load = np.full(len(ts), 50.0)
+    load[np.flatnonzero(ts == pd.Timestamp("2025-04-10 10:00"))[0]] = 450.0  # one 15 min spike
+    load[(ts >= "2025-05-05 10:00") & (ts < "2025-05-05 11:00")] = 150.0      # a full hour
+    comp = Tariff(CFG).prepare(ts).period_components(load)
+    np.testing.assert_allclose(comp["demand_kw"], [150.0, 150.0])  # (450 + 3 * 50) / 4 = 150
+    np.testing.assert_allclose(comp["demand_eur"], [1500.0, 1500.0])
+
+    cfg = {**CFG, "demand_charge": {"eur_per_kw": 10.0, "averaging_minutes": 15}}
+    comp = Tariff(cfg).prepare(ts).period_components(load)
+    np.testing.assert_allclose(comp["demand_kw"], [450.0, 150.0])
+
+
+def test_partial_periods_are_prorated():
+    ts = _index("2025-04-16", "2025-05-01")  # half of April
+    load = np.full(len(ts), 100.0)
+    prepared = Tariff(CFG).prepare(ts)
+    comp = prepared.period_components(load)
+    np.testing.assert_allclose(prepared.period_coverage, [0.5])
+    np.testing.assert_allclose(comp["fixed_eur"], [50.0])
+    np.testing.assert_allclose(comp["demand_eur"], [500.0])
+
+    bill = prepared.bill(load)
+    fixed = bill[bill["line_item"] == "fixed_fee"].iloc[0]
+    assert fixed["quantity"] == pytest.approx(0.5) and fixed["amount_eur"] == pytest.approx(50.0)
+
+    full = Tariff({**CFG, "prorate_partial_periods": False}).prepare(ts).period_components(load)
+    np.testing.assert_allclose(full["fixed_eur"], [100.0])
+    np.testing.assert_allclose(full["demand_eur"], [1000.0])
+
+    # a whole year of partial-period bills annualises like a full-year bill
+    year = _index("2025-01-01", "2026-01-01")
+    comp = Tariff(CFG).prepare(year).period_components(np.full(len(year), 100.0))
+    assert comp["fixed_eur"].sum() == pytest.approx(1200.0)
+
+
+def test_quarter_periods_and_sites():
+    ts = _index("2025-01-01", "2025-07-01")
+    cfg = {**CFG, "billing_period": "quarter"}
+    prepared = Tariff(cfg).prepare(np.concatenate([ts, ts]), sites=["a"] * len(ts) + ["b"] * len(ts), interval_h=0.25)
+    assert list(prepared.periods["site"]) == ["a", "a", "b", "b"]
+    assert list(prepared.periods["period_start"].dt.month) == [1, 4, 1, 4]
+    comp = prepared.period_components(np.full(2 * len(ts), 10.0))
+    np.testing.assert_allclose(comp["fixed_eur"], [300.0] * 4)